@@ -0,0 +1,82 @@
+from collections import deque
+from typing import Dict, Iterable, List, Mapping
+
+import numpy as np
+
+
+# =========================
+# AHO-CORASICK MATCHER
+# =========================
+class KeywordMatcher:
+    """
+    Many labelled keyword lists compiled into one Aho-Corasick automaton.
+
+    scan() walks a (lower-cased) text once and returns a bitmask with
+    bit i set when any keyword of the i-th label occurs in it as a
+    substring, i.e. `any(k in text for k in keywords)` for every label
+    at once. Cost is linear in the text, whatever the keyword count.
+    """
+
+    def __init__(self, patterns: Mapping[str, Iterable[str]]):
+        self.labels: List[str] = list(patterns)
+        self.bits: Dict[str, int] = {label: 1 << i for i, label in enumerate(self.labels)}
+
+        # Trie of all keywords; out[state] = labels ending at that state
+        goto: List[Dict[str, int]] = [{}]
+        out: List[int] = [0]
+        for label, keywords in patterns.items():
+            for keyword in keywords:
+                state = 0
+                for char in keyword.lower():
+                    nxt = goto[state].get(char)
+                    if nxt is None:
+                        nxt = goto[state][char] = len(goto)
+                        goto.append({})
+                        out.append(0)
+                    state = nxt
+                out[state] |= self.bits[label]
+
+        # Breadth-first failure links, folded into full transition tables:
+        # delta[state] holds every edge of the state and its failure chain
+        delta: List[Dict[str, int]] = [dict() for _ in goto]
+        delta[0] = dict(goto[0])
+        queue = deque()
+        for child in goto[0].values():
+            queue.append((child, 0))
+
+        while queue:
+            state, fail = queue.popleft()
+            out[state] |= out[fail]
+            delta[state] = dict(delta[fail])
+            delta[state].update(goto[state])
+            for char, child in goto[state].items():
+                queue.append((child, delta[fail].get(char, 0)))
+
+        self._delta = delta
+        self._out = out
+
+    def scan(self, text: str) -> int:
+        """Bitmask of the labels with a keyword in `text` (already lower-cased)"""
+        delta, out = self._delta, self._out
+        state = 0
+        mask = out[0]                # an empty keyword matches everything
+        for char in text:
+            state = delta[state].get(char, 0)
+            mask |= out[state]
+        return mask
+
+    def scan_many(self, texts: Iterable[str]) -> np.ndarray:
+        """scan() of each text, as an int64 array (object past 63 labels)"""
+        dtype = np.int64 if len(self.labels) < 64 else object
+        return np.array([self.scan(text) for text in texts], dtype=dtype)
+
+    def names(self, mask: int) -> List[str]:
+        return [label for label in self.labels if mask & self.bits[label]]
+
+    def __contains__(self, label: str) -> bool:
+        return label in self.bits
+
+
+def term_matcher(terms: Iterable[str]) -> KeywordMatcher:
+    """One label per (lower-cased) term, e.g. an avoid_foods list"""
+    return KeywordMatcher({term: [term] for term in dict.fromkeys(t.lower() for t in terms)})
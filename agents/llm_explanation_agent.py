@@ -1,4 +1,5 @@
-from typing import Dict, Optional
+import asyncio
+from typing import AsyncIterator, Dict, Optional
 
 
 class LLMExplanationAgent:
@@ -7,11 +8,15 @@ class LLMExplanationAgent:
     Never changes meals or numbers.
     """
 
-    def __init__(self, llm):
+    def __init__(self, llm, async_llm=None, stream_llm=None):
         """
         llm: a callable with signature llm(prompt:str) -> str
+        async_llm: optional coroutine function async_llm(prompt:str) -> str
+        stream_llm: optional async generator function stream_llm(prompt:str)
         """
         self.llm = llm
+        self.async_llm = async_llm
+        self.stream_llm = stream_llm
 
     # =========================
     # PUBLIC ENTRY
@@ -29,6 +34,44 @@ class LLMExplanationAgent:
         )
         return self.llm(prompt)
 
+    async def aexplain_day_plan(
+        self,
+        user_profile: Dict,
+        day_plan: Dict,
+        feedback_adjustments: Optional[Dict] = None
+    ) -> str:
+        prompt = self._build_prompt(
+            user_profile,
+            day_plan,
+            feedback_adjustments
+        )
+        if self.async_llm is None:
+            return await asyncio.to_thread(self.llm, prompt)
+        return await self.async_llm(prompt)
+
+    async def astream_day_plan(
+        self,
+        user_profile: Dict,
+        day_plan: Dict,
+        feedback_adjustments: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """Explanation text chunks as the LLM produces them"""
+        if self.stream_llm is None:
+            text = await self.aexplain_day_plan(
+                user_profile, day_plan, feedback_adjustments
+            )
+            if text:
+                yield text
+            return
+
+        prompt = self._build_prompt(
+            user_profile,
+            day_plan,
+            feedback_adjustments
+        )
+        async for chunk in self.stream_llm(prompt):
+            yield chunk
+
     # =========================
     # PROMPT CONSTRUCTION
     # =========================
@@ -1,5 +1,17 @@
-from typing import Dict, List
-from agents.nutrition_agent import NutritionAgent
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from agents.keyword_matcher import term_matcher
+from agents.nutrition_agent import (
+    FoodCatalog,
+    NutritionAgent,
+    get_food_catalog,
+    DISH_MATCHER,
+    NOT_MAIN_LABELS,
+    allergen_labels
+)
+from rules_engine.engine import CompiledRules, rules_for
 
 
 # =========================
@@ -13,29 +25,231 @@ MEAL_SPLIT = {
 
 
 # =========================
-# MEAL TYPE CLASSIFICATION
+# SCORING WEIGHTS
+# =========================
+PROTEIN_WEIGHT = 2
+PREFERENCE_BOOST = 15
+DAY_REPEAT_PENALTY = 50
+WEEK_REPEAT_PENALTY = 150
+CALORIE_TOLERANCE = 1.2
+
+
 # =========================
-DESSERT_KEYWORDS = [
-    "ladoo", "halwa", "barfi", "kheer", "payasam",
-    "gulab", "rasgulla", "sweet", "mithai", "jalebi"
-]
+# BATCHED MEAL SCORER
+# =========================
+def _term_hits(names: List[str], terms: List[str]) -> np.ndarray:
+    """`any(t in name for t in terms)` per (lower-cased) name, in one pass each"""
+    if not terms:
+        return np.zeros(len(names), dtype=bool)
+    return term_matcher(terms).scan_many(names) != 0
+
+
+def _catalog_rows(catalog: Optional[FoodCatalog], foods: List[Dict]) -> Optional[np.ndarray]:
+    """Catalog rows of `foods`, or None if they did not come from this catalog load"""
+    if catalog is None or not foods:
+        return None
+    rows = np.searchsorted(catalog.ids, [f.get("id", -1) for f in foods])
+    if (rows >= catalog.size).any():
+        return None
+    for row, food in zip(rows.tolist(), foods):
+        if catalog.ids[row] != food.get("id") or catalog.dish_names[row] != food["dish_name"]:
+            return None
+    return rows
+
+
+class BatchMealScorer:
+    """
+    Scores a whole candidate set per meal slot with array operations.
+
+    Per-candidate work (allow-list checks, meal typing, name lookups) is
+    done once when the scorer is built; each meal slot is then a few
+    vector ops and an argmax. Terms are accumulated in the same order as
+    the original per-dish score so the chosen dish is identical.
+
+    With the `catalog` the candidates came from, name labels and
+    avoid/prefer matches are read from its per-dish caches instead of
+    scanning the names again. `rules` (rules_engine) block the dishes
+    they exclude and subtract their penalties from the score.
+    """
+
+    def __init__(
+        self,
+        foods: List[Dict],
+        food_restrictions: List[str],
+        avoid_foods: List[str],
+        prefer_foods: List[str],
+        week_used_dishes: set,
+        name_matcher=None,
+        catalog: Optional[FoodCatalog] = None,
+        rules: Optional[CompiledRules] = None
+    ):
+        self.size = len(foods)
+        self.calories = np.array([f["calories"] for f in foods], dtype=np.float64)
+        self.protein = np.array([f.get("protein", 0) for f in foods], dtype=np.float64)
+
+        names = [f["dish_name"].lower() for f in foods]
+        rows = _catalog_rows(catalog, foods)
+
+        # Allergen, avoid/prefer and meal-type substring rules
+        # (agents/keyword_matcher.py); with a retrieval.embedder.NameMatcher,
+        # avoid/prefer terms are matched semantically instead
+        if rows is not None:
+            labels = catalog.labels[rows]
+        else:
+            labels = DISH_MATCHER.scan_many(names)
+
+        if name_matcher is not None:
+            matcher_rows = name_matcher.rows([f["id"] for f in foods])
+            blocked = name_matcher.mask(avoid_foods)[matcher_rows]
+            preferred = name_matcher.mask(prefer_foods)[matcher_rows]
+        elif rows is not None:
+            blocked = catalog.term_mask(avoid_foods)[rows]
+            preferred = catalog.term_mask(prefer_foods)[rows]
+        else:
+            blocked = _term_hits(names, avoid_foods)
+            preferred = _term_hits(names, prefer_foods)
+        blocked |= (labels & allergen_labels(food_restrictions)) != 0
+        not_main = (labels & NOT_MAIN_LABELS) != 0
+
+        self.rule_penalty = None
+        if rules is not None:
+            if rows is not None and rules.matches(catalog):
+                allowed, penalty = rules.allowed[rows], rules.penalty[rows]
+            else:
+                applied = rules.for_foods(foods)
+                allowed, penalty = applied.allowed, applied.penalty
+            blocked |= ~allowed
+            if penalty.any():
+                self.rule_penalty = penalty
+
+        self.eligible = ~blocked & ~not_main
+        self.preference = np.where(preferred, PREFERENCE_BOOST, 0).astype(np.float64)
+
+        # Lower-cased names interned to integer codes for set-membership masks
+        self._codes_by_name: Dict[str, int] = {}
+        self.name_codes = np.array(
+            [self._codes_by_name.setdefault(n, len(self._codes_by_name)) for n in names],
+            dtype=np.int64
+        )
+        self.week_penalty = np.where(
+            self._name_mask(week_used_dishes), WEEK_REPEAT_PENALTY, 0
+        ).astype(np.float64)
+
+    def _name_mask(self, names: set) -> np.ndarray:
+        codes = [self._codes_by_name[n] for n in names if n in self._codes_by_name]
+        if not codes:
+            return np.zeros(self.size, dtype=bool)
+        return np.isin(self.name_codes, codes)
+
+    def scores(
+        self,
+        calorie_target: float,
+        used_dishes: set,
+        meal_index: int
+    ) -> np.ndarray:
+        """Score per candidate; non-viable candidates get -inf."""
+        score = -np.abs(self.calories - calorie_target)
+        score += self.protein * PROTEIN_WEIGHT
+        score += self.preference
+        if self.rule_penalty is not None:
+            score -= self.rule_penalty
+
+        if meal_index > 0 and used_dishes:
+            score -= np.where(self._name_mask(used_dishes), DAY_REPEAT_PENALTY, 0)
+
+        score -= self.week_penalty
+
+        viable = self.eligible & (self.calories <= calorie_target * CALORIE_TOLERANCE)
+        return np.where(viable, score, -np.inf)
+
+    def best(
+        self,
+        calorie_target: float,
+        used_dishes: set,
+        meal_index: int
+    ) -> int:
+        """Index of the winning candidate (first on ties), or -1 if none."""
+        if not self.size:
+            return -1
 
-SNACK_KEYWORDS = [
-    "sandwich", "cutlet", "pakora", "samosa",
-    "chaat", "bonda", "roll", "burger", "pizza"
-]
+        score = self.scores(calorie_target, used_dishes, meal_index)
+        best = int(np.argmax(score))
 
+        if score[best] == -np.inf:
+            return -1
+        return best
 
-def classify_meal_type(dish_name: str) -> str:
-    name = dish_name.lower()
 
-    if any(k in name for k in DESSERT_KEYWORDS):
-        return "dessert"
+# =========================
+# SHARED PLANNING STATE
+# =========================
+class PlanningSession:
+    """
+    State shared by many planners in one pass (e.g. POST /plan/batch).
+
+    Every planner reads the same catalog snapshot. Candidate lists are
+    memoized by the catalog rows they contain and scorers by their
+    inputs, so users whose calorie caps select the same dishes share
+    both instead of rebuilding them.
+    """
+
+    def __init__(
+        self,
+        catalog: Optional[FoodCatalog] = None,
+        recommendation_index=None,
+        name_matcher=None
+    ):
+        self.catalog = catalog if catalog is not None else get_food_catalog()
+        # Optional agents.recommendation_index.RecommendationIndex and
+        # retrieval.embedder.NameMatcher for this catalog
+        self.recommendation_index = recommendation_index
+        self.name_matcher = name_matcher
+        self._candidates: Dict[bytes, List[Dict]] = {}
+        self._scorers: Dict[tuple, tuple] = {}
+
+    def meal_candidates(self, max_calories: float, max_sugar: float) -> List[Dict]:
+        rows = NutritionAgent(
+            max_calories_per_meal=max_calories,
+            min_protein_per_meal=0,
+            max_free_sugar=max_sugar,
+            catalog=self.catalog
+        ).get_meal_candidate_rows()
+
+        key = rows.tobytes()
+        foods = self._candidates.get(key)
+        if foods is None:
+            foods = self._candidates[key] = self.catalog.serving_dicts(rows)
+        return foods
 
-    if any(k in name for k in SNACK_KEYWORDS):
-        return "snack"
+    def scorer(
+        self,
+        foods: List[Dict],
+        food_restrictions: List[str],
+        avoid_foods: List[str],
+        prefer_foods: List[str],
+        week_used_dishes: set,
+        name_matcher=None,
+        rules: Optional[CompiledRules] = None
+    ) -> BatchMealScorer:
+        key = (
+            id(foods),
+            tuple(food_restrictions),
+            tuple(avoid_foods),
+            tuple(prefer_foods),
+            frozenset(week_used_dishes),
+            id(name_matcher),
+            id(rules)
+        )
 
-    return "main"
+        entry = self._scorers.get(key)
+        if entry is None:
+            scorer = BatchMealScorer(
+                foods, food_restrictions, avoid_foods, prefer_foods, week_used_dishes,
+                name_matcher, self.catalog, rules
+            )
+            # Keep `foods` and `rules` alive so their id()s cannot be reused
+            entry = self._scorers[key] = (foods, rules, scorer)
+        return entry[2]
 
 
 # =========================
@@ -47,11 +261,39 @@ class DailyMealPlanner:
         user_profile: Dict,
         feedback_adjustments: Dict = None,
         week_used_dishes: set = None,
+        meal_candidates: List[Dict] = None,
+        session: PlanningSession = None,
+        recommendation_index=None,
+        name_matcher=None,
+        rules: Optional[CompiledRules] = None,
     ):
         self.profile = user_profile
         self.adjustments = feedback_adjustments or {}
         self.week_used_dishes = week_used_dishes or set()
 
+        # Shared candidate set (e.g. fetched once for a whole week)
+        self.meal_candidates = meal_candidates
+        self.session = session
+
+        # Precomputed shortlists; only consulted when the candidates are
+        # the planner's own (not a list handed in by the caller)
+        if recommendation_index is None and session is not None:
+            recommendation_index = session.recommendation_index
+        if meal_candidates is not None:
+            recommendation_index = None
+        self.recommendation_index = recommendation_index
+
+        # Semantic avoid/prefer matching (opt-in)
+        if name_matcher is None and session is not None:
+            name_matcher = session.name_matcher
+        self.name_matcher = name_matcher
+
+        # Diet rules from config/rules.yaml, compiled for this profile
+        # (shared by every planner with the same active rules)
+        if rules is None:
+            rules = rules_for(user_profile, session.catalog if session is not None else None)
+        self.rules = rules
+
         # Base targets
         self.daily_calories = (
             user_profile["daily_calories"]
@@ -73,29 +315,31 @@ class DailyMealPlanner:
             max_free_sugar=self.sugar_limit
         )
 
+        self._scorer = None
+        self._scorer_foods = None
+        self._row_tests_key = None
+        self._row_tests_cache = None
+
     # =========================
     # MAIN PLANNER
     # =========================
     def generate_day_plan(self) -> Dict:
-        meal_candidates = self.nutrition_agent.get_meal_candidates()
-
         day_plan = {}
         totals = self._init_totals()
         used_dishes = set()
 
-        for meal_index, (meal_name, ratio) in enumerate(MEAL_SPLIT.items()):
-            if self.meal_strategy.get(meal_name) == "lighter":
-                ratio *= 0.8
-
+        for meal_index, (meal_name, ratio) in enumerate(self.meal_ratios().items()):
             calorie_target = self.daily_calories * ratio
 
-            meal = self._select_meal(
-                meal_candidates,
-                calorie_target,
-                used_dishes,
-                meal_name,
-                meal_index
-            )
+            meal = self._indexed_meal(ratio, calorie_target, used_dishes, meal_index)
+            if meal is None:
+                meal = self._select_meal(
+                    self._meal_candidates(),
+                    calorie_target,
+                    used_dishes,
+                    meal_name,
+                    meal_index
+                )
 
             day_plan[meal_name] = meal
             self._update_totals(totals, meal)
@@ -103,22 +347,70 @@ class DailyMealPlanner:
         day_plan["totals"] = totals
         return day_plan
 
-    # =========================
-    # FOOD FILTERING
-    # =========================
-    def _is_food_allowed(self, food: Dict) -> bool:
-        dish = food["dish_name"].lower()
+    def meal_ratios(self) -> Dict[str, float]:
+        """Each meal's share of daily_calories after the meal strategy"""
+        return {
+            meal_name: ratio * 0.8 if self.meal_strategy.get(meal_name) == "lighter" else ratio
+            for meal_name, ratio in MEAL_SPLIT.items()
+        }
 
-        # Allergy filtering (simple name-based)
-        if "peanut" in self.food_restrictions:
-            if "peanut" in dish or "groundnut" in dish:
-                return False
+    def _meal_candidates(self) -> List[Dict]:
+        """Candidate list, fetched on first use and kept for the day's meals"""
+        if self.meal_candidates is None and self.session is not None:
+            self.meal_candidates = self.session.meal_candidates(
+                self.daily_calories, self.sugar_limit
+            )
+        if self.meal_candidates is None:
+            self.meal_candidates = self.nutrition_agent.get_meal_candidates()
+        return self.meal_candidates
 
-        # Avoid disliked foods
-        if any(bad.lower() in dish for bad in self.avoid_foods):
-            return False
+    def _indexed_meal(
+        self,
+        ratio: float,
+        calorie_target: float,
+        used_dishes: set,
+        meal_index: int
+    ) -> Optional[Dict]:
+        """
+        The scorer's pick read off the recommendation index, or None when
+        the index does not cover this planner (or cannot decide the slot).
+        """
+        index = self.recommendation_index
+        if index is None:
+            return None
+
+        catalog = self.session.catalog if self.session is not None else get_food_catalog()
+        if not index.matches(catalog):
+            return None
+        if self.name_matcher is not None and not self.name_matcher.matches_catalog(catalog):
+            return None
+
+        rules = self.rules
+        if rules is not None and not rules.matches(catalog):
+            return None
+
+        slot = index.slot(self.daily_calories, self.sugar_limit, self.food_restrictions, ratio)
+        if slot is None:
+            return None
+
+        avoided, preferred = self._row_tests(catalog)
+        row = slot.best(
+            calorie_target,
+            used_dishes,
+            meal_index,
+            self.week_used_dishes,
+            avoided,
+            preferred,
+            rules.penalty if rules is not None and rules.has_penalty else None
+        )
+        if row is None:
+            return None
+        if row < 0:
+            return {}
 
-        return True
+        chosen = index.serving_dict(row)
+        used_dishes.add(chosen["dish_name"].lower())
+        return chosen
 
     # =========================
     # MEAL SELECTION WITH DIVERSITY
@@ -131,55 +423,73 @@ class DailyMealPlanner:
         meal_name: str,
         meal_index: int
     ) -> Dict:
-        viable = []
-
-        for food in foods:
-            if not self._is_food_allowed(food):
-                continue
-
-            meal_type = classify_meal_type(food["dish_name"])
-            if meal_type != "main":
-                continue
-
-            if food["calories"] <= calorie_target * 1.2:
-                viable.append(food)
+        scorer = self._scorer_for(foods)
+        best = scorer.best(calorie_target, used_dishes, meal_index)
 
-        if not viable:
+        if best < 0:
             return {}
 
-        def score(food):
-            score = 0
-
-            # 1️⃣ Calorie closeness
-            score -= abs(food["calories"] - calorie_target)
-
-            # 2️⃣ Protein reward
-            score += food.get("protein", 0) * 2
-
-            # 3️⃣ Preference boost
-            if self._preference_score(food):
-                score += 15
-
-            # 4️⃣ Soft diversity penalty within day
-            if meal_index > 0:
-                if food["dish_name"].lower() in used_dishes:
-                    score -= 50
-
-            # 5️⃣ Strong penalty for dishes already used this week (weekly variety)
-            if food["dish_name"].lower() in self.week_used_dishes:
-                score -= 150
-
-            return score
-
-        viable.sort(key=score, reverse=True)
-        chosen = viable[0]
+        chosen = foods[best]
 
         used_dishes.add(chosen["dish_name"].lower())
         return chosen
 
-    def _preference_score(self, food: Dict) -> int:
-        dish = food["dish_name"].lower()
-        return 1 if any(p.lower() in dish for p in self.prefer_foods) else 0
+    def _row_tests(self, catalog: FoodCatalog) -> tuple:
+        """
+        (row, name) tests for the avoid list (plus rule exclusions) and
+        the prefer list, None where empty; built once per planner.
+        """
+        key = (id(catalog), catalog.mtime)
+        if self._row_tests_key != key:
+            avoided = self._name_rows(self.avoid_foods, catalog)
+            if self.rules is not None:
+                excluded = self.rules.excluded
+                avoided = excluded if avoided is None else avoided | excluded
+            preferred = self._name_rows(self.prefer_foods, catalog)
+
+            self._row_tests_cache = (
+                None if avoided is None else lambda row, name: avoided[row],
+                None if preferred is None else lambda row, name: preferred[row]
+            )
+            self._row_tests_key = key
+        return self._row_tests_cache
+
+    def _name_rows(self, terms: List[str], catalog: FoodCatalog) -> Optional[np.ndarray]:
+        """Catalog rows matching any of `terms`; None for no terms"""
+        if not terms:
+            return None
+        if self.name_matcher is not None:
+            return self.name_matcher.mask(terms)
+        return catalog.term_mask(terms)
+
+    def _scorer_for(self, foods: List[Dict]) -> BatchMealScorer:
+        """One scorer per candidate list, reused across the day's meals"""
+        if self._scorer_foods is not foods:
+            # Within a session, identical scorers are shared across planners
+            if self.session is not None:
+                self._scorer = self.session.scorer(
+                    foods,
+                    self.food_restrictions,
+                    self.avoid_foods,
+                    self.prefer_foods,
+                    self.week_used_dishes,
+                    self.name_matcher,
+                    self.rules
+                )
+            else:
+                self._scorer = BatchMealScorer(
+                    foods,
+                    self.food_restrictions,
+                    self.avoid_foods,
+                    self.prefer_foods,
+                    self.week_used_dishes,
+                    self.name_matcher,
+                    catalog=get_food_catalog(),
+                    rules=self.rules
+                )
+            self._scorer_foods = foods
+
+        return self._scorer
 
     # =========================
     # TOTAL TRACKING
@@ -1,10 +1,12 @@
-from typing import List, Dict
-from database.queries import (
-    get_high_protein_foods_full,
-    get_low_sugar_foods,
-    get_high_fibre_foods,
-    get_foods_by_calories
-)
+import os
+import threading
+import time
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from agents.keyword_matcher import KeywordMatcher, term_matcher
+from database.db_connection import DB_PATH, get_pool, reset_pool
 
 # =========================
 # FOOD TYPE CLASSIFICATION
@@ -24,20 +26,87 @@ SIDE_KEYWORDS = [
 
 
 def classify_food(dish_name: str) -> str:
-    name = dish_name.lower()
+    return food_type_of(DISH_MATCHER.scan(dish_name.lower()))
+
 
-    if any(k in name for k in SPICE_KEYWORDS):
+def food_type_of(labels: int) -> str:
+    """Food type from a DISH_MATCHER label mask (first matching list wins)"""
+    if labels & DISH_MATCHER.bits["spice"]:
         return "spice"
 
-    if any(k in name for k in BEVERAGE_KEYWORDS):
+    if labels & DISH_MATCHER.bits["beverage"]:
         return "beverage"
 
-    if any(k in name for k in SIDE_KEYWORDS):
+    if labels & DISH_MATCHER.bits["side"]:
         return "side"
 
     return "meal"
 
 
+# =========================
+# MEAL TYPE CLASSIFICATION
+# =========================
+
+DESSERT_KEYWORDS = [
+    "ladoo", "halwa", "barfi", "kheer", "payasam",
+    "gulab", "rasgulla", "sweet", "mithai", "jalebi"
+]
+
+SNACK_KEYWORDS = [
+    "sandwich", "cutlet", "pakora", "samosa",
+    "chaat", "bonda", "roll", "burger", "pizza"
+]
+
+
+def classify_meal_type(dish_name: str) -> str:
+    return meal_type_of(DISH_MATCHER.scan(dish_name.lower()))
+
+
+def meal_type_of(labels: int) -> str:
+    if labels & DISH_MATCHER.bits["dessert"]:
+        return "dessert"
+
+    if labels & DISH_MATCHER.bits["snack"]:
+        return "snack"
+
+    return "main"
+
+
+# =========================
+# ALLERGEN SCREENING
+# =========================
+
+# Restriction name -> dish-name synonyms screened for it
+ALLERGEN_SYNONYMS = {
+    "peanut": ["peanut", "groundnut"]
+}
+
+
+def allergen_label(allergen: str) -> str:
+    return f"allergen:{allergen}"
+
+
+def allergen_labels(restrictions: List[str]) -> int:
+    """DISH_MATCHER bitmask of the allergens screened for `restrictions`"""
+    labels = 0
+    for restriction in restrictions:
+        labels |= DISH_MATCHER.bits.get(allergen_label(restriction), 0)
+    return labels
+
+
+# Every keyword list above in one automaton: a single pass over a dish
+# name yields all of its labels (see agents/keyword_matcher.py)
+DISH_MATCHER = KeywordMatcher({
+    "spice": SPICE_KEYWORDS,
+    "beverage": BEVERAGE_KEYWORDS,
+    "side": SIDE_KEYWORDS,
+    "dessert": DESSERT_KEYWORDS,
+    "snack": SNACK_KEYWORDS,
+    **{allergen_label(a): synonyms for a, synonyms in ALLERGEN_SYNONYMS.items()}
+})
+NOT_MAIN_LABELS = DISH_MATCHER.bits["dessert"] | DISH_MATCHER.bits["snack"]
+
+
 # =========================
 # PORTION LOGIC (PER 100g → SERVING)
 # =========================
@@ -50,6 +119,13 @@ DEFAULT_SERVING_GRAMS = {
 }
 
 
+NUTRIENT_COLUMNS = [
+    "calories", "carbs", "protein", "fats",
+    "free_sugar", "fibre", "sodium",
+    "calcium", "iron", "vitamin_c", "folate"
+]
+
+
 def apply_portion(food: Dict) -> Dict:
     food_type = food["food_type"]
     serving = DEFAULT_SERVING_GRAMS[food_type]
@@ -60,16 +136,215 @@ def apply_portion(food: Dict) -> Dict:
     adjusted["serving_grams"] = serving
 
     # Scale nutritional values
-    for key in [
-        "calories", "carbs", "protein", "fats",
-        "free_sugar", "fibre", "sodium",
-        "calcium", "iron", "vitamin_c", "folate"
-    ]:
+    for key in NUTRIENT_COLUMNS:
         adjusted[key] = round(food[key] * factor, 2)
 
     return adjusted
 
 
+# =========================
+# IN-MEMORY FOOD CATALOG
+# =========================
+
+CATALOG_CHECK_INTERVAL = 5.0    # seconds between DB mtime checks
+TERM_CACHE_SIZE = 4096          # avoid/prefer terms with a cached row mask
+
+
+class FoodCatalog:
+    """
+    The whole `foods` table held as NumPy columns, loaded once.
+
+    Food/meal-type labels and per-serving values are computed at load
+    time, so candidate filtering is a handful of boolean masks with no
+    SQL and no disk I/O. A load is never modified afterwards: when the
+    database file's mtime changes, get_food_catalog() builds a new
+    catalog and swaps it in, so readers never mix columns of two loads.
+    """
+
+    def __init__(self):
+        self.db_path = DB_PATH
+        self._lock = threading.Lock()
+        self._load()
+        self._last_check = time.monotonic()
+
+    # ---------- LOADING ----------
+    def _load(self):
+        self.mtime = os.path.getmtime(self.db_path)
+
+        rows = get_pool().fetchall(
+            f"SELECT id, dish_name, {', '.join(NUTRIENT_COLUMNS)} FROM foods ORDER BY id"
+        )
+
+        self.size = len(rows)
+        self.ids = np.array([r["id"] for r in rows], dtype=np.int64)
+        self.dish_names = [r["dish_name"] for r in rows]
+
+        # Per-100g values (NULL -> NaN, which fails every comparison like SQL)
+        self.raw = {
+            col: np.array(
+                [np.nan if r[col] is None else r[col] for r in rows],
+                dtype=np.float64
+            )
+            for col in NUTRIENT_COLUMNS
+        }
+
+        # DISH_MATCHER labels per row (one pass per name); types and
+        # allergen screens are read off these masks
+        self.labels = DISH_MATCHER.scan_many(name.lower() for name in self.dish_names)
+        label_list = self.labels.tolist()
+        self.food_types = np.array([food_type_of(m) for m in label_list])
+        self.meal_types = np.array([meal_type_of(m) for m in label_list])
+        self._term_masks: Dict[str, np.ndarray] = {}
+        self.serving_grams = np.array(
+            [DEFAULT_SERVING_GRAMS[t] for t in self.food_types],
+            dtype=np.int64
+        )
+
+        # Per-serving values, rounded exactly like apply_portion()
+        factors = [g / 100.0 for g in self.serving_grams.tolist()]
+        self.serving = {
+            col: np.array(
+                [round(v * f, 2) for v, f in zip(self.raw[col].tolist(), factors)],
+                dtype=np.float64
+            )
+            for col in NUTRIENT_COLUMNS
+        }
+
+        self.is_meal_like = ~np.isin(self.food_types, ["spice", "beverage"])
+
+        # Protein descending, ties by row (NaN last); filtering this order
+        # equals a stable sort of any filtered subset
+        self.protein_order = np.argsort(-self.raw["protein"], kind="stable")
+
+    def is_stale(self) -> bool:
+        """DB file changed since this load (checked at most every few seconds)."""
+        now = time.monotonic()
+        if now - self._last_check < CATALOG_CHECK_INTERVAL:
+            return False
+        self._last_check = now
+        return os.path.getmtime(self.db_path) != self.mtime
+
+    # ---------- VECTORIZED FILTERS ----------
+    def protein_mask(self, min_protein: float) -> np.ndarray:
+        return self.raw["protein"] >= min_protein
+
+    def calorie_mask(self, max_calories: Optional[float]) -> np.ndarray:
+        if not max_calories:
+            return np.ones(self.size, dtype=bool)
+        return self.raw["calories"] <= max_calories
+
+    def sugar_mask(self, max_sugar: float) -> np.ndarray:
+        # "not above" so NaN sugar passes, matching the previous row loop
+        return ~(self.raw["free_sugar"] > max_sugar)
+
+    def top_by_protein(self, mask: np.ndarray, limit: int) -> np.ndarray:
+        """Row indices passing `mask`, protein descending, first `limit`."""
+        order = self.protein_order
+        return order[mask[order]][:limit]
+
+    def meal_candidate_rows(
+        self,
+        min_protein: float,
+        max_calories: Optional[float],
+        max_sugar: float,
+        limit: int = 50
+    ) -> np.ndarray:
+        """
+        Same selection as the former SQL + row loop: top `limit` dishes by
+        protein under the calorie cap, minus spices/beverages, high-sugar
+        and < 50 kcal servings.
+        """
+        rows = self.top_by_protein(
+            self.protein_mask(min_protein) & self.calorie_mask(max_calories),
+            limit
+        )
+
+        keep = (
+            self.is_meal_like[rows]
+            & self.sugar_mask(max_sugar)[rows]
+            & ~(self.serving["calories"][rows] < 50)
+        )
+        return rows[keep]
+
+    # ---------- NAME LABELS ----------
+    def label_mask(self, labels: int) -> np.ndarray:
+        """Rows carrying any of the DISH_MATCHER labels in the bitmask"""
+        return (self.labels & labels) != 0
+
+    def allergen_mask(self, restrictions: List[str]) -> np.ndarray:
+        """Rows screened out for the allergens among `restrictions`"""
+        return self.label_mask(allergen_labels(restrictions))
+
+    def labels_of(self, food_id: int) -> List[str]:
+        row = int(np.searchsorted(self.ids, food_id))
+        if row >= self.size or self.ids[row] != food_id:
+            raise KeyError(food_id)
+        return DISH_MATCHER.names(int(self.labels[row]))
+
+    def term_mask(self, terms: List[str]) -> np.ndarray:
+        """
+        Rows whose lower-cased name contains any of `terms` (the
+        avoid/prefer rule). Each term's mask is computed once per catalog
+        load; new terms are matched together in one pass over the names.
+        """
+        terms = list(dict.fromkeys(t.lower() for t in terms))
+        cache = self._term_masks
+        with self._lock:
+            masks = {t: cache[t] for t in terms if t in cache}
+
+        missing = [t for t in terms if t not in masks]
+        if missing:
+            matcher = term_matcher(missing)
+            found = matcher.scan_many(name.lower() for name in self.dish_names)
+            with self._lock:
+                if len(cache) + len(missing) > TERM_CACHE_SIZE:
+                    cache.clear()
+                for term in missing:
+                    masks[term] = cache[term] = (found & matcher.bits[term]) != 0
+
+        mask = np.zeros(self.size, dtype=bool)
+        for term_rows in masks.values():
+            mask |= term_rows
+        return mask
+
+    # ---------- ROW MATERIALIZATION ----------
+    def serving_dict(self, row: int) -> Dict:
+        food = {"id": int(self.ids[row]), "dish_name": self.dish_names[row]}
+        for col in NUTRIENT_COLUMNS:
+            food[col] = float(self.serving[col][row])
+        food["food_type"] = str(self.food_types[row])
+        food["serving_grams"] = int(self.serving_grams[row])
+        return food
+
+    def serving_dicts(self, rows: np.ndarray) -> List[Dict]:
+        return [self.serving_dict(r) for r in rows.tolist()]
+
+
+_catalog: Optional[FoodCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_food_catalog() -> FoodCatalog:
+    """
+    Process-wide catalog, loaded on first use and kept fresh by mtime.
+    A reload builds a new FoodCatalog and swaps the reference, so
+    callers holding the old one keep a consistent (if stale) snapshot
+    and `catalog is ...` checks in the indexes see the change.
+    """
+    global _catalog
+
+    catalog = _catalog
+    if catalog is not None and not catalog.is_stale():
+        return catalog
+
+    with _catalog_lock:
+        if _catalog is catalog:
+            if catalog is not None:
+                reset_pool()
+            _catalog = FoodCatalog()
+        return _catalog
+
+
 # =========================
 # CORE NUTRITION AGENT
 # =========================
@@ -79,44 +354,38 @@ class NutritionAgent:
         self,
         max_calories_per_meal: float = 500,
         min_protein_per_meal: float = 10,
-        max_free_sugar: float = 5
+        max_free_sugar: float = 5,
+        catalog: Optional[FoodCatalog] = None
     ):
         self.max_calories = max_calories_per_meal
         self.min_protein = min_protein_per_meal
         self.max_sugar = max_free_sugar
 
-    def get_meal_candidates(self) -> List[Dict]:
-        """
-        Return realistic meal candidates only
-        """
+        # A pinned catalog (e.g. one snapshot for a whole batch);
+        # otherwise the process-wide one
+        self._catalog = catalog
+
+    @property
+    def catalog(self) -> FoodCatalog:
+        if self._catalog is not None:
+            return self._catalog
+        return get_food_catalog()
 
-        raw_foods = get_high_protein_foods_full(
+    def get_meal_candidate_rows(self, catalog: Optional[FoodCatalog] = None) -> np.ndarray:
+        """Catalog row indices of the meal candidates"""
+        catalog = catalog or self.catalog
+        return catalog.meal_candidate_rows(
             min_protein=self.min_protein,
             max_calories=self.max_calories,
+            max_sugar=self.max_sugar,
             limit=50
         )
 
-        candidates = []
-
-        for food in raw_foods:
-            food_type = classify_food(food["dish_name"])
-            food["food_type"] = food_type
-
-            # ❌ Exclude spices & beverages as meals
-            if food_type in ["spice", "beverage"]:
-                continue
-
-            # ❌ Exclude high-sugar items
-            if food["free_sugar"] > self.max_sugar:
-                continue
-
-            # ✅ Apply portion logic
-            adjusted_food = apply_portion(food)
-
-            # ❌ Remove nutritionally meaningless meals
-            if adjusted_food["calories"] < 50:
-                continue
-
-            candidates.append(adjusted_food)
-
-        return candidates
+    def get_meal_candidates(self) -> List[Dict]:
+        """
+        Return realistic meal candidates only
+        """
+        # Rows and dicts must come from the same catalog load
+        catalog = self.catalog
+        rows = self.get_meal_candidate_rows(catalog)
+        return catalog.serving_dicts(rows)
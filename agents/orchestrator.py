@@ -1,26 +1,71 @@
-from agents.user_profile_agent import UserProfileAgent
-from agents.meal_planner_agent import DailyMealPlanner
+import asyncio
+import json
+
+from agents.user_profile_agent import build_profiles, get_profile
+from agents.meal_planner_agent import DailyMealPlanner, PlanningSession
+from agents.weekly_planner_agent import WeeklyMealPlanner
+from agents.recommendation_index import USE_RECOMMENDATION_INDEX, get_recommendation_index
+from retrieval.embedder import USE_SEMANTIC_MATCHING, get_name_matcher
 from agents.feedback_agent import FeedbackAgent
 from agents.llm_explanation_agent import LLMExplanationAgent
 from llm.llama_loader import LlamaLoader
+from llm.explanation_scheduler import ExplanationScheduler, READY, SKIPPED, UNAVAILABLE
+
+
+BATCH_EXPLAIN_CONCURRENCY = 8   # explanation requests in flight per batch
 
 
 class NutritionOrchestrator:
-    def __init__(self):
+    def __init__(
+        self,
+        scheduler: ExplanationScheduler = None,
+        use_recommendation_index: bool = USE_RECOMMENDATION_INDEX,
+        use_semantic_matching: bool = USE_SEMANTIC_MATCHING
+    ):
         self.llm_loader = LlamaLoader()
-        self.explainer = LLMExplanationAgent(self.llm_loader.generate)
+        self.explainer = LLMExplanationAgent(
+            self.llm_loader.generate,
+            async_llm=self.llm_loader.agenerate,
+            stream_llm=self.llm_loader.astream
+        )
+        self.scheduler = scheduler or ExplanationScheduler()
+        self.use_recommendation_index = use_recommendation_index
+        self.use_semantic_matching = use_semantic_matching
 
-    def run_day(self, user_input, feedback=None):
-        profile = UserProfileAgent(user_input).build_profile()
+    def _recommendation_index(self, catalog=None):
+        """Precomputed shortlists (opt-in), kept current with the catalog"""
+        if not self.use_recommendation_index:
+            return None
+        return get_recommendation_index(catalog)
 
+    def _name_matcher(self, catalog=None):
+        """Embedding-based avoid/prefer matching (opt-in)"""
+        if not self.use_semantic_matching:
+            return None
+        return get_name_matcher(catalog)
+
+    def _plan_day(self, user_input, feedback=None):
+        profile = get_profile(user_input)
+        return profile, self._day_plan(profile, feedback)
+
+    def _day_plan(self, profile, feedback=None, session=None):
         if feedback:
             feedback_agent = FeedbackAgent(feedback["yesterday_plan"], feedback)
             adjustments = feedback_agent.generate_adjustments()
         else:
             adjustments = None
 
-        planner = DailyMealPlanner(profile, adjustments)
-        plan = planner.generate_day_plan()
+        planner = DailyMealPlanner(
+            profile,
+            adjustments,
+            session=session,
+            recommendation_index=None if session is not None else self._recommendation_index(),
+            name_matcher=None if session is not None else self._name_matcher()
+        )
+        return planner.generate_day_plan()
+
+    def run_day(self, user_input, feedback=None):
+        profile, plan = self._plan_day(user_input, feedback)
 
         try:
             explanation = self.explainer.explain_day_plan(
@@ -37,3 +82,248 @@ class NutritionOrchestrator:
             "plan": plan,
             "explanation": explanation
         }
+
+    def _plan_week(self, user_input):
+        profile = get_profile(user_input)
+        planner = WeeklyMealPlanner(
+            profile,
+            recommendation_index=self._recommendation_index(),
+            name_matcher=self._name_matcher()
+        )
+        return profile, planner.generate_week_plan()
+
+    def run_week(self, user_input, explain=False):
+        """
+        Profile once, plan seven days against one shared candidate set.
+        Explanations are a separate, opt-in stage (one LLM call per day).
+        """
+        profile, result = self._plan_week(user_input)
+
+        if explain:
+            result["explanations"] = self.explain_week(profile, result["week_plan"])
+
+        return result
+
+    def explain_week(self, profile, week_plan):
+        """
+        Per-day explanations in the same shape as aexplain_week
+        ({"status", "explanation", "explanation_id"}), generated inline.
+        """
+        explanations = {}
+
+        for day, day_plan in week_plan.items():
+            try:
+                explanation = self.explainer.explain_day_plan(
+                    user_profile=profile,
+                    day_plan=day_plan
+                )
+                status = READY
+            except Exception:
+                explanation, status = "", UNAVAILABLE
+
+            explanations[day] = {
+                "status": status,
+                "explanation": explanation,
+                "explanation_id": None
+            }
+
+        return explanations
+
+    # =========================
+    # ASYNC REQUEST PATH
+    # =========================
+    async def arun_day(self, user_input, feedback=None):
+        """
+        Same plan as run_day, computed off the event loop; the
+        explanation goes through the scheduler and comes back pending
+        instead of blocking the response.
+        """
+        profile, plan = await asyncio.to_thread(self._plan_day, user_input, feedback)
+
+        result = await self.scheduler.explain(
+            lambda: self.explainer.aexplain_day_plan(
+                user_profile=profile,
+                day_plan=plan,
+                feedback_adjustments=feedback
+            )
+        )
+
+        return {
+            "profile": profile,
+            "plan": plan,
+            "explanation": result["explanation"],
+            "explanation_status": result["status"],
+            "explanation_id": result["explanation_id"]
+        }
+
+    async def arun_week(self, user_input, explain=False):
+        profile, result = await asyncio.to_thread(self._plan_week, user_input)
+
+        if explain:
+            result["explanations"] = await self.aexplain_week(
+                profile, result["week_plan"]
+            )
+
+        return result
+
+    async def aexplain_week(self, profile, week_plan):
+        days = list(week_plan)
+
+        results = await asyncio.gather(*[
+            self.scheduler.explain(
+                lambda day_plan=week_plan[day]: self.explainer.aexplain_day_plan(
+                    user_profile=profile,
+                    day_plan=day_plan
+                )
+            )
+            for day in days
+        ])
+
+        return dict(zip(days, results))
+
+    # =========================
+    # STREAMING (SSE) PATH
+    # =========================
+    async def astream_day(self, user_input, feedback=None):
+        """
+        Yield ("plan", {...}) as soon as the plan is computed, then
+        ("token", text) chunks of the explanation and its final
+        ("explanation", {status, explanation, explanation_id}).
+        """
+        profile, plan = await asyncio.to_thread(self._plan_day, user_input, feedback)
+        yield "plan", {"profile": profile, "plan": plan}
+
+        async for event, data in self._astream_explanation(profile, plan, feedback):
+            yield event, data
+
+    async def astream_week(self, user_input):
+        profile, result = await asyncio.to_thread(self._plan_week, user_input)
+        yield "plan", {"profile": profile, **result}
+
+        for day, day_plan in result["week_plan"].items():
+            async for event, data in self._astream_explanation(profile, day_plan):
+                yield event, {"day": day, **data}
+
+    async def _astream_explanation(self, profile, plan, feedback=None):
+        """
+        A stream holds an LLM slot for at most the scheduler's hard
+        timeout. If no slot frees up within its response budget, the
+        explanation is queued like a non-streamed one and reported as
+        pending, to poll by id.
+        """
+        request = {"user_profile": profile, "day_plan": plan, "feedback_adjustments": feedback}
+
+        async with self.scheduler.slot() as acquired:
+            if acquired:
+                text = ""
+                try:
+                    async for chunk in self.scheduler.stream(self.explainer.astream_day_plan(**request)):
+                        text += chunk
+                        yield "token", {"text": chunk}
+                except Exception:
+                    # The plan has already been sent; end the explanation as unavailable
+                    status = UNAVAILABLE
+                else:
+                    status = READY
+                yield "explanation", {"status": status, "explanation": text, "explanation_id": None}
+                return
+
+        result = await self.scheduler.explain(
+            lambda: self.explainer.aexplain_day_plan(**request)
+        )
+        yield "explanation", result
+
+    # =========================
+    # BATCH (COHORT) PATH
+    # =========================
+    def plan_batch(self, requests, horizon="day"):
+        """
+        Plan a cohort in one pass. `requests` is a list of
+        (user_input, feedback) pairs; results come back in the same order.
+
+        Every plan reads the same catalog snapshot, profiles are built in
+        bulk, and users with identical profiles (and feedback) are planned
+        once and share the result.
+        """
+        session = PlanningSession()
+        session.recommendation_index = self._recommendation_index(session.catalog)
+        session.name_matcher = self._name_matcher(session.catalog)
+        profiles = build_profiles([user_input for user_input, _ in requests])
+
+        groups = {}
+        results = []
+        for (_, feedback), profile in zip(requests, profiles):
+            # build_profiles returns one shared object per profile key
+            key = (id(profile), self._feedback_key(feedback) if horizon == "day" else None)
+
+            if key not in groups:
+                if horizon == "week":
+                    groups[key] = {
+                        "profile": profile,
+                        **WeeklyMealPlanner(profile, session=session).generate_week_plan()
+                    }
+                else:
+                    groups[key] = {
+                        "profile": profile,
+                        "plan": self._day_plan(profile, feedback, session),
+                        "explanation": "",
+                        "explanation_status": SKIPPED,
+                        "explanation_id": None
+                    }
+            results.append(groups[key])
+
+        return results, len(groups)
+
+    @staticmethod
+    def _feedback_key(feedback):
+        if not feedback:
+            return None
+        return json.dumps(feedback, sort_keys=True, default=str)
+
+    async def arun_batch(self, requests, horizon="day", explain=False):
+        """
+        plan_batch off the event loop; explanations are opt-in, one per
+        distinct plan, with at most BATCH_EXPLAIN_CONCURRENCY in flight.
+        """
+        results, group_count = await asyncio.to_thread(
+            self.plan_batch, requests, horizon
+        )
+
+        if explain:
+            await self._aexplain_batch(results, requests, horizon)
+
+        return {"plans": results, "groups": group_count}
+
+    async def _aexplain_batch(self, results, requests, horizon):
+        gate = asyncio.Semaphore(BATCH_EXPLAIN_CONCURRENCY)
+
+        # Grouped users share a result dict; explain each one once
+        distinct = {}
+        for result, (_, feedback) in zip(results, requests):
+            distinct.setdefault(id(result), (result, feedback))
+
+        async def explain(result, feedback):
+            async with gate:
+                if horizon == "week":
+                    result["explanations"] = await self.aexplain_week(
+                        result["profile"], result["week_plan"]
+                    )
+                    return
+
+                explained = await self.scheduler.explain(
+                    lambda: self.explainer.aexplain_day_plan(
+                        user_profile=result["profile"],
+                        day_plan=result["plan"],
+                        feedback_adjustments=feedback
+                    )
+                )
+                result["explanation"] = explained["explanation"]
+                result["explanation_status"] = explained["status"]
+                result["explanation_id"] = explained["explanation_id"]
+
+        await asyncio.gather(*[
+            explain(result, feedback) for result, feedback in distinct.values()
+        ])
+
+    def get_explanation(self, explanation_id):
+        return self.scheduler.get(explanation_id)
@@ -0,0 +1,397 @@
+import hashlib
+import io
+import itertools
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from agents.meal_planner_agent import (
+    MEAL_SPLIT,
+    PROTEIN_WEIGHT,
+    PREFERENCE_BOOST,
+    DAY_REPEAT_PENALTY,
+    WEEK_REPEAT_PENALTY,
+    CALORIE_TOLERANCE
+)
+from agents.nutrition_agent import (
+    FoodCatalog,
+    NutritionAgent,
+    get_food_catalog,
+    ALLERGEN_SYNONYMS,
+    NOT_MAIN_LABELS,
+    allergen_labels
+)
+from database.db_connection import BASE_DIR
+
+
+# =========================
+# PROFILE BUCKETS
+# =========================
+INDEX_PATH = BASE_DIR / "data" / "processed" / "recommendation_index.npz"
+USE_RECOMMENDATION_INDEX = os.getenv("NUTRITION_RECOMMENDATION_INDEX", "0") == "1"
+
+FORMAT_VERSION = 1
+CALORIE_BANDS = np.arange(800, 5001, 100, dtype=np.float64)     # band i: [edge i, edge i+1)
+SUGAR_LIMITS = (20, 40)                  # UserProfileAgent._sugar_limit values
+SCORED_RESTRICTIONS = tuple(ALLERGEN_SYNONYMS)   # restrictions BatchMealScorer acts on
+SHORTLIST_SIZE = 16                      # pre-ranked dishes kept per meal slot
+BOUND_SLACK = 1e-6                       # keeps float rounding on the safe side
+
+# Every calorie ratio DailyMealPlanner can use ("lighter" scales by 0.8)
+SLOT_RATIOS = sorted({r for ratio in MEAL_SPLIT.values() for r in (ratio, ratio * 0.8)})
+
+FALLBACK = None                          # RecommendationSlot.best: shortlist not conclusive
+
+# The index is a set of buckets (calorie band x sugar limit x scored
+# restrictions). A bucket is only stored when every daily calorie value
+# in its band selects the same candidate list; for each meal ratio it
+# keeps the SHORTLIST_SIZE dishes with the highest upper bound on their
+# base score over the band, plus the best bound left outside the list.
+
+
+def restriction_key(food_restrictions: List[str]) -> tuple:
+    return tuple(r for r in SCORED_RESTRICTIONS if r in food_restrictions)
+
+
+def _restriction_sets():
+    return [
+        combo
+        for size in range(len(SCORED_RESTRICTIONS) + 1)
+        for combo in itertools.combinations(SCORED_RESTRICTIONS, size)
+    ]
+
+
+def _band(daily_calories: float) -> int:
+    """Band index of a daily calorie value, -1 outside the indexed range"""
+    band = int(np.searchsorted(CALORIE_BANDS, daily_calories, side="right")) - 1
+    return band if 0 <= band < len(CALORIE_BANDS) - 1 else -1
+
+
+# =========================
+# REQUEST-TIME SLOT
+# =========================
+class RecommendationSlot:
+    """
+    Pre-ranked shortlist for one (bucket, meal ratio).
+
+    Entries are (bound, position, row, calories, protein, name) sorted by
+    bound, where bound >= the dish's base score (calorie distance and
+    protein) for any target in the band and position is the dish's place
+    in the full candidate list (the scorer's tie-break). best() adds the
+    per-user terms and stops as soon as no remaining dish can win.
+    """
+
+    def __init__(self, entries: List[tuple], outside_bound: float):
+        self.entries = entries
+        self.outside_bound = outside_bound
+
+    def best(
+        self,
+        calorie_target: float,
+        used_dishes: set,
+        meal_index: int,
+        week_used_dishes: set,
+        avoided: Optional[Callable] = None,
+        preferred: Optional[Callable] = None,
+        penalty: Optional[np.ndarray] = None
+    ) -> Optional[int]:
+        """
+        Catalog row BatchMealScorer.best would pick, -1 if no dish is
+        viable, or FALLBACK when the answer may lie outside the shortlist.
+        `avoided` / `preferred` test (row, lower-cased name) against the
+        user's avoid / prefer lists (None when a list is empty); `penalty`
+        holds the diet-rule penalties per catalog row. Penalties only
+        lower scores, so the shortlist bounds stay valid.
+        """
+        boost = PREFERENCE_BOOST if preferred is not None else 0
+        day_repeats = meal_index > 0 and used_dishes
+        limit = calorie_target * CALORIE_TOLERANCE
+
+        best_score, best_position, best_row = -np.inf, -1, -1
+        for bound, position, row, calories, protein, name in self.entries:
+            if bound + boost < best_score:
+                return best_row
+            if calories > limit:
+                continue
+            if avoided is not None and avoided(row, name):
+                continue
+
+            # Same terms, same order as BatchMealScorer.scores
+            score = -abs(calories - calorie_target)
+            score += protein * PROTEIN_WEIGHT
+            if preferred is not None and preferred(row, name):
+                score += PREFERENCE_BOOST
+            if penalty is not None:
+                score -= penalty[row]
+            if day_repeats and name in used_dishes:
+                score -= DAY_REPEAT_PENALTY
+            if name in week_used_dishes:
+                score -= WEEK_REPEAT_PENALTY
+
+            if score > best_score or (score == best_score and position < best_position):
+                best_score, best_position, best_row = score, position, row
+
+        if self.outside_bound + boost < best_score or self.outside_bound == -np.inf:
+            return best_row
+        return FALLBACK
+
+
+# =========================
+# INDEX
+# =========================
+class RecommendationIndex:
+    """
+    Precomputed meal shortlists over profile buckets for one catalog.
+
+    Buckets are keyed by content hash of their inputs, so rebuilding for
+    a changed `foods` table only re-ranks the buckets whose candidate
+    dishes actually changed.
+    """
+
+    def __init__(self, catalog: FoodCatalog, buckets: Dict[tuple, Dict]):
+        self.catalog = catalog
+        self.catalog_mtime = catalog.mtime
+        self.buckets = buckets
+        self.reused = 0          # buckets carried over by the last build
+        self.rebuilt = 0
+        self._slots: Dict[tuple, RecommendationSlot] = {}
+        self._dicts: Dict[int, Dict] = {}
+
+    # ---------- BUILD ----------
+    @classmethod
+    def build(cls, catalog: FoodCatalog, previous: "RecommendationIndex" = None):
+        old = {}
+        if previous is not None:
+            old = {bucket["hash"]: bucket for bucket in previous.buckets.values()}
+
+        not_main = catalog.label_mask(NOT_MAIN_LABELS)
+
+        buckets, reused = {}, 0
+        for sugar in SUGAR_LIMITS:
+            for band in range(len(CALORIE_BANDS) - 1):
+                low, high = CALORIE_BANDS[band], CALORIE_BANDS[band + 1]
+                rows = _candidate_rows(catalog, low, sugar)
+                if not np.array_equal(rows, _candidate_rows(catalog, high, sugar)):
+                    continue      # candidates change inside the band: not indexable
+
+                for restrictions in _restriction_sets():
+                    digest = _bucket_hash(catalog, rows, low, high, restrictions)
+                    bucket = old.get(digest)
+                    if bucket is not None:
+                        reused += 1
+                    else:
+                        blocked = (not_main | catalog.label_mask(allergen_labels(restrictions)))[rows]
+                        bucket = _rank_bucket(catalog, rows, blocked, low, high)
+                        bucket["hash"] = digest
+                    buckets[(band, sugar, restrictions)] = bucket
+
+        index = cls(catalog, buckets)
+        index.reused, index.rebuilt = reused, len(buckets) - reused
+        return index
+
+    # ---------- PERSISTENCE ----------
+    def save(self, path=INDEX_PATH):
+        path = Path(path)
+        keys = list(self.buckets)
+        arrays = {
+            "format": np.array(FORMAT_VERSION),
+            "catalog_mtime": np.array(self.catalog_mtime),
+            "calorie_bands": CALORIE_BANDS,
+            "slot_ratios": np.array(SLOT_RATIOS),
+            "band": np.array([k[0] for k in keys], dtype=np.int16),
+            "sugar": np.array([k[1] for k in keys], dtype=np.float64),
+            "restrictions": np.array([",".join(k[2]) for k in keys], dtype=str),
+            "hash": np.array([self.buckets[k]["hash"] for k in keys], dtype="S20")
+        }
+        for field in ("ids", "positions", "bounds", "outside"):
+            arrays[field] = np.stack([self.buckets[k][field] for k in keys])
+
+        # Written next to the target and swapped in
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        tmp.write_bytes(buffer.getvalue())
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, catalog: FoodCatalog, path=INDEX_PATH):
+        """
+        Index stored at `path` for `catalog`. A file written for another
+        version of the `foods` table (or other bucket settings) is
+        rebuilt, reusing every bucket whose inputs are unchanged.
+        """
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+        if int(arrays["format"]) != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recommendation index format: {int(arrays['format'])}")
+
+        buckets = {}
+        for i, band in enumerate(arrays["band"].tolist()):
+            restrictions = tuple(r for r in str(arrays["restrictions"][i]).split(",") if r)
+            buckets[(band, float(arrays["sugar"][i]), restrictions)] = {
+                "hash": bytes(arrays["hash"][i]),
+                "ids": arrays["ids"][i],
+                "positions": arrays["positions"][i],
+                "bounds": arrays["bounds"][i],
+                "outside": arrays["outside"][i]
+            }
+        stored = cls(catalog, buckets)
+        current = (
+            float(arrays["catalog_mtime"]) == catalog.mtime
+            and np.array_equal(arrays["calorie_bands"], CALORIE_BANDS)
+            and np.array_equal(arrays["slot_ratios"], SLOT_RATIOS)
+            and arrays["ids"].shape[-1] == SHORTLIST_SIZE
+        )
+
+        if current:
+            return stored
+        return cls.build(catalog, previous=stored)
+
+    # ---------- LOOKUP ----------
+    def matches(self, catalog: FoodCatalog) -> bool:
+        return catalog is self.catalog and catalog.mtime == self.catalog_mtime
+
+    def slot(
+        self,
+        daily_calories: float,
+        sugar_limit: float,
+        food_restrictions: List[str],
+        ratio: float
+    ) -> Optional[RecommendationSlot]:
+        """Shortlist for a planner's inputs, None if they are not indexed"""
+        band = _band(daily_calories)
+        if band < 0 or ratio not in SLOT_RATIOS:
+            return None
+
+        key = (band, float(sugar_limit), restriction_key(food_restrictions), ratio)
+        slot = self._slots.get(key)
+        if slot is None:
+            bucket = self.buckets.get(key[:3])
+            if bucket is None:
+                return None
+            slot = self._slots[key] = self._make_slot(bucket, SLOT_RATIOS.index(ratio))
+        return slot
+
+    def _make_slot(self, bucket: Dict, column: int) -> RecommendationSlot:
+        catalog = self.catalog
+        ids = bucket["ids"][column]
+        count = int(np.count_nonzero(ids >= 0))
+        rows = np.searchsorted(catalog.ids, ids[:count]).tolist()
+
+        entries = [
+            (
+                float(bucket["bounds"][column][i]),
+                int(bucket["positions"][column][i]),
+                row,
+                float(catalog.serving["calories"][row]),
+                float(catalog.serving["protein"][row]),
+                catalog.dish_names[row].lower()
+            )
+            for i, row in enumerate(rows)
+        ]
+        return RecommendationSlot(entries, float(bucket["outside"][column]))
+
+    def serving_dict(self, row: int) -> Dict:
+        """Shared per-serving dict for a catalog row (like session candidates)"""
+        food = self._dicts.get(row)
+        if food is None:
+            food = self._dicts[row] = self.catalog.serving_dict(row)
+        return food
+
+
+def _candidate_rows(catalog: FoodCatalog, daily_calories: float, sugar_limit: float) -> np.ndarray:
+    return NutritionAgent(
+        max_calories_per_meal=daily_calories,
+        min_protein_per_meal=0,
+        max_free_sugar=sugar_limit,
+        catalog=catalog
+    ).get_meal_candidate_rows()
+
+
+def _bucket_hash(catalog, rows, low, high, restrictions) -> bytes:
+    digest = hashlib.sha1()
+    digest.update(np.array([low, high, SHORTLIST_SIZE, *SLOT_RATIOS]).tobytes())
+    digest.update(",".join(restrictions).encode())
+    digest.update(catalog.ids[rows].tobytes())
+    digest.update(catalog.serving["calories"][rows].tobytes())
+    digest.update(catalog.serving["protein"][rows].tobytes())
+    digest.update("\0".join(catalog.dish_names[r] for r in rows.tolist()).encode())
+    return digest.digest()
+
+
+def _rank_bucket(catalog, rows, blocked, low, high) -> Dict:
+    """Shortlists of one bucket, one row per ratio in SLOT_RATIOS"""
+    calories = catalog.serving["calories"][rows]
+    protein = catalog.serving["protein"][rows]
+    positions = np.arange(len(rows))
+
+    shape = (len(SLOT_RATIOS), SHORTLIST_SIZE)
+    bucket = {
+        "ids": np.full(shape, -1, dtype=np.int64),
+        "positions": np.full(shape, -1, dtype=np.int16),
+        "bounds": np.full(shape, -np.inf),
+        "outside": np.full(len(SLOT_RATIOS), -np.inf)
+    }
+
+    for column, ratio in enumerate(SLOT_RATIOS):
+        lowest, highest = low * ratio, high * ratio
+
+        # Never eligible, or too large for every target in the band
+        keep = ~blocked & ~(calories > highest * CALORIE_TOLERANCE + BOUND_SLACK)
+        distance = np.maximum(0, np.maximum(lowest - calories, calories - highest))
+        bound = protein * PROTEIN_WEIGHT - distance + BOUND_SLACK
+
+        order = positions[keep][np.lexsort((positions[keep], -bound[keep]))]
+        listed = order[:SHORTLIST_SIZE]
+        bucket["ids"][column, :len(listed)] = catalog.ids[rows[listed]]
+        bucket["positions"][column, :len(listed)] = listed
+        bucket["bounds"][column, :len(listed)] = bound[listed]
+        if len(order) > SHORTLIST_SIZE:
+            bucket["outside"][column] = bound[order[SHORTLIST_SIZE]]
+
+    return bucket
+
+
+# =========================
+# PROCESS-WIDE INDEX
+# =========================
+_index: Optional[RecommendationIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_recommendation_index(catalog: Optional[FoodCatalog] = None, path=INDEX_PATH) -> RecommendationIndex:
+    """
+    Index for `catalog` (the process-wide one by default). Loaded from
+    `path` on first use; when the catalog reloads, the index is rebuilt
+    incrementally and written back.
+    """
+    global _index
+    path = Path(path)
+    catalog = catalog if catalog is not None else get_food_catalog()
+
+    index = _index
+    if index is not None and index.matches(catalog):
+        return index
+
+    with _index_lock:
+        if _index is not None and _index.matches(catalog):
+            return _index
+
+        if _index is not None:
+            index = RecommendationIndex.build(catalog, previous=_index)
+        elif path.exists():
+            index = RecommendationIndex.load(catalog, path)
+        else:
+            index = RecommendationIndex.build(catalog)
+
+        if index.rebuilt or not path.exists():
+            try:
+                index.save(path)
+            except OSError:
+                pass              # read-only deployment: keep it in memory
+        _index = index
+        return index
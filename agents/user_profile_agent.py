@@ -1,4 +1,27 @@
-from typing import Dict
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+ACTIVITY_FACTORS = {
+    "sedentary": 1.2,
+    "light": 1.375,
+    "moderate": 1.55,
+    "active": 1.725,
+    "very_active": 1.9
+}
+
+# Every input field that influences build_profile(), in profile_key() order
+PROFILE_FIELDS = (
+    "age", "gender", "height", "weight", "activity_level", "goal",
+    "blood_pressure", "blood_sugar", "cholesterol",
+    "thyroid", "pcos", "digestive_issues",
+    "allergies", "culture", "region", "state", "diet_preference"
+)
+
+PROFILE_CACHE_SIZE = 4096
 
 
 class UserProfileAgent:
@@ -43,14 +66,7 @@ class UserProfileAgent:
             return 10 * weight + 6.25 * height - 5 * age - 161
 
     def _calculate_tdee(self, bmr: float) -> float:
-        activity_map = {
-            "sedentary": 1.2,
-            "light": 1.375,
-            "moderate": 1.55,
-            "active": 1.725,
-            "very_active": 1.9
-        }
-        factor = activity_map.get(self.user["activity_level"], 1.2)
+        factor = ACTIVITY_FACTORS.get(self.user["activity_level"], 1.2)
         return bmr * factor
 
     def _adjust_for_goal(self, tdee: float) -> float:
@@ -117,3 +133,226 @@ class UserProfileAgent:
             "state": self.user.get("state"),
             "veg_preference": self.user.get("diet_preference", "any")
         }
+
+
+# =========================
+# IMMUTABLE PROFILES
+# =========================
+class FrozenProfile(dict):
+    """
+    Read-only profile dict. Cached profiles are shared between requests,
+    so any in-place change would leak into other users' plans.
+    Still a dict, so pydantic and JSON encoding treat it as one.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("cached profiles are read-only; copy with dict(profile)")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        return (FrozenProfile, (dict(self),))
+
+
+def freeze_profile(profile: Dict) -> FrozenProfile:
+    frozen = dict(profile)
+    frozen["food_restrictions"] = tuple(profile["food_restrictions"])
+    frozen["diet_style"] = FrozenProfile(profile["diet_style"])
+    return FrozenProfile(frozen)
+
+
+# =========================
+# PROFILE KEY
+# =========================
+def profile_key(user_input: Dict) -> Tuple:
+    """
+    Canonical, hashable key of everything build_profile() reads.
+    Values are normalised only where the agent ignores the difference
+    (gender case, truthiness of the boolean flags, list vs tuple).
+    """
+    get = user_input.get
+    return (
+        user_input["age"],
+        user_input["gender"].lower(),
+        float(user_input["height"]),
+        float(user_input["weight"]),
+        user_input["activity_level"],
+        user_input["goal"],
+        get("blood_pressure"),
+        get("blood_sugar"),
+        get("cholesterol"),
+        bool(get("thyroid")),
+        bool(get("pcos")),
+        get("digestive_issues"),
+        # Order is kept: it is the order of food_restrictions
+        tuple(get("allergies") or ()),
+        get("culture"),
+        get("region"),
+        get("state"),
+        get("diet_preference", "any")
+    )
+
+
+def _input_from_key(key: Tuple) -> Dict:
+    return dict(zip(PROFILE_FIELDS, key))
+
+
+# =========================
+# PROFILE CACHE
+# =========================
+class ProfileCache:
+    """Bounded LRU of frozen profiles keyed by profile_key()"""
+
+    def __init__(self, max_entries: int = PROFILE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._profiles: "OrderedDict[Tuple, FrozenProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[FrozenProfile]:
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                self.misses += 1
+                return None
+            self._profiles.move_to_end(key)
+            self.hits += 1
+            return profile
+
+    def put(self, key: Tuple, profile: FrozenProfile):
+        with self._lock:
+            self._profiles[key] = profile
+            self._profiles.move_to_end(key)
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+
+    def get_many(self, keys) -> Dict[Tuple, FrozenProfile]:
+        """Cached profiles for `keys` under a single lock acquisition"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                profile = self._profiles.get(key)
+                if profile is not None:
+                    self._profiles.move_to_end(key)
+                    found[key] = profile
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, profiles: Dict[Tuple, FrozenProfile]):
+        with self._lock:
+            self._profiles.update(profiles)
+            for key in profiles:
+                self._profiles.move_to_end(key)
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._profiles),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+_profile_cache = ProfileCache()
+
+
+def get_profile_cache() -> ProfileCache:
+    return _profile_cache
+
+
+def get_profile(user_input: Dict) -> FrozenProfile:
+    """Memoized build_profile(); the result is shared and read-only"""
+    key = profile_key(user_input)
+
+    profile = _profile_cache.get(key)
+    if profile is None:
+        profile = freeze_profile(UserProfileAgent(_input_from_key(key)).build_profile())
+        _profile_cache.put(key, profile)
+    return profile
+
+
+# =========================
+# BATCH
+# =========================
+def _energy_targets(keys: List[Tuple]) -> Dict[str, np.ndarray]:
+    """
+    Mifflin-St Jeor, TDEE, goal adjustment and protein over a whole cohort.
+    Same float64 operations in the same order as the scalar methods,
+    so every value is bit-identical to build_profile().
+    """
+    columns = dict(zip(PROFILE_FIELDS, zip(*keys)))
+
+    age = np.array(columns["age"], dtype=np.float64)
+    height = np.array(columns["height"], dtype=np.float64)
+    weight = np.array(columns["weight"], dtype=np.float64)
+    male = np.array(columns["gender"], dtype=object) == "male"
+    goals = np.array(columns["goal"], dtype=object)
+    factor = np.array(
+        [ACTIVITY_FACTORS.get(level, 1.2) for level in columns["activity_level"]],
+        dtype=np.float64
+    )
+
+    base = 10 * weight + 6.25 * height - 5 * age
+    bmr = np.where(male, base + 5, base - 161)
+    tdee = bmr * factor
+
+    fat_loss = goals == "fat_loss"
+    muscle_gain = goals == "muscle_gain"
+    daily = np.where(fat_loss, tdee - 500, np.where(muscle_gain, tdee + 300, tdee))
+    protein = np.where(
+        muscle_gain, weight * 2.0,
+        np.where(fat_loss, weight * 1.6, weight * 1.2)
+    )
+
+    return {
+        "bmr": bmr,
+        "tdee": tdee,
+        "daily_calories": daily,
+        "protein_target": protein
+    }
+
+
+def build_profiles(user_inputs: List[Dict]) -> List[FrozenProfile]:
+    """
+    Profiles for a batch of users, in input order.
+    Duplicate inputs share one profile; only keys missing from the
+    cache are computed, with the energy maths vectorized over NumPy.
+    """
+    keys = [profile_key(user_input) for user_input in user_inputs]
+
+    unique = list(dict.fromkeys(keys))
+    profiles = _profile_cache.get_many(unique)
+    missing = [key for key in unique if key not in profiles]
+
+    if missing:
+        energy = {
+            name: values.tolist()
+            for name, values in _energy_targets(missing).items()
+        }
+
+        built = {}
+        for i, key in enumerate(missing):
+            agent = UserProfileAgent(_input_from_key(key))
+            profile = {name: values[i] for name, values in energy.items()}
+            profile["sugar_limit"] = agent._sugar_limit()
+            profile["sodium_limit"] = agent._sodium_limit()
+            profile["fat_strategy"] = agent._fat_strategy()
+            profile["food_restrictions"] = agent._food_restrictions()
+            profile["diet_style"] = agent._diet_style()
+            built[key] = freeze_profile(profile)
+
+        _profile_cache.put_many(built)
+        profiles.update(built)
+
+    return [profiles[key] for key in keys]
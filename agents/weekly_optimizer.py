@@ -0,0 +1,494 @@
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from agents.meal_planner_agent import (
+    MEAL_SPLIT,
+    CALORIE_TOLERANCE,
+    BatchMealScorer
+)
+
+try:
+    from ortools.sat.python import cp_model
+except ImportError:
+    cp_model = None
+
+try:
+    import pulp
+except ImportError:
+    pulp = None
+
+
+# =========================
+# WEEKLY MODEL
+# =========================
+DAYS = 7
+MEALS = list(MEAL_SPLIT)
+SLOTS = DAYS * len(MEALS)
+
+OPTIMIZER_TIME_BUDGET = float(os.getenv("NUTRITION_OPTIMIZER_BUDGET", "0.5"))   # seconds
+OPTIMIZER_SOLVER = os.getenv("NUTRITION_OPTIMIZER_SOLVER", "auto")   # auto / cpsat / pulp / local
+
+CALORIE_BAND = 0.10             # each day within +-10% of its calorie target
+FIBRE_TARGET = 25               # g/day, organ_twin's daily target
+
+# Penalties, in meal-score points
+EMPTY_SLOT_PENALTY = 1000       # a slot left without a dish
+REPEAT_PENALTY = 500            # per extra day a dish is used in the week
+CALORIE_BAND_PENALTY = 20       # per kcal outside a day's band, when the candidates can reach it
+UNREACHABLE_BAND_PENALTY = 2    # per kcal short of a band no choice of dishes reaches
+SUGAR_PENALTY = 20              # per g of free sugar over a day's limit
+PROTEIN_SHORTFALL_PENALTY = 3   # per g below the weekly protein target
+FIBRE_SHORTFALL_PENALTY = 2     # per g below the weekly fibre target
+# A repeat is traded for 25 kcal of a reachable band, 250 kcal of an
+# unreachable one or 25 g of sugar over the limit: weeks gain repeats
+# only to bring reachable days into their band or cut sugar, and a
+# repeat-free week that costs only meal score is always preferred
+
+OBJECTIVE_SCALE = 100           # CP-SAT needs integer coefficients
+NUTRIENT_SCALE = 10             # 0.1 kcal / 0.1 g resolution in CP-SAT
+
+EMPTY = -1                      # assignment value of an empty slot
+
+# The week is 21 slots (day-major: day 0 breakfast, lunch, dinner, day 1
+# ...) each taking one candidate dish. A slot's own score is the meal
+# planner's score (calorie distance to its target, protein, preference,
+# rule penalties) and only viable dishes may fill it; on top of that:
+#   - a dish at most once per day (hard) and once per week (soft, each
+#     extra use costs REPEAT_PENALTY, so small candidate pools still plan)
+#   - each day's calories within CALORIE_BAND of its target
+#   - each day's free sugar within the profile's sugar_limit
+#   - weekly protein and fibre totals reach 7x the daily targets
+# The day/week terms are soft (penalized slacks), so a plan always exists.
+
+
+class WeeklyProblem:
+    """Arrays of one week's assignment problem over a candidate list"""
+
+    def __init__(
+        self,
+        foods: List[Dict],
+        scorer: BatchMealScorer,
+        day_calories: List[float],
+        meal_ratios: List[Dict[str, float]],
+        protein_target: float,
+        sugar_limit: float
+    ):
+        self.foods = foods
+        self.size = len(foods)
+        self.calories = scorer.calories
+        self.protein = scorer.protein
+        self.fibre = np.array([f.get("fibre", 0) or 0 for f in foods], dtype=np.float64)
+        self.sugar = np.array([f.get("free_sugar", 0) or 0 for f in foods], dtype=np.float64)
+
+        self.day_calories = np.array(day_calories, dtype=np.float64)
+        self.targets = np.array(
+            [day_calories[day] * meal_ratios[day][meal] for day in range(DAYS) for meal in MEALS],
+            dtype=np.float64
+        )
+        self.day_of = np.repeat(np.arange(DAYS), len(MEALS))
+
+        # score[s, d]: the meal planner's score of dish d in slot s
+        score = -np.abs(self.calories[None, :] - self.targets[:, None])
+        score += self.protein[None, :] * 2
+        score += scorer.preference[None, :]
+        if scorer.rule_penalty is not None:
+            score -= scorer.rule_penalty[None, :]
+        self.viable = scorer.eligible[None, :] & (
+            self.calories[None, :] <= self.targets[:, None] * CALORIE_TOLERANCE
+        )
+        self.score = np.where(self.viable, score, -np.inf)
+
+        self.band_low = self.day_calories * (1 - CALORIE_BAND)
+        self.band_high = self.day_calories * (1 + CALORIE_BAND)
+
+        # A day's band is enforced (high weight) only if its slots' largest
+        # viable dishes can reach it; otherwise the gap is mostly fixed by
+        # the candidate set and a high weight would only buy repeats
+        largest = np.where(self.viable, self.calories[None, :], 0).max(axis=1)
+        reachable = np.bincount(self.day_of, weights=largest, minlength=DAYS) >= self.band_low
+        self.band_weight = np.where(reachable, CALORIE_BAND_PENALTY, UNREACHABLE_BAND_PENALTY)
+        self.sugar_limit = float(sugar_limit)
+        self.protein_goal = DAYS * float(protein_target)
+        self.fibre_goal = DAYS * float(FIBRE_TARGET)
+
+    # ---------- OBJECTIVE ----------
+    def objective(self, assign: np.ndarray) -> float:
+        """Exact objective of an assignment (slot -> dish row or EMPTY)"""
+        return float(self.breakdown(assign)["objective"])
+
+    def breakdown(self, assign: np.ndarray) -> Dict[str, float]:
+        filled = assign >= 0
+        rows = assign[filled]
+        slots = np.flatnonzero(filled)
+
+        score = self.score[slots, rows].sum() - EMPTY_SLOT_PENALTY * (~filled).sum()
+        uses = np.bincount(rows, minlength=self.size)
+        repeats = np.maximum(uses - 1, 0).sum()
+
+        day_cal = np.bincount(self.day_of[slots], weights=self.calories[rows], minlength=DAYS)
+        day_sugar = np.bincount(self.day_of[slots], weights=self.sugar[rows], minlength=DAYS)
+        band = np.maximum(self.band_low - day_cal, 0) + np.maximum(day_cal - self.band_high, 0)
+        sugar_over = np.maximum(day_sugar - self.sugar_limit, 0)
+        protein_short = max(self.protein_goal - self.protein[rows].sum(), 0)
+        fibre_short = max(self.fibre_goal - self.fibre[rows].sum(), 0)
+
+        objective = (
+            score
+            - REPEAT_PENALTY * repeats
+            - (self.band_weight * band).sum()
+            - SUGAR_PENALTY * sugar_over.sum()
+            - PROTEIN_SHORTFALL_PENALTY * protein_short
+            - FIBRE_SHORTFALL_PENALTY * fibre_short
+        )
+        return {
+            "objective": objective,
+            "meal_score": score,
+            "repeats": int(repeats),
+            "empty_slots": int((~filled).sum()),
+            "calorie_band_kcal": float(band.sum()),
+            "days_outside_band": int((band > 0).sum()),
+            "sugar_over_g": float(sugar_over.sum()),
+            "protein_shortfall_g": float(protein_short),
+            "fibre_shortfall_g": float(fibre_short)
+        }
+
+    def valid(self, assign: np.ndarray) -> bool:
+        """Hard constraints: viable dishes, none twice in a day"""
+        filled = assign >= 0
+        if not self.viable[np.flatnonzero(filled), assign[filled]].all():
+            return False
+        for day in range(DAYS):
+            day_rows = assign[day * len(MEALS):(day + 1) * len(MEALS)]
+            day_rows = day_rows[day_rows >= 0]
+            if len(set(day_rows.tolist())) != len(day_rows):
+                return False
+        return True
+
+    def assignment_from(self, foods_by_slot: List[Optional[Dict]]) -> np.ndarray:
+        """Assignment of an existing week (e.g. the greedy plan) over these candidates"""
+        position = {food["id"]: i for i, food in enumerate(self.foods)}
+        return np.array(
+            [position.get(food["id"], EMPTY) if food else EMPTY for food in foods_by_slot],
+            dtype=np.int64
+        )
+
+
+# =========================
+# SOLVERS
+# =========================
+def solve_cpsat(
+    problem: WeeklyProblem,
+    time_budget: float,
+    hint: Optional[np.ndarray] = None
+) -> Tuple[Optional[np.ndarray], str]:
+    """CP-SAT on the integer-scaled model; best solution found within the budget"""
+    model = cp_model.CpModel()
+    n_meals = len(MEALS)
+
+    def scaled(value):
+        return int(round(value * NUTRIENT_SCALE))
+
+    x = {}
+    objective = []
+    for s in range(SLOTS):
+        for d in np.flatnonzero(problem.viable[s]).tolist():
+            x[s, d] = model.NewBoolVar(f"x_{s}_{d}")
+            objective.append(int(round(problem.score[s, d] * OBJECTIVE_SCALE)) * x[s, d])
+    empty = [model.NewBoolVar(f"empty_{s}") for s in range(SLOTS)]
+    objective.append(sum(-EMPTY_SLOT_PENALTY * OBJECTIVE_SCALE * e for e in empty))
+    if hint is not None:
+        for (s, d), var in x.items():
+            model.AddHint(var, int(hint[s] == d))
+        for s, var in enumerate(empty):
+            model.AddHint(var, int(hint[s] == EMPTY))
+
+    by_slot, by_dish = {}, {}
+    for (s, d), var in x.items():
+        by_slot.setdefault(s, []).append(var)
+        by_dish.setdefault(d, []).append((s, var))
+
+    for s in range(SLOTS):
+        model.AddExactlyOne(by_slot.get(s, []) + [empty[s]])
+
+    for d, uses in by_dish.items():
+        for day in range(DAYS):
+            same_day = [var for s, var in uses if s // n_meals == day]
+            if len(same_day) > 1:
+                model.AddAtMostOne(same_day)
+        if len(uses) > 1:
+            extra = model.NewIntVar(0, DAYS - 1, f"repeat_{d}")
+            model.Add(extra >= sum(var for _, var in uses) - 1)
+            objective.append(-REPEAT_PENALTY * OBJECTIVE_SCALE * extra)
+
+    def slack_penalty(weight):
+        return int(round(weight * OBJECTIVE_SCALE / NUTRIENT_SCALE))
+
+    calorie_cap = scaled(problem.band_high.max() + n_meals * problem.calories.max())
+    sugar_cap = scaled(n_meals * problem.sugar.max()) + 1
+    for day in range(DAYS):
+        day_vars = [(s, d, var) for (s, d), var in x.items() if s // n_meals == day]
+        calories = sum(scaled(problem.calories[d]) * var for _, d, var in day_vars)
+        sugar = sum(scaled(problem.sugar[d]) * var for _, d, var in day_vars)
+
+        under = model.NewIntVar(0, calorie_cap, f"under_{day}")
+        over = model.NewIntVar(0, calorie_cap, f"over_{day}")
+        model.Add(calories + under >= scaled(problem.band_low[day]))
+        model.Add(calories - over <= scaled(problem.band_high[day]))
+        sugar_over = model.NewIntVar(0, sugar_cap, f"sugar_{day}")
+        model.Add(sugar - sugar_over <= scaled(problem.sugar_limit))
+        objective.append(-slack_penalty(problem.band_weight[day]) * (under + over))
+        objective.append(-slack_penalty(SUGAR_PENALTY) * sugar_over)
+
+    for values, goal, weight, name in (
+        (problem.protein, problem.protein_goal, PROTEIN_SHORTFALL_PENALTY, "protein"),
+        (problem.fibre, problem.fibre_goal, FIBRE_SHORTFALL_PENALTY, "fibre")
+    ):
+        short = model.NewIntVar(0, scaled(goal) + 1, f"{name}_short")
+        model.Add(sum(scaled(values[d]) * var for (_, d), var in x.items()) + short >= scaled(goal))
+        objective.append(-slack_penalty(weight) * short)
+
+    model.Maximize(sum(objective))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max(time_budget, 0.01)
+    solver.parameters.num_workers = max(1, min(8, os.cpu_count() or 1))
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None, "unsolved"
+
+    assign = np.full(SLOTS, EMPTY, dtype=np.int64)
+    for (s, d), var in x.items():
+        if solver.Value(var):
+            assign[s] = d
+    return assign, "optimal" if status == cp_model.OPTIMAL else "time_limit"
+
+
+def solve_pulp(
+    problem: WeeklyProblem,
+    time_budget: float,
+    hint: Optional[np.ndarray] = None
+) -> Tuple[Optional[np.ndarray], str]:
+    """The same model as a MILP for PuLP's bundled CBC"""
+    n_meals = len(MEALS)
+    # Stated as a minimization: the bundled CBC mishandles a MIP start on
+    # a maximization (the start is reported optimal without any search)
+    lp = pulp.LpProblem("weekly_plan", pulp.LpMinimize)
+
+    x = {
+        (s, d): pulp.LpVariable(f"x_{s}_{d}", cat="Binary")
+        for s in range(SLOTS)
+        for d in np.flatnonzero(problem.viable[s]).tolist()
+    }
+    empty = [pulp.LpVariable(f"empty_{s}", cat="Binary") for s in range(SLOTS)]
+    if hint is not None:
+        for (s, d), var in x.items():
+            var.setInitialValue(int(hint[s] == d))
+        for s, var in enumerate(empty):
+            var.setInitialValue(int(hint[s] == EMPTY))
+    objective = [float(problem.score[s, d]) * var for (s, d), var in x.items()]
+    objective.append(-EMPTY_SLOT_PENALTY * pulp.lpSum(empty))
+
+    by_slot, by_dish = {}, {}
+    for (s, d), var in x.items():
+        by_slot.setdefault(s, []).append(var)
+        by_dish.setdefault(d, []).append((s, var))
+
+    for s in range(SLOTS):
+        lp += pulp.lpSum(by_slot.get(s, []) + [empty[s]]) == 1
+
+    for d, uses in by_dish.items():
+        for day in range(DAYS):
+            same_day = [var for s, var in uses if s // n_meals == day]
+            if len(same_day) > 1:
+                lp += pulp.lpSum(same_day) <= 1
+        if len(uses) > 1:
+            extra = pulp.LpVariable(f"repeat_{d}", lowBound=0)
+            lp += extra >= pulp.lpSum(var for _, var in uses) - 1
+            objective.append(-REPEAT_PENALTY * extra)
+
+    for day in range(DAYS):
+        day_vars = [(d, var) for (s, d), var in x.items() if s // n_meals == day]
+        calories = pulp.lpSum(float(problem.calories[d]) * var for d, var in day_vars)
+        sugar = pulp.lpSum(float(problem.sugar[d]) * var for d, var in day_vars)
+
+        under = pulp.LpVariable(f"under_{day}", lowBound=0)
+        over = pulp.LpVariable(f"over_{day}", lowBound=0)
+        sugar_over = pulp.LpVariable(f"sugar_{day}", lowBound=0)
+        lp += calories + under >= float(problem.band_low[day])
+        lp += calories - over <= float(problem.band_high[day])
+        lp += sugar - sugar_over <= problem.sugar_limit
+        objective.append(
+            -float(problem.band_weight[day]) * (under + over) - SUGAR_PENALTY * sugar_over
+        )
+
+    for values, goal, weight, name in (
+        (problem.protein, problem.protein_goal, PROTEIN_SHORTFALL_PENALTY, "protein"),
+        (problem.fibre, problem.fibre_goal, FIBRE_SHORTFALL_PENALTY, "fibre")
+    ):
+        short = pulp.LpVariable(f"{name}_short", lowBound=0)
+        lp += pulp.lpSum(float(values[d]) * var for (_, d), var in x.items()) + short >= goal
+        objective.append(-weight * short)
+
+    lp += -pulp.lpSum(objective)
+    lp.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=max(time_budget, 0.01), warmStart=hint is not None))
+
+    if lp.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+        return None, "unsolved"
+
+    assign = np.full(SLOTS, EMPTY, dtype=np.int64)
+    for (s, d), var in x.items():
+        if (var.value() or 0) > 0.5:
+            assign[s] = d
+    status = "optimal" if lp.sol_status == pulp.LpSolutionOptimal else "time_limit"
+    return assign, status
+
+
+def solve_local(
+    problem: WeeklyProblem,
+    time_budget: float,
+    start: Optional[np.ndarray] = None,
+    rounds: int = 40
+) -> Tuple[np.ndarray, str]:
+    """
+    Dependency-free fallback. Lagrangian rounds relax the weekly terms
+    (dish reuse, protein, fibre) into per-dish score adjustments so every
+    day can be solved on its own; subgradient steps update the
+    multipliers and the best week by the exact objective is kept. Local
+    search (single-slot replacements, then cross-slot swaps) improves it
+    until no move helps or the budget runs out.
+    """
+    deadline = time.perf_counter() + time_budget
+    best = start.copy() if start is not None and problem.valid(start) else _day_by_day(problem, np.zeros(problem.size))
+    best_value = problem.objective(best)
+
+    reuse = np.zeros(problem.size)
+    protein_price = fibre_price = 0.0
+    step = float(REPEAT_PENALTY)
+    for i in range(rounds):
+        if time.perf_counter() > deadline:
+            break
+        adjust = -reuse + protein_price * problem.protein + fibre_price * problem.fibre
+        assign = _day_by_day(problem, adjust)
+        value = problem.objective(assign)
+        if value > best_value:
+            best, best_value = assign, value
+
+        rows = assign[assign >= 0]
+        uses = np.bincount(rows, minlength=problem.size)
+        scale = step / (1 + i)
+        reuse = np.maximum(reuse + scale * (uses - 1), 0)
+        protein_gap = (problem.protein_goal - problem.protein[rows].sum()) / problem.protein_goal
+        fibre_gap = (problem.fibre_goal - problem.fibre[rows].sum()) / problem.fibre_goal
+        protein_price = float(np.clip(protein_price + scale * protein_gap / 10, 0, PROTEIN_SHORTFALL_PENALTY))
+        fibre_price = float(np.clip(fibre_price + scale * fibre_gap / 10, 0, FIBRE_SHORTFALL_PENALTY))
+
+    best, best_value = _improve(problem, best, best_value, deadline)
+    return best, "converged" if time.perf_counter() <= deadline else "time_limit"
+
+
+def _day_by_day(problem: WeeklyProblem, adjust: np.ndarray) -> np.ndarray:
+    """Best distinct dishes per day under the adjusted per-slot scores"""
+    n_meals = len(MEALS)
+    scores = problem.score + adjust[None, :]
+    assign = np.full(SLOTS, EMPTY, dtype=np.int64)
+
+    for day in range(DAYS):
+        slots = list(range(day * n_meals, (day + 1) * n_meals))
+        taken = set()
+        # Most constrained slot (fewest viable dishes) picks first
+        for s in sorted(slots, key=lambda slot: problem.viable[slot].sum()):
+            row_scores = scores[s].copy()
+            if taken:
+                row_scores[list(taken)] = -np.inf
+            d = int(np.argmax(row_scores))
+            if row_scores[d] > -np.inf:
+                assign[s] = d
+                taken.add(d)
+    return assign
+
+
+def _improve(problem: WeeklyProblem, assign: np.ndarray, value: float, deadline: float):
+    n_meals = len(MEALS)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+
+        # Replace one slot's dish with any viable dish not used that day
+        for s in range(SLOTS):
+            day = s // n_meals
+            day_rows = set(assign[day * n_meals:(day + 1) * n_meals].tolist()) - {assign[s]}
+            for d in np.flatnonzero(problem.viable[s]).tolist():
+                if d == assign[s] or d in day_rows:
+                    continue
+                trial = assign.copy()
+                trial[s] = d
+                trial_value = problem.objective(trial)
+                if trial_value > value + 1e-9:
+                    assign, value, improved = trial, trial_value, True
+                    day_rows = set(assign[day * n_meals:(day + 1) * n_meals].tolist()) - {d}
+            if time.perf_counter() > deadline:
+                return assign, value
+
+        # Swap the dishes of two slots
+        for a in range(SLOTS):
+            for b in range(a + 1, SLOTS):
+                trial = assign.copy()
+                trial[a], trial[b] = assign[b], assign[a]
+                if trial[a] == trial[b] or not problem.valid(trial):
+                    continue
+                trial_value = problem.objective(trial)
+                if trial_value > value + 1e-9:
+                    assign, value, improved = trial, trial_value, True
+            if time.perf_counter() > deadline:
+                return assign, value
+    return assign, value
+
+
+# "auto" order: neither MIP proves these weeks optimal within a useful
+# budget, and both spend all of it. From the local search week, CBC
+# improves it slightly (within 0.1%) in 0.5 s, which CP-SAT only matches
+# with 2 s. That is why the default budget is 0.5 s
+# (scripts/benchmark_weekly_optimizer.py)
+SOLVERS = {
+    "pulp": (lambda: pulp is not None, solve_pulp),
+    "cpsat": (lambda: cp_model is not None, solve_cpsat),
+}
+
+
+def solve_week(
+    problem: WeeklyProblem,
+    time_budget: float = OPTIMIZER_TIME_BUDGET,
+    solver: str = OPTIMIZER_SOLVER,
+    start: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, str, str]:
+    """
+    (assignment, solver used, status). The local search runs first from
+    `start` (usually converging in tens of milliseconds); a MIP solver
+    ("auto": PuLP/CBC, then CP-SAT, whichever is installed) then gets
+    the rest of the budget with that week as its hint, and the better
+    week wins. Status is "optimal" when the MIP proved it, otherwise
+    "time_limit" or "converged" (local search).
+    """
+    deadline = time.perf_counter() + time_budget
+    installed = [name for name, (available, _) in SOLVERS.items() if available()]
+    if solver == "auto":
+        mip = installed[0] if installed else None
+    elif solver == "local":
+        mip = None
+    elif solver in installed:
+        mip = solver
+    else:
+        raise ValueError(f"Solver {solver!r} is not available (installed: {installed + ['local']})")
+
+    best, status = solve_local(problem, time_budget, start)
+    best_solver = "local"
+
+    remaining = deadline - time.perf_counter()
+    if mip is not None and remaining > 0:
+        assign, mip_status = SOLVERS[mip][1](problem, remaining, best)
+        if assign is not None and problem.objective(assign) >= problem.objective(best) - 1e-6:
+            best, best_solver, status = assign, mip, mip_status
+    return best, best_solver, status
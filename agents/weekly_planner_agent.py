@@ -1,18 +1,102 @@
-from typing import Dict, List
-from agents.meal_planner_agent import DailyMealPlanner
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from agents.feedback_agent import FeedbackAgent
+from agents.meal_planner_agent import BatchMealScorer, DailyMealPlanner, PlanningSession
+from agents.nutrition_agent import NutritionAgent, get_food_catalog
+from agents.weekly_optimizer import (
+    DAYS,
+    MEALS,
+    OPTIMIZER_SOLVER,
+    OPTIMIZER_TIME_BUDGET,
+    WeeklyProblem,
+    solve_week
+)
+from rules_engine.engine import rules_for
+
+
+# "greedy" plans day by day; "optimal" assigns all 21 meals jointly
+WEEKLY_PLANNER_MODE = os.getenv("NUTRITION_WEEKLY_PLANNER", "greedy")
+
+# Feedback simulated after each planned day (steady hunger and energy, no
+# weight change), read by FeedbackAgent as the orchestrator reads real feedback
+SIMULATED_FEEDBACK = {"hunger": 5, "energy": 6, "weight_change": 0}
+
+
+def simulated_adjustments(yesterday_plan: Dict) -> Dict:
+    """Planner adjustments for the day after `yesterday_plan`"""
+    feedback = {"yesterday_plan": yesterday_plan, **SIMULATED_FEEDBACK}
+    return FeedbackAgent(yesterday_plan, feedback).generate_adjustments()
 
 
 class WeeklyMealPlanner:
     """
     Generates a 7-day meal plan using DailyMealPlanner
     while encouraging variety across days.
+
+    In "optimal" mode the week is solved as one assignment problem
+    instead (agents/weekly_optimizer.py), starting from the greedy plan.
     """
 
-    def __init__(self, user_profile: Dict):
+    def __init__(
+        self,
+        user_profile: Dict,
+        meal_candidates: List[Dict] = None,
+        session: PlanningSession = None,
+        recommendation_index=None,
+        name_matcher=None,
+        mode: str = WEEKLY_PLANNER_MODE,
+        time_budget: float = OPTIMIZER_TIME_BUDGET,
+        solver: str = OPTIMIZER_SOLVER
+    ):
         self.user_profile = user_profile
         self.used_dishes = set()
+        self.meal_candidates = meal_candidates
+        self.session = session
+
+        if recommendation_index is None and session is not None:
+            recommendation_index = session.recommendation_index
+        self.recommendation_index = recommendation_index
+        self.name_matcher = name_matcher
+
+        if mode not in ("greedy", "optimal"):
+            raise ValueError(f"Unknown weekly planner mode: {mode}")
+        self.mode = mode
+        self.time_budget = time_budget
+        self.solver = solver
+
+    def _week_candidates(self) -> List[Dict]:
+        """
+        Candidates are fetched once for the week with day 1's calorie cap
+        (later days are only ever adjusted downwards by the simulated feedback).
+        """
+        if self.meal_candidates is None and self.session is not None:
+            self.meal_candidates = self.session.meal_candidates(
+                self.user_profile["daily_calories"],
+                self.user_profile["sugar_limit"]
+            )
+        if self.meal_candidates is None:
+            self.meal_candidates = NutritionAgent(
+                max_calories_per_meal=self.user_profile["daily_calories"],
+                min_protein_per_meal=0,
+                max_free_sugar=self.user_profile["sugar_limit"]
+            ).get_meal_candidates()
+        return self.meal_candidates
 
     def generate_week_plan(self) -> Dict:
+        if self.mode == "optimal":
+            return self._optimal_week_plan()
+        return self._greedy_week_plan()
+
+    def _greedy_week_plan(self) -> Dict:
+        # With an index, days read their shortlists and only fetch
+        # candidates (memoized by the session) for slots it cannot decide
+        if self.recommendation_index is not None and self.meal_candidates is None:
+            meal_candidates = None
+        else:
+            meal_candidates = self._week_candidates()
         week_plan = {}
         weekly_totals = {
             "calories": 0,
@@ -20,14 +104,18 @@ class WeeklyMealPlanner:
             "fibre": 0
         }
 
-        feedback = None
+        adjustments = None
 
         for day in range(1, 8):
             # Pass dishes already used on previous days so this day picks different ones
             planner = DailyMealPlanner(
                 self.user_profile,
-                feedback_adjustments=feedback,
+                feedback_adjustments=adjustments,
                 week_used_dishes=set(self.used_dishes),
+                meal_candidates=meal_candidates,
+                session=self.session,
+                recommendation_index=self.recommendation_index,
+                name_matcher=self.name_matcher,
             )
 
             day_plan = planner.generate_day_plan()
@@ -48,12 +136,7 @@ class WeeklyMealPlanner:
             week_plan[f"day_{day}"] = day_plan
 
             # Light feedback simulation (optional)
-            feedback = {
-                "yesterday_plan": day_plan,
-                "hunger": 5,
-                "energy": 6,
-                "weight_change": 0
-            }
+            adjustments = simulated_adjustments(day_plan)
 
         weekly_summary = {
             "avg_calories": round(weekly_totals["calories"] / 7, 1),
@@ -66,3 +149,93 @@ class WeeklyMealPlanner:
             "week_plan": week_plan,
             "weekly_summary": weekly_summary
         }
+
+    # =========================
+    # JOINT OPTIMIZATION
+    # =========================
+    def _optimal_week_plan(self) -> Dict:
+        # The greedy week is the starting point, so the result is never worse
+        greedy = WeeklyMealPlanner(
+            self.user_profile, meal_candidates=self._week_candidates(), session=self.session,
+            name_matcher=self.name_matcher, mode="greedy"
+        ).generate_week_plan()
+        problem = self.week_problem(greedy)
+
+        assign, solver, status = solve_week(
+            problem, self.time_budget, self.solver, self.assignment_of(problem, greedy)
+        )
+        return self._week_result(problem, assign, solver, status)
+
+    def week_problem(self, week: Optional[Dict] = None) -> WeeklyProblem:
+        """
+        The week as one assignment problem over the week's candidates.
+        Each day's calorie and meal targets are the greedy day's: day 1
+        plans without adjustments, later days with the simulated feedback
+        on the previous day of `week` (the greedy week, when given).
+        """
+        foods = self._week_candidates()
+        catalog = self.session.catalog if self.session is not None else get_food_catalog()
+        rules = rules_for(self.user_profile, catalog)
+        scorer = BatchMealScorer(
+            foods, self.user_profile["food_restrictions"], [], [], set(),
+            self.name_matcher, catalog, rules
+        )
+
+        day_calories, meal_ratios = [], []
+        adjustments = None
+        for day in range(1, DAYS + 1):
+            planner = DailyMealPlanner(
+                self.user_profile, feedback_adjustments=adjustments,
+                meal_candidates=foods, session=self.session, rules=rules
+            )
+            day_calories.append(planner.daily_calories)
+            meal_ratios.append(planner.meal_ratios())
+            adjustments = simulated_adjustments(week["week_plan"][f"day_{day}"] if week else {})
+
+        return WeeklyProblem(
+            foods, scorer, day_calories, meal_ratios,
+            self.user_profile["protein_target"],
+            self.user_profile["sugar_limit"]
+        )
+
+    @staticmethod
+    def assignment_of(problem: WeeklyProblem, week: Dict) -> np.ndarray:
+        """A generated week (either mode) as an assignment over `problem`"""
+        return problem.assignment_from([
+            week["week_plan"][f"day_{day}"][meal] for day in range(1, DAYS + 1) for meal in MEALS
+        ])
+
+    def _week_result(self, problem: WeeklyProblem, assign: np.ndarray, solver: str, status: str) -> Dict:
+        week_plan = {}
+        weekly_totals = {"calories": 0, "protein": 0, "fibre": 0}
+
+        for day in range(DAYS):
+            day_plan = {}
+            totals = {"calories": 0, "protein": 0, "carbs": 0, "fats": 0, "fibre": 0}
+            for i, meal in enumerate(MEALS):
+                row = int(assign[day * len(MEALS) + i])
+                food = problem.foods[row] if row >= 0 else {}
+                day_plan[meal] = food
+                if food:
+                    self.used_dishes.add(food["dish_name"].lower())
+                    for key in totals:
+                        totals[key] = round(totals[key] + food.get(key, 0), 2)
+            day_plan["totals"] = totals
+            week_plan[f"day_{day + 1}"] = day_plan
+
+            for key in weekly_totals:
+                weekly_totals[key] += totals[key]
+
+        weekly_summary = {
+            "avg_calories": round(weekly_totals["calories"] / 7, 1),
+            "avg_protein": round(weekly_totals["protein"] / 7, 1),
+            "avg_fibre": round(weekly_totals["fibre"] / 7, 1),
+            "unique_dishes": len(self.used_dishes),
+            "solver": solver,
+            "solver_status": status
+        }
+
+        return {
+            "week_plan": week_plan,
+            "weekly_summary": weekly_summary
+        }
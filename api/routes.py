@@ -1,8 +1,13 @@
-from fastapi import APIRouter
+import json
+
+from fastapi import APIRouter, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from api.schemas import UserInput, FeedbackInput, PlanResponse, PlanFeedbackRequest
 from agents.orchestrator import NutritionOrchestrator
-from agents.weekly_planner_agent import WeeklyMealPlanner
-from api.schemas import WeeklyPlanResponse
+from api.schemas import WeeklyPlanResponse, ExplanationResponse
+from api.schemas import BatchPlanRequest, BatchPlanResponse
+from database.db_connection import get_pool_metrics
 
 
 # THIS NAME MUST BE `router`
@@ -12,25 +17,91 @@ orchestrator = NutritionOrchestrator()
 
 
 @router.get("/health")
-def health_check():
+async def health_check():
     return {"status": "ok", "service": "nutrition-ai"}
 
 
 @router.post("/plan/day", response_model=PlanResponse)
-def generate_day_plan(user_input: UserInput):
-    return orchestrator.run_day(user_input.dict())
+async def generate_day_plan(user_input: UserInput):
+    return await orchestrator.arun_day(user_input.dict())
 
 
 @router.post("/plan/feedback", response_model=PlanResponse)
-def generate_plan_with_feedback(body: PlanFeedbackRequest):
-    return orchestrator.run_day(
+async def generate_plan_with_feedback(body: PlanFeedbackRequest):
+    return await orchestrator.arun_day(
         body.user_input.dict(),
         body.feedback.dict()
     )
 
 @router.post("/plan/week", response_model=WeeklyPlanResponse)
-def generate_week_plan(user_input: UserInput):
-    orchestrator_profile = orchestrator.run_day(user_input.dict())["profile"]
+async def generate_week_plan(user_input: UserInput, explain: bool = False):
+    return await orchestrator.arun_week(user_input.dict(), explain=explain)
+
+
+@router.post("/plan/batch", response_model=BatchPlanResponse)
+async def generate_batch_plans(body: BatchPlanRequest):
+    requests = [
+        (item.user_input.dict(), item.feedback.dict() if item.feedback else None)
+        for item in body.users
+    ]
+    return await orchestrator.arun_batch(
+        requests,
+        horizon=body.horizon,
+        explain=body.explain
+    )
+
+
+# ---------- SERVER-SENT EVENTS ----------
+async def _sse(events):
+    """
+    Format (event, data) pairs as text/event-stream frames. The 200 has
+    already been sent, so a failure ends the stream with an `error`
+    event instead of a truncated body.
+    """
+    try:
+        async for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+    except Exception as e:
+        message = {"message": f"{type(e).__name__}: {e}"}
+        yield f"event: error\ndata: {json.dumps(message)}\n\n"
+        return
+    yield "event: done\ndata: {}\n\n"
+
+
+def _event_stream(events) -> StreamingResponse:
+    return StreamingResponse(
+        _sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/plan/day/stream")
+async def stream_day_plan(user_input: UserInput):
+    return _event_stream(orchestrator.astream_day(user_input.dict()))
+
+
+@router.post("/plan/week/stream")
+async def stream_week_plan(user_input: UserInput):
+    return _event_stream(orchestrator.astream_week(user_input.dict()))
+
+
+@router.get("/plan/explanation/{explanation_id}", response_model=ExplanationResponse)
+async def get_explanation(explanation_id: str):
+    result = orchestrator.get_explanation(explanation_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown explanation id")
+    return result
+
+
+@router.get("/metrics/db")
+def database_metrics():
+    return get_pool_metrics()
+
 
-    weekly_planner = WeeklyMealPlanner(orchestrator_profile)
-    return weekly_planner.generate_week_plan()
+@router.get("/metrics/llm")
+async def llm_metrics():
+    return {
+        "scheduler": orchestrator.scheduler.stats(),
+        "cache": orchestrator.llm_loader.cache.stats()
+    }
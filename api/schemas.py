@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, Optional
+from typing import Dict, List, Literal, Optional
 
 
 # ---------- INPUTS ----------
@@ -40,13 +40,46 @@ class PlanFeedbackRequest(BaseModel):
     feedback: FeedbackInput
 
 
+class BatchPlanItem(BaseModel):
+    user_input: UserInput
+    # Only used for day plans
+    feedback: Optional[FeedbackInput] = None
+
+
+class BatchPlanRequest(BaseModel):
+    """Body for POST /plan/batch: a whole cohort, planned in one call."""
+    users: List[BatchPlanItem]
+    horizon: Literal["day", "week"] = "day"
+    explain: bool = False
+
+
 # ---------- RESPONSES ----------
 
 class PlanResponse(BaseModel):
     profile: Dict
     plan: Dict
     explanation: str
+    # "ready", "pending" (poll /plan/explanation/{id}), "unavailable"
+    # or "skipped" (batch plans without explain)
+    explanation_status: str = "ready"
+    explanation_id: Optional[str] = None
+
+class ExplanationResponse(BaseModel):
+    status: str
+    explanation: str
+    explanation_id: Optional[str] = None
+
 
 class WeeklyPlanResponse(BaseModel):
     week_plan: Dict
     weekly_summary: Dict
+    # day -> explanation, only with ?explain=true
+    explanations: Optional[Dict[str, ExplanationResponse]] = None
+
+
+class BatchPlanResponse(BaseModel):
+    # One entry per user, in request order: PlanResponse fields for
+    # "day", WeeklyPlanResponse fields (plus profile) for "week"
+    plans: List[Dict]
+    # Distinct plans computed (users with identical profiles share one)
+    groups: int
@@ -1,10 +1,12 @@
 """
 Streamlit frontend for Nutrition AI backend.
 Backend: http://127.0.0.1:8000
-Endpoints: GET /health, POST /plan/day, POST /plan/week
+Endpoints: GET /health, POST /plan/day/stream, POST /plan/week
 Run: streamlit run app.py
 """
 
+import json
+
 import requests
 import streamlit as st
 
@@ -104,6 +106,66 @@ def fetch_day_plan(payload):
     return r
 
 
+def iter_sse(response):
+    """Yield (event, data) pairs from a text/event-stream response."""
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            yield event, json.loads(line[len("data: "):])
+
+
+def stream_day_plan(payload):
+    """
+    POST /plan/day/stream: show the plan as soon as it arrives (first event),
+    then fill in the AI explanation token by token.
+    Returns the PlanResponse-shaped dict, or None on an API error.
+    """
+    result = {"plan": {}, "explanation": ""}
+    with requests.post(
+        f"{BASE_URL}/plan/day/stream",
+        json=payload,
+        stream=True,
+        timeout=API_TIMEOUT,
+    ) as r:
+        if r.status_code != 200:
+            st.error(f"API error: {r.status_code} — {r.text[:200]}")
+            return None
+
+        with st.spinner("Generating today's plan..."):
+            events = iter_sse(r)
+            for event, data in events:
+                if event == "error":
+                    st.error(f"API error: {data.get('message', 'stream failed')}")
+                    return None
+                if event == "plan":
+                    result.update(data)
+                    break
+            else:
+                st.error("API error: the stream ended without a plan")
+                return None
+
+        st.header("Today's plan")
+        render_daily_plan(result)
+        explanation_box = st.empty()
+        for event, data in events:
+            if event == "error":
+                st.error(f"API error: {data.get('message', 'stream failed')}")
+                return None
+            if event == "token":
+                result["explanation"] += data["text"]
+                explanation_box.info(result["explanation"])
+            elif event == "explanation":
+                result["explanation_status"] = data["status"]
+                result["explanation_id"] = data["explanation_id"]
+                if data["status"] == "pending":
+                    explanation_box.info("The AI explanation is still being generated.")
+                elif data["status"] == "unavailable" and not result["explanation"]:
+                    explanation_box.warning("The AI explanation is unavailable right now.")
+    return result
+
+
 def fetch_week_plan(payload):
     with st.spinner("Generating weekly plan..."):
         r = requests.post(
@@ -232,12 +294,14 @@ def main():
                 st.error("Please set valid Age, Height, and Weight in the sidebar.")
             else:
                 try:
-                    r = fetch_day_plan(payload)
-                    if r.status_code == 200:
-                        st.session_state["last_daily"] = r.json()
+                    result = stream_day_plan(payload)
+                    if result is not None:
+                        st.session_state["last_daily"] = result
                         st.session_state["last_weekly"] = None
-                    else:
-                        st.error(f"API error: {r.status_code} — {r.text[:200]}")
+                        if hasattr(st, "rerun"):
+                            st.rerun()
+                        else:
+                            st.experimental_rerun()
                 except requests.RequestException as e:
                     st.error(f"Request failed: {e}")
     with col_btn2:
@@ -201,7 +201,12 @@ DQN_CONFIG = {
     "memory_size": 2000,
     "batch_size": 32,
     "learning_rate": 0.001,
-    "target_update_freq": 10
+    "target_update_freq": 10,
+    "target_update_tau": None,     # e.g. 0.005 for soft target updates
+    # Proportional prioritized replay (rl.memory_buffer.ReplayBuffer)
+    "prioritized_replay": False,
+    "per_alpha": 0.6,
+    "per_beta": 0.4
 }
 
 # Organ health weights for overall health calculation
@@ -0,0 +1,255 @@
+import bisect
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# =========================
+# DATABASE PATH
+# =========================
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "data" / "processed" / "nutrition.db"
+
+
+# =========================
+# POOL SETTINGS
+# =========================
+POOL_SIZE = int(os.getenv("NUTRITION_DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = 5.0                  # seconds to wait for a free connection
+# Set to 0 when the database is rebuilt in place while the API is running
+POOL_IMMUTABLE = os.getenv("NUTRITION_DB_IMMUTABLE", "1") == "1"
+MMAP_SIZE = 64 * 1024 * 1024        # the whole catalog fits comfortably
+STATEMENT_CACHE_SIZE = 128          # sqlite3 prepared statement cache per connection
+
+# Upper bounds (milliseconds) of the latency histogram buckets
+LATENCY_BUCKETS_MS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250]
+
+
+# =========================
+# METRICS
+# =========================
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)."""
+
+    def __init__(self, buckets: List[float] = None):
+        self.buckets = list(buckets or LATENCY_BUCKETS_MS)
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+
+    def snapshot(self) -> Dict:
+        labels = [str(b) for b in self.buckets] + ["+Inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 4) if self.count else 0.0,
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+
+class PoolMetrics:
+    """Checkout counters plus wait-time and query-latency histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.connections_opened = 0
+            self.wait_ms = LatencyHistogram()
+            self.query_ms = LatencyHistogram()
+
+    def record_open(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    def record_checkout(self, wait_ms: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_ms.observe(wait_ms)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_query(self, latency_ms: float):
+        with self._lock:
+            self.query_ms.observe(latency_ms)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connections_opened": self.connections_opened,
+                "wait_ms": self.wait_ms.snapshot(),
+                "query_ms": self.query_ms.snapshot()
+            }
+
+
+# =========================
+# CONNECTION POOL
+# =========================
+class ReadOnlyConnectionPool:
+    """
+    Thread-safe pool of read-only SQLite connections.
+
+    Connections are opened lazily (up to `size`) with the read-only URI,
+    mmap enabled and a per-connection prepared statement cache, and are
+    handed out to one thread at a time.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = DB_PATH,
+        size: int = POOL_SIZE,
+        timeout: float = POOL_TIMEOUT,
+        immutable: bool = POOL_IMMUTABLE
+    ):
+        self.db_path = Path(db_path)
+        self.size = size
+        self.timeout = timeout
+        self.immutable = immutable
+        self.metrics = PoolMetrics()
+
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    # ---------- CONNECTION SETUP ----------
+    def _uri(self) -> str:
+        uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        if self.immutable:
+            # File is never written while served: skip locking and change detection
+            uri += "&immutable=1"
+        return uri
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._uri(),
+            uri=True,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        conn.execute("PRAGMA query_only = 1")
+        self.metrics.record_open()
+        return conn
+
+    # ---------- CHECKOUT / RETURN ----------
+    def _acquire(self) -> sqlite3.Connection:
+        start = time.perf_counter()
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if len(self._all) < self.size:
+                    conn = self._open()
+                    self._all.append(conn)
+
+            if conn is None:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    self.metrics.record_timeout()
+                    raise TimeoutError(
+                        f"No database connection available after {self.timeout}s"
+                    )
+
+        self.metrics.record_checkout((time.perf_counter() - start) * 1000)
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        if self._closed:
+            conn.close()
+            return
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    # ---------- QUERY HELPERS ----------
+    def fetchall(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self.connection() as conn:
+            start = time.perf_counter()
+            rows = conn.execute(sql, params).fetchall()
+            self.metrics.record_query((time.perf_counter() - start) * 1000)
+        return rows
+
+    def fetchone(self, sql: str, params: tuple = ()) -> Optional[sqlite3.Row]:
+        with self.connection() as conn:
+            start = time.perf_counter()
+            row = conn.execute(sql, params).fetchone()
+            self.metrics.record_query((time.perf_counter() - start) * 1000)
+        return row
+
+    def close(self):
+        """Close idle connections now; checked-out ones close on release."""
+        with self._lock:
+            self._closed = True
+            self._all = []
+
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# =========================
+# SHARED POOL
+# =========================
+_pool: Optional[ReadOnlyConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ReadOnlyConnectionPool:
+    """Process-wide pool for the nutrition database (created on first use)."""
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ReadOnlyConnectionPool(DB_PATH)
+    return _pool
+
+
+def reset_pool():
+    """
+    Close the shared pool so the next query reopens the database.
+    Must be called after the database file is rebuilt, since immutable
+    connections never notice changes on disk.
+    """
+    global _pool
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+
+    if pool is not None:
+        pool.close()
+
+
+def get_pool_metrics() -> Dict:
+    return get_pool().metrics.snapshot()
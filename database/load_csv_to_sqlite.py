@@ -82,6 +82,8 @@ def load_to_sqlite(df: pd.DataFrame, db_path: Path):
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
+    # WAL lets a non-immutable read pool keep serving while the table is rebuilt
+    cursor.execute("PRAGMA journal_mode=WAL")
     cursor.execute(CREATE_TABLE_SQL)
 
     df.to_sql(
@@ -1,18 +1,14 @@
 import sqlite3
-from pathlib import Path
 from typing import List, Dict, Optional
 
-# =========================
-# DATABASE PATH
-# =========================
-BASE_DIR = Path(__file__).resolve().parent.parent
-DB_PATH = BASE_DIR / "data" / "processed" / "nutrition.db"
+from database.db_connection import BASE_DIR, DB_PATH, get_pool
 
 
 # =========================
 # CONNECTION HELPER
 # =========================
 def get_connection():
+    """Standalone read-write connection (scripts / maintenance only)"""
     return sqlite3.connect(DB_PATH)
 
 
@@ -21,22 +17,13 @@ def get_connection():
 # =========================
 def get_food_count() -> int:
     """Return total number of food items"""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT COUNT(*) FROM foods")
-    count = cursor.fetchone()[0]
-
-    conn.close()
-    return count
+    row = get_pool().fetchone("SELECT COUNT(*) FROM foods")
+    return row[0]
 
 
 def get_food_by_name(dish_name: str) -> Optional[Dict]:
     """Fetch full nutrition data for a single dish"""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
+    row = get_pool().fetchone(
         """
         SELECT *
         FROM foods
@@ -45,19 +32,10 @@ def get_food_by_name(dish_name: str) -> Optional[Dict]:
         (dish_name,)
     )
 
-    row = cursor.fetchone()
-    conn.close()
-
     if not row:
         return None
 
-    columns = [
-        "id", "dish_name", "calories", "carbs", "protein", "fats",
-        "free_sugar", "fibre", "sodium", "calcium",
-        "iron", "vitamin_c", "folate"
-    ]
-
-    return dict(zip(columns, row))
+    return dict(row)
 
 
 # =========================
@@ -68,10 +46,7 @@ def get_foods_by_calories(
     limit: int = 20
 ) -> List[Dict]:
     """Foods under a calorie limit"""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
+    rows = get_pool().fetchall(
         """
         SELECT dish_name, calories, protein, carbs, fats
         FROM foods
@@ -82,19 +57,7 @@ def get_foods_by_calories(
         (max_calories, limit)
     )
 
-    rows = cursor.fetchall()
-    conn.close()
-
-    return [
-        {
-            "dish_name": r[0],
-            "calories": r[1],
-            "protein": r[2],
-            "carbs": r[3],
-            "fats": r[4],
-        }
-        for r in rows
-    ]
+    return [dict(r) for r in rows]
 
 
 def get_high_protein_foods(
@@ -103,11 +66,8 @@ def get_high_protein_foods(
     limit: int = 20
 ) -> List[Dict]:
     """High protein foods with optional calorie cap"""
-    conn = get_connection()
-    cursor = conn.cursor()
-
     if max_calories:
-        cursor.execute(
+        rows = get_pool().fetchall(
             """
             SELECT dish_name, protein, calories
             FROM foods
@@ -119,7 +79,7 @@ def get_high_protein_foods(
             (min_protein, max_calories, limit)
         )
     else:
-        cursor.execute(
+        rows = get_pool().fetchall(
             """
             SELECT dish_name, protein, calories
             FROM foods
@@ -130,28 +90,15 @@ def get_high_protein_foods(
             (min_protein, limit)
         )
 
-    rows = cursor.fetchall()
-    conn.close()
-
-    return [
-        {
-            "dish_name": r[0],
-            "protein": r[1],
-            "calories": r[2],
-        }
-        for r in rows
-    ]
+    return [dict(r) for r in rows]
 
 def get_high_protein_foods_full(
     min_protein: float,
     max_calories: float = None,
     limit: int = 20
 ):
-    conn = get_connection()
-    cursor = conn.cursor()
-
     if max_calories:
-        cursor.execute(
+        rows = get_pool().fetchall(
             """
             SELECT *
             FROM foods
@@ -163,7 +110,7 @@ def get_high_protein_foods_full(
             (min_protein, max_calories, limit)
         )
     else:
-        cursor.execute(
+        rows = get_pool().fetchall(
             """
             SELECT *
             FROM foods
@@ -174,16 +121,7 @@ def get_high_protein_foods_full(
             (min_protein, limit)
         )
 
-    rows = cursor.fetchall()
-    conn.close()
-
-    columns = [
-        "id", "dish_name", "calories", "carbs", "protein", "fats",
-        "free_sugar", "fibre", "sodium", "calcium",
-        "iron", "vitamin_c", "folate"
-    ]
-
-    return [dict(zip(columns, r)) for r in rows]
+    return [dict(r) for r in rows]
 
 
 def get_low_sugar_foods(
@@ -191,10 +129,7 @@ def get_low_sugar_foods(
     limit: int = 20
 ) -> List[Dict]:
     """Low free-sugar foods (diabetic-safe filter)"""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
+    rows = get_pool().fetchall(
         """
         SELECT dish_name, free_sugar, calories
         FROM foods
@@ -205,17 +140,7 @@ def get_low_sugar_foods(
         (max_sugar, limit)
     )
 
-    rows = cursor.fetchall()
-    conn.close()
-
-    return [
-        {
-            "dish_name": r[0],
-            "free_sugar": r[1],
-            "calories": r[2],
-        }
-        for r in rows
-    ]
+    return [dict(r) for r in rows]
 
 
 def get_high_fibre_foods(
@@ -223,10 +148,7 @@ def get_high_fibre_foods(
     limit: int = 20
 ) -> List[Dict]:
     """High fibre foods (satiety & gut health)"""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
+    rows = get_pool().fetchall(
         """
         SELECT dish_name, fibre, calories
         FROM foods
@@ -237,14 +159,4 @@ def get_high_fibre_foods(
         (min_fibre, limit)
     )
 
-    rows = cursor.fetchall()
-    conn.close()
-
-    return [
-        {
-            "dish_name": r[0],
-            "fibre": r[1],
-            "calories": r[2],
-        }
-        for r in rows
-    ]
+    return [dict(r) for r in rows]
@@ -2,10 +2,12 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 import random
-from collections import deque
 import numpy as np
-from datetime import datetime
 from config import DQN_CONFIG
+from rl.memory_buffer import ReplayBuffer
+from rl import checkpoint
+from rl.recorder import DecisionRecorder
+from rl.state_encoder import StateEncoder
 
 class DQNOrganOptimizer:
     """DQN agent that learns to optimize organ health"""
@@ -27,18 +29,80 @@ class DQNOrganOptimizer:
         self.epsilon = self.config["epsilon"]
         self.epsilon_decay = self.config["epsilon_decay"]
         self.epsilon_min = self.config["epsilon_min"]
-        self.memory = deque(maxlen=self.config["memory_size"])
+        self.memory = ReplayBuffer(
+            self.config["memory_size"],
+            self.state_size,
+            device=self.device,
+            prioritized=self.config.get("prioritized_replay", False),
+            alpha=self.config.get("per_alpha", 0.6),
+            beta=self.config.get("per_beta", 0.4)
+        )
         self.optimizer = optim.Adam(self.model.parameters(), lr=self.config["learning_rate"])
         self.criterion = nn.MSELoss()
         self.batch_size = self.config["batch_size"]
         self.target_update_freq = self.config["target_update_freq"]
+        # Polyak averaging each update instead of hard copies when set
+        self.target_update_tau = self.config.get("target_update_tau")
         
         # Action definitions with nutrient modifications
         self.actions = self._define_actions()
         self.action_effects = self._define_action_effects()
         
-        self.decision_log = []
-        self.training_losses = []
+        # Bounded decision/reward/loss history with running aggregates
+        self.recorder = DecisionRecorder(self.actions)
+        
+        # 10 organ health + 9 nutrient ratios + 4 health metrics = 23 features
+        self.state_encoder = StateEncoder(self.state_size, self.device)
+        
+        # Set while the weights alias a shared pretrained checkpoint
+        self._shared_checkpoint = None
+    
+    @property
+    def decision_log(self):
+        """Recent decisions (up to the recorder's capacity) as dicts"""
+        return self.recorder.recent_decisions()
+    
+    @property
+    def training_losses(self):
+        """Loss history, downsampled to a fixed number of points"""
+        return self.recorder.loss_series()[1].tolist()
+    
+    @classmethod
+    def from_pretrained(cls, path=checkpoint.PRETRAINED_CHECKPOINT, state_size=None, action_size=None):
+        """
+        Agent starting from the process-wide copy of a pretrained
+        checkpoint (weights shared until the first update). Falls back
+        to a fresh agent when no checkpoint exists at `path`.
+        """
+        agent = cls(state_size, action_size)
+        pretrained = checkpoint.get_pretrained(path)
+        if pretrained is not None:
+            pretrained.attach(agent)
+        return agent
+    
+    def save_checkpoint(self, path, replay=True, extra=None):
+        """Save model, target model, optimizer, epsilon and replay memory"""
+        return checkpoint.save_checkpoint(self, path, replay=replay, extra=extra)
+    
+    def load_checkpoint(self, path, replay=True):
+        """Load a checkpoint into this agent (private copies of the weights)"""
+        self._shared_checkpoint = None
+        return checkpoint.load_checkpoint(self, path, replay=replay)
+    
+    def export_policy(self, path=None, quantize=False):
+        """Inference-only TorchScript policy (no Dropout, optional int8); see rl.policy"""
+        from rl.policy import POLICY_PATH, export_policy
+        return export_policy(self, path or POLICY_PATH, quantize=quantize)
+    
+    def _ensure_private_weights(self):
+        """Copy-on-write: clone shared pretrained weights before the first update"""
+        if self._shared_checkpoint is None:
+            return
+        for model in (self.model, self.target_model):
+            for tensor in model.state_dict(keep_vars=True).values():
+                tensor.data = tensor.data.clone()
+        checkpoint.load_optimizer(self, self._shared_checkpoint)
+        self._shared_checkpoint = None
         
     def _build_network(self):
         """Build neural network"""
@@ -79,56 +143,13 @@ class DQNOrganOptimizer:
             7: {}
         }
     
-    def get_state(self, organ_twin, nutrients):
-        """Get state representation"""
-        # Define canonical order
-        ORGAN_ORDER = [
-            "heart", "lungs", "brain", "kidneys", "pancreas",
-            "liver", "gut", "skin", "immune", "muscles"
-        ]
-        
-        # Organ health (10 values for 10 organs) - in FIXED order
-        organ_health = []
-        for organ_name in ORGAN_ORDER:
-            if organ_name in organ_twin.organs:
-                organ_health.append(organ_twin.organs[organ_name]["health"])
-            else:
-                organ_health.append(0.5)  # Default if organ missing
-        
-        # Nutrient ratios (9 values)
-        nutrient_features = [
-            nutrients.get('calories', 0) / 1000,
-            nutrients.get('carbs', 0) / 200,
-            nutrients.get('protein', 0) / 100,
-            nutrients.get('fat', 0) / 100,
-            nutrients.get('sugar', 0) / 100,
-            nutrients.get('fiber', 0) / 50,
-            nutrients.get('sodium', 0) / 5000,
-            nutrients.get('calcium', 0) / 2000,
-            nutrients.get('iron', 0) / 50
-        ]
-        
-        # Health metrics (4 values)
-        organ_health_array = np.array(organ_health)
-        health_metrics = [
-            organ_twin.get_overall_health(),
-            len([h for h in organ_health if h < 0.6]) / len(organ_health),
-            np.std(organ_health_array) if len(organ_health_array) > 1 else 0.1,
-            min(organ_health) if organ_health else 0.5
-        ]
-        
-        # Combine: 10 + 9 + 4 = 23 features
-        state_vector = organ_health + nutrient_features + health_metrics
-        
-        # Ensure correct size
-        if len(state_vector) != self.state_size:
-            # Adjust size
-            if len(state_vector) < self.state_size:
-                state_vector = state_vector + [0] * (self.state_size - len(state_vector))
-            else:
-                state_vector = state_vector[:self.state_size]
-        
-        return torch.FloatTensor(state_vector).unsqueeze(0).to(self.device)
+    def get_state(self, organ_twin, nutrients, out=None):
+        """Get state representation (1 x state_size); written into `out` if given"""
+        return self.state_encoder.encode([(organ_twin, nutrients)], out)
+    
+    def get_states(self, pairs, out=None):
+        """Batched get_state for (twin, nutrients) pairs -> N x state_size"""
+        return self.state_encoder.encode(pairs, out)
     
     def select_action(self, state, explore=True):
         """Select action with epsilon-greedy"""
@@ -151,36 +172,26 @@ class DQNOrganOptimizer:
                 q_val = q_values[0][action_idx].item()
         
         # Log decision
-        self.decision_log.append({
-            "timestamp": datetime.now(),
-            "action": self.actions[action_idx],
-            "action_idx": action_idx,
-            "epsilon": self.epsilon,
-            "q_value": q_val
-        })
+        self.recorder.record_decision(action_idx, self.epsilon, q_val)
         
         return action_idx
     
     def store_transition(self, state, action, reward, next_state, done):
         """Store transition in replay memory"""
-        # Store tensors, not numpy arrays
-        self.memory.append((state, action, reward, next_state, done))
+        # Copied into preallocated rows; no tensors are kept per transition
+        self.memory.push(state, action, reward, next_state, done)
+        self.recorder.record_reward(reward)
     
     def replay(self):
         """Train on batch from replay memory"""
         if len(self.memory) < self.batch_size:
             return 0
+        self._ensure_private_weights()
         
-        # Sample batch
-        batch = random.sample(self.memory, self.batch_size)
-        states, actions, rewards, next_states, dones = zip(*batch)
-        
-        # Convert to tensors - states and next_states are already tensors
-        states = torch.cat(states).to(self.device)
-        actions = torch.LongTensor(actions).unsqueeze(1).to(self.device)
-        rewards = torch.FloatTensor(rewards).unsqueeze(1).to(self.device)
-        next_states = torch.cat(next_states).to(self.device)
-        dones = torch.FloatTensor(dones).unsqueeze(1).to(self.device)
+        # Sample batch - gathered by index from the preallocated buffer
+        states, actions, rewards, next_states, dones, indices, weights = (
+            self.memory.sample(self.batch_size)
+        )
         
         # Current Q values
         current_q = self.model(states).gather(1, actions)
@@ -190,8 +201,11 @@ class DQNOrganOptimizer:
             next_q = self.target_model(next_states).max(1)[0].unsqueeze(1)
             target_q = rewards + (1 - dones) * self.gamma * next_q
         
-        # Compute loss
-        loss = self.criterion(current_q, target_q)
+        # Compute loss (importance-weighted under prioritized replay)
+        if weights is None:
+            loss = self.criterion(current_q, target_q)
+        else:
+            loss = (weights * (current_q - target_q).pow(2)).mean()
         
         # Optimize
         self.optimizer.zero_grad()
@@ -199,17 +213,28 @@ class DQNOrganOptimizer:
         torch.nn.utils.clip_grad_norm_(self.model.parameters(), 1.0)  # Gradient clipping
         self.optimizer.step()
         
+        self.memory.update_priorities(indices, target_q - current_q.detach())
+        
         # Update target network
         self.update_target_counter += 1
-        if self.update_target_counter % self.target_update_freq == 0:
+        if self.target_update_tau:
+            self.soft_update_target(self.target_update_tau)
+        elif self.update_target_counter % self.target_update_freq == 0:
             self.target_model.load_state_dict(self.model.state_dict())
         
         # Decay epsilon
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
         
-        self.training_losses.append(loss.item())
-        return loss.item()
+        loss_value = loss.item()
+        self.recorder.record_loss(loss_value)
+        return loss_value
+    
+    def soft_update_target(self, tau):
+        """target <- (1 - tau) * target + tau * model"""
+        with torch.no_grad():
+            for target, param in zip(self.target_model.parameters(), self.model.parameters()):
+                target.lerp_(param, tau)
     
     def apply_action_to_nutrients(self, action_idx, current_nutrients):
         """Apply action to modify nutrients for next meal"""
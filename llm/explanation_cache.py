@@ -0,0 +1,352 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+from database.db_connection import BASE_DIR
+
+# =========================
+# DEFAULTS
+# =========================
+CACHE_DB_PATH = BASE_DIR / "data" / "processed" / "llm_cache.db"
+
+MEMORY_ENTRIES = 1024
+MEMORY_TTL = 6 * 3600          # seconds
+DISK_ENTRIES = 50_000
+DISK_TTL = 30 * 24 * 3600      # seconds
+TOUCH_BATCH = 64               # disk hits whose last_used is written in one commit
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS explanations (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+"""
+
+
+# =========================
+# KEYING
+# =========================
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Whitespace/indentation differences must not change the key"""
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def cache_key(prompt: str, model: str, params: Dict) -> str:
+    """Content address of one generation request"""
+    payload = json.dumps(
+        {
+            "prompt": normalize_prompt(prompt),
+            "model": model,
+            "params": params
+        },
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# =========================
+# CACHE
+# =========================
+class ExplanationCache:
+    """
+    Two-tier cache for LLM explanations.
+
+    - memory: LRU with a TTL, per process
+    - disk: SQLite table that survives restarts, bounded by entry count
+
+    get_or_compute / aget_or_compute are single-flight: concurrent callers
+    asking for the same key share one upstream call. Empty results and
+    exceptions are never cached. The async paths (aget / aput) run the
+    SQLite work in a worker thread, never on the event loop.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = CACHE_DB_PATH,
+        memory_entries: int = MEMORY_ENTRIES,
+        memory_ttl: float = MEMORY_TTL,
+        disk_entries: int = DISK_ENTRIES,
+        disk_ttl: float = DISK_TTL
+    ):
+        self.memory_entries = memory_entries
+        self.memory_ttl = memory_ttl
+        self.disk_entries = disk_entries
+        self.disk_ttl = disk_ttl
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[str, asyncio.Future] = {}
+
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._disk_count = 0
+        # key -> last_used of disk hits not yet written back
+        self._touched: Dict[str, float] = {}
+        if db_path is not None:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(CREATE_TABLE_SQL)
+            self._db.commit()
+            # Counted once; kept current by _disk_put / _disk_get afterwards
+            self._disk_count = self._db.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "shared_waits": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0
+        }
+
+    # ---------- LOOKUP ----------
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        return self._disk_result(key, self._disk_get(key, now), now)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get() with the disk lookup off the event loop"""
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+
+        value = None
+        if self._db is not None:
+            value = await asyncio.to_thread(self._disk_get, key, now)
+        return self._disk_result(key, value, now)
+
+    def _disk_result(self, key: str, value: Optional[str], now: float) -> Optional[str]:
+        if value is not None:
+            self._memory_put(key, value, now)
+            with self._lock:
+                self.counters["disk_hits"] += 1
+            return value
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, value: str):
+        if not value:
+            return
+        now = time.time()
+        self._memory_put(key, value, now)
+        self._disk_put(key, value, now)
+
+    async def aput(self, key: str, value: str):
+        """put() with the disk write off the event loop"""
+        if not value:
+            return
+        now = time.time()
+        self._memory_put(key, value, now)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put, key, value, now)
+
+    # ---------- SINGLE-FLIGHT ----------
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.counters["shared_waits"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[str]]
+    ) -> str:
+        value = await self.aget(key)
+        if value is not None:
+            return value
+
+        future = self._ainflight.get(key)
+        if future is not None:
+            self.counters["shared_waits"] += 1
+            # shield: a cancelled follower must not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._ainflight[key] = future
+        try:
+            value = await compute()
+            await self.aput(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark retrieved so an unobserved failure is not logged
+            future.exception()
+            raise
+        finally:
+            self._ainflight.pop(key, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = self._disk_count
+
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round(
+            (stats["memory_hits"] + stats["disk_hits"]) / lookups, 4
+        ) if lookups else 0.0
+        return stats
+
+    # ---------- MEMORY TIER ----------
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return value
+            del self._memory[key]
+            return None
+
+    def _memory_put(self, key: str, value: str, now: float):
+        with self._lock:
+            self._memory[key] = (now + self.memory_ttl, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+                self.counters["memory_evictions"] += 1
+
+    # ---------- DISK TIER ----------
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        if self._db is None:
+            return None
+
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, created_at FROM explanations WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created_at = row
+            if created_at + self.disk_ttl <= now:
+                self._db.execute("DELETE FROM explanations WHERE key = ?", (key,))
+                self._touched.pop(key, None)
+                self._disk_count -= 1
+                self._db.commit()
+                return None
+
+            # last_used only orders evictions: written back in batches
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH:
+                self._flush_touched()
+                self._db.commit()
+            return value
+
+    def _flush_touched(self):
+        """Write pending last_used values (caller holds _db_lock and commits)"""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE explanations SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _disk_put(self, key: str, value: str, now: float):
+        if self._db is None:
+            return
+
+        with self._db_lock:
+            exists = self._db.execute(
+                "SELECT 1 FROM explanations WHERE key = ?", (key,)
+            ).fetchone() is not None
+            self._db.execute(
+                """
+                INSERT OR REPLACE INTO explanations (key, value, created_at, last_used)
+                VALUES (?, ?, ?, ?)
+                """,
+                (key, value, now, now)
+            )
+            self._touched.pop(key, None)
+            if not exists:
+                self._disk_count += 1
+
+            # Least recently used rows beyond the size bound go first
+            overflow = self._disk_count - self.disk_entries
+            if overflow > 0:
+                self._flush_touched()
+                deleted = self._db.execute(
+                    """
+                    DELETE FROM explanations WHERE key IN (
+                        SELECT key FROM explanations ORDER BY last_used ASC LIMIT ?
+                    )
+                    """,
+                    (overflow,)
+                ).rowcount
+                self._disk_count -= deleted
+                with self._lock:
+                    self.counters["disk_evictions"] += deleted
+
+            self._db.commit()
+
+
+# =========================
+# SHARED CACHE
+# =========================
+_cache: Optional[ExplanationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_explanation_cache() -> ExplanationCache:
+    """Process-wide cache shared by the Groq and Ollama explainers"""
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExplanationCache()
+    return _cache
@@ -0,0 +1,161 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+
+# =========================
+# DEFAULT BUDGETS
+# =========================
+MAX_OUTSTANDING_CALLS = 8      # concurrent upstream LLM calls
+RESPONSE_BUDGET = 2.0          # seconds a request waits for its explanation
+HARD_TIMEOUT = 60.0            # seconds before a background call is abandoned
+MAX_PENDING = 256              # explanations queued or running in the background
+MAX_FINISHED = 1024            # finished explanations kept for polling
+
+
+# Explanation status values surfaced in API responses
+READY = "ready"
+PENDING = "pending"
+UNAVAILABLE = "unavailable"
+SKIPPED = "skipped"            # not requested (e.g. batch planning)
+
+
+class ExplanationScheduler:
+    """
+    Bounds outstanding LLM calls and decouples them from the request.
+
+    A request waits at most `response_budget` seconds for its explanation,
+    and not at all when every LLM slot is busy. Anything slower keeps
+    running in the background and is reported as pending; the caller
+    polls for it by id.
+    """
+
+    def __init__(
+        self,
+        max_outstanding: int = MAX_OUTSTANDING_CALLS,
+        response_budget: float = RESPONSE_BUDGET,
+        hard_timeout: float = HARD_TIMEOUT,
+        max_pending: int = MAX_PENDING
+    ):
+        self.max_outstanding = max_outstanding
+        self.response_budget = response_budget
+        self.hard_timeout = hard_timeout
+        self.max_pending = max_pending
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._finished: "OrderedDict[str, Dict]" = OrderedDict()
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_outstanding)
+        return self._semaphore
+
+    # =========================
+    # PUBLIC ENTRY
+    # =========================
+    async def explain(self, generate: Callable[[], Awaitable[str]]) -> Dict:
+        """
+        Run `generate` under the limiter and return
+        {"status", "explanation", "explanation_id"}.
+        """
+        if len(self._pending) >= self.max_pending:
+            return self._result(UNAVAILABLE)
+
+        saturated = self.semaphore.locked()
+        explanation_id = uuid.uuid4().hex
+        task = asyncio.create_task(self._run(generate))
+
+        if not saturated:
+            done, _ = await asyncio.wait({task}, timeout=self.response_budget)
+            if done:
+                return self._task_result(task)
+
+        self._pending[explanation_id] = task
+        task.add_done_callback(lambda t: self._finish(explanation_id, t))
+        return self._result(PENDING, explanation_id=explanation_id)
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold an LLM slot for a streamed explanation. Yields False, holding
+        nothing, if no slot frees up within `response_budget` seconds.
+        """
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=self.response_budget)
+        except asyncio.TimeoutError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            self.semaphore.release()
+
+    async def stream(self, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        """
+        Yield from `chunks` for at most `hard_timeout` seconds in total;
+        asyncio.TimeoutError once a stream outlives it.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.hard_timeout
+        iterator = chunks.__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), deadline - loop.time())
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def get(self, explanation_id: str) -> Optional[Dict]:
+        """Status of a previously pending explanation (None if unknown)"""
+        if explanation_id in self._pending:
+            return self._result(PENDING, explanation_id=explanation_id)
+
+        result = self._finished.get(explanation_id)
+        if result is None:
+            return None
+        return {**result, "explanation_id": explanation_id}
+
+    def stats(self) -> Dict:
+        return {
+            "max_outstanding": self.max_outstanding,
+            "pending": len(self._pending),
+            "finished": len(self._finished)
+        }
+
+    # =========================
+    # INTERNALS
+    # =========================
+    async def _run(self, generate: Callable[[], Awaitable[str]]) -> str:
+        async with self.semaphore:
+            return await asyncio.wait_for(generate(), timeout=self.hard_timeout)
+
+    def _finish(self, explanation_id: str, task: asyncio.Task):
+        self._pending.pop(explanation_id, None)
+        self._finished[explanation_id] = self._task_result(task)
+
+        while len(self._finished) > MAX_FINISHED:
+            self._finished.popitem(last=False)
+
+    def _task_result(self, task: asyncio.Task) -> Dict:
+        if task.cancelled() or task.exception() is not None:
+            # Never fail the API if the explainer fails
+            return self._result(UNAVAILABLE)
+        return self._result(READY, task.result() or "")
+
+    @staticmethod
+    def _result(status: str, explanation: str = "", explanation_id: str = None) -> Dict:
+        return {
+            "status": status,
+            "explanation": explanation,
+            "explanation_id": explanation_id
+        }
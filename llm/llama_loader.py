@@ -1,44 +1,162 @@
+import asyncio
 import os
+from typing import AsyncIterator, Iterator
+
+from llm.explanation_cache import cache_key, get_explanation_cache
+
+
+SYSTEM_PROMPT = (
+    "You are a nutrition explanation assistant. "
+    "You only explain decisions already made. "
+    "You never suggest new meals or change calories."
+)
+
+GENERATION_PARAMS = {
+    "temperature": 0.4,
+    "max_tokens": 500
+}
 
 
 class LlamaLoader:
     """
     Online LLaMA-3 loader using Groq API.
     Used ONLY for explanation generation.
+
+    The Groq SDK honours GROQ_BASE_URL, so any OpenAI-compatible
+    server (e.g. a local fake for load tests) can stand in for Groq.
+    Completions are cached by prompt/model/sampling parameters.
     """
 
-    def __init__(self, model_name="llama-3.1-8b-instant"):
+    def __init__(self, model_name="llama-3.1-8b-instant", cache=None):
         api_key = os.getenv("GROQ_API_KEY")
         self.client = None
+        self.async_client = None
         if api_key:
             try:
-                from groq import Groq
+                from groq import Groq, AsyncGroq
                 self.client = Groq(api_key=api_key)
+                self.async_client = AsyncGroq(api_key=api_key)
             except Exception:
                 # Fall back to no-op if Groq is unavailable
                 self.client = None
+                self.async_client = None
         self.model = model_name
+        self._cache = cache
+
+    @property
+    def cache(self):
+        # Resolved lazily so the cache file is only opened once it is needed
+        if self._cache is None:
+            self._cache = get_explanation_cache()
+        return self._cache
+
+    def _messages(self, prompt: str):
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
+    def _cache_key(self, prompt: str) -> str:
+        return cache_key(
+            prompt,
+            self.model,
+            {"system": SYSTEM_PROMPT, **GENERATION_PARAMS}
+        )
 
     def generate(self, prompt: str) -> str:
         if not self.client:
             return ""
+        return self.cache.get_or_compute(
+            self._cache_key(prompt),
+            lambda: self._generate(prompt)
+        )
+
+    def _generate(self, prompt: str) -> str:
         response = self.client.chat.completions.create(
             model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a nutrition explanation assistant. "
-                        "You only explain decisions already made. "
-                        "You never suggest new meals or change calories."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.4,
-            max_tokens=500
+            messages=self._messages(prompt),
+            **GENERATION_PARAMS
         )
         return response.choices[0].message.content
+
+    async def agenerate(self, prompt: str) -> str:
+        """Non-blocking variant of generate() for the async request path"""
+        if not self.async_client:
+            if not self.client:
+                return ""
+            return await asyncio.to_thread(self.generate, prompt)
+
+        return await self.cache.aget_or_compute(
+            self._cache_key(prompt),
+            lambda: self._agenerate(prompt)
+        )
+
+    async def _agenerate(self, prompt: str) -> str:
+        response = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(prompt),
+            **GENERATION_PARAMS
+        )
+        return response.choices[0].message.content
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the completion piece by piece as Groq produces it"""
+        if not self.client:
+            return
+
+        key = self._cache_key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(prompt),
+            stream=True,
+            **GENERATION_PARAMS
+        )
+        for chunk in stream:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                parts.append(text)
+                yield text
+
+        self.cache.put(key, "".join(parts))
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Async variant of stream() for the SSE endpoints"""
+        if not self.async_client:
+            # Sync-only client: no incremental output, one final chunk
+            text = await self.agenerate(prompt)
+            if text:
+                yield text
+            return
+
+        key = self._cache_key(prompt)
+        cached = await self.cache.aget(key)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        stream = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(prompt),
+            stream=True,
+            **GENERATION_PARAMS
+        )
+        async for chunk in stream:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                parts.append(text)
+                yield text
+
+        await self.cache.aput(key, "".join(parts))
@@ -1,17 +1,125 @@
 import requests
 import json
 from config import ORGAN_BASELINES
+from llm.explanation_cache import cache_key, get_explanation_cache
+
+ORGAN_OPTIONS = {"temperature": 0.7, "top_p": 0.9, "num_predict": 300}
+AGENT_OPTIONS = {"temperature": 0.7, "num_predict": 350}
 
 class OllamaDigitalTwinExplainer:
     """Ollama-powered LLM that explains digital twin responses"""
     
-    def __init__(self, base_url="http://localhost:11434"):
+    def __init__(self, base_url="http://localhost:11434", cache=None):
         self.base_url = base_url
         self.model_name = "llama3"  # or "mistral", "gemma", etc.
+        self._cache = cache
+    
+    @property
+    def cache(self):
+        """Explanation cache shared with the Groq explainer (opened lazily)"""
+        if self._cache is None:
+            self._cache = get_explanation_cache()
+        return self._cache
         
     def explain_organ_response(self, organ_name, impact_data, nutrients):
         """Get LLM explanation for organ response"""
         
+        prompt = self._organ_prompt(organ_name, impact_data, nutrients)
+        
+        try:
+            return self._generate_cached(prompt, ORGAN_OPTIONS)
+        except:
+            return self._fallback_explanation(organ_name, impact_data, nutrients)
+    
+    def explain_agent_decision(self, agent_action, organ_states, nutrients, action_idx, reward=None):
+        """Explain why the DQN agent chose a specific action"""
+        
+        prompt = self._agent_prompt(agent_action, organ_states, nutrients, reward)
+        
+        try:
+            return self._generate_cached(prompt, AGENT_OPTIONS)
+        except:
+            return self._fallback_agent_explanation(agent_action, action_idx)
+    
+    def _generate_cached(self, prompt, options):
+        """Cached, single-flight Ollama call; raises if Ollama fails"""
+        key = cache_key(prompt, self.model_name, options)
+        return self.cache.get_or_compute(key, lambda: self._generate(prompt, options))
+    
+    def _generate(self, prompt, options):
+        response = requests.post(
+            f"{self.base_url}/api/generate",
+            json={
+                "model": self.model_name,
+                "prompt": prompt,
+                "stream": False,
+                "options": options
+            },
+            timeout=10
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Ollama returned {response.status_code}")
+        return response.json()["response"]
+    
+    # ---------- STREAMING ----------
+    def stream_organ_response(self, organ_name, impact_data, nutrients):
+        """Yield the organ explanation as Ollama generates it"""
+        prompt = self._organ_prompt(organ_name, impact_data, nutrients)
+        yield from self._stream_or_fallback(
+            prompt, ORGAN_OPTIONS,
+            lambda: self._fallback_explanation(organ_name, impact_data, nutrients)
+        )
+    
+    def stream_agent_decision(self, agent_action, organ_states, nutrients, action_idx, reward=None):
+        """Yield the agent decision explanation as Ollama generates it"""
+        prompt = self._agent_prompt(agent_action, organ_states, nutrients, reward)
+        yield from self._stream_or_fallback(
+            prompt, AGENT_OPTIONS,
+            lambda: self._fallback_agent_explanation(agent_action, action_idx)
+        )
+    
+    def _stream_or_fallback(self, prompt, options, fallback):
+        """Ollama `stream: true` returns one JSON object per line"""
+        key = cache_key(prompt, self.model_name, options)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        parts = []
+        try:
+            with requests.post(
+                f"{self.base_url}/api/generate",
+                json={
+                    "model": self.model_name,
+                    "prompt": prompt,
+                    "stream": True,
+                    "options": options
+                },
+                stream=True,
+                timeout=10
+            ) as response:
+                if response.status_code != 200:
+                    yield fallback()
+                    return
+                
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        parts.append(chunk["response"])
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        self.cache.put(key, "".join(parts))
+                        break
+        except Exception:
+            if not parts:
+                yield fallback()
+    
+    # ---------- PROMPTS ----------
+    def _organ_prompt(self, organ_name, impact_data, nutrients):
+        """Prompt shared by explain_ and stream_organ_response"""
         prompt = f"""
         You are Dr. AI, a clinical nutritionist explaining organ responses to meals.
         
@@ -27,34 +135,10 @@ class OllamaDigitalTwinExplainer:
         
         Keep it concise, medical but understandable, and actionable.
         """
-        
-        try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.7,
-                        "top_p": 0.9,
-                        "num_predict": 300
-                    }
-                },
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                return response.json()["response"]
-            else:
-                return self._fallback_explanation(organ_name, impact_data, nutrients)
-                
-        except:
-            return self._fallback_explanation(organ_name, impact_data, nutrients)
+        return prompt
     
-    def explain_agent_decision(self, agent_action, organ_states, nutrients, action_idx, reward=None):
-        """Explain why the DQN agent chose a specific action"""
-        
+    def _agent_prompt(self, agent_action, organ_states, nutrients, reward=None):
+        """Prompt shared by explain_ and stream_agent_decision"""
         prompt = f"""
         Explain why an AI nutrition agent recommended: "{agent_action}"
         
@@ -74,24 +158,7 @@ class OllamaDigitalTwinExplainer:
         
         Be scientific but practical. Mention 2-3 research-backed mechanisms.
         """
-        
-        try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {"temperature": 0.7, "num_predict": 350}
-                },
-                timeout=10
-            )
-            if response.status_code == 200:
-                return response.json()["response"]
-            else:
-                return self._fallback_agent_explanation(agent_action, action_idx)
-        except:
-            return self._fallback_agent_explanation(agent_action, action_idx)
+        return prompt
     
     def _fallback_explanation(self, organ_name, impact_data, nutrients):
         """Fallback explanation if Ollama is unavailable"""
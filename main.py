@@ -22,7 +22,8 @@ def initialize_session_state():
     if "digital_twin" not in st.session_state:
         st.session_state.digital_twin = OrganDigitalTwin()
     if "dqn_agent" not in st.session_state:
-        st.session_state.dqn_agent = DQNOrganOptimizer(state_size=23, action_size=8)
+        # Shared pretrained weights when a checkpoint exists, fresh otherwise
+        st.session_state.dqn_agent = DQNOrganOptimizer.from_pretrained(state_size=23, action_size=8)
     if "ollama_explainer" not in st.session_state:
         st.session_state.ollama_explainer = OllamaDigitalTwinExplainer()
     if "meal_history" not in st.session_state:
@@ -31,8 +32,6 @@ def initialize_session_state():
         st.session_state.explanations = []
     if "last_reward" not in st.session_state:
         st.session_state.last_reward = 0
-    if "training_loss_history" not in st.session_state:
-        st.session_state.training_loss_history = []
 
 # Initialize session state
 initialize_session_state()
@@ -83,11 +82,9 @@ if sidebar_data.get("simulate_clicked", False):
         done
     )
     
-    # Train agent if enough data
+    # Train agent if enough data (losses are kept by the agent's recorder)
     if len(st.session_state.dqn_agent.memory) >= st.session_state.dqn_agent.batch_size:
-        loss = st.session_state.dqn_agent.replay()
-        if loss:
-            st.session_state.training_loss_history.append(loss)
+        st.session_state.dqn_agent.replay()
     
     # Get recommendation
     recommendation = st.session_state.dqn_agent.get_recommendation(action_idx, nutrients)
@@ -148,7 +145,6 @@ if sidebar_data.get("simulate_clicked", False):
 if sidebar_data.get("train_clicked", False):
     if st.session_state.dqn_agent.memory:
         loss = st.session_state.dqn_agent.replay()
-        st.session_state.training_loss_history.append(loss)
         st.sidebar.success(f"Agent trained! Loss: {loss:.4f}")
     else:
         st.sidebar.warning("Need more meal data to train agent")
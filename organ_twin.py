@@ -1,24 +1,203 @@
 import numpy as np
 import random
-from collections import deque
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 from config import ORGAN_BASELINES, ORGAN_DEFINITIONS, ORGAN_WEIGHTS
+from twin_history import (
+    HISTORY_CAPACITY,
+    InterventionEventsView,
+    MealEventsView,
+    OrganHistory,
+    TwinHistory
+)
+
+# Nutrient normalization (daily limits/targets); anything else is / 100
+NUTRIENT_NORMALIZATION = {
+    "sodium": 2300,     # Daily limit
+    "sugar": 50,        # Daily limit
+    "fiber": 25,        # Daily target
+    "protein": 100,     # Typical max
+    "calories": 2000,   # Daily average
+    "fat": 100          # Generic normalization
+}
+DEFAULT_NORMALIZATION = 100
+
+# Per-organ intervention effects: (boosted organs, boosted, other);
+# shared by OrganDigitalTwin and TwinPopulation
+INTERVENTION_EFFECTS = {
+    "exercise": (["heart", "lungs", "muscles"], 0.02, 0.01),
+    "hydration": (["kidneys", "brain", "skin"], 0.015, 0.008),
+    "sleep": (["brain", "immune"], 0.025, 0.01),
+    "stress_reduction": (["brain", "heart", "gut"], 0.03, 0.015)
+}
+DEFAULT_INTERVENTION_EFFECT = 0.01
+
+
+def intervention_effect(intervention_type):
+    """(boosted organs, boosted, other) for an intervention"""
+    return INTERVENTION_EFFECTS.get(
+        intervention_type, ([], DEFAULT_INTERVENTION_EFFECT, DEFAULT_INTERVENTION_EFFECT)
+    )
+
+
+class OrganImpactModel:
+    """
+    ORGAN_DEFINITIONS sensitivities compiled into arrays.
+
+    - matrix: dense organ x nutrient sensitivities (0 where unused)
+    - normalization: per-nutrient divisor
+    - slot_nutrient / slot_sensitivity: each organ's sensitivities in
+      their dict order, padded with zeros
+
+    impacts() sums one slot at a time across all organs, which adds the
+    terms in exactly the order of the former per-organ loop, so results
+    are bit-identical to it (a BLAS matrix-vector product is not).
+    """
+
+    def __init__(self, organs):
+        self.organ_names = list(organs)
+        self.organ_index = {name: i for i, name in enumerate(self.organ_names)}
+
+        self.nutrient_names = []
+        for organ in organs.values():
+            for nutrient in organ["sensitivity"]:
+                if nutrient not in self.nutrient_names:
+                    self.nutrient_names.append(nutrient)
+        self.nutrient_index = {name: j for j, name in enumerate(self.nutrient_names)}
+
+        self.normalization = np.array(
+            [NUTRIENT_NORMALIZATION.get(n, DEFAULT_NORMALIZATION) for n in self.nutrient_names],
+            dtype=np.float64
+        )
+
+        n_slots = max(len(organ["sensitivity"]) for organ in organs.values())
+        self.matrix = np.zeros((len(organs), len(self.nutrient_names)))
+        self.slot_nutrient = np.zeros((len(organs), n_slots), dtype=np.int64)
+        self.slot_sensitivity = np.zeros((len(organs), n_slots))
+
+        for i, organ in enumerate(organs.values()):
+            for k, (nutrient, sensitivity) in enumerate(organ["sensitivity"].items()):
+                j = self.nutrient_index[nutrient]
+                self.matrix[i, j] = sensitivity
+                self.slot_nutrient[i, k] = j
+                self.slot_sensitivity[i, k] = sensitivity
+
+    def normalized(self, nutrients):
+        """Normalized nutrient vector (0 for nutrients the meal lacks)"""
+        values = np.array(
+            [nutrients.get(n, 0) for n in self.nutrient_names], dtype=np.float64
+        )
+        return values / self.normalization
+
+    def impacts(self, nutrients, scale):
+        """Deterministic impact per organ (before the random jitter)"""
+        terms = self.slot_sensitivity * self.normalized(nutrients)[self.slot_nutrient] * scale
+
+        impact = np.zeros(len(self.organ_names))
+        for k in range(terms.shape[1]):
+            impact += terms[:, k]
+        return impact
+
+
+class OrganMetricsModel:
+    """
+    Organ metrics flattened into arrays: one slot per (organ, metric),
+    with its baseline and clip range, so a health update moves every
+    metric in a few vector ops instead of a scalar np.clip per metric.
+    """
+
+    def __init__(self, organs):
+        self.slots = []
+        organ_slot, base, low, high = [], [], [], []
+
+        for i, (organ_name, organ) in enumerate(organs.items()):
+            for metric in organ["metrics"]:
+                # Use baseline values if available
+                base_value = ORGAN_BASELINES.get(organ_name, {}).get(metric, 100)
+                self.slots.append((organ["metrics"], metric))
+                organ_slot.append(i)
+                base.append(base_value)
+
+                # Bounds based on metric type
+                if "pressure" in metric or "creatinine" in metric or "inflammation" in metric:
+                    low.append(base_value * 0.5)
+                    high.append(base_value * 1.5)
+                else:
+                    low.append(base_value * 0.3)
+                    high.append(base_value * 1.2)
+
+        self.organ_slot = np.array(organ_slot, dtype=np.int64)
+        self.base = np.array(base, dtype=np.float64)
+        self.low = np.array(low, dtype=np.float64)
+        self.high = np.array(high, dtype=np.float64)
+
+    def update(self, health, organs=None):
+        """
+        Move metrics toward baseline * health factor.
+        `health` is per organ; `organs` (indices) limits the update.
+        """
+        mask = None if organs is None else np.isin(self.organ_slot, organs)
+        slots = self.slots if mask is None else [
+            slot for slot, keep in zip(self.slots, mask) if keep
+        ]
+        organ_slot = self.organ_slot if mask is None else self.organ_slot[mask]
+
+        current = np.array([metrics[metric] for metrics, metric in slots], dtype=np.float64)
+
+        # Maps 0.1-1.0 to 0.64-1.0
+        health_factor = 0.6 + (np.asarray(health, dtype=np.float64)[organ_slot] * 0.4)
+        target_value = (self.base if mask is None else self.base[mask]) * health_factor
+        adjustment = (target_value - current) * 0.1
+
+        updated = np.clip(
+            current + adjustment,
+            self.low if mask is None else self.low[mask],
+            self.high if mask is None else self.high[mask]
+        )
+        for (metrics, metric), value in zip(slots, updated.tolist()):
+            metrics[metric] = value
+
+
+def organ_colors(health):
+    """rgb() colour strings for an array of organ health values"""
+    health = np.asarray(health, dtype=np.float64)
+
+    # Green: Healthy
+    green = (255 * (1 - (health - 0.8) * 5)).astype(np.int64)
+    # Yellow: Moderate
+    yellow = (255 * (health - 0.6) * 5).astype(np.int64)
+    # Red: At risk
+    red = (255 * (0.6 - health) * 5).astype(np.int64)
+
+    colors = []
+    for h, g_r, y_i, r_i in zip(health.tolist(), green.tolist(), yellow.tolist(), red.tolist()):
+        if h >= 0.8:
+            colors.append(f"rgb({g_r}, 255, {g_r})")
+        elif h >= 0.6:
+            colors.append(f"rgb(255, {255 - y_i // 2}, 0)")
+        else:
+            fade = max(50, 255 - r_i)
+            colors.append(f"rgb(255, {fade}, {fade})")
+    return colors
+
 
 class OrganDigitalTwin:
     """Real-time digital twin of 10 vital organs"""
     
-    def __init__(self):
+    def __init__(self, history_capacity=HISTORY_CAPACITY):
         # Initialize organs with realistic physiology
         self.organs = {}
         self._previous_overall_health = 0.5
         self._initialize_organs()
+        self.impact_model = OrganImpactModel(self.organs)
+        self.metrics_model = OrganMetricsModel(self.organs)
         
-        # Simulation state
-        self.history = {organ: deque(maxlen=100) for organ in self.organs}
+        # Simulation state: bounded ring buffers, exposed through views
+        self.history_store = TwinHistory(self.organs, history_capacity)
+        self.history = OrganHistory(self.history_store)
         self.current_time = datetime.now()
-        self.nutrient_history = []
-        self.intervention_history = []
+        self.nutrient_history = MealEventsView(self.history_store)
+        self.intervention_history = InterventionEventsView(self.history_store)
     
     def _initialize_organs(self):
         """Initialize all organs with their properties"""
@@ -39,58 +218,49 @@ class OrganDigitalTwin:
         organ_states_before = self.get_organ_states()
         self._previous_overall_health = self.get_overall_health()
         
-        for organ_name, organ_data in self.organs.items():
-            # Calculate organ-specific impact
-            impact = self._calculate_organ_impact(organ_name, nutrients, scale)
-            
-            # Apply impact
-            new_health = organ_data["health"] + impact
-            
-            # Apply bounds and recovery
-            new_health = np.clip(new_health, 0.1, 1.0)
-            new_health = min(1.0, new_health + 0.001)  # Natural recovery
-            
-            # Update organ
-            organ_data["health"] = new_health
-            
-            # Update metrics
-            self._update_organ_metrics(organ_name, new_health)
-            
-            # Update color
-            self._update_organ_color(organ_name, new_health)
+        # All organs at once; jitter drawn in organ order as before
+        impact = self.impact_model.impacts(nutrients, scale)
+        impact += np.array([random.uniform(-0.02, 0.02) for _ in self.organs])
+        
+        # Apply impact, bounds and natural recovery
+        health = np.array([organ["health"] for organ in self.organs.values()])
+        new_health = np.minimum(1.0, np.clip(health + impact, 0.1, 1.0) + 0.001)
+        
+        # Update metrics and colours
+        self.metrics_model.update(new_health)
+        colors = organ_colors(new_health)
+        
+        impact = impact.tolist()
+        new_health = new_health.tolist()
+        
+        for i, (organ_name, organ_data) in enumerate(self.organs.items()):
+            organ_data["health"] = new_health[i]
+            organ_data["color"] = colors[i]
             
             # Record impact
             impacts[organ_name] = {
-                "impact": impact,
-                "new_health": new_health,
-                "stress_level": abs(impact) * 100
+                "impact": impact[i],
+                "new_health": new_health[i],
+                "stress_level": abs(impact[i]) * 100
             }
-            
-            # Record history
-            self.history[organ_name].append({
-                "timestamp": self.current_time,
-                "health": new_health,
-                "impact": impact,
-                "meal": meal_name,
-                "nutrients": nutrients.copy()
-            })
         
         # Calculate reward for RL agent
         organ_states_after = self.get_organ_states()
         reward = self._calculate_reward(organ_states_before, organ_states_after)
         
-        # Record nutrient history
-        self.nutrient_history.append({
-            "timestamp": self.current_time,
-            "meal": meal_name,
-            "nutrients": nutrients.copy(),
-            "portion": portion_g,
-            "overall_impact": np.mean([impacts[o]["impact"] for o in impacts]),
-            "organ_states": organ_states_before,
-            "reward": reward,
-            "overall_health_before": self._previous_overall_health,
-            "overall_health_after": self.get_overall_health()
-        })
+        # Record history (one row for all organs; nutrients interned once)
+        self.history_store.record_meal(
+            self.current_time,
+            meal_name,
+            nutrients,
+            portion_g,
+            list(organ_states_before.values()),
+            new_health,
+            impact,
+            reward,
+            self._previous_overall_health,
+            self.get_overall_health()
+        )
         
         self.current_time += timedelta(hours=1)  # Advance simulation time
         
@@ -98,59 +268,17 @@ class OrganDigitalTwin:
     
     def _calculate_organ_impact(self, organ_name, nutrients, scale):
         """Calculate organ-specific impact using sensitivity coefficients"""
-        organ = self.organs[organ_name]
-        impact = 0
-        
-        for nutrient, sensitivity in organ["sensitivity"].items():
-            if nutrient in nutrients:
-                nutrient_value = nutrients[nutrient]
-                
-                # Normalize nutrient values
-                if nutrient == "sodium":
-                    norm_value = nutrient_value / 2300  # Daily limit
-                elif nutrient == "sugar":
-                    norm_value = nutrient_value / 50    # Daily limit
-                elif nutrient == "fiber":
-                    norm_value = nutrient_value / 25    # Daily target
-                elif nutrient == "protein":
-                    norm_value = nutrient_value / 100   # Typical max
-                elif nutrient == "calories":
-                    norm_value = nutrient_value / 2000  # Daily average
-                elif nutrient == "fat":
-                    norm_value = nutrient_value / 100   # Generic normalization
-                else:
-                    norm_value = nutrient_value / 100   # Generic normalization
-                
-                # Calculate impact (negative sensitivity means beneficial)
-                impact += sensitivity * norm_value * scale
+        impact = self.impact_model.impacts(nutrients, scale)[self.impact_model.organ_index[organ_name]]
         
         # Add some randomness for realism
-        impact += random.uniform(-0.02, 0.02)
-        return impact
+        return float(impact) + random.uniform(-0.02, 0.02)
     
     def _update_organ_metrics(self, organ_name, new_health):
         """Update organ metrics based on health"""
-        organ = self.organs[organ_name]
-        
-        # Update metrics proportionally to health
-        health_factor = 0.6 + (new_health * 0.4)  # Maps 0.1-1.0 to 0.64-1.0
-        
-        for metric in organ["metrics"]:
-            # Use baseline values if available
-            base_value = ORGAN_BASELINES.get(organ_name, {}).get(metric, 100)
-            current_value = organ["metrics"][metric]
-            
-            # Move toward target value
-            target_value = base_value * health_factor
-            adjustment = (target_value - current_value) * 0.1
-            
-            # Apply bounds based on metric type
-            if "pressure" in metric or "creatinine" in metric or "inflammation" in metric:
-                organ["metrics"][metric] = np.clip(current_value + adjustment, 
-                                                  base_value * 0.5, base_value * 1.5)
-            else:
-                organ["metrics"][metric] = np.clip(current_value + adjustment, 
-                                                  base_value * 0.3, base_value * 1.2)
+        index = self.impact_model.organ_index[organ_name]
+        health = np.zeros(len(self.organs))
+        health[index] = new_health
+        self.metrics_model.update(health, organs=[index])
     
     def _calculate_reward(self, states_before, states_after):
         """Calculate reward for RL agent"""
@@ -177,48 +305,19 @@ class OrganDigitalTwin:
     
     def _update_organ_color(self, organ_name, health):
         """Update organ color based on health status"""
-        organ = self.organs[organ_name]
-        
-        if health >= 0.8:
-            # Green: Healthy
-            r = int(255 * (1 - (health - 0.8) * 5))
-            g = 255
-            b = r
-            organ["color"] = f"rgb({r}, {g}, {b})"
-        elif health >= 0.6:
-            # Yellow: Moderate
-            intensity = int(255 * (health - 0.6) * 5)
-            r = 255
-            g = 255 - intensity // 2
-            b = 0
-            organ["color"] = f"rgb({r}, {g}, {b})"
-        else:
-            # Red: At risk
-            intensity = int(255 * (0.6 - health) * 5)
-            r = 255
-            g = max(50, 255 - intensity)
-            b = max(50, 255 - intensity)
-            organ["color"] = f"rgb({r}, {g}, {b})"
+        self.organs[organ_name]["color"] = organ_colors([health])[0]
     
     def apply_intervention(self, intervention_type, intensity=1.0):
         """Apply a health intervention"""
         impacts = {}
+        boosted, boost, other = intervention_effect(intervention_type)
         
         for organ_name in self.organs:
             organ = self.organs[organ_name]
             base_health = organ["health"]
             
             # Calculate intervention impact
-            if intervention_type == "exercise":
-                impact = 0.02 * intensity if organ_name in ["heart", "lungs", "muscles"] else 0.01 * intensity
-            elif intervention_type == "hydration":
-                impact = 0.015 * intensity if organ_name in ["kidneys", "brain", "skin"] else 0.008 * intensity
-            elif intervention_type == "sleep":
-                impact = 0.025 * intensity if organ_name in ["brain", "immune"] else 0.01 * intensity
-            elif intervention_type == "stress_reduction":
-                impact = 0.03 * intensity if organ_name in ["brain", "heart", "gut"] else 0.015 * intensity
-            else:
-                impact = 0.01 * intensity
+            impact = (boost if organ_name in boosted else other) * intensity
             
             # Apply impact
             new_health = np.clip(base_health + impact, 0.1, 1.0)
@@ -234,12 +333,13 @@ class OrganDigitalTwin:
             }
         
         # Record intervention
-        self.intervention_history.append({
-            "timestamp": self.current_time,
-            "intervention": intervention_type,
-            "intensity": intensity,
-            "impacts": impacts
-        })
+        self.history_store.record_intervention(
+            self.current_time,
+            intervention_type,
+            intensity,
+            [impacts[name]["new_health"] for name in self.organs],
+            [impacts[name]["impact"] for name in self.organs]
+        )
         
         return impacts
     
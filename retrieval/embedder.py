@@ -0,0 +1,393 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from agents.nutrition_agent import NUTRIENT_COLUMNS, FoodCatalog, get_food_catalog
+from database.db_connection import BASE_DIR
+
+
+# =========================
+# NUTRIENT VECTORS
+# =========================
+class NutrientEmbedder:
+    """
+    Per-100g nutrient columns -> standardized float32 vectors.
+
+    Values are log1p-compressed (sodium in mg and iron in mg otherwise
+    differ by orders of magnitude) and z-scored with the catalog's
+    statistics; a missing value maps to 0, the column mean.
+    """
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray, columns: List[str] = None):
+        self.columns = list(columns or NUTRIENT_COLUMNS)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+
+    @property
+    def dim(self) -> int:
+        return len(self.columns)
+
+    @classmethod
+    def fit(cls, catalog: FoodCatalog, columns: List[str] = None) -> "NutrientEmbedder":
+        columns = list(columns or NUTRIENT_COLUMNS)
+        values = cls._compress(np.column_stack([catalog.raw[c] for c in columns]))
+        mean = np.nanmean(values, axis=0)
+        scale = np.nanstd(values, axis=0)
+        scale[~(scale > 0)] = 1.0
+        return cls(np.nan_to_num(mean), scale, columns)
+
+    @staticmethod
+    def _compress(values: np.ndarray) -> np.ndarray:
+        return np.log1p(np.maximum(values, 0))
+
+    def transform(self, values: np.ndarray) -> np.ndarray:
+        """N x len(columns) per-100g values -> N x dim float32 vectors"""
+        vectors = (self._compress(np.asarray(values, dtype=np.float64)) - self.mean) / self.scale
+        return np.nan_to_num(vectors, nan=0.0).astype(np.float32)
+
+    def embed_catalog(self, catalog: FoodCatalog) -> np.ndarray:
+        return self.transform(np.column_stack([catalog.raw[c] for c in self.columns]))
+
+    def embed_nutrients(self, nutrients: Dict) -> np.ndarray:
+        """One per-100g nutrient dict -> 1 x dim (absent keys count as missing)"""
+        return self.transform([[nutrients.get(c, np.nan) for c in self.columns]])
+
+    def to_meta(self) -> Dict:
+        return {"columns": self.columns, "mean": self.mean.tolist(), "scale": self.scale.tolist()}
+
+    @classmethod
+    def from_meta(cls, meta: Dict) -> "NutrientEmbedder":
+        return cls(meta["mean"], meta["scale"], meta["columns"])
+
+
+# =========================
+# DISH-NAME VECTORS
+# =========================
+NAME_EMBEDDINGS_DIR = BASE_DIR / "data" / "processed" / "name_embeddings"
+USE_SEMANTIC_MATCHING = os.getenv("NUTRITION_SEMANTIC_MATCHING", "0") == "1"
+NAME_FILES = ("vectors", "norms", "ids", "name_hashes")
+NGRAM_DIM = 2048
+NGRAM_SIZES = (2, 3, 4)
+DEFAULT_SENTENCE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_CHUNK_SIZE = 256
+
+# A term matches a dish when most of its n-grams occur in the name
+# (word-level, so "tea" no longer hits "steamed") or the whole names
+# are alike ("paneer tikka" ~ "paneer shaslik/tikka")
+CONTAINMENT_THRESHOLD = 0.9
+SIMILARITY_THRESHOLD = 0.6
+MATCH_CACHE_SIZE = 4096
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(text: str) -> str:
+    return " ".join(_NON_ALNUM.sub(" ", text.lower()).split())
+
+
+def name_hash(dish_name: str) -> bytes:
+    return hashlib.blake2b(dish_name.encode(), digest_size=8).digest()
+
+
+class NgramEmbedder:
+    """
+    Hashed character n-grams of the normalized, space-padded name. Each
+    distinct n-gram sets one of `dim` columns to +-1 (column and sign
+    from a stable hash) and rows are L2-normalized. There is no
+    vocabulary, so every name embeds independently of the others.
+    """
+
+    containment = True         # raw dot products count shared n-grams
+
+    def __init__(self, dim: int = NGRAM_DIM, sizes: Sequence[int] = NGRAM_SIZES):
+        self.dim = dim
+        self.sizes = tuple(sizes)
+        self.name = f"ngram-{self.dim}-{'-'.join(map(str, self.sizes))}"
+        self._columns: Dict[str, tuple] = {}
+
+    def _column(self, gram: str) -> tuple:
+        column = self._columns.get(gram)
+        if column is None:
+            code = zlib.crc32(gram.encode())
+            column = self._columns[gram] = (code % self.dim, 1.0 if code & 0x80000000 else -1.0)
+        return column
+
+    def encode_raw(self, texts: List[str]) -> np.ndarray:
+        """Unnormalized +-1 rows"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            padded = f" {normalize_name(text)} "
+            grams = {
+                padded[start:start + size]
+                for size in self.sizes
+                for start in range(len(padded) - size + 1)
+            }
+            for gram in grams:
+                column, sign = self._column(gram)
+                vectors[i, column] += sign
+        return vectors
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self.encode_raw(texts)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class SentenceEmbedder:
+    """
+    A sentence-transformers model already in the local cache (no
+    download is attempted). Optional: needs sentence-transformers.
+    """
+
+    containment = False
+
+    def __init__(self, model: str = DEFAULT_SENTENCE_MODEL):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as exc:
+            raise ImportError("sentence-transformers is required for the sentence embedder") from exc
+
+        self.model = SentenceTransformer(model, device="cpu", local_files_only=True)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"sentence:{model}"
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+    encode_raw = encode
+
+
+def make_name_embedder(name: Optional[str] = None):
+    """Embedder recorded as `name` in an embeddings meta file (n-grams by default)"""
+    if not name:
+        return NgramEmbedder()
+    if name.startswith("ngram-"):
+        dim, *sizes = name.split("-")[1:]
+        return NgramEmbedder(int(dim), [int(size) for size in sizes])
+    if name.startswith("sentence:"):
+        return SentenceEmbedder(name.split(":", 1)[1])
+    raise ValueError(f"Unknown name embedder: {name}")
+
+
+# =========================
+# EMBEDDING MATRIX
+# =========================
+class NameEmbeddings:
+    """
+    Unit-length name vectors (float16) with their norms before
+    normalization, and an ID map: row i belongs to food `ids[i]`, whose
+    dish_name hashed to `name_hashes[i]` when it was embedded.
+
+    `embedder` is an embedder or the name recorded in meta.json; a name
+    is turned into its embedder on first use, so loading a matrix only
+    to replace it never loads the model that produced it.
+    """
+
+    def __init__(self, embedder, vectors, norms, ids, name_hashes):
+        self._embedder = embedder
+        self.vectors = vectors
+        self.norms = norms
+        self.ids = ids
+        self.name_hashes = name_hashes
+
+    @property
+    def embedder(self):
+        if isinstance(self._embedder, str):
+            self._embedder = make_name_embedder(self._embedder)
+        return self._embedder
+
+    @property
+    def embedder_name(self) -> str:
+        """Embedder that produced `vectors`"""
+        return self._embedder if isinstance(self._embedder, str) else self._embedder.name
+
+    @classmethod
+    def build(cls, catalog: FoodCatalog, embedder=None, previous: "NameEmbeddings" = None,
+              chunk_size: int = EMBED_CHUNK_SIZE, progress=None):
+        """
+        Embeddings for every catalog row, in catalog order. Rows of
+        `previous` are reused when the dish's name hash is unchanged and
+        it was built by the same embedder (name and dimension); otherwise
+        everything is re-embedded, `chunk_size` names at a time.
+        """
+        embedder = embedder or (previous.embedder if previous is not None else NgramEmbedder())
+        hashes = np.array([name_hash(name) for name in catalog.dish_names], dtype="S8")
+        vectors = np.zeros((catalog.size, embedder.dim), dtype=np.float16)
+        norms = np.ones(catalog.size, dtype=np.float32)
+
+        stale = np.ones(catalog.size, dtype=bool)
+        reusable = (
+            previous is not None
+            and len(previous.ids)
+            and previous.embedder_name == embedder.name
+            and previous.vectors.shape[1] == embedder.dim
+        )
+        if reusable:
+            found = np.minimum(np.searchsorted(previous.ids, catalog.ids), len(previous.ids) - 1)
+            same = (previous.ids[found] == catalog.ids) & (previous.name_hashes[found] == hashes)
+            vectors[same] = previous.vectors[found[same]]
+            norms[same] = previous.norms[found[same]]
+            stale = ~same
+
+        todo = np.flatnonzero(stale)
+        for start in range(0, len(todo), chunk_size):
+            rows = todo[start:start + chunk_size]
+            raw = embedder.encode_raw([catalog.dish_names[r] for r in rows.tolist()])
+            lengths = np.linalg.norm(raw, axis=1)
+            lengths[lengths == 0] = 1.0
+            vectors[rows] = raw / lengths[:, None]
+            norms[rows] = lengths
+            if progress is not None:
+                progress(start + len(rows), len(todo))
+
+        embeddings = cls(embedder, vectors, norms, catalog.ids.copy(), hashes)
+        embeddings.embedded = len(todo)
+        return embeddings
+
+    def save(self, directory: Path = NAME_EMBEDDINGS_DIR) -> Path:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in NAME_FILES:
+            tmp = directory / f"{name}.tmp.npy"
+            np.save(tmp, getattr(self, name))
+            tmp.replace(directory / f"{name}.npy")
+        meta = {"embedder": self.embedder_name, "dim": self.vectors.shape[1], "count": len(self.ids)}
+        (directory / "meta.json").write_text(json.dumps(meta, indent=2))
+        return directory
+
+    @classmethod
+    def load(cls, directory: Path = NAME_EMBEDDINGS_DIR, mmap: bool = True, embedder=None):
+        """
+        Stored embeddings (memory-mapped), or None if there are none.
+        They keep the embedder recorded in meta.json; `embedder` is used
+        only if it is that same embedder (saves re-creating a model).
+        """
+        directory = Path(directory)
+        if not (directory / "meta.json").exists():
+            return None
+        meta = json.loads((directory / "meta.json").read_text())
+        mode = "r" if mmap else None
+        arrays = [np.load(directory / f"{name}.npy", mmap_mode=mode) for name in NAME_FILES]
+        if len(arrays[2]) != meta["count"] or arrays[0].shape[1] != meta["dim"]:
+            return None           # written by a concurrent build: rebuild
+        if embedder is None or embedder.name != meta["embedder"]:
+            embedder = meta["embedder"]
+        return cls(embedder, *arrays)
+
+    def matches(self, catalog: FoodCatalog) -> bool:
+        """True when row i is food catalog.ids[i] with its current name"""
+        return (
+            len(self.ids) == catalog.size
+            and np.array_equal(self.ids, catalog.ids)
+            and np.array_equal(
+                self.name_hashes,
+                np.array([name_hash(name) for name in catalog.dish_names], dtype="S8")
+            )
+        )
+
+
+# =========================
+# SEMANTIC NAME MATCHING
+# =========================
+class NameMatcher:
+    """
+    avoid/prefer-style matching against the embedding matrix: one
+    matrix-vector product per new term, cached as a row mask, so a
+    request only ORs masks it has seen before.
+    """
+
+    def __init__(self, catalog: FoodCatalog, embeddings: NameEmbeddings,
+                 containment: float = CONTAINMENT_THRESHOLD, similarity: float = SIMILARITY_THRESHOLD):
+        self.catalog = catalog
+        self.catalog_mtime = catalog.mtime
+        self.embeddings = embeddings
+        self.containment = containment
+        self.similarity = similarity
+        self._matrix = None
+        self._masks: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """float32 copy of the vectors for BLAS products (made once)"""
+        if self._matrix is None:
+            self._matrix = np.asarray(self.embeddings.vectors, dtype=np.float32)
+        return self._matrix
+
+    def matches_catalog(self, catalog: FoodCatalog) -> bool:
+        return catalog is self.catalog and catalog.mtime == self.catalog_mtime
+
+    def scores(self, text: str) -> np.ndarray:
+        """Cosine similarity of `text` to every dish name"""
+        query = self.embeddings.embedder.encode([text])[0]
+        return self.matrix @ query
+
+    def term_mask(self, term: str) -> np.ndarray:
+        key = term.lower()
+        mask = self._masks.get(key)
+        if mask is None:
+            embedder = self.embeddings.embedder
+            raw = embedder.encode_raw([key])[0]
+            length = float(np.linalg.norm(raw)) or 1.0
+            cosine = self.matrix @ (raw / length)
+            mask = cosine >= self.similarity
+            if embedder.containment:
+                # Shared n-grams / the term's n-grams
+                mask |= cosine * self.embeddings.norms >= self.containment * length
+            with self._lock:
+                if len(self._masks) >= MATCH_CACHE_SIZE:
+                    self._masks.clear()
+                self._masks[key] = mask
+        return mask
+
+    def mask(self, terms: Sequence[str]) -> np.ndarray:
+        """Catalog rows matching any of `terms`"""
+        mask = np.zeros(self.catalog.size, dtype=bool)
+        for term in terms:
+            mask |= self.term_mask(term)
+        return mask
+
+    def rows(self, ids: Sequence[int]) -> np.ndarray:
+        return np.searchsorted(self.catalog.ids, np.asarray(ids, dtype=np.int64))
+
+
+_matcher: Optional[NameMatcher] = None
+_matcher_lock = threading.Lock()
+
+
+def get_name_matcher(catalog: Optional[FoodCatalog] = None,
+                     directory: Path = NAME_EMBEDDINGS_DIR) -> NameMatcher:
+    """
+    Matcher for `catalog` (the process-wide one by default) over the
+    stored embeddings. Rows whose names changed since the last build
+    are re-embedded and the file is updated.
+    """
+    global _matcher
+    catalog = catalog if catalog is not None else get_food_catalog()
+
+    matcher = _matcher
+    if matcher is not None and matcher.matches_catalog(catalog):
+        return matcher
+
+    with _matcher_lock:
+        if _matcher is not None and _matcher.matches_catalog(catalog):
+            return _matcher
+
+        embeddings = NameEmbeddings.load(directory)
+        if embeddings is None or not embeddings.matches(catalog):
+            embeddings = NameEmbeddings.build(catalog, previous=embeddings)
+            try:
+                embeddings.save(directory)
+            except OSError:
+                pass              # read-only deployment: keep it in memory
+        _matcher = NameMatcher(catalog, embeddings)
+        return _matcher
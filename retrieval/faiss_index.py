@@ -0,0 +1,346 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from database.db_connection import BASE_DIR
+
+try:
+    import faiss
+except ImportError:            # optional: NumPy IVF/flat index otherwise
+    faiss = None
+
+# =========================
+# DEFAULTS
+# =========================
+INDEX_DIR = BASE_DIR / "data" / "processed" / "dish_index"
+
+META_FILE = "meta.json"
+FAISS_FILE = "faiss.index"
+IVF_FILES = ("centroids", "vectors", "norms", "labels", "offsets")
+
+FLAT_MAX_SIZE = 4096           # below this an exact flat scan is cheapest
+IVF_ITERATIONS = 12            # k-means rounds when training coarse lists
+PROBE_FRACTION = 16            # nprobe = nlist / PROBE_FRACTION by default
+
+# An index directory holds meta.json plus either faiss.index or the
+# NumPy IVF arrays (*.npy, memory-mapped on load). Both search rows
+# 0..n-1 of the matrix they were built from by squared L2 distance.
+
+
+def default_nlist(size: int) -> int:
+    if size <= FLAT_MAX_SIZE:
+        return 1
+    return int(np.sqrt(size))
+
+
+def _top_k(distances: np.ndarray, labels: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """k smallest distances (ascending, ties by label) and their labels"""
+    if len(distances) > k:
+        keep = np.argpartition(distances, k - 1)[:k]
+        distances, labels = distances[keep], labels[keep]
+    order = np.lexsort((labels, distances))
+    return distances[order], labels[order]
+
+
+def _pad(distances, labels, k):
+    out_d = np.full(k, np.inf, dtype=np.float32)
+    out_l = np.full(k, -1, dtype=np.int64)
+    out_d[:len(distances)], out_l[:len(labels)] = distances, labels
+    return out_d, out_l
+
+
+# =========================
+# NUMPY IVF / FLAT
+# =========================
+class IVFIndex:
+    """
+    Inverted-file index in plain NumPy.
+
+    Vectors are grouped by their nearest k-means centroid and stored
+    contiguously per list; a query scans the `nprobe` lists closest to
+    it. With nlist == 1 this is an exact flat scan. `allowed` (a mask
+    over rows) is applied inside the scan, and more lists are probed
+    until k allowed rows are found.
+    """
+
+    backend = "numpy"
+
+    def __init__(self, centroids, vectors, norms, labels, offsets, nprobe=None):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.norms = norms
+        self.labels = labels
+        self.offsets = offsets
+        self.nlist = len(centroids)
+        self.size = len(vectors)
+        self.dim = vectors.shape[1]
+        self.nprobe = nprobe or max(1, self.nlist // PROBE_FRACTION)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, nlist: int = None, nprobe: int = None, seed: int = 0):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        nlist = min(nlist or default_nlist(len(vectors)), len(vectors)) or 1
+        centroids = cls._kmeans(vectors, nlist, seed)
+
+        assignment = cls._nearest(vectors, centroids)
+        labels = np.argsort(assignment, kind="stable")
+        offsets = np.searchsorted(assignment[labels], np.arange(nlist + 1))
+        grouped = vectors[labels]
+        return cls(
+            centroids, grouped, np.einsum("ij,ij->i", grouped, grouped),
+            labels.astype(np.int64), offsets.astype(np.int64), nprobe
+        )
+
+    @staticmethod
+    def _nearest(vectors, centroids, chunk=65536):
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+        for start in range(0, len(vectors), chunk):
+            block = vectors[start:start + chunk]
+            assignment[start:start + chunk] = np.argmin(centroid_norms - 2 * block @ centroids.T, axis=1)
+        return assignment
+
+    @classmethod
+    def _kmeans(cls, vectors, nlist, seed):
+        rng = np.random.default_rng(seed)
+        if nlist == 1:
+            return vectors.mean(axis=0, keepdims=True)
+
+        # Lloyd iterations on a sample (as FAISS does: at most 256 points per list)
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), nlist * 256), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(IVF_ITERATIONS):
+            assignment = cls._nearest(sample, centroids)
+            counts = np.bincount(assignment, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # Re-seed empty lists from random sample points
+            empty = np.flatnonzero(~filled)
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        return centroids
+
+    # ---------- SEARCH ----------
+    def search(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray] = None,
+               nprobe: int = None):
+        """(distances, rows), each Q x k; missing results are inf / -1"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        if self.nlist == 1:
+            return self._search_flat(queries, k, allowed)
+
+        centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        list_order = np.argsort(centroid_norms - 2 * queries @ self.centroids.T, axis=1)
+
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        rows = np.empty((len(queries), k), dtype=np.int64)
+        for i, query in enumerate(queries):
+            distances[i], rows[i] = self._search_one(query, list_order[i], k, allowed, nprobe)
+        return distances, rows
+
+    def _search_flat(self, queries, k, allowed):
+        """One matrix product for the whole batch (single list, exact)"""
+        distances = self.norms[None, :] - 2 * (queries @ self.vectors.T)
+        distances += np.einsum("ij,ij->i", queries, queries)[:, None]
+        labels = self.labels
+        if allowed is not None:
+            keep = allowed[labels]
+            distances, labels = distances[:, keep], labels[keep]
+
+        count = min(k, len(labels))
+        out_d = np.full((len(queries), k), np.inf, dtype=np.float32)
+        out_l = np.full((len(queries), k), -1, dtype=np.int64)
+        if count:
+            nearest = np.argpartition(distances, count - 1, axis=1)[:, :count] \
+                if len(labels) > count else np.tile(np.arange(len(labels)), (len(queries), 1))
+            near_d = np.take_along_axis(distances, nearest, axis=1)
+            near_l = labels[nearest]
+            order = np.lexsort((near_l, near_d), axis=1)
+            out_d[:, :count] = np.maximum(np.take_along_axis(near_d, order, axis=1), 0)
+            out_l[:, :count] = np.take_along_axis(near_l, order, axis=1)
+        return out_d, out_l
+
+    def _search_one(self, query, list_order, k, allowed, nprobe):
+        query_norm = float(query @ query)
+        found_d, found_l = [], []
+        found, probed = 0, 0
+
+        while probed < self.nlist:
+            lists = list_order[probed:probed + nprobe]
+            probed += len(lists)
+            for lst in lists.tolist():
+                start, end = self.offsets[lst], self.offsets[lst + 1]
+                if start == end:
+                    continue
+                labels = self.labels[start:end]
+                block = self.vectors[start:end]
+                dist = self.norms[start:end] - 2 * (block @ query) + query_norm
+                if allowed is not None:
+                    keep = allowed[labels]
+                    labels, dist = labels[keep], dist[keep]
+                found_d.append(dist)
+                found_l.append(labels)
+                found += len(labels)
+            # Filters may empty the probed lists: widen until k survive
+            if found >= k:
+                break
+
+        if not found:
+            return _pad([], [], k)
+        distances, labels = _top_k(np.concatenate(found_d), np.concatenate(found_l), k)
+        return _pad(np.maximum(distances, 0), labels, k)
+
+    # ---------- PERSISTENCE ----------
+    def save(self, directory: Path) -> dict:
+        for name in IVF_FILES:
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        return {"nlist": self.nlist, "nprobe": self.nprobe}
+
+    @classmethod
+    def load(cls, directory: Path, meta: dict, mmap: bool = True):
+        mode = "r" if mmap else None
+        arrays = [np.load(directory / f"{name}.npy", mmap_mode=mode) for name in IVF_FILES]
+        return cls(*arrays, nprobe=meta["nprobe"])
+
+
+# =========================
+# FAISS
+# =========================
+class FaissIndex:
+    """The same interface over a FAISS IndexFlatL2 / IndexIVFFlat"""
+
+    backend = "faiss"
+
+    def __init__(self, index):
+        self.index = index
+        self.size = index.ntotal
+        self.dim = index.d
+        self.nlist = getattr(index, "nlist", 1)
+
+    @property
+    def nprobe(self):
+        return getattr(self.index, "nprobe", 1)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, nlist: int = None, nprobe: int = None, seed: int = 0):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        nlist = min(nlist or default_nlist(len(vectors)), len(vectors)) or 1
+        dim = vectors.shape[1]
+        if nlist == 1:
+            index = faiss.IndexFlatL2(dim)
+        else:
+            index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, nlist)
+            index.cp.seed = seed
+            index.train(vectors)
+            index.nprobe = nprobe or max(1, nlist // PROBE_FRACTION)
+        index.add(vectors)
+        return cls(index)
+
+    def search(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray] = None,
+               nprobe: int = None):
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype=np.float32)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+
+        selector = None
+        if allowed is not None:
+            # Filtered inside the scan; the bitmap must outlive the search
+            bitmap = np.packbits(allowed, bitorder="little")
+            selector = faiss.IDSelectorBitmap(len(allowed), faiss.swig_ptr(bitmap))
+
+        distances, rows = self.index.search(queries, k, params=self._params(nprobe, selector))
+
+        # Filters may empty the probed lists: widen until k survive
+        wanted = min(k, self.size if allowed is None else int(np.count_nonzero(allowed)))
+        short = np.flatnonzero((rows >= 0).sum(axis=1) < wanted)
+        while len(short) and nprobe < self.nlist:
+            nprobe = min(2 * nprobe, self.nlist)
+            distances[short], rows[short] = self.index.search(
+                queries[short], k, params=self._params(nprobe, selector)
+            )
+            short = short[(rows[short] >= 0).sum(axis=1) < wanted]
+        return distances, rows
+
+    def _params(self, nprobe, selector):
+        if self.nlist > 1:
+            params = faiss.SearchParametersIVF()
+            params.nprobe = nprobe
+        elif selector is not None:
+            params = faiss.SearchParameters()
+        else:
+            return None
+        if selector is not None:
+            params.sel = selector
+        return params
+
+    def save(self, directory: Path) -> dict:
+        faiss.write_index(self.index, str(directory / FAISS_FILE))
+        return {"nlist": self.nlist, "nprobe": self.nprobe}
+
+    @classmethod
+    def load(cls, directory: Path, meta: dict, mmap: bool = True):
+        path = str(directory / FAISS_FILE)
+        try:
+            index = faiss.read_index(path, faiss.IO_FLAG_MMAP if mmap else 0)
+        except RuntimeError:   # index types without mmap support
+            index = faiss.read_index(path)
+        if meta["nlist"] > 1:
+            index.nprobe = meta["nprobe"]
+        return cls(index)
+
+
+BACKENDS = {"numpy": IVFIndex, "faiss": FaissIndex}
+
+
+# =========================
+# BUILD / SAVE / LOAD
+# =========================
+def build_index(vectors: np.ndarray, backend: str = "auto", nlist: int = None,
+                nprobe: int = None, seed: int = 0):
+    """FAISS when installed (backend="auto"), otherwise the NumPy index"""
+    if backend == "auto":
+        backend = "faiss" if faiss is not None else "numpy"
+    if backend == "faiss" and faiss is None:
+        raise ImportError("faiss is not installed")
+    return BACKENDS[backend].train(vectors, nlist=nlist, nprobe=nprobe, seed=seed)
+
+
+def save_index(index, directory: Path = INDEX_DIR, extra: dict = None) -> Path:
+    """Write `index` (and `extra` metadata) to `directory`, swapped in whole"""
+    directory = Path(directory)
+    tmp = directory.with_name(f"{directory.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    meta = {"backend": index.backend, "size": index.size, "dim": index.dim, **index.save(tmp)}
+    meta["extra"] = extra or {}
+    (tmp / META_FILE).write_text(json.dumps(meta, indent=2))
+
+    old = directory.with_name(f"{directory.name}.old-{os.getpid()}")
+    if directory.exists():
+        directory.rename(old)
+    tmp.rename(directory)
+    shutil.rmtree(old, ignore_errors=True)
+    return directory
+
+
+def read_meta(directory: Path = INDEX_DIR) -> Optional[dict]:
+    path = Path(directory) / META_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def load_index(directory: Path = INDEX_DIR, mmap: bool = True):
+    """Index stored in `directory`, memory-mapped by default"""
+    directory = Path(directory)
+    meta = read_meta(directory)
+    if meta is None:
+        raise FileNotFoundError(f"No index in {directory}")
+    if meta["backend"] == "faiss" and faiss is None:
+        raise ImportError("This index was built with faiss, which is not installed")
+    return BACKENDS[meta["backend"]].load(directory, meta, mmap=mmap)
@@ -0,0 +1,222 @@
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from agents.nutrition_agent import FoodCatalog, get_food_catalog
+from retrieval.embedder import NutrientEmbedder, get_name_matcher
+from retrieval.faiss_index import INDEX_DIR, build_index, load_index, read_meta, save_index
+
+
+def catalog_signature(catalog: FoodCatalog, embedder: NutrientEmbedder) -> str:
+    """Identifies the dish rows and nutrient values an index was built from"""
+    digest = hashlib.sha1(catalog.ids.tobytes())
+    for column in embedder.columns:
+        digest.update(catalog.raw[column].tobytes())
+    return digest.hexdigest()
+
+
+# =========================
+# RETRIEVER
+# =========================
+class DishRetriever:
+    """
+    Nearest dishes by nutrient profile, with hard filters.
+
+    Vectors come from NutrientEmbedder (per-100g composition); filters
+    use per-serving values, as the planner reports them. Filters are a
+    row mask handed to the index, so they never force a full scan.
+    """
+
+    def __init__(self, catalog: FoodCatalog, index, embedder: NutrientEmbedder):
+        self.catalog = catalog
+        self.catalog_mtime = catalog.mtime
+        self.index = index
+        self.embedder = embedder
+        self._names = None
+        self._vectors = None
+
+    # ---------- BUILD / LOAD ----------
+    @classmethod
+    def build(cls, catalog: FoodCatalog, backend: str = "auto", nlist: int = None):
+        embedder = NutrientEmbedder.fit(catalog)
+        index = build_index(embedder.embed_catalog(catalog), backend=backend, nlist=nlist)
+        return cls(catalog, index, embedder)
+
+    def save(self, directory: Path = INDEX_DIR) -> Path:
+        return save_index(self.index, directory, extra={
+            "signature": catalog_signature(self.catalog, self.embedder),
+            "embedder": self.embedder.to_meta()
+        })
+
+    @classmethod
+    def load(cls, catalog: FoodCatalog, directory: Path = INDEX_DIR, mmap: bool = True):
+        """Retriever stored in `directory`, or None if it was built from other data"""
+        meta = read_meta(directory)
+        if meta is None:
+            return None
+        embedder = NutrientEmbedder.from_meta(meta["extra"]["embedder"])
+        if meta["extra"]["signature"] != catalog_signature(catalog, embedder):
+            return None
+        return cls(catalog, load_index(directory, mmap=mmap), embedder)
+
+    def matches(self, catalog: FoodCatalog) -> bool:
+        return catalog is self.catalog and catalog.mtime == self.catalog_mtime
+
+    # ---------- QUERIES ----------
+    def similar(
+        self,
+        dish: Union[int, str],
+        k: int = 10,
+        max_calories: Optional[float] = None,
+        max_sugar: Optional[float] = None,
+        exclude: Sequence[str] = (),
+        lower: Sequence[str] = ()
+    ) -> List[Dict]:
+        """
+        Dishes closest to `dish` (a food id or dish name), e.g. "like X
+        but lower sodium" is similar(x, lower=["sodium"]). The dish itself
+        is never returned; `lower` keeps dishes strictly below it in the
+        given per-serving nutrients.
+        """
+        row = self.row_of(dish)
+        if row is None:
+            raise KeyError(f"Unknown dish: {dish!r}")
+
+        allowed = self.filter_mask(max_calories, max_sugar, exclude)
+        allowed[row] = False
+        for column in lower:
+            allowed &= self.catalog.serving[column] < self.catalog.serving[column][row]
+
+        return self._results(self.vectors[row], k, allowed)
+
+    def search(
+        self,
+        nutrients: Dict,
+        k: int = 10,
+        max_calories: Optional[float] = None,
+        max_sugar: Optional[float] = None,
+        exclude: Sequence[str] = ()
+    ) -> List[Dict]:
+        """Dishes closest to a per-100g nutrient profile"""
+        query = self.embedder.embed_nutrients(nutrients)[0]
+        return self._results(query, k, self.filter_mask(max_calories, max_sugar, exclude))
+
+    def by_name(
+        self,
+        text: str,
+        k: int = 10,
+        max_calories: Optional[float] = None,
+        max_sugar: Optional[float] = None,
+        exclude: Sequence[str] = ()
+    ) -> List[Dict]:
+        """
+        Dishes whose names are closest to `text`, from the name embedding
+        matrix (see scripts/build_embeddings.py); "distance" is 1 - cosine.
+        """
+        matcher = get_name_matcher(self.catalog)
+        scores = matcher.scores(text)
+        if exclude:
+            # Excluded names use the same semantic matching as avoid_foods
+            scores[matcher.mask(exclude)] = -np.inf
+        scores[~self.filter_mask(max_calories, max_sugar)] = -np.inf
+
+        count = min(k, int(np.count_nonzero(scores > -np.inf)))
+        if not count:
+            return []
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.lexsort((top, -scores[top]))]
+        results = []
+        for row in top.tolist():
+            food = self.catalog.serving_dict(row)
+            food["distance"] = round(1.0 - float(scores[row]), 4)
+            results.append(food)
+        return results
+
+    def filter_mask(
+        self,
+        max_calories: Optional[float] = None,
+        max_sugar: Optional[float] = None,
+        exclude: Sequence[str] = ()
+    ) -> np.ndarray:
+        """Rows passing the hard filters (per serving; names by substring, like avoid_foods)"""
+        catalog = self.catalog
+        allowed = np.ones(catalog.size, dtype=bool)
+        if max_calories is not None:
+            allowed &= catalog.serving["calories"] <= max_calories
+        if max_sugar is not None:
+            # "not above", so a missing sugar value passes as in sugar_mask
+            allowed &= ~(catalog.serving["free_sugar"] > max_sugar)
+        if exclude:
+            allowed &= ~catalog.term_mask(exclude)
+        return allowed
+
+    def _results(self, query: np.ndarray, k: int, allowed: np.ndarray) -> List[Dict]:
+        distances, rows = self.index.search(query[None], k, allowed=allowed)
+        results = []
+        for distance, row in zip(distances[0].tolist(), rows[0].tolist()):
+            if row < 0:
+                break
+            food = self.catalog.serving_dict(row)
+            food["distance"] = round(float(np.sqrt(max(distance, 0.0))), 4)
+            results.append(food)
+        return results
+
+    # ---------- LOOKUPS ----------
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._vectors is None:
+            self._vectors = self.embedder.embed_catalog(self.catalog)
+        return self._vectors
+
+    @property
+    def names(self) -> np.ndarray:
+        if self._names is None:
+            self._names = np.array([n.lower() for n in self.catalog.dish_names], dtype=str)
+        return self._names
+
+    def row_of(self, dish: Union[int, str]) -> Optional[int]:
+        catalog = self.catalog
+        if isinstance(dish, (int, np.integer)):
+            row = int(np.searchsorted(catalog.ids, dish))
+            return row if row < catalog.size and catalog.ids[row] == dish else None
+
+        matches = np.flatnonzero(self.names == dish.lower())
+        return int(matches[0]) if len(matches) else None
+
+
+# =========================
+# PROCESS-WIDE RETRIEVER
+# =========================
+_retriever: Optional[DishRetriever] = None
+_retriever_lock = threading.Lock()
+
+
+def get_dish_retriever(catalog: Optional[FoodCatalog] = None, directory: Path = INDEX_DIR) -> DishRetriever:
+    """
+    Retriever for `catalog` (the process-wide one by default): the index
+    in `directory` when it was built from the same rows, otherwise a new
+    one, built and written there.
+    """
+    global _retriever
+    catalog = catalog if catalog is not None else get_food_catalog()
+
+    retriever = _retriever
+    if retriever is not None and retriever.matches(catalog):
+        return retriever
+
+    with _retriever_lock:
+        if _retriever is not None and _retriever.matches(catalog):
+            return _retriever
+
+        retriever = DishRetriever.load(catalog, directory)
+        if retriever is None:
+            retriever = DishRetriever.build(catalog)
+            try:
+                retriever.save(directory)
+            except OSError:
+                pass              # read-only deployment: keep it in memory
+        _retriever = retriever
+        return retriever
@@ -0,0 +1,191 @@
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import torch
+
+from database.db_connection import BASE_DIR
+from rl.memory_buffer import ReplayBuffer
+
+try:
+    from safetensors.torch import load_file as _load_tensors, save_file as _save_tensors
+except ImportError:            # optional: plain torch.save files otherwise
+    _load_tensors = _save_tensors = None
+
+# =========================
+# DEFAULTS
+# =========================
+CHECKPOINT_DIR = BASE_DIR / "data" / "processed" / "checkpoints"
+PRETRAINED_CHECKPOINT = CHECKPOINT_DIR / "dqn_pretrained"
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+OPTIMIZER_FILE = "optimizer.pt"
+TENSOR_FILES = {"safetensors": "weights.safetensors", "torch": "weights.pt"}
+
+# A checkpoint is a directory:
+#   meta.json                  epsilon, counters, replay layout, extra
+#   weights.safetensors|.pt    model.* and target_model.* tensors
+#   optimizer.pt               Adam state
+#   replay.npy                 capacity x (2 * state_size + 3) float32 rows
+#   replay_priorities.npy      sum tree (prioritized replay only)
+
+
+# =========================
+# SAVE
+# =========================
+def save_checkpoint(agent, path, replay=True, extra=None):
+    """
+    Write `agent` to the directory `path`. The directory is built next
+    to its final location and swapped in, so readers never see half a
+    checkpoint.
+    """
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    tensors = {}
+    for prefix, model in (("model", agent.model), ("target_model", agent.target_model)):
+        for name, tensor in model.state_dict().items():
+            tensors[f"{prefix}.{name}"] = tensor.detach().cpu().contiguous()
+
+    if _save_tensors is not None:
+        tensor_format = "safetensors"
+        _save_tensors(tensors, str(tmp / TENSOR_FILES[tensor_format]))
+    else:
+        tensor_format = "torch"
+        torch.save(tensors, tmp / TENSOR_FILES[tensor_format])
+    torch.save(agent.optimizer.state_dict(), tmp / OPTIMIZER_FILE)
+
+    meta = {
+        "format": FORMAT_VERSION,
+        "tensors": tensor_format,
+        "state_size": agent.state_size,
+        "action_size": agent.action_size,
+        "epsilon": agent.epsilon,
+        "update_target_counter": agent.update_target_counter,
+        "replay": agent.memory.save(tmp) if replay else None,
+        "extra": extra or {}
+    }
+    (tmp / META_FILE).write_text(json.dumps(meta, indent=2))
+
+    old = path.with_name(f"{path.name}.old-{os.getpid()}")
+    if path.exists():
+        path.rename(old)
+    tmp.rename(path)
+    shutil.rmtree(old, ignore_errors=True)
+    return path
+
+
+# =========================
+# LOAD
+# =========================
+def read_meta(path):
+    meta = json.loads((Path(path) / META_FILE).read_text())
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint format: {meta.get('format')}")
+    return meta
+
+
+def _read_tensors(path, meta):
+    file = Path(path) / TENSOR_FILES[meta["tensors"]]
+    if meta["tensors"] == "safetensors":
+        if _load_tensors is None:
+            raise ImportError("safetensors is required to read this checkpoint")
+        return _load_tensors(str(file))
+    return torch.load(file, map_location="cpu", weights_only=True)
+
+
+def _split(tensors):
+    """Flat {prefix.name: tensor} -> (model state, target state)"""
+    states = {"model": {}, "target_model": {}}
+    for key, tensor in tensors.items():
+        prefix, name = key.split(".", 1)
+        states[prefix][name] = tensor
+    return states["model"], states["target_model"]
+
+
+def _check_shape(agent, meta):
+    if (meta["state_size"], meta["action_size"]) != (agent.state_size, agent.action_size):
+        raise ValueError(
+            f"Checkpoint is for state/action size {meta['state_size']}/{meta['action_size']}, "
+            f"agent has {agent.state_size}/{agent.action_size}"
+        )
+
+
+def _restore_common(agent, path, meta, replay, mmap):
+    agent.epsilon = meta["epsilon"]
+    agent.update_target_counter = meta["update_target_counter"]
+    if replay and meta["replay"] is not None:
+        agent.memory = ReplayBuffer.load(path, meta["replay"], device=agent.device, mmap=mmap)
+
+
+def load_checkpoint(agent, path, replay=True, mmap=True):
+    """Load into `agent` with private copies of the weights; returns meta"""
+    meta = read_meta(path)
+    _check_shape(agent, meta)
+
+    model_state, target_state = _split(_read_tensors(path, meta))
+    agent.model.load_state_dict(model_state)
+    agent.target_model.load_state_dict(target_state)
+    load_optimizer(agent, path)
+    _restore_common(agent, path, meta, replay, mmap)
+    return meta
+
+
+def load_optimizer(agent, path):
+    state = torch.load(Path(path) / OPTIMIZER_FILE, map_location=agent.device, weights_only=True)
+    agent.optimizer.load_state_dict(state)
+
+
+# =========================
+# SHARED PRETRAINED WEIGHTS
+# =========================
+class PretrainedCheckpoint:
+    """
+    Weights of one checkpoint, read from disk once per process.
+
+    attach() points an agent's parameters at these tensors without
+    copying; the agent clones them (and loads its own optimizer state)
+    before its first update, so the shared tensors are never written.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.meta = read_meta(self.path)
+        model_state, target_state = _split(_read_tensors(self.path, self.meta))
+        self.model_state = {name: t.requires_grad_(False) for name, t in model_state.items()}
+        self.target_state = {name: t.requires_grad_(False) for name, t in target_state.items()}
+
+    def attach(self, agent, replay=True):
+        _check_shape(agent, self.meta)
+        for model, state in ((agent.model, self.model_state), (agent.target_model, self.target_state)):
+            for name, tensor in model.state_dict(keep_vars=True).items():
+                tensor.data = state[name].to(agent.device)
+        agent._shared_checkpoint = self.path
+        # Replay rows are mapped copy-on-write, so sessions share pages too
+        _restore_common(agent, self.path, self.meta, replay, mmap=True)
+        return agent
+
+
+_pretrained = {}
+_pretrained_lock = threading.Lock()
+
+
+def get_pretrained(path=PRETRAINED_CHECKPOINT):
+    """Process-wide PretrainedCheckpoint for `path` (None if it does not exist)"""
+    path = Path(path).resolve()
+    with _pretrained_lock:
+        if path not in _pretrained:
+            if not (path / META_FILE).exists():
+                return None
+            _pretrained[path] = PretrainedCheckpoint(path)
+        return _pretrained[path]
+
+
+def clear_pretrained():
+    with _pretrained_lock:
+        _pretrained.clear()
@@ -0,0 +1,271 @@
+import random
+from pathlib import Path
+
+import numpy as np
+import torch
+
+REPLAY_FILE = "replay.npy"
+PRIORITIES_FILE = "replay_priorities.npy"
+
+
+# =========================
+# SUM TREE
+# =========================
+class SumTree:
+    """
+    Binary sum-tree over `capacity` leaf priorities, stored as a flat
+    array (node i has children 2i+1 and 2i+2). Batched updates and
+    prefix-sum lookups walk all requested leaves one level at a time.
+    """
+
+    def __init__(self, capacity):
+        # Leaves padded to a power of two so every level is complete
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self.capacity = capacity
+        self.tree = np.zeros(2 * self.leaves - 1, dtype=np.float64)
+
+    @property
+    def total(self):
+        return float(self.tree[0])
+
+    def update(self, indices, priorities):
+        nodes = np.asarray(indices, dtype=np.int64) + self.leaves - 1
+        self.tree[nodes] = priorities
+
+        # Repeated parents just get the same sum written twice
+        while nodes[0] > 0:
+            nodes = (nodes - 1) // 2
+            self.tree[nodes] = self.tree[2 * nodes + 1] + self.tree[2 * nodes + 2]
+
+    def find(self, values):
+        """Leaf index whose prefix-sum interval contains each value"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.zeros(len(values), dtype=np.int64)
+
+        while True:
+            left = 2 * nodes + 1
+            if left[0] >= len(self.tree):
+                break
+            left_sum = self.tree[left]
+            go_right = values > left_sum
+            values -= np.where(go_right, left_sum, 0.0)
+            nodes = np.where(go_right, left + 1, left)
+
+        # Float round-off can land on an empty padding leaf
+        return np.minimum(nodes - (self.leaves - 1), self.capacity - 1)
+
+    def priorities(self, indices):
+        return self.tree[np.asarray(indices, dtype=np.int64) + self.leaves - 1]
+
+
+# =========================
+# REPLAY BUFFER
+# =========================
+class ReplayBuffer:
+    """
+    Preallocated experience replay.
+
+    Each transition is one row of a preallocated capacity x
+    (2 * state_size + 3) tensor on the agent's device:
+    [state | next_state | action | reward | done]. push() writes a row at
+    a circular index and sample() gathers a minibatch with a single
+    index_select, returning views into it. With
+    `prioritized=True`, indices are drawn proportionally to
+    (|td_error| + eps) ** alpha from a SumTree, and importance weights
+    correct for the bias (beta annealed towards 1).
+    """
+
+    def __init__(
+        self,
+        capacity,
+        state_size,
+        device=None,
+        prioritized=False,
+        alpha=0.6,
+        beta=0.4,
+        beta_increment=0.001,
+        eps=1e-5,
+        seed=None,
+        data=None
+    ):
+        self.capacity = capacity
+        self.state_size = state_size
+        self.device = device or torch.device("cpu")
+
+        if data is None:
+            data = torch.zeros(
+                (capacity, 2 * state_size + 3), dtype=torch.float32, device=self.device
+            )
+        self._bind(data)
+
+        self.position = 0
+        self.size = 0
+        self.random = random.Random(seed)
+        self.rng = np.random.default_rng(seed)
+
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.eps = eps
+        self.max_priority = 1.0
+        self.tree = SumTree(capacity) if prioritized else None
+
+    def _bind(self, data):
+        self.data = data
+        # Column views per field
+        s = self.state_size
+        self.states = data[:, :s]
+        self.next_states = data[:, s:2 * s]
+        self.actions = data[:, 2 * s]
+        self.rewards = data[:, 2 * s + 1]
+        self.dones = data[:, 2 * s + 2]
+
+    def __len__(self):
+        return self.size
+
+    # ---------- WRITE ----------
+    def push(self, state, action, reward, next_state, done):
+        i = self.position
+        self.states[i] = torch.as_tensor(state, dtype=torch.float32).reshape(-1)
+        self.next_states[i] = torch.as_tensor(next_state, dtype=torch.float32).reshape(-1)
+        self.actions[i] = int(action)
+        self.rewards[i] = float(reward)
+        self.dones[i] = float(done)
+
+        if self.tree is not None:
+            # New experience is replayed at least once
+            self.tree.update([i], [self.max_priority ** self.alpha])
+
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def push_batch(self, states, actions, rewards, next_states, dones):
+        """Write N transitions at once (N x state_size states, length-N rest)"""
+        n = len(actions)
+        if n > self.capacity:
+            # Only the newest `capacity` rows would survive anyway; they
+            # land where one-by-one pushes would have put them
+            states, actions, rewards, next_states, dones = (
+                x[-self.capacity:] for x in (states, actions, rewards, next_states, dones)
+            )
+            self.position = int((self.position + n - self.capacity) % self.capacity)
+            n = self.capacity
+
+        rows = (self.position + np.arange(n)) % self.capacity
+        index = torch.as_tensor(rows, dtype=torch.int64, device=self.device)
+        s = self.state_size
+        batch = torch.empty((n, 2 * s + 3), dtype=torch.float32, device=self.device)
+        batch[:, :s] = torch.as_tensor(states, dtype=torch.float32).reshape(n, s)
+        batch[:, s:2 * s] = torch.as_tensor(next_states, dtype=torch.float32).reshape(n, s)
+        batch[:, 2 * s] = torch.as_tensor(actions, dtype=torch.float32)
+        batch[:, 2 * s + 1] = torch.as_tensor(rewards, dtype=torch.float32)
+        batch[:, 2 * s + 2] = torch.as_tensor(dones, dtype=torch.float32)
+        self.data.index_copy_(0, index, batch)
+
+        if self.tree is not None:
+            self.tree.update(rows, np.full(n, self.max_priority ** self.alpha))
+
+        self.position = int((self.position + n) % self.capacity)
+        self.size = min(self.size + n, self.capacity)
+
+    # ---------- SAMPLE ----------
+    def sample(self, batch_size):
+        """
+        Returns (states, actions, rewards, next_states, dones, indices, weights);
+        actions/rewards/dones/weights are batch x 1 columns.
+        """
+        if self.tree is None:
+            indices = self.random.sample(range(self.size), batch_size)
+            weights = None
+        else:
+            indices, weights = self._sample_prioritized(batch_size)
+
+        batch = self.data.index_select(
+            0, torch.as_tensor(indices, dtype=torch.int64, device=self.device)
+        )
+        s = self.state_size
+        return (
+            batch[:, :s],
+            batch[:, 2 * s:2 * s + 1].long(),
+            batch[:, 2 * s + 1:2 * s + 2],
+            batch[:, s:2 * s],
+            batch[:, 2 * s + 2:2 * s + 3],
+            indices,
+            weights
+        )
+
+    def _sample_prioritized(self, batch_size):
+        # One stratified draw per equal slice of the total priority
+        total = self.tree.total
+        segment = total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        indices = np.minimum(self.tree.find(values), self.size - 1)
+
+        probabilities = self.tree.priorities(indices) / total
+        weights = (self.size * probabilities) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        weights = torch.as_tensor(weights, dtype=torch.float32, device=self.device).unsqueeze(1)
+        return indices, weights
+
+    def update_priorities(self, indices, td_errors):
+        """Refresh priorities of sampled transitions from their new TD errors"""
+        if self.tree is None:
+            return
+
+        if isinstance(td_errors, torch.Tensor):
+            td_errors = td_errors.detach().reshape(-1).cpu().numpy()
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities ** self.alpha)
+
+    # ---------- PERSISTENCE ----------
+    def save(self, directory):
+        """Write replay.npy (and the priority tree); returns the metadata to keep"""
+        directory = Path(directory)
+        np.save(directory / REPLAY_FILE, self.data.cpu().numpy())
+        if self.tree is not None:
+            np.save(directory / PRIORITIES_FILE, self.tree.tree)
+        return {
+            "capacity": self.capacity,
+            "state_size": self.state_size,
+            "position": self.position,
+            "size": self.size,
+            "prioritized": self.prioritized,
+            "alpha": self.alpha,
+            "beta": self.beta,
+            "max_priority": self.max_priority
+        }
+
+    @classmethod
+    def load(cls, directory, meta, device=None, mmap=True):
+        """
+        Buffer over a saved replay.npy. With `mmap`, rows stay a private
+        copy-on-write mapping of the file: pages are read on first use,
+        shared with every other mapping of the same file until written.
+        """
+        directory = Path(directory)
+        array = np.load(directory / REPLAY_FILE, mmap_mode="c" if mmap else None)
+        data = torch.from_numpy(array)
+        if device is not None and torch.device(device).type != "cpu":
+            data = data.to(device)
+
+        buffer = cls(
+            meta["capacity"],
+            meta["state_size"],
+            device=device,
+            prioritized=meta["prioritized"],
+            alpha=meta["alpha"],
+            beta=meta["beta"],
+            data=data
+        )
+        buffer.position = meta["position"]
+        buffer.size = meta["size"]
+        buffer.max_priority = meta["max_priority"]
+        if buffer.tree is not None:
+            buffer.tree.tree = np.load(directory / PRIORITIES_FILE)
+        return buffer
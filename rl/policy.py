@@ -0,0 +1,126 @@
+import copy
+import json
+import warnings
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from rl.checkpoint import CHECKPOINT_DIR
+
+POLICY_PATH = CHECKPOINT_DIR / "dqn_policy.pt"
+META_FILE = "policy.json"      # stored inside the TorchScript archive
+
+try:
+    from torch.ao.quantization import quantize_dynamic
+except ImportError:            # removed from newer torch builds
+    quantize_dynamic = None
+
+
+class GreedyPolicy(nn.Module):
+    """Q-network without Dropout; forward returns (greedy actions, Q-values)"""
+
+    def __init__(self, q_network):
+        super().__init__()
+        self.q_network = q_network
+
+    def forward(self, states):
+        q_values = self.q_network(states)
+        return q_values.argmax(dim=1), q_values
+
+
+def inference_network(model):
+    """Copy of an nn.Sequential Q-network with Dropout layers dropped, in eval mode"""
+    layers = [copy.deepcopy(layer) for layer in model if not isinstance(layer, nn.Dropout)]
+    network = nn.Sequential(*layers).cpu().eval()
+    for param in network.parameters():
+        param.requires_grad_(False)
+    return network
+
+
+# =========================
+# EXPORT
+# =========================
+def export_policy(agent, path=POLICY_PATH, quantize=False):
+    """
+    Write the agent's current greedy policy as a TorchScript archive for
+    CPU serving. With `quantize`, Linear layers use dynamic int8
+    quantization (weights int8, activations quantized per batch).
+    """
+    if quantize and quantize_dynamic is None:
+        raise RuntimeError("Dynamic quantization is not available in this torch build")
+
+    meta = {
+        "state_size": agent.state_size,
+        "action_size": agent.action_size,
+        "actions": agent.actions,
+        "quantized": bool(quantize)
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # torch.jit / torch.ao warn that they are deprecated in recent releases;
+    # the archives still load with torch.jit.load and need no Python code
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", (FutureWarning, DeprecationWarning, UserWarning))
+        network = inference_network(agent.model)
+        if quantize:
+            network = quantize_dynamic(network, {nn.Linear}, dtype=torch.qint8)
+
+        example = torch.zeros(1, agent.state_size)
+        scripted = torch.jit.freeze(torch.jit.trace(GreedyPolicy(network).eval(), example))
+        torch.jit.save(scripted, str(path), _extra_files={META_FILE: json.dumps(meta)})
+    return path
+
+
+# =========================
+# SERVING
+# =========================
+class Policy:
+    """
+    Loaded policy artifact. act() takes one state or a batch (NumPy
+    array, tensor or nested lists) and returns greedy action indices.
+    """
+
+    def __init__(self, module, meta):
+        self.module = module
+        self.meta = meta
+        self.state_size = meta["state_size"]
+        self.action_size = meta["action_size"]
+        self.actions = meta["actions"]
+        self.quantized = meta["quantized"]
+
+    @classmethod
+    def load(cls, path=POLICY_PATH):
+        extra_files = {META_FILE: ""}
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", (FutureWarning, DeprecationWarning))
+            module = torch.jit.load(str(path), map_location="cpu", _extra_files=extra_files)
+        return cls(module.eval(), json.loads(extra_files[META_FILE]))
+
+    def _batch(self, states):
+        if not isinstance(states, torch.Tensor):
+            states = np.asarray(states, dtype=np.float32)
+        states = torch.as_tensor(states, dtype=torch.float32)
+        if states.dim() == 1:
+            states = states.unsqueeze(0)
+        if states.shape[1] != self.state_size:
+            raise ValueError(f"Expected {self.state_size} features, got {states.shape[1]}")
+        return states
+
+    def evaluate(self, states):
+        """(actions, q_values) tensors for a batch of states"""
+        with torch.inference_mode():
+            return self.module(self._batch(states))
+
+    def act(self, states):
+        """Greedy action index per state, as an int64 NumPy array"""
+        actions, _ = self.evaluate(states)
+        return actions.numpy()
+
+    def recommend(self, states):
+        """Action names per state"""
+        return [self.actions[i] for i in self.act(states).tolist()]
+
+    __call__ = act
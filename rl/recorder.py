@@ -0,0 +1,157 @@
+from datetime import datetime
+
+import numpy as np
+
+from twin_history import RingBuffer
+
+DECISION_CAPACITY = 1000       # decisions / rewards kept for "recent" views
+LOSS_POINTS = 512              # points in the downsampled loss series
+LOSS_EMA_ALPHA = 0.05
+
+
+# =========================
+# DOWNSAMPLED SERIES
+# =========================
+class DownsampledSeries:
+    """
+    Whole-history series in at most `points` buckets. Each bucket is
+    the mean of `stride` consecutive values; when the buckets fill up,
+    neighbours are merged pairwise and the stride doubles. Appends are
+    O(1) amortized and memory is fixed.
+    """
+
+    def __init__(self, points=LOSS_POINTS):
+        self.points = points - points % 2
+        self.values = np.empty(self.points, dtype=np.float64)
+        self.steps = np.empty(self.points, dtype=np.int64)     # first step of each bucket
+        self.size = 0
+        self.stride = 1
+        self.count = 0
+        self._pending_sum = 0.0
+        self._pending = 0
+
+    def append(self, value):
+        if self._pending == 0:
+            self._pending_start = self.count
+        self._pending_sum += value
+        self._pending += 1
+        self.count += 1
+
+        if self._pending == self.stride:
+            self.values[self.size] = self._pending_sum / self._pending
+            self.steps[self.size] = self._pending_start
+            self.size += 1
+            self._pending_sum, self._pending = 0.0, 0
+            if self.size == self.points:
+                self._halve()
+
+    def _halve(self):
+        half = self.points // 2
+        self.values[:half] = (self.values[0::2] + self.values[1::2]) / 2
+        self.steps[:half] = self.steps[0::2]
+        self.size = half
+        self.stride *= 2
+
+    def series(self):
+        """(steps, values) including the partially filled last bucket"""
+        steps, values = self.steps[:self.size], self.values[:self.size]
+        if self._pending:
+            steps = np.append(steps, self._pending_start)
+            values = np.append(values, self._pending_sum / self._pending)
+        return steps, values
+
+    def __len__(self):
+        return self.count
+
+
+# =========================
+# RECORDER
+# =========================
+class DecisionRecorder:
+    """
+    Decisions, rewards and losses of one agent in fixed memory.
+
+    Recent decisions and rewards sit in ring buffers; the action
+    histogram, running mean reward, loss EMA and downsampled loss series
+    are updated on every record, so readers never rescan history.
+    """
+
+    def __init__(self, actions, capacity=DECISION_CAPACITY, loss_points=LOSS_POINTS,
+                 loss_ema_alpha=LOSS_EMA_ALPHA):
+        self.actions = list(actions)
+        self.decisions = RingBuffer([
+            ("timestamp", "datetime64[ns]"),
+            ("action", np.int16),
+            ("epsilon", np.float32),
+            ("q_value", np.float32)          # NaN for exploratory actions
+        ], capacity)
+        self.action_counts = np.zeros(len(self.actions), dtype=np.int64)
+        self.total_decisions = 0
+
+        self.rewards = RingBuffer([("reward", np.float32)], capacity)
+        self.total_rewards = 0
+        self.reward_sum = 0.0
+
+        self.losses = DownsampledSeries(loss_points)
+        self.loss_ema = None
+        self.loss_ema_alpha = loss_ema_alpha
+        self.last_loss = None
+
+    # ---------- RECORDING ----------
+    def record_decision(self, action_idx, epsilon, q_value=None, timestamp=None):
+        self.decisions.append((
+            np.datetime64(timestamp or datetime.now(), "ns"),
+            action_idx,
+            epsilon,
+            np.nan if q_value is None else q_value
+        ))
+        self.action_counts[action_idx] += 1
+        self.total_decisions += 1
+
+    def record_reward(self, reward):
+        self.rewards.append((reward,))
+        self.total_rewards += 1
+        self.reward_sum += reward
+
+    def record_loss(self, loss):
+        self.losses.append(loss)
+        self.last_loss = loss
+        if self.loss_ema is None:
+            self.loss_ema = loss
+        else:
+            self.loss_ema += self.loss_ema_alpha * (loss - self.loss_ema)
+
+    # ---------- AGGREGATES ----------
+    @property
+    def mean_reward(self):
+        return self.reward_sum / self.total_rewards if self.total_rewards else 0.0
+
+    def recent_mean_reward(self, n=5):
+        rewards = self.rewards.column("reward")[-n:]
+        return float(rewards.mean()) if len(rewards) else 0.0
+
+    def action_histogram(self):
+        """{action name: count} for actions taken at least once"""
+        return {
+            self.actions[i]: int(count) for i, count in enumerate(self.action_counts.tolist()) if count
+        }
+
+    def loss_series(self):
+        """(steps, mean loss) over the whole history, at most ~loss_points long"""
+        return self.losses.series()
+
+    def recent_decisions(self, n=None):
+        """Latest decisions as dicts (oldest first), in the former decision_log format"""
+        records = self.decisions.records()
+        if n is not None:
+            records = records[-n:]
+        return [
+            {
+                "timestamp": row["timestamp"].astype("datetime64[us]").item(),
+                "action": self.actions[row["action"]],
+                "action_idx": int(row["action"]),
+                "epsilon": float(row["epsilon"]),
+                "q_value": None if np.isnan(row["q_value"]) else float(row["q_value"])
+            }
+            for row in records
+        ]
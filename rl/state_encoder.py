@@ -0,0 +1,155 @@
+import numpy as np
+import torch
+
+from config import ORGAN_WEIGHTS
+
+# Feature layout of DQNOrganOptimizer.get_state (checkpoints depend on it)
+STATE_ORGANS = [
+    "heart", "lungs", "brain", "kidneys", "pancreas",
+    "liver", "gut", "skin", "immune", "muscles"
+]
+STATE_NUTRIENTS = {
+    "calories": 1000, "carbs": 200, "protein": 100, "fat": 100, "sugar": 100,
+    "fiber": 50, "sodium": 5000, "calcium": 2000, "iron": 50
+}
+MISSING_ORGAN_HEALTH = 0.5
+FEATURE_SIZE = len(STATE_ORGANS) + len(STATE_NUTRIENTS) + 4     # 23
+
+
+class StateEncoder:
+    """
+    Batched get_state: N (twin, nutrients) pairs -> N x state_size tensor.
+
+    Features are computed in float64 scratch arrays that are reused
+    across calls (the same arithmetic as the original list code, so the
+    float32 result is bit-identical) and copied once into the output,
+    which the caller may preallocate. Columns beyond the 23 features
+    are zeroed; a smaller state_size keeps the leading features.
+    """
+
+    def __init__(self, state_size=FEATURE_SIZE, device=None, capacity=1):
+        self.state_size = state_size
+        self.device = device or torch.device("cpu")
+        self.width = min(state_size, FEATURE_SIZE)
+        self.nutrient_names = list(STATE_NUTRIENTS)
+        self.nutrient_scale = np.array(list(STATE_NUTRIENTS.values()), dtype=np.float64)
+        # get_overall_health adds organs in ORGAN_WEIGHTS order
+        self.weights = [
+            (STATE_ORGANS.index(name), weight)
+            for name, weight in ORGAN_WEIGHTS.items() if name in STATE_ORGANS
+        ]
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self._nutrients = np.empty((capacity, len(STATE_NUTRIENTS)), dtype=np.float64)
+        self._features = np.zeros((capacity, FEATURE_SIZE), dtype=np.float64)
+        self._critical = np.empty((capacity, len(STATE_ORGANS)), dtype=bool)
+        self._deviation = np.empty((capacity, len(STATE_ORGANS)), dtype=np.float64)
+        self._mean = np.empty((capacity, 1), dtype=np.float64)
+        self._features_t = torch.from_numpy(self._features)
+        self._view_cache = {}
+
+    def _reserve(self, n):
+        if n > self.capacity:
+            self._allocate(max(n, 2 * self.capacity))
+
+    def output(self, n):
+        """A new N x state_size tensor suitable as `out`"""
+        return torch.empty((n, self.state_size), dtype=torch.float32, device=self.device)
+
+    # =========================
+    # ENCODING
+    # =========================
+    def encode(self, pairs, out=None):
+        """
+        `pairs` is a sequence of (twin, nutrients dict); a twin needs
+        get_organ_states() and get_overall_health(). Returns `out`
+        (or a new tensor) with one row per pair.
+        """
+        n = len(pairs)
+        self._reserve(n)
+        health, nutrients, overall = self._views(n)[:3]
+
+        for i, (twin, meal) in enumerate(pairs):
+            states = twin.get_organ_states()
+            health[i] = [states.get(name, MISSING_ORGAN_HEALTH) for name in STATE_ORGANS]
+            nutrients[i] = [meal.get(name, 0) for name in self.nutrient_names]
+            overall[i] = twin.get_overall_health()
+
+        return self._finish(n, out)
+
+    def encode_arrays(self, health, nutrients, overall=None, out=None):
+        """
+        Array form: `health` N x 10 in STATE_ORGANS order, `nutrients`
+        N x 9 raw amounts in STATE_NUTRIENTS order, `overall` the twins'
+        overall health (computed as get_overall_health does when None).
+        """
+        n = len(health)
+        self._reserve(n)
+        health_rows, nutrient_rows, total = self._views(n)[:3]
+        health_rows[:] = health
+        nutrient_rows[:] = nutrients
+
+        if overall is None:
+            total[:] = 0.0
+            for column, weight in self.weights:
+                total += health_rows[:, column] * weight
+        else:
+            total[:] = overall
+
+        return self._finish(n, out)
+
+    def _views(self, n):
+        """Scratch and feature-column views for batches of n rows (cached)"""
+        views = self._view_cache.get(n)
+        if views is None:
+            organs = len(STATE_ORGANS)
+            end = organs + len(STATE_NUTRIENTS)
+            features = self._features[:n]
+            source = self._features_t[:n, :self.width]
+            # Organ health and overall health are gathered straight into
+            # their feature columns; the reductions read them from there
+            views = self._view_cache[n] = (
+                features[:, :organs], self._nutrients[:n], features[:, end],
+                self._critical[:n], self._deviation[:n], self._mean[:n],
+                features[:, organs:end],
+                features[:, end + 1], features[:, end + 2], features[:, end + 3],
+                source
+            )
+        return views
+
+    def _finish(self, n, out):
+        (health, nutrients, _, critical_mask, deviation, mean,
+         nutrient_columns, critical, std, minimum, source) = self._views(n)
+        organs = len(STATE_ORGANS)
+
+        np.divide(nutrients, self.nutrient_scale, out=nutrient_columns)
+
+        # Critical fraction: count / organs, as len([...]) / len(...)
+        np.add.reduce(np.less(health, 0.6, out=critical_mask), axis=1, dtype=np.float64, out=critical)
+        critical /= organs
+
+        # np.std's own sequence of ufuncs (numpy/_core/_methods._var),
+        # without its dispatch overhead
+        np.add.reduce(health, axis=1, keepdims=True, out=mean)
+        mean /= organs
+        np.subtract(health, mean, out=deviation)
+        np.multiply(deviation, deviation, out=deviation)
+        np.add.reduce(deviation, axis=1, out=std)
+        std /= organs
+        np.sqrt(std, out=std)
+
+        np.minimum.reduce(health, axis=1, out=minimum)
+
+        if out is None:
+            out = self.output(n)
+
+        # One float64 -> float32 copy (same rounding as torch.FloatTensor(list))
+        if out.shape[0] == n and self.state_size == self.width:
+            out.copy_(source)
+        else:
+            out[:n, :self.width].copy_(source)
+            if self.state_size > self.width:
+                out[:n, self.width:].zero_()
+        return out
@@ -0,0 +1,348 @@
+"""
+Headless DQN training against a batched twin environment.
+
+Run: python -m rl.trainer [--env-steps 200000] [--num-envs 64] [--updates-per-step 4]
+                          [--target-update-freq 10 | --tau 0.005] [--threads auto]
+                          [--checkpoint-dir data/processed/checkpoints] [--checkpoint-every 5000]
+                          [--resume data/processed/checkpoints/dqn_pretrained]
+"""
+
+import argparse
+import copy
+import os
+import time
+
+import numpy as np
+import torch
+
+from config import DEFAULT_NUTRIENTS
+from dqn_agent import DQNOrganOptimizer
+from rl.state_encoder import FEATURE_SIZE, STATE_NUTRIENTS, STATE_ORGANS, StateEncoder
+from twin_population import TwinPopulation
+
+EPISODE_LENGTH = 24 * 7        # meals per episode before a twin is reset
+DEFAULT_NUM_THREADS = 4        # a 23-input MLP stops scaling after a few threads
+
+
+# =========================
+# ENVIRONMENT
+# =========================
+class VectorTwinEnv:
+    """
+    `num_envs` twins stepping together on a TwinPopulation.
+
+    Each step every twin gets a meal drawn from `meals` (scaled by a
+    random factor), modified by its action exactly as
+    apply_action_to_nutrients does, and eaten at `portion_g`. States are
+    the 23 features of DQNOrganOptimizer.get_state, one row per twin.
+    Twins are reset after `episode_length` meals; as in the app, the
+    episode is never terminal, so `done` stays 0.
+    """
+
+    def __init__(self, num_envs, action_effects, meals=None, portion_g=100,
+                 episode_length=EPISODE_LENGTH, seed=None, state_size=FEATURE_SIZE):
+        self.num_envs = num_envs
+        self.portion_g = portion_g
+        self.episode_length = episode_length
+        self.rng = np.random.default_rng(seed)
+        self.population = TwinPopulation(num_envs, seed=self.rng.integers(2 ** 32))
+
+        # Impact nutrients first, then the state-only ones (calories, ...)
+        impact_names = self.population.nutrient_names
+        self.nutrient_names = impact_names + [n for n in STATE_NUTRIENTS if n not in impact_names]
+        self.impact_columns = len(impact_names)
+        column = {name: j for j, name in enumerate(self.nutrient_names)}
+
+        meals = meals or [DEFAULT_NUTRIENTS]
+        self.menu = np.array(
+            [[meal.get(name, 0) for name in self.nutrient_names] for meal in meals],
+            dtype=np.float32
+        )
+
+        # actions x nutrients multipliers
+        self.action_multipliers = np.ones((len(action_effects), len(self.nutrient_names)), dtype=np.float32)
+        for action, effects in action_effects.items():
+            for nutrient, multiplier in effects.items():
+                if nutrient in column:
+                    self.action_multipliers[action, column[nutrient]] = multiplier
+
+        self.organ_order = np.array([self.population.organ_names.index(n) for n in STATE_ORGANS])
+        self.feature_columns = np.array([column[n] for n in STATE_NUTRIENTS])
+
+        # States are written into two preallocated tensors: the current
+        # observation and the post-step one
+        self.encoder = StateEncoder(state_size, capacity=num_envs)
+        self.states = self.encoder.output(num_envs)
+        self.next_states = self.encoder.output(num_envs)
+
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.nutrients = self._draw_meals()
+
+    def _draw_meals(self):
+        choice = self.rng.integers(len(self.menu), size=self.num_envs)
+        factor = self.rng.uniform(0.5, 1.5, (self.num_envs, 1)).astype(np.float32)
+        return self.menu[choice] * factor
+
+    def encode(self, nutrients, out):
+        """get_state for every twin (TwinView semantics) into `out`"""
+        population = self.population
+        return self.encoder.encode_arrays(
+            population.health[:, self.organ_order],
+            nutrients[:, self.feature_columns],
+            overall=population.overall_health(),
+            out=out
+        )
+
+    def observe(self):
+        return self.encode(self.nutrients, self.states)
+
+    def step(self, actions):
+        """
+        Returns (next_states, rewards, dones), then draws the next meals.
+        next_states is overwritten by the following step.
+        """
+        nutrients = self.nutrients * self.action_multipliers[actions]
+        _, rewards = self.population.apply_meals(
+            nutrients[:, :self.impact_columns], self.portion_g
+        )
+        next_states = self.encode(nutrients, self.next_states)
+        dones = np.zeros(self.num_envs, dtype=np.float32)
+
+        self.steps += 1
+        finished = np.flatnonzero(self.steps >= self.episode_length)
+        if len(finished):
+            self.reset(finished)
+        self.nutrients = self._draw_meals()
+        return next_states, rewards, dones
+
+    def reset(self, rows):
+        population = self.population
+        population.health[rows] = 0.7 + self.rng.random((len(rows), len(population.organ_names)), dtype=np.float32) * np.float32(0.2)
+        population.metrics[rows] = population.initial_metrics
+        population.previous_overall_health[rows] = 0.5
+        self.steps[rows] = 0
+
+
+# =========================
+# THREADS
+# =========================
+def tune_num_threads(agent, candidates=None, updates=30):
+    """
+    Time forward/backward passes of a copy of the agent's network at
+    replay batch size for each thread count; set and return the fastest.
+    """
+    candidates = candidates or sorted({1, 2, 4, os.cpu_count() or 1})
+    model = copy.deepcopy(agent.model)
+    optimizer = torch.optim.Adam(model.parameters(), lr=agent.config["learning_rate"])
+    states = torch.randn(agent.batch_size, agent.state_size, device=agent.device)
+
+    timings = {}
+    for threads in candidates:
+        torch.set_num_threads(threads)
+        start = time.perf_counter()
+        for _ in range(updates):
+            loss = model(states).pow(2).mean()
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+        timings[threads] = time.perf_counter() - start
+
+    best = min(timings, key=timings.get)
+    torch.set_num_threads(best)
+    return best
+
+
+# =========================
+# TRAINER
+# =========================
+class DQNTrainer:
+    """
+    Vectorized DQN training loop.
+
+    Every environment step acts for all `num_envs` twins at once
+    (batched epsilon-greedy on one forward pass), writes their
+    transitions with one push_batch, then runs `updates_per_step`
+    agent.replay() updates. The target network follows the agent's
+    schedule: hard copies every `target_update_freq` updates, or Polyak
+    averaging when `target_update_tau` is set.
+    """
+
+    def __init__(
+        self,
+        agent=None,
+        num_envs=64,
+        updates_per_step=4,
+        target_update_freq=None,
+        target_update_tau=None,
+        meals=None,
+        portion_g=100,
+        episode_length=EPISODE_LENGTH,
+        checkpoint_dir=None,
+        checkpoint_every=5000,
+        log_every=1000,
+        num_threads=DEFAULT_NUM_THREADS,
+        seed=0,
+        log=print
+    ):
+        torch.manual_seed(seed)
+
+        self.agent = agent or DQNOrganOptimizer()
+        if target_update_freq is not None:
+            self.agent.target_update_freq = target_update_freq
+        if target_update_tau is not None:
+            self.agent.target_update_tau = target_update_tau
+
+        if num_threads == "auto":
+            self.num_threads = tune_num_threads(self.agent)
+        else:
+            self.num_threads = min(int(num_threads), os.cpu_count() or 1)
+            torch.set_num_threads(self.num_threads)
+
+        self.env = VectorTwinEnv(
+            num_envs, self.agent.action_effects, meals=meals, portion_g=portion_g,
+            episode_length=episode_length, seed=seed, state_size=self.agent.state_size
+        )
+        self.num_envs = num_envs
+        self.updates_per_step = updates_per_step
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self.log_every = log_every
+        self.log = log
+        self.rng = np.random.default_rng(seed)
+
+        self.env_steps = 0        # transitions collected (vector steps x num_envs)
+        self.updates = 0
+        self.history = []         # one summary per log interval
+
+    # ---------- ACTING ----------
+    def act(self, states):
+        """Batched epsilon-greedy; no per-decision logging"""
+        agent = self.agent
+        with torch.no_grad():
+            q_values = agent.model(states.to(agent.device))
+        actions = q_values.argmax(1).cpu().numpy()
+
+        explore = self.rng.random(self.num_envs) < agent.epsilon
+        actions[explore] = self.rng.integers(agent.action_size, size=int(explore.sum()))
+        return actions
+
+    # ---------- LOOP ----------
+    def train(self, env_steps):
+        """Collect about `env_steps` transitions; returns the last log summary"""
+        agent = self.agent
+        states = self.env.observe()
+        target = self.env_steps + env_steps
+
+        window = {"start": time.perf_counter(), "env_steps": 0, "updates": 0,
+                  "env_time": 0.0, "update_time": 0.0, "loss": 0.0, "reward": 0.0}
+        next_log = self.env_steps + self.log_every
+        next_checkpoint = self.updates + self.checkpoint_every
+
+        while self.env_steps < target:
+            start = time.perf_counter()
+            actions = self.act(states)
+            next_states, rewards, dones = self.env.step(actions)
+            agent.memory.push_batch(states, actions, rewards, next_states, dones)
+            states = self.env.observe()
+            self.env_steps += self.num_envs
+            window["env_steps"] += self.num_envs
+            window["reward"] += float(rewards.sum(dtype=np.float64))
+            window["env_time"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            if len(agent.memory) >= agent.batch_size:
+                for _ in range(self.updates_per_step):
+                    window["loss"] += agent.replay()
+                    window["updates"] += 1
+                self.updates += self.updates_per_step
+            window["update_time"] += time.perf_counter() - start
+
+            if self.env_steps >= next_log or self.env_steps >= target:
+                self._log(window)
+                window.update(start=time.perf_counter(), env_steps=0, updates=0,
+                              env_time=0.0, update_time=0.0, loss=0.0, reward=0.0)
+                next_log = self.env_steps + self.log_every
+
+            if self.checkpoint_dir and self.updates >= next_checkpoint:
+                self.save_checkpoint()
+                next_checkpoint = self.updates + self.checkpoint_every
+
+        if self.checkpoint_dir:
+            self.save_checkpoint()
+        return self.history[-1] if self.history else None
+
+    def _log(self, window):
+        elapsed = time.perf_counter() - window["start"]
+        summary = {
+            "env_steps": self.env_steps,
+            "updates": self.updates,
+            "env_steps_per_s": window["env_steps"] / elapsed if elapsed else 0.0,
+            "updates_per_s": window["updates"] / elapsed if elapsed else 0.0,
+            "env_time_share": window["env_time"] / elapsed if elapsed else 0.0,
+            "loss": window["loss"] / window["updates"] if window["updates"] else None,
+            "mean_reward": window["reward"] / window["env_steps"] if window["env_steps"] else 0.0,
+            "mean_health": float(self.env.population.overall_health().mean()),
+            "epsilon": self.agent.epsilon
+        }
+        self.history.append(summary)
+        if self.log:
+            loss = f"{summary['loss']:.4f}" if summary["loss"] is not None else "-"
+            self.log(
+                f"steps {summary['env_steps']:>10,}  updates {summary['updates']:>9,}  "
+                f"{summary['env_steps_per_s']:>9,.0f} env steps/s  "
+                f"{summary['updates_per_s']:>7,.0f} updates/s  loss {loss}  "
+                f"reward {summary['mean_reward']:+.3f}  health {summary['mean_health']:.3f}  "
+                f"eps {summary['epsilon']:.3f}"
+            )
+
+    # ---------- CHECKPOINTS ----------
+    def save_checkpoint(self, path=None):
+        """Checkpoint directory (see rl.checkpoint) with the trainer counters"""
+        if path is None:
+            path = os.path.join(self.checkpoint_dir, f"dqn_{self.updates:09d}")
+        return self.agent.save_checkpoint(
+            path, extra={"env_steps": self.env_steps, "updates": self.updates}
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--env-steps", type=int, default=200_000)
+    parser.add_argument("--num-envs", type=int, default=64)
+    parser.add_argument("--updates-per-step", type=int, default=4)
+    parser.add_argument("--target-update-freq", type=int, default=None)
+    parser.add_argument("--tau", type=float, default=None)
+    parser.add_argument("--threads", default=str(DEFAULT_NUM_THREADS), help="count or 'auto'")
+    parser.add_argument("--checkpoint-dir", default=None)
+    parser.add_argument("--resume", default=None, help="checkpoint to continue from")
+    parser.add_argument("--checkpoint-every", type=int, default=5000, help="updates")
+    parser.add_argument("--log-every", type=int, default=10_000, help="env steps")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    agent = DQNOrganOptimizer()
+    meta = agent.load_checkpoint(args.resume) if args.resume else None
+
+    trainer = DQNTrainer(
+        agent=agent,
+        num_envs=args.num_envs,
+        updates_per_step=args.updates_per_step,
+        target_update_freq=args.target_update_freq,
+        target_update_tau=args.tau,
+        checkpoint_dir=args.checkpoint_dir,
+        checkpoint_every=args.checkpoint_every,
+        log_every=args.log_every,
+        num_threads=args.threads if args.threads == "auto" else int(args.threads),
+        seed=args.seed
+    )
+    if meta is not None:
+        # Continue the counters, so logs and checkpoint names pick up where the run stopped
+        extra = meta.get("extra") or {}
+        trainer.env_steps = extra.get("env_steps", 0)
+        trainer.updates = extra.get("updates", 0)
+    print(f"torch threads: {trainer.num_threads}")
+    trainer.train(args.env_steps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from typing import Callable, List, Mapping
+
+import numpy as np
+
+
+# =========================
+# NUMERIC RULE TERMS
+# =========================
+# Calorie and nutrient terms of a rule, over per-serving columns (the
+# values the planner scores and shows). Thresholds are numbers or
+# {param: <profile field>, scale: k}, resolved per user, e.g. a sodium
+# cap of 40% of profile["sodium_limit"].
+
+
+def resolve_threshold(value, profile: Mapping) -> float:
+    if isinstance(value, Mapping):
+        return float(profile[value["param"]]) * float(value.get("scale", 1))
+    return float(value)
+
+
+def threshold_params(spec) -> List[str]:
+    """Profile fields a (nested) rule spec reads through {param: ...}"""
+    found = []
+    if isinstance(spec, Mapping):
+        if isinstance(spec.get("param"), str):
+            found.append(spec["param"])
+        for value in spec.values():
+            found.extend(threshold_params(value))
+    elif isinstance(spec, list):
+        for value in spec:
+            found.extend(threshold_params(value))
+    return list(dict.fromkeys(found))
+
+
+def column_values(table, spec: Mapping) -> np.ndarray:
+    """Per-serving `column`, or `ratio` num / den (x / 0 -> inf, 0 / 0 -> NaN)"""
+    if "column" in spec:
+        return table.values[spec["column"]]
+    numerator, denominator = spec["ratio"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return table.values[numerator] / table.values[denominator]
+
+
+def compile_comparison(spec: Mapping) -> Callable:
+    """
+    (table, profile) -> rows where the value is above / below the
+    threshold. NaN compares False, so dishes with missing values pass,
+    like the catalog's other nutrient filters.
+    """
+    above = "above" in spec
+    threshold = spec["above" if above else "below"]
+
+    def test(table, profile: Mapping) -> np.ndarray:
+        values = column_values(table, spec)
+        limit = resolve_threshold(threshold, profile)
+        return values > limit if above else values < limit
+
+    return test
+
+
+def compile_nutrient_penalty(spec: Mapping) -> Callable:
+    """(table, profile) -> weight * value / per, per row (non-finite -> 0)"""
+    weight = float(spec["weight"])
+    per = spec["per"]
+
+    def penalty(table, profile: Mapping) -> np.ndarray:
+        scale = weight / resolve_threshold(per, profile)
+        return np.nan_to_num(column_values(table, spec) * scale, nan=0.0, posinf=0.0)
+
+    return penalty
@@ -0,0 +1,141 @@
+from typing import Callable, Dict, List, Mapping, Optional
+
+import numpy as np
+
+from agents.keyword_matcher import KeywordMatcher, term_matcher
+from agents.nutrition_agent import NUTRIENT_COLUMNS, FoodCatalog, classify_food
+from rules_engine.calorie_rules import compile_comparison, compile_nutrient_penalty
+
+
+# =========================
+# RULE INPUT TABLE
+# =========================
+class FoodTable:
+    """
+    The columns rule predicates read, one row per dish: names, food
+    types and per-serving nutrient values. Name-term masks are cached
+    per table; for a catalog they come from FoodCatalog.term_mask, so
+    they are shared with the planner's avoid/prefer matching.
+    """
+
+    def __init__(
+        self,
+        names: List[str],
+        food_types: np.ndarray,
+        values: Dict[str, np.ndarray],
+        term_mask: Optional[Callable] = None
+    ):
+        self.size = len(names)
+        self.names = names
+        self.food_types = food_types
+        self.values = values
+        self._catalog_term_mask = term_mask
+        self._term_masks: Dict[tuple, np.ndarray] = {}
+
+    @classmethod
+    def from_catalog(cls, catalog: FoodCatalog) -> "FoodTable":
+        return cls(catalog.dish_names, catalog.food_types, catalog.serving, catalog.term_mask)
+
+    @classmethod
+    def from_foods(cls, foods: List[Dict]) -> "FoodTable":
+        """Table over serving dicts (e.g. a caller-supplied candidate list)"""
+        values = {
+            col: np.array(
+                [np.nan if f.get(col) is None else f[col] for f in foods],
+                dtype=np.float64
+            )
+            for col in NUTRIENT_COLUMNS
+        }
+        food_types = np.array(
+            [f.get("food_type") or classify_food(f["dish_name"]) for f in foods], dtype=str
+        )
+        return cls([f["dish_name"] for f in foods], food_types, values)
+
+    def prepare(self, term_sets: List[tuple]):
+        """Match every not yet cached term set in one pass over the names"""
+        missing = [terms for terms in dict.fromkeys(term_sets) if terms not in self._term_masks]
+        if not missing:
+            return
+        if self._catalog_term_mask is not None:
+            # The catalog caches per term; later term_mask() calls are hits
+            self._catalog_term_mask([term for terms in missing for term in terms])
+            return
+
+        matcher = KeywordMatcher({terms: terms for terms in missing})
+        found = matcher.scan_many(name.lower() for name in self.names)
+        for terms in missing:
+            self._term_masks[terms] = (found & matcher.bits[terms]) != 0
+
+    def term_mask(self, terms: tuple) -> np.ndarray:
+        """Rows whose lower-cased name contains any of `terms`"""
+        mask = self._term_masks.get(terms)
+        if mask is None:
+            if self._catalog_term_mask is not None:
+                mask = self._catalog_term_mask(list(terms))
+            else:
+                mask = term_matcher(terms).scan_many(n.lower() for n in self.names) != 0
+            self._term_masks[terms] = mask
+        return mask
+
+
+# =========================
+# PREDICATE COMPILER
+# =========================
+def _terms(values: List[str]) -> tuple:
+    return tuple(dict.fromkeys(value.lower() for value in values))
+
+
+def name_term_sets(spec) -> List[tuple]:
+    """Every name_contains term set in a (nested) rule spec"""
+    found = []
+    if isinstance(spec, Mapping):
+        if "name_contains" in spec:
+            found.append(_terms(spec["name_contains"]))
+        for value in spec.values():
+            found.extend(name_term_sets(value))
+    elif isinstance(spec, list):
+        for value in spec:
+            found.extend(name_term_sets(value))
+    return found
+
+
+def compile_predicate(spec: Mapping) -> Callable:
+    """
+    Turn a (validated) predicate spec into a function
+    (table, profile) -> boolean row mask. The spec is walked once here;
+    evaluating it is only array operations.
+    """
+    if "all" in spec or "any" in spec:
+        combine = np.logical_and if "all" in spec else np.logical_or
+        parts = [compile_predicate(part) for part in spec["all" if "all" in spec else "any"]]
+
+        def test(table, profile):
+            mask = parts[0](table, profile)
+            for part in parts[1:]:
+                mask = combine(mask, part(table, profile))
+            return mask
+
+        return test
+
+    if "not" in spec:
+        inner = compile_predicate(spec["not"])
+        return lambda table, profile: ~inner(table, profile)
+
+    if "name_contains" in spec:
+        terms = _terms(spec["name_contains"])
+        return lambda table, profile: table.term_mask(terms)
+
+    if "food_type" in spec:
+        food_types = list(spec["food_type"])
+        return lambda table, profile: np.isin(table.food_types, food_types)
+
+    return compile_comparison(spec)
+
+
+def compile_penalty(spec: Mapping) -> Callable:
+    """Penalty term -> (table, profile) -> float penalty per row"""
+    if "when" in spec:
+        weight = float(spec["weight"])
+        test = compile_predicate(spec["when"])
+        return lambda table, profile: np.where(test(table, profile), weight, 0.0)
+    return compile_nutrient_penalty(spec)
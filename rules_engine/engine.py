@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+
+from agents.nutrition_agent import FoodCatalog, get_food_catalog
+from rules_engine.diet_constraints import FoodTable
+from rules_engine.medical_rules import RULES_PATH, Rule, load_rules
+
+
+# =========================
+# COMPILED RULE SETS
+# =========================
+USE_RULES_ENGINE = os.getenv("NUTRITION_RULES_ENGINE", "1") == "1"
+
+COMPILED_CACHE_SIZE = 1024      # rule signatures kept per catalog load
+RULES_CHECK_INTERVAL = 5.0      # seconds between rules file mtime checks
+
+
+class CompiledRules:
+    """
+    A user's active rules applied to a whole table at once.
+
+    `allowed` is the boolean row mask the planner filters with, `penalty`
+    the summed soft terms it subtracts from the meal score, and
+    `exclusions` has bit i set where the i-th rule excluded the row, so
+    every exclusion can be traced back to its rule(s).
+    """
+
+    def __init__(self, rules: List[Rule], profile: Mapping, table: FoodTable, catalog=None):
+        self.rules = rules
+        self.profile = dict(profile)
+        self.catalog = catalog
+        self.catalog_mtime = catalog.mtime if catalog is not None else None
+
+        table.prepare([terms for rule in rules for terms in rule.term_sets])
+        self.exclusions = np.zeros(table.size, dtype=np.int64)
+        self.penalty = np.zeros(table.size, dtype=np.float64)
+        for bit, rule in enumerate(rules):
+            if rule.exclude is not None:
+                self.exclusions |= np.where(rule.exclude(table, profile), 1 << bit, 0)
+            for term in rule.penalties:
+                self.penalty += term(table, profile)
+
+        self.allowed = self.exclusions == 0
+        self.excluded = ~self.allowed
+        self.has_penalty = bool(self.penalty.any())
+
+    @property
+    def names(self) -> List[str]:
+        return [rule.name for rule in self.rules]
+
+    def matches(self, catalog: FoodCatalog) -> bool:
+        """Rows line up with this catalog load"""
+        return self.catalog is catalog and self.catalog_mtime == catalog.mtime
+
+    def for_foods(self, foods: List[Dict]) -> "CompiledRules":
+        """The same rules applied to a list of serving dicts"""
+        return CompiledRules(self.rules, self.profile, FoodTable.from_foods(foods))
+
+    # ---------- REPORTING ----------
+    def excluded_by(self, row: int) -> List[str]:
+        """Names of the rules that excluded `row` (empty if allowed)"""
+        bits = int(self.exclusions[row])
+        return [rule.name for i, rule in enumerate(self.rules) if bits >> i & 1]
+
+    def reasons(self, row: int) -> List[str]:
+        bits = int(self.exclusions[row])
+        return [rule.reason for i, rule in enumerate(self.rules) if bits >> i & 1]
+
+    def exclusion_counts(self) -> Dict[str, int]:
+        """Rows each rule excludes (a row can count for several rules)"""
+        return {
+            rule.name: int(np.count_nonzero(self.exclusions >> i & 1))
+            for i, rule in enumerate(self.rules)
+        }
+
+    def explain(self, food_id: int) -> List[str]:
+        """Rules excluding a catalog dish, by food id"""
+        row = int(np.searchsorted(self.catalog.ids, food_id))
+        if row >= self.catalog.size or self.catalog.ids[row] != food_id:
+            raise KeyError(food_id)
+        return self.excluded_by(row)
+
+    def violations(self, food: Dict) -> List[str]:
+        """Rules a single serving dict breaks"""
+        return self.for_foods([food]).excluded_by(0)
+
+    def allows(self, food: Dict) -> bool:
+        return not self.violations(food)
+
+
+# =========================
+# ENGINE
+# =========================
+class RuleEngine:
+    """
+    The rules of config/rules.yaml, compiled once. compile() picks the
+    rules active for a profile and applies them to the catalog; results
+    are cached by signature (active rule names plus the profile values
+    their thresholds read), so users who share restrictions and limits
+    share one CompiledRules until the catalog reloads.
+    """
+
+    def __init__(self, rules: List[Rule], path: Optional[Path] = None):
+        self.rules = rules
+        self.path = path
+        self.mtime = os.path.getmtime(path) if path is not None else None
+        self._last_check = time.monotonic()
+        self._lock = threading.Lock()
+        self._catalog = None
+        self._catalog_mtime = None
+        self._table: Optional[FoodTable] = None
+        self._compiled: "OrderedDict[tuple, CompiledRules]" = OrderedDict()
+
+    @classmethod
+    def load(cls, path: Path = RULES_PATH) -> "RuleEngine":
+        path = path if isinstance(path, Path) else Path(path)
+        return cls(load_rules(path), path)
+
+    def matches_file(self) -> bool:
+        """Rules file unchanged (its mtime is checked at most every few seconds)"""
+        if self.path is None:
+            return True
+        now = time.monotonic()
+        if now - self._last_check < RULES_CHECK_INTERVAL:
+            return True
+        self._last_check = now
+        return os.path.getmtime(self.path) == self.mtime
+
+    def active(self, profile: Mapping) -> List[Rule]:
+        return [rule for rule in self.rules if rule.applies_to(profile)]
+
+    def signature(self, profile: Mapping) -> tuple:
+        return tuple(rule.signature(profile) for rule in self.active(profile))
+
+    def compile(self, profile: Mapping, catalog: Optional[FoodCatalog] = None) -> Optional[CompiledRules]:
+        """CompiledRules of the profile's active rules, or None if no rule applies"""
+        catalog = catalog if catalog is not None else get_food_catalog()
+        active = self.active(profile)
+        if not active:
+            return None
+        key = tuple(rule.signature(profile) for rule in active)
+
+        with self._lock:
+            if self._catalog is not catalog or self._catalog_mtime != catalog.mtime:
+                self._catalog, self._catalog_mtime = catalog, catalog.mtime
+                self._table = FoodTable.from_catalog(catalog)
+                self._compiled.clear()
+
+            compiled = self._compiled.get(key)
+            if compiled is not None:
+                self._compiled.move_to_end(key)
+                return compiled
+            table = self._table
+
+        compiled = CompiledRules(active, profile, table, catalog)
+        with self._lock:
+            if table is self._table:
+                self._compiled[key] = compiled
+                if len(self._compiled) > COMPILED_CACHE_SIZE:
+                    self._compiled.popitem(last=False)
+        return compiled
+
+
+_engine: Optional[RuleEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_rule_engine(path: Path = RULES_PATH) -> RuleEngine:
+    """Process-wide engine, reloaded when the rules file changes"""
+    global _engine
+
+    engine = _engine
+    if engine is not None and (path is engine.path or Path(path) == engine.path) and engine.matches_file():
+        return engine
+
+    with _engine_lock:
+        if _engine is None or Path(path) != _engine.path or os.path.getmtime(path) != _engine.mtime:
+            _engine = RuleEngine.load(path)
+        return _engine
+
+
+def rules_for(profile: Mapping, catalog: Optional[FoodCatalog] = None) -> Optional[CompiledRules]:
+    """The planner's rule set for a profile (None when disabled or nothing applies)"""
+    if not USE_RULES_ENGINE:
+        return None
+    return get_rule_engine().compile(profile, catalog)
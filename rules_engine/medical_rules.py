@@ -0,0 +1,64 @@
+from pathlib import Path
+from typing import List, Mapping
+
+import yaml
+
+from database.db_connection import BASE_DIR
+from rules_engine.calorie_rules import threshold_params
+from rules_engine.diet_constraints import compile_penalty, compile_predicate, name_term_sets
+from rules_engine.validator import validate_rules
+
+
+# =========================
+# RULE DEFINITIONS
+# =========================
+RULES_PATH = BASE_DIR / "config" / "rules.yaml"
+
+
+class Rule:
+    """
+    One rule from config/rules.yaml, compiled: `exclude` and `penalties`
+    are (table, profile) functions over whole columns, `params` are the
+    profile fields its thresholds read (part of the cache signature) and
+    `term_sets` the name term lists it matches.
+    """
+
+    def __init__(self, spec: Mapping):
+        self.name = spec["name"]
+        self.reason = spec.get("reason", self.name)
+        self.when = dict(spec["when"])
+        self.exclude = compile_predicate(spec["exclude"]) if "exclude" in spec else None
+        self.penalties = [compile_penalty(term) for term in spec.get("penalty") or []]
+        self.params = threshold_params([spec.get("exclude"), spec.get("penalty")])
+        self.term_sets = name_term_sets([spec.get("exclude"), spec.get("penalty")])
+
+    def applies_to(self, profile: Mapping) -> bool:
+        """Active for this profile (and every param it reads is present)"""
+        if any(profile.get(param) is None for param in self.params):
+            return False
+
+        when = self.when
+        if "restriction" in when:
+            return when["restriction"] in (profile.get("food_restrictions") or ())
+
+        if "profile" in when:
+            for field, condition in when["profile"].items():
+                value = profile.get(field)
+                if value is None:
+                    return False
+                if "above" in condition and not value > condition["above"]:
+                    return False
+                if "below" in condition and not value < condition["below"]:
+                    return False
+            return True
+
+        return bool(when["always"])
+
+    def signature(self, profile: Mapping) -> tuple:
+        return (self.name,) + tuple(profile[param] for param in self.params)
+
+
+def load_rules(path: Path = RULES_PATH) -> List[Rule]:
+    with open(path, encoding="utf-8") as f:
+        document = yaml.safe_load(f)
+    return [Rule(spec) for spec in validate_rules(document, source=str(path))]
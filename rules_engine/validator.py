@@ -0,0 +1,178 @@
+from typing import Dict, List, Mapping
+
+from agents.nutrition_agent import NUTRIENT_COLUMNS
+
+
+# =========================
+# RULE FILE SCHEMA
+# =========================
+FORMAT_VERSION = 1
+MAX_RULES = 63                  # one bit per rule in CompiledRules.exclusions
+
+COMPARISONS = ("above", "below")
+RULE_KEYS = {"name", "reason", "when", "exclude", "penalty"}
+
+
+def validate_rules(document, source: str = "rules.yaml") -> List[Dict]:
+    """
+    Check a parsed rules file and return its rule specs. Errors name the
+    file and rule, so a typo fails at load time instead of silently
+    matching nothing at request time.
+    """
+    if not isinstance(document, Mapping):
+        raise ValueError(f"{source}: expected a mapping with 'version' and 'rules'")
+    if document.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{source}: unsupported rules format: {document.get('version')}")
+
+    rules = document.get("rules") or []
+    if not isinstance(rules, list):
+        raise ValueError(f"{source}: 'rules' must be a list")
+    if len(rules) > MAX_RULES:
+        raise ValueError(f"{source}: at most {MAX_RULES} rules are supported")
+
+    names = set()
+    for i, rule in enumerate(rules):
+        where = f"{source}: rule {i}"
+        if not isinstance(rule, Mapping) or not rule.get("name"):
+            raise ValueError(f"{where}: every rule needs a name")
+        where = f"{source}: rule {rule['name']!r}"
+        if rule["name"] in names:
+            raise ValueError(f"{where}: duplicate name")
+        names.add(rule["name"])
+
+        unknown = set(rule) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"{where}: unknown keys {sorted(unknown)}")
+        if "exclude" not in rule and "penalty" not in rule:
+            raise ValueError(f"{where}: needs 'exclude' and/or 'penalty'")
+
+        _check_when(rule.get("when"), where)
+        if "exclude" in rule:
+            _check_predicate(rule["exclude"], f"{where}.exclude")
+        for j, term in enumerate(rule.get("penalty") or []):
+            _check_penalty(term, f"{where}.penalty[{j}]")
+
+    return list(rules)
+
+
+def _check_when(when, where: str):
+    if not isinstance(when, Mapping) or len(when) != 1:
+        raise ValueError(f"{where}: 'when' needs exactly one of restriction / profile / always")
+
+    if "restriction" in when:
+        if not isinstance(when["restriction"], str):
+            raise ValueError(f"{where}: 'restriction' must be a string")
+    elif "profile" in when:
+        fields = when["profile"]
+        if not isinstance(fields, Mapping) or not fields:
+            raise ValueError(f"{where}: 'profile' must map fields to conditions")
+        for field, condition in fields.items():
+            _check_comparison(condition, f"{where}.when.{field}", allow_params=False)
+    elif "always" not in when:
+        raise ValueError(f"{where}: unknown activation {sorted(when)}")
+
+
+def _check_predicate(spec, where: str):
+    if not isinstance(spec, Mapping):
+        raise ValueError(f"{where}: a predicate must be a mapping")
+
+    if "all" in spec or "any" in spec:
+        key = "all" if "all" in spec else "any"
+        parts = spec[key]
+        if len(spec) != 1 or not isinstance(parts, list) or not parts:
+            raise ValueError(f"{where}: '{key}' takes a non-empty list")
+        for j, part in enumerate(parts):
+            _check_predicate(part, f"{where}.{key}[{j}]")
+    elif "not" in spec:
+        if len(spec) != 1:
+            raise ValueError(f"{where}: 'not' takes a single predicate")
+        _check_predicate(spec["not"], f"{where}.not")
+    elif "name_contains" in spec or "food_type" in spec:
+        key = "name_contains" if "name_contains" in spec else "food_type"
+        values = spec[key]
+        if len(spec) != 1 or not isinstance(values, list) or not values:
+            raise ValueError(f"{where}: '{key}' takes a non-empty list")
+        if not all(isinstance(v, str) and v for v in values):
+            raise ValueError(f"{where}: '{key}' entries must be non-empty strings")
+    elif "column" in spec or "ratio" in spec:
+        _check_values(spec, where)
+        _check_comparison({k: v for k, v in spec.items() if k in COMPARISONS}, where)
+        extra = set(spec) - {"column", "ratio", *COMPARISONS}
+        if extra:
+            raise ValueError(f"{where}: unknown keys {sorted(extra)}")
+    else:
+        raise ValueError(f"{where}: unknown predicate {sorted(spec)}")
+
+
+def _check_penalty(term, where: str):
+    if not isinstance(term, Mapping) or not isinstance(term.get("weight"), (int, float)):
+        raise ValueError(f"{where}: a penalty term needs a numeric 'weight'")
+
+    if "when" in term:
+        if set(term) != {"weight", "when"}:
+            raise ValueError(f"{where}: use either 'when' or 'column'/'ratio' with 'per'")
+        _check_predicate(term["when"], f"{where}.when")
+    else:
+        _check_values(term, where)
+        if "per" not in term:
+            raise ValueError(f"{where}: a nutrient penalty needs 'per'")
+        _check_threshold(term["per"], f"{where}.per")
+        extra = set(term) - {"weight", "column", "ratio", "per"}
+        if extra:
+            raise ValueError(f"{where}: unknown keys {sorted(extra)}")
+
+
+def _check_values(spec: Mapping, where: str):
+    if "column" in spec:
+        columns = [spec["column"]]
+    elif "ratio" in spec and isinstance(spec["ratio"], list) and len(spec["ratio"]) == 2:
+        columns = spec["ratio"]
+    else:
+        raise ValueError(f"{where}: needs 'column' or a two-element 'ratio'")
+
+    for column in columns:
+        if column not in NUTRIENT_COLUMNS:
+            raise ValueError(f"{where}: unknown nutrient column {column!r}")
+
+
+def _check_comparison(condition, where: str, allow_params: bool = True):
+    if not isinstance(condition, Mapping) or len(condition) != 1 or set(condition) - set(COMPARISONS):
+        raise ValueError(f"{where}: needs exactly one of {COMPARISONS}")
+    for value in condition.values():
+        if allow_params:
+            _check_threshold(value, where)
+        elif not isinstance(value, (int, float)):
+            raise ValueError(f"{where}: threshold must be a number")
+
+
+def _check_threshold(value, where: str):
+    if isinstance(value, bool):
+        raise ValueError(f"{where}: threshold must be a number or {{param: ...}}")
+    if isinstance(value, (int, float)):
+        return
+    if (
+        isinstance(value, Mapping)
+        and isinstance(value.get("param"), str)
+        and set(value) <= {"param", "scale"}
+        and isinstance(value.get("scale", 1), (int, float))
+    ):
+        return
+    raise ValueError(f"{where}: threshold must be a number or {{param: ..., scale: ...}}")
+
+
+# =========================
+# PLAN CHECKS
+# =========================
+def plan_violations(day_plan: Dict, rules) -> Dict[str, List[str]]:
+    """
+    Rules (rules_engine.engine.CompiledRules) broken by each meal of a
+    day plan; meals that pass every rule are left out.
+    """
+    violations = {}
+    for meal, food in day_plan.items():
+        if meal == "totals" or not food:
+            continue
+        broken = rules.violations(food)
+        if broken:
+            violations[meal] = broken
+    return violations
@@ -0,0 +1,101 @@
+"""
+p50/p99 of POST /plan/day under concurrent load with a slow LLM.
+
+Compares the blocking path (run_day in a worker thread, as the old sync
+routes did) with the async route that bounds LLM calls and returns
+pending explanations. Uses scripts.fake_llm_server, no network needed.
+
+Run: python -m scripts.benchmark_async_api [--requests 400] [--concurrency 100]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter
+
+from scripts.fake_llm_server import start_server
+
+PAYLOAD = {
+    "age": 30,
+    "gender": "female",
+    "height": 162,
+    "weight": 68,
+    "activity_level": "light",
+    "goal": "fat_loss",
+    "allergies": ["peanut"]
+}
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000, 1)
+    }
+
+
+async def load(call, requests: int, concurrency: int):
+    gate = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], Counter()
+
+    async def one():
+        async with gate:
+            start = time.perf_counter()
+            status = await call()
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    elapsed = time.perf_counter() - start
+
+    return {**percentiles(latencies), "rps": round(requests / elapsed, 1), "status": dict(statuses)}
+
+
+async def main_async(args):
+    import anyio
+    import httpx
+    from fastapi import FastAPI
+    from api.routes import router, orchestrator
+
+    app = FastAPI()
+    app.include_router(router)
+
+    # Blocking path: the old sync route, run in Starlette's worker threads (40)
+    limiter = anyio.CapacityLimiter(40)
+
+    async def blocking_call():
+        await anyio.to_thread.run_sync(orchestrator.run_day, PAYLOAD, limiter=limiter)
+        return "ready"
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def async_call():
+            response = await client.post("/plan/day", json=PAYLOAD)
+            return response.json()["explanation_status"]
+
+        print("blocking run_day :", await load(blocking_call, args.requests, args.concurrency))
+        print("async /plan/day  :", await load(async_call, args.requests, args.concurrency))
+
+    print("scheduler        :", orchestrator.scheduler.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--median", type=float, default=1.0)
+    parser.add_argument("--tail", type=float, default=5.0)
+    args = parser.parse_args()
+
+    server = start_server(0, args.median, args.tail)
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
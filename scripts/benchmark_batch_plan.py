@@ -0,0 +1,98 @@
+"""
+Plans/second for a synthetic cohort: one /plan/day-style call per user
+versus a single POST /plan/batch.
+
+The cohort draws from a realistic grid (ages, rounded weights, a few
+conditions), so some users share a profile and are planned once.
+
+Run: python -m scripts.benchmark_batch_plan [--users 10000] [--horizon day]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+
+ACTIVITY_LEVELS = ["sedentary", "light", "moderate", "active", "very_active"]
+GOALS = ["fat_loss", "maintenance", "muscle_gain"]
+ALLERGIES = [[], [], [], ["peanut"], ["milk"]]
+
+
+def synthetic_cohort(users: int, seed: int = 7):
+    rng = random.Random(seed)
+    cohort = []
+    for _ in range(users):
+        cohort.append({
+            "age": rng.randint(18, 75),
+            "gender": rng.choice(["male", "female"]),
+            "height": float(rng.randrange(150, 196, 2)),
+            "weight": float(rng.randrange(45, 121)),
+            "activity_level": rng.choice(ACTIVITY_LEVELS),
+            "goal": rng.choice(GOALS),
+            "blood_sugar": rng.choice([None, None, None, "high"]),
+            "blood_pressure": rng.choice([None, None, "high"]),
+            "pcos": rng.random() < 0.05,
+            "allergies": rng.choice(ALLERGIES)
+        })
+    return cohort
+
+
+def report(name: str, users: int, elapsed: float, extra: str = ""):
+    print(f"{name:<22}: {users / elapsed:9.1f} plans/s  ({elapsed:.2f}s){extra}")
+
+
+async def http_batch(cohort, horizon: str):
+    import httpx
+    from fastapi import FastAPI
+    from api.routes import router
+
+    app = FastAPI()
+    app.include_router(router)
+
+    body = {"users": [{"user_input": user} for user in cohort], "horizon": horizon}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        start = time.perf_counter()
+        response = await client.post("/plan/batch", json=body)
+        elapsed = time.perf_counter() - start
+
+    response.raise_for_status()
+    return elapsed, response.json()["groups"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--horizon", choices=["day", "week"], default="day")
+    args = parser.parse_args()
+
+    from agents.orchestrator import NutritionOrchestrator
+    from agents.user_profile_agent import get_profile_cache
+
+    cohort = synthetic_cohort(args.users)
+    orchestrator = NutritionOrchestrator()
+    cache = get_profile_cache()
+
+    # Per-user path: what one request per user costs today (no LLM)
+    cache.clear()
+    start = time.perf_counter()
+    for user in cohort:
+        if args.horizon == "week":
+            orchestrator._plan_week(user)
+        else:
+            orchestrator._plan_day(user)
+    report("per-user requests", args.users, time.perf_counter() - start)
+
+    cache.clear()
+    start = time.perf_counter()
+    _, groups = orchestrator.plan_batch([(user, None) for user in cohort], args.horizon)
+    report("plan_batch", args.users, time.perf_counter() - start, f"  groups={groups}")
+
+    cache.clear()
+    elapsed, groups = asyncio.run(http_batch(cohort, args.horizon))
+    report("POST /plan/batch", args.users, elapsed, f"  groups={groups}")
+
+
+if __name__ == "__main__":
+    main()
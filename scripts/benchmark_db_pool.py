@@ -0,0 +1,71 @@
+"""
+Load test: candidate query latency with connect-per-call vs the pooled
+read-only connections, from many concurrent worker threads.
+
+Run: python -m scripts.benchmark_db_pool [--threads 16] [--requests 4000]
+"""
+
+import argparse
+import sqlite3
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database.db_connection import DB_PATH, get_pool_metrics
+from database.queries import get_high_protein_foods_full
+
+CANDIDATE_SQL = """
+SELECT *
+FROM foods
+WHERE protein >= ?
+  AND calories <= ?
+ORDER BY protein DESC
+LIMIT ?
+"""
+
+
+def legacy_query(min_protein, max_calories, limit):
+    """The previous implementation: open, query, close on every call"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(CANDIDATE_SQL, (min_protein, max_calories, limit))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def pooled_query(min_protein, max_calories, limit):
+    return get_high_protein_foods_full(min_protein, max_calories, limit)
+
+
+def run(fn, threads: int, requests: int):
+    def one_call(i):
+        start = time.perf_counter()
+        fn(0, 1500 + (i % 500), 50)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = sorted(pool.map(one_call, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "qps": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=4000)
+    args = parser.parse_args()
+
+    print("connect-per-call:", run(legacy_query, args.threads, args.requests))
+    print("pooled          :", run(pooled_query, args.threads, args.requests))
+    print("pool metrics    :", get_pool_metrics())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Dish-name labelling cost as the keyword lists grow: the former
+`any(k in name for k in KEYWORDS)` chain per label versus one
+KeywordMatcher pass per name, over the catalog's dish names. Extra
+keywords are random 6-letter strings split across the labels (think
+allergen synonyms or an avoid_foods list that keeps growing).
+
+Run: python -m scripts.benchmark_keyword_matcher [--max-keywords 4096]
+"""
+
+import argparse
+import random
+import string
+import time
+
+from agents.keyword_matcher import KeywordMatcher
+from agents.nutrition_agent import (
+    DISH_MATCHER,
+    get_food_catalog,
+    SPICE_KEYWORDS,
+    BEVERAGE_KEYWORDS,
+    SIDE_KEYWORDS,
+    DESSERT_KEYWORDS,
+    SNACK_KEYWORDS,
+    ALLERGEN_SYNONYMS,
+    allergen_label
+)
+
+BASE_PATTERNS = {
+    "spice": SPICE_KEYWORDS,
+    "beverage": BEVERAGE_KEYWORDS,
+    "side": SIDE_KEYWORDS,
+    "dessert": DESSERT_KEYWORDS,
+    "snack": SNACK_KEYWORDS,
+    **{allergen_label(a): synonyms for a, synonyms in ALLERGEN_SYNONYMS.items()}
+}
+
+
+def legacy_labels(patterns, names):
+    return [
+        [label for label, keywords in patterns.items() if any(k in name for k in keywords)]
+        for name in names
+    ]
+
+
+def matcher_labels(matcher, names):
+    return [matcher.names(mask) for mask in matcher.scan_many(names).tolist()]
+
+
+def grown(extra, rng):
+    patterns = {label: list(keywords) for label, keywords in BASE_PATTERNS.items()}
+    labels = list(patterns)
+    for i in range(extra):
+        patterns[labels[i % len(labels)]].append("".join(rng.choices(string.ascii_lowercase, k=6)))
+    return patterns
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-keywords", type=int, default=4096)
+    args = parser.parse_args()
+
+    names = [name.lower() for name in get_food_catalog().dish_names]
+    assert matcher_labels(DISH_MATCHER, names) == legacy_labels(BASE_PATTERNS, names)
+
+    rng = random.Random(0)
+    extra = 0
+    print(f"{len(names)} dish names")
+    while True:
+        patterns = grown(extra, rng)
+        keywords = sum(len(k) for k in patterns.values())
+        matcher, build_ms = timed(lambda: KeywordMatcher(patterns))
+        legacy, legacy_ms = timed(lambda: legacy_labels(patterns, names))
+        labelled, matcher_ms = timed(lambda: matcher_labels(matcher, names))
+        assert labelled == legacy
+        print(
+            f"keywords={keywords:5d}: any() {legacy_ms:8.2f} ms | "
+            f"matcher {matcher_ms:6.2f} ms (+{build_ms:6.2f} ms build) | "
+            f"speedup x{legacy_ms / matcher_ms:.1f}"
+        )
+        if extra >= args.max_keywords:
+            break
+        extra = max(64, extra * 4)
+
+
+if __name__ == "__main__":
+    main()
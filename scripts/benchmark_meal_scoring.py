@@ -0,0 +1,157 @@
+"""
+Micro-benchmark: per-dish Python scoring loop (the original _select_meal,
+frozen below) vs BatchMealScorer, on the real catalog and on synthetic
+dish sets. Also checks that both pick the same dish for every meal slot.
+
+Run: python -m scripts.benchmark_meal_scoring [--synthetic 100000]
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from agents.meal_planner_agent import DailyMealPlanner, MEAL_SPLIT
+from agents.nutrition_agent import DESSERT_KEYWORDS, SNACK_KEYWORDS, get_food_catalog
+
+PROFILE = {
+    "daily_calories": 1800,
+    "protein_target": 90,
+    "sugar_limit": 40,
+    "food_restrictions": ["peanut"],
+}
+
+ADJUSTMENTS = {
+    "avoid_foods": ["Paneer tikka", "Fish curry"],
+    "prefer_foods": ["dosa", "chicken"],
+}
+
+
+# Frozen copy of the original per-dish planner code (substring tests per
+# dish, no label/term caches); PROFILE has no diet rules, so it is the
+# full reference for the picks
+def legacy_meal_type(dish_name):
+    name = dish_name.lower()
+    if any(k in name for k in DESSERT_KEYWORDS):
+        return "dessert"
+    if any(k in name for k in SNACK_KEYWORDS):
+        return "snack"
+    return "main"
+
+
+def legacy_allowed(planner, food):
+    dish = food["dish_name"].lower()
+    if "peanut" in planner.food_restrictions:
+        if "peanut" in dish or "groundnut" in dish:
+            return False
+    if any(bad.lower() in dish for bad in planner.avoid_foods):
+        return False
+    return True
+
+
+def legacy_preference(planner, food):
+    dish = food["dish_name"].lower()
+    return 1 if any(p.lower() in dish for p in planner.prefer_foods) else 0
+
+
+def legacy_select(planner, foods, calorie_target, used_dishes, meal_index):
+    """The original _select_meal loop"""
+    viable = []
+    for food in foods:
+        if not legacy_allowed(planner, food):
+            continue
+        if legacy_meal_type(food["dish_name"]) != "main":
+            continue
+        if food["calories"] <= calorie_target * 1.2:
+            viable.append(food)
+
+    if not viable:
+        return {}
+
+    def score(food):
+        score = 0
+        score -= abs(food["calories"] - calorie_target)
+        score += food.get("protein", 0) * 2
+        if legacy_preference(planner, food):
+            score += 15
+        if meal_index > 0:
+            if food["dish_name"].lower() in used_dishes:
+                score -= 50
+        if food["dish_name"].lower() in planner.week_used_dishes:
+            score -= 150
+        return score
+
+    viable.sort(key=score, reverse=True)
+    chosen = viable[0]
+    used_dishes.add(chosen["dish_name"].lower())
+    return chosen
+
+
+def synthetic_foods(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    words = ["dal", "chicken", "dosa", "paneer", "rice", "curry", "fish",
+             "roti", "sabzi", "egg", "ladoo", "samosa", "tikka", "soup"]
+    return [
+        {
+            "dish_name": f"{rng.choice(words)} {rng.choice(words)} {i % 5000}",
+            "calories": round(rng.uniform(50, 900), 2),
+            "protein": round(rng.uniform(0, 45), 2),
+        }
+        for i in range(n)
+    ]
+
+
+def plan_day(select, planner, foods):
+    used, chosen = set(), []
+    for meal_index, ratio in enumerate(MEAL_SPLIT.values()):
+        meal = select(planner, foods, planner.daily_calories * ratio, used, meal_index)
+        chosen.append(meal.get("dish_name"))
+    return chosen
+
+
+def vectorized_select(planner, foods, calorie_target, used_dishes, meal_index):
+    return planner._select_meal(foods, calorie_target, used_dishes, "", meal_index)
+
+
+def bench(label: str, foods, repeats: int):
+    week_used = {f["dish_name"].lower() for f in foods[::37]}
+
+    def fresh_planner():
+        return DailyMealPlanner(PROFILE, dict(ADJUSTMENTS), set(week_used))
+
+    expected = plan_day(legacy_select, fresh_planner(), foods)
+    actual = plan_day(vectorized_select, fresh_planner(), foods)
+    assert expected == actual, (expected, actual)
+
+    timings = {}
+    for name, select in [("loop", legacy_select), ("batched", vectorized_select)]:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            plan_day(select, fresh_planner(), foods)
+        timings[name] = (time.perf_counter() - start) / repeats * 1000
+
+    print(
+        f"{label:>18} n={len(foods):>7}: loop {timings['loop']:9.3f} ms/day | "
+        f"batched {timings['batched']:8.3f} ms/day | "
+        f"speedup x{timings['loop'] / timings['batched']:.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=100_000)
+    args = parser.parse_args()
+
+    catalog = get_food_catalog()
+    all_rows = np.arange(catalog.size)
+
+    bench("planner candidates", catalog.serving_dicts(
+        catalog.meal_candidate_rows(0, PROFILE["daily_calories"], PROFILE["sugar_limit"])
+    ), repeats=200)
+    bench("full catalog", catalog.serving_dicts(all_rows), repeats=20)
+    bench("synthetic", synthetic_foods(args.synthetic), repeats=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Greedy action selection: the eager Q-network (as select_action runs it,
+Dropout active) versus the exported TorchScript policy, fp32 and
+dynamic int8, at batch sizes 1, 64 and 4096.
+
+Run: python -m scripts.benchmark_policy [--seconds 0.5] [--threads 1]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import torch
+
+from dqn_agent import DQNOrganOptimizer
+from rl.policy import Policy, inference_network
+
+BATCH_SIZES = (1, 64, 4096)
+
+
+def timed_calls(call, seconds):
+    """Run `call` for about `seconds`; return (calls, elapsed)"""
+    call()
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        call()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return calls, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=0.5)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    torch.manual_seed(0)
+    agent = DQNOrganOptimizer()
+    eval_network = inference_network(agent.model)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fp32 = Policy.load(agent.export_policy(Path(tmp) / "fp32.pt"))
+        int8 = Policy.load(agent.export_policy(Path(tmp) / "int8.pt", quantize=True))
+
+    def eager(states):
+        with torch.no_grad():
+            return agent.model(states).argmax(dim=1)
+
+    def eager_eval(states):
+        with torch.inference_mode():
+            return eval_network(states).argmax(dim=1)
+
+    variants = {
+        "eager (dropout on)": eager,
+        "eager eval": eager_eval,
+        "torchscript fp32": lambda states: fp32.evaluate(states)[0],
+        "torchscript int8": lambda states: int8.evaluate(states)[0]
+    }
+
+    # Greedy agreement with the dropout-free eager network
+    states = torch.rand(4096, agent.state_size)
+    reference = eager_eval(states)
+    for name in ("torchscript fp32", "torchscript int8"):
+        agreement = (variants[name](states) == reference).float().mean().item()
+        print(f"{name} argmax agreement with eager eval: {agreement:.2%}")
+
+    print(f"{'':>20} {'batch':>6} {'latency us':>12} {'states/s':>14}")
+    for batch in BATCH_SIZES:
+        states = torch.rand(batch, agent.state_size)
+        for name, variant in variants.items():
+            calls, elapsed = timed_calls(lambda: variant(states), args.seconds)
+            print(f"{name:>20} {batch:>6} {elapsed / calls * 1e6:>12.1f} {calls * batch / elapsed:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Day and week plans with and without the recommendation index, for a
+synthetic cohort with random feedback adjustments (avoid/prefer lists,
+lighter meals). Checks that every plan is identical and reports how
+often a slot had to fall back to the full scorer.
+
+Run: python -m scripts.benchmark_recommendation_index [--users 2000]
+"""
+
+import argparse
+import random
+import time
+
+from agents.meal_planner_agent import DailyMealPlanner
+from agents.nutrition_agent import get_food_catalog
+from agents.recommendation_index import RecommendationIndex, RecommendationSlot
+from agents.user_profile_agent import build_profiles
+from agents.weekly_planner_agent import WeeklyMealPlanner
+from scripts.benchmark_batch_plan import synthetic_cohort
+
+WORDS = ["chicken", "dal", "paneer", "egg", "rice", "fish", "dosa", "curry", "soya", "mutton"]
+
+
+def random_adjustments(rng):
+    adjustments = {}
+    if rng.random() < 0.5:
+        adjustments["avoid_foods"] = rng.sample(WORDS, rng.randint(1, 3))
+    if rng.random() < 0.5:
+        adjustments["prefer_foods"] = rng.sample(WORDS, rng.randint(1, 2))
+    if rng.random() < 0.3:
+        adjustments["meal_strategy"] = {rng.choice(["breakfast", "lunch", "dinner"]): "lighter"}
+    return adjustments or None
+
+
+def count_fallbacks():
+    """Wrap RecommendationSlot.best to count decided / undecided slots"""
+    counts = {"decided": 0, "fallback": 0}
+    best = RecommendationSlot.best
+
+    def counted(self, *args):
+        row = best(self, *args)
+        counts["fallback" if row is None else "decided"] += 1
+        return row
+
+    RecommendationSlot.best = counted
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    catalog = get_food_catalog()
+    index = RecommendationIndex.build(catalog)
+    profiles = build_profiles(synthetic_cohort(args.users))
+    adjustments = [random_adjustments(rng) for _ in profiles]
+    counts = count_fallbacks()
+
+    def days(recommendation_index):
+        return [
+            DailyMealPlanner(profile, adjustment, recommendation_index=recommendation_index).generate_day_plan()
+            for profile, adjustment in zip(profiles, adjustments)
+        ]
+
+    def weeks(recommendation_index):
+        return [
+            WeeklyMealPlanner(profile, recommendation_index=recommendation_index).generate_week_plan()
+            for profile in profiles[: max(1, args.users // 10)]
+        ]
+
+    for name, plan in (("day", days), ("week", weeks)):
+        start = time.perf_counter()
+        reference = plan(None)
+        full = time.perf_counter() - start
+
+        counts.update(decided=0, fallback=0)
+        start = time.perf_counter()
+        indexed = plan(index)
+        fast = time.perf_counter() - start
+
+        slots = counts["decided"] + counts["fallback"]
+        print(
+            f"{name:<5} plans={len(reference):<6} identical={reference == indexed}  "
+            f"full scorer {len(reference) / full:8.1f}/s  index {len(reference) / fast:8.1f}/s  "
+            f"fallback slots {counts['fallback']}/{slots}"
+        )
+
+
+if __name__ == "__main__":
+    main()
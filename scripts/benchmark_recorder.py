@@ -0,0 +1,83 @@
+"""
+Cost of the AI Insights aggregates as history grows: the former
+unbounded decision_log / loss list rescans versus rl.recorder's
+running aggregates. Also reports the memory each keeps.
+
+Run: python -m scripts.benchmark_recorder [--max-decisions 1000000]
+"""
+
+import argparse
+import random
+import timeit
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from dqn_agent import DQNOrganOptimizer
+from rl.recorder import DecisionRecorder
+
+ACTIONS = DQNOrganOptimizer().actions
+
+
+def legacy_fill(n):
+    decision_log, losses = [], []
+    for i in range(n):
+        decision_log.append({
+            "timestamp": datetime.now(), "action": ACTIONS[i % 8], "action_idx": i % 8,
+            "epsilon": 0.1, "q_value": None if i % 3 else 0.5
+        })
+        losses.append(random.random())
+    return decision_log, losses
+
+
+def legacy_aggregates(decision_log, losses):
+    """What render_ai_insights_tab computed on every rerun"""
+    action_counts = {}
+    for decision in decision_log:
+        action_counts[decision["action"]] = action_counts.get(decision["action"], 0) + 1
+    return action_counts, len(decision_log), decision_log[-8:], list(range(len(losses))), list(losses)
+
+
+def recorder_fill(n):
+    recorder = DecisionRecorder(ACTIONS)
+    for i in range(n):
+        recorder.record_decision(i % 8, 0.1, None if i % 3 else 0.5)
+        recorder.record_reward(random.random())
+        recorder.record_loss(random.random())
+    return recorder
+
+
+def recorder_aggregates(recorder):
+    return (recorder.action_histogram(), recorder.total_decisions, recorder.recent_decisions(8),
+            recorder.loss_series(), recorder.mean_reward, recorder.recent_mean_reward(5))
+
+
+def traced(fill, n):
+    tracemalloc.start()
+    result = fill(n)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-decisions", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'decisions':>10} {'legacy ms':>10} {'recorder ms':>12} {'legacy MB':>10} {'recorder MB':>12}")
+    n = 1000
+    while n <= args.max_decisions:
+        (log, losses), legacy_bytes = traced(legacy_fill, n)
+        recorder, recorder_bytes = traced(recorder_fill, n)
+        legacy = min(timeit.repeat(lambda: legacy_aggregates(log, losses), number=3, repeat=3)) / 3
+        current = min(timeit.repeat(lambda: recorder_aggregates(recorder), number=50, repeat=3)) / 50
+        print(f"{n:>10,} {legacy * 1e3:>10.3f} {current * 1e3:>12.3f} "
+              f"{legacy_bytes / 2**20:>10.1f} {recorder_bytes / 2**20:>12.2f}")
+        del log, losses, recorder
+        n *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Per-update time of DQNOrganOptimizer.replay(): the former deque +
+random.sample + torch.cat path versus rl.memory_buffer.ReplayBuffer
+(uniform and prioritized). Also times minibatch assembly on its own.
+
+Run: python -m scripts.benchmark_replay [--updates 2000] [--batch-size 32]
+"""
+
+import argparse
+import random
+import time
+from collections import deque
+
+import torch
+
+from config import DQN_CONFIG
+from dqn_agent import DQNOrganOptimizer
+
+
+def legacy_batch(memory, batch_size, device):
+    """Minibatch assembly as replay() did it before the buffer"""
+    batch = random.sample(memory, batch_size)
+    states, actions, rewards, next_states, dones = zip(*batch)
+    return (
+        torch.cat(states).to(device),
+        torch.LongTensor(actions).unsqueeze(1).to(device),
+        torch.FloatTensor(rewards).unsqueeze(1).to(device),
+        torch.cat(next_states).to(device),
+        torch.FloatTensor(dones).unsqueeze(1).to(device)
+    )
+
+
+def legacy_replay(agent, memory):
+    states, actions, rewards, next_states, dones = legacy_batch(memory, agent.batch_size, agent.device)
+
+    current_q = agent.model(states).gather(1, actions)
+    with torch.no_grad():
+        next_q = agent.target_model(next_states).max(1)[0].unsqueeze(1)
+        target_q = rewards + (1 - dones) * agent.gamma * next_q
+
+    loss = agent.criterion(current_q, target_q)
+    agent.optimizer.zero_grad()
+    loss.backward()
+    torch.nn.utils.clip_grad_norm_(agent.model.parameters(), 1.0)
+    agent.optimizer.step()
+    return loss.item()
+
+
+def filled_agent(prioritized, transitions):
+    DQN_CONFIG["prioritized_replay"] = prioritized
+    agent = DQNOrganOptimizer()
+    for state, action, reward, next_state, done in transitions:
+        agent.store_transition(state, action, reward, next_state, done)
+    return agent
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=DQN_CONFIG["batch_size"])
+    args = parser.parse_args()
+
+    DQN_CONFIG["batch_size"] = args.batch_size
+    torch.manual_seed(0)
+    random.seed(0)
+
+    size = DQN_CONFIG["state_size"]
+    transitions = [
+        (torch.rand(1, size), random.randrange(DQN_CONFIG["action_size"]), random.uniform(-5, 5),
+         torch.rand(1, size), False)
+        for _ in range(DQN_CONFIG["memory_size"])
+    ]
+
+    legacy = filled_agent(False, [])
+    memory = deque(transitions, maxlen=DQN_CONFIG["memory_size"])
+    uniform = filled_agent(False, transitions)
+    prioritized = filled_agent(True, transitions)
+
+    print("minibatch assembly (us)")
+    print(f"  deque + torch.cat : {per_call_us(lambda: legacy_batch(memory, args.batch_size, legacy.device), args.updates):8.1f}")
+    print(f"  buffer, uniform   : {per_call_us(lambda: uniform.memory.sample(args.batch_size), args.updates):8.1f}")
+    print(f"  buffer, PER       : {per_call_us(lambda: prioritized.memory.sample(args.batch_size), args.updates):8.1f}")
+
+    print("full replay() update (us)")
+    print(f"  deque + torch.cat : {per_call_us(lambda: legacy_replay(legacy, memory), args.updates):8.1f}")
+    print(f"  buffer, uniform   : {per_call_us(uniform.replay, args.updates):8.1f}")
+    print(f"  buffer, PER       : {per_call_us(prioritized.replay, args.updates):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Dish similarity search: recall@k and queries/second of the NumPy and
+FAISS (when installed) indexes against a brute-force scan, on the real
+catalog and on a synthetic catalog of standardized nutrient vectors,
+unfiltered and with a row filter keeping ~10% of the dishes.
+
+Run: python -m scripts.benchmark_retrieval [--synthetic 100000] [--k 10]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from agents.nutrition_agent import get_food_catalog
+from retrieval.embedder import NutrientEmbedder
+from retrieval.faiss_index import build_index, faiss
+
+
+def brute_force(vectors, queries, k, allowed=None):
+    distances = (
+        np.einsum("ij,ij->i", vectors, vectors)[None, :] - 2 * queries @ vectors.T
+    )
+    if allowed is not None:
+        distances[:, ~allowed] = np.inf
+    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(nearest, order, axis=1)
+
+
+def recall(found, truth):
+    hits = [len(set(f[f >= 0].tolist()) & set(t.tolist())) for f, t in zip(found, truth)]
+    return sum(hits) / truth.size
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    result = fn()
+    return result, len(queries) / (time.perf_counter() - start)
+
+
+def run(name, vectors, queries, k, nprobes):
+    print(f"{name}: {len(vectors)} vectors x {vectors.shape[1]}, {len(queries)} queries, k={k}")
+    allowed = np.random.default_rng(1).random(len(vectors)) < 0.1
+
+    for label, mask in (("unfiltered", None), ("10% filter", allowed)):
+        truth, qps = timed(lambda: brute_force(vectors, queries, k, mask), queries)
+        print(f"  {label:<11} brute force         recall 1.000  {qps:9.0f} q/s")
+
+        for backend in ["numpy"] + (["faiss"] if faiss is not None else []):
+            index = build_index(vectors, backend=backend)
+            for nprobe in nprobes if index.nlist > 1 else [None]:
+                (_, rows), qps = timed(lambda: index.search(queries, k, allowed=mask, nprobe=nprobe), queries)
+                probe = f"nprobe={nprobe or index.nprobe}/{index.nlist}"
+                print(f"  {label:<11} {backend:<6} {probe:<12} recall {recall(rows, truth):.3f}  {qps:9.0f} q/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    catalog = get_food_catalog()
+    vectors = NutrientEmbedder.fit(catalog).embed_catalog(catalog)
+    queries = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+    run("catalog", vectors, queries, args.k, [None])
+
+    # Synthetic dishes: perturbed copies of real ones, so clusters look alike
+    base = vectors[rng.integers(0, len(vectors), args.synthetic)]
+    synthetic = (base + 0.3 * rng.standard_normal(base.shape)).astype(np.float32)
+    queries = synthetic[rng.choice(len(synthetic), args.queries, replace=False)]
+    queries = (queries + 0.1 * rng.standard_normal(queries.shape)).astype(np.float32)
+    run("synthetic", synthetic, queries, args.k, [None, 4, 16, 64])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+DQNOrganOptimizer.get_state: the former list-building version versus
+rl.state_encoder.StateEncoder, one twin at a time and in batches.
+Also checks that both produce the same float32 features.
+
+Run: python -m scripts.benchmark_state_encoder [--twins 1024] [--repeat 5]
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+import torch
+
+from config import DEFAULT_NUTRIENTS
+from dqn_agent import DQNOrganOptimizer
+from organ_twin import OrganDigitalTwin
+from rl.state_encoder import STATE_NUTRIENTS
+
+ORGAN_ORDER = [
+    "heart", "lungs", "brain", "kidneys", "pancreas",
+    "liver", "gut", "skin", "immune", "muscles"
+]
+
+
+def legacy_state(organ_twin, nutrients, state_size=23, device="cpu"):
+    """get_state as it was before the encoder"""
+    organ_health = []
+    for organ_name in ORGAN_ORDER:
+        if organ_name in organ_twin.organs:
+            organ_health.append(organ_twin.organs[organ_name]["health"])
+        else:
+            organ_health.append(0.5)
+
+    nutrient_features = [
+        nutrients.get('calories', 0) / 1000,
+        nutrients.get('carbs', 0) / 200,
+        nutrients.get('protein', 0) / 100,
+        nutrients.get('fat', 0) / 100,
+        nutrients.get('sugar', 0) / 100,
+        nutrients.get('fiber', 0) / 50,
+        nutrients.get('sodium', 0) / 5000,
+        nutrients.get('calcium', 0) / 2000,
+        nutrients.get('iron', 0) / 50
+    ]
+
+    organ_health_array = np.array(organ_health)
+    health_metrics = [
+        organ_twin.get_overall_health(),
+        len([h for h in organ_health if h < 0.6]) / len(organ_health),
+        np.std(organ_health_array) if len(organ_health_array) > 1 else 0.1,
+        min(organ_health) if organ_health else 0.5
+    ]
+
+    state_vector = organ_health + nutrient_features + health_metrics
+    return torch.FloatTensor(state_vector[:state_size]).unsqueeze(0).to(device)
+
+
+def random_pairs(count, seed=0):
+    rng = np.random.default_rng(seed)
+    pairs = []
+    for _ in range(count):
+        twin = OrganDigitalTwin()
+        for organ in twin.organs.values():
+            organ["health"] = float(rng.uniform(0.1, 1.0))
+        meal = {name: value * float(rng.uniform(0.5, 1.5)) for name, value in DEFAULT_NUTRIENTS.items()}
+        pairs.append((twin, meal))
+    return pairs
+
+
+def best_us(fn, number, repeat):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--twins", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    agent = DQNOrganOptimizer()
+    pairs = random_pairs(args.twins)
+
+    reference = torch.cat([legacy_state(twin, meal) for twin, meal in pairs])
+    batched = agent.get_states(pairs)
+    single = torch.cat([agent.get_state(twin, meal) for twin, meal in pairs])
+    print(f"identical features: batch {torch.equal(reference, batched)}, single {torch.equal(reference, single)}")
+
+    twin, meal = pairs[0]
+    out = agent.state_encoder.output(1)
+    print("one twin (us/state)")
+    print(f"  legacy get_state      : {best_us(lambda: legacy_state(twin, meal), 2000, args.repeat):8.2f}")
+    print(f"  encoder, new tensor   : {best_us(lambda: agent.get_state(twin, meal), 2000, args.repeat):8.2f}")
+    print(f"  encoder, preallocated : {best_us(lambda: agent.get_state(twin, meal, out), 2000, args.repeat):8.2f}")
+
+    print(f"batch of {args.twins} (us/state)")
+    out = agent.state_encoder.output(args.twins)
+    legacy = best_us(lambda: torch.cat([legacy_state(t, m) for t, m in pairs]), 3, args.repeat)
+    encoder = best_us(lambda: agent.get_states(pairs, out), 3, args.repeat)
+    print(f"  legacy loop + cat     : {legacy / args.twins:8.2f}")
+    print(f"  get_states            : {encoder / args.twins:8.2f}")
+
+    health = np.array([[t.organs[name]["health"] for name in ORGAN_ORDER] for t, _ in pairs])
+    nutrients = np.array([[m[name] for name in STATE_NUTRIENTS] for _, m in pairs])
+    arrays = best_us(lambda: agent.state_encoder.encode_arrays(health, nutrients, out=out), 20, args.repeat)
+    print(f"  encode_arrays         : {arrays / args.twins:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
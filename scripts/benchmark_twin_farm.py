@@ -0,0 +1,62 @@
+"""
+Speedup of TwinFarm over worker counts on a fixed meal workload
+(default 1M meals: 10k twins x 100 hourly meals), and a check that
+every worker count produces bit-identical state for the same seed.
+
+Run: python -m scripts.benchmark_twin_farm [--twins 10000] [--hours 100] [--max-workers N]
+"""
+
+import argparse
+import hashlib
+import os
+import time
+
+from config import DEFAULT_NUTRIENTS
+from twin_farm import TwinFarm
+from twin_population import TwinPopulation
+
+
+def rollout(args, workers):
+    meals = TwinPopulation(1).nutrient_matrix([
+        DEFAULT_NUTRIENTS,
+        dict(DEFAULT_NUTRIENTS, sugar=40.0, sodium=1200.0),
+        dict(DEFAULT_NUTRIENTS, fiber=15.0, fat=4.0)
+    ])
+
+    with TwinFarm(args.twins, seed=args.seed, workers=workers, shard_size=args.shard_size) as farm:
+        # Start the pool outside the timed region
+        farm.executor.submit(int).result()
+
+        start = time.perf_counter()
+        summary = farm.run(args.hours, meals, portion_g=150)
+        elapsed = time.perf_counter() - start
+
+        digest = hashlib.sha256(farm.health.tobytes() + farm.returns.tobytes()).hexdigest()[:16]
+    return summary, elapsed, digest
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--twins", type=int, default=10_000)
+    parser.add_argument("--hours", type=int, default=100)
+    parser.add_argument("--shard-size", type=int, default=1024)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workers, baseline, digests = 1, None, set()
+    while workers <= args.max_workers:
+        summary, elapsed, digest = rollout(args, workers)
+        baseline = baseline or elapsed
+        digests.add(digest)
+        print(
+            f"{workers:>3} workers: {summary['meals'] / elapsed:12,.0f} meals/s"
+            f"  {elapsed:6.2f}s  speedup {baseline / elapsed:4.1f}x  state {digest}"
+        )
+        workers *= 2
+
+    print("identical across worker counts:", len(digests) == 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Meals/second for TwinPopulation from 1 to 100k twins, next to the
+single-object OrganDigitalTwin loop.
+
+Run: python -m scripts.benchmark_twin_population [--max-twins 100000] [--seconds 0.5]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from config import DEFAULT_NUTRIENTS
+from organ_twin import OrganDigitalTwin
+from twin_population import TwinPopulation
+
+
+def timed_steps(step, seconds: float) -> tuple:
+    """Run `step` repeatedly for about `seconds`; return (steps, elapsed)"""
+    steps = 0
+    start = time.perf_counter()
+    while True:
+        step()
+        steps += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return steps, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-twins", type=int, default=100_000)
+    parser.add_argument("--seconds", type=float, default=0.5)
+    args = parser.parse_args()
+
+    twin = OrganDigitalTwin()
+    steps, elapsed = timed_steps(lambda: twin.simulate_meal_impact(DEFAULT_NUTRIENTS), args.seconds)
+    print(f"{'OrganDigitalTwin':>16}: {steps / elapsed:14,.0f} meals/s")
+
+    size = 1
+    while size <= args.max_twins:
+        population = TwinPopulation(size, seed=0)
+        rng = np.random.default_rng(0)
+
+        # Per-twin meals: default meal scaled by a random factor
+        base = population.nutrient_matrix([DEFAULT_NUTRIENTS])
+        meals = base * rng.uniform(0.5, 1.5, (size, 1)).astype(np.float32)
+        portions = rng.uniform(50, 400, size).astype(np.float32)
+
+        steps, elapsed = timed_steps(lambda: population.apply_meals(meals, portions), args.seconds)
+        print(
+            f"{size:>9,} twins: {steps * size / elapsed:14,.0f} meals/s"
+            f"  ({elapsed / steps * 1000:.3f} ms/step, mean health {population.overall_health().mean():.3f})"
+        )
+        size *= 10
+
+
+if __name__ == "__main__":
+    main()
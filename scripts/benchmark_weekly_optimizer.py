@@ -0,0 +1,69 @@
+"""
+Weekly plans for a synthetic cohort: the greedy day-by-day planner versus
+the joint week optimizer with each installed solver. Reports latency
+(mean / p95) and plan quality on the optimizer's own objective: repeated
+dishes, days outside the calorie band, free sugar over the limit and the
+weekly protein / fibre shortfall.
+
+Run: python -m scripts.benchmark_weekly_optimizer [--users 20] [--budget 0.5]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from agents.user_profile_agent import build_profiles
+from agents.weekly_optimizer import OPTIMIZER_TIME_BUDGET, SOLVERS
+from agents.weekly_planner_agent import WeeklyMealPlanner
+from scripts.benchmark_batch_plan import synthetic_cohort
+
+METRICS = [
+    "objective", "repeats", "days_outside_band", "calorie_band_kcal", "sugar_over_g",
+    "protein_shortfall_g", "fibre_shortfall_g"
+]
+
+
+def run(profiles, **planner_args):
+    """Latencies (ms) and the quality breakdown of each profile's week"""
+    latencies, quality, solvers = [], [], {}
+    for profile in profiles:
+        planner = WeeklyMealPlanner(profile, **planner_args)
+        start = time.perf_counter()
+        week = planner.generate_week_plan()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        problem = WeeklyMealPlanner(profile).week_problem(week)
+        quality.append(problem.breakdown(WeeklyMealPlanner.assignment_of(problem, week)))
+        used = week["weekly_summary"].get("solver", "greedy")
+        solvers[used] = solvers.get(used, 0) + 1
+    return np.array(latencies), quality, solvers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--budget", type=float, default=OPTIMIZER_TIME_BUDGET)
+    args = parser.parse_args()
+
+    # build_profiles returns one shared object per distinct profile
+    profiles = list({id(p): p for p in build_profiles(synthetic_cohort(args.users))}.values())
+    installed = [name for name, (available, _) in SOLVERS.items() if available()]
+    print(f"{len(profiles)} profiles, budget {args.budget}s, installed solvers: {installed or 'none'}")
+
+    modes = [("greedy", {"mode": "greedy"})] + [
+        (solver, {"mode": "optimal", "solver": solver, "time_budget": args.budget})
+        for solver in ["auto"] + installed + ["local"]
+    ]
+    for label, planner_args in modes:
+        latencies, quality, solvers = run(profiles, **planner_args)
+        means = {key: np.mean([q[key] for q in quality]) for key in METRICS}
+        print(
+            f"{label:<7} mean {latencies.mean():8.1f} ms  p95 {np.percentile(latencies, 95):8.1f} ms | "
+            + "  ".join(f"{key} {value:.1f}" for key, value in means.items())
+            + f" | {solvers}"
+        )
+
+
+if __name__ == "__main__":
+    main()
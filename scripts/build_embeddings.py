@@ -0,0 +1,58 @@
+"""
+Embed every dish name in the foods table, offline and without network.
+
+Writes data/processed/name_embeddings/: a float16 matrix of unit name
+vectors, their norms, and the ID map (food ids + dish_name hashes).
+Re-running only embeds rows whose dish_name changed or that are new.
+
+Run: python -m scripts.build_embeddings [--full] [--chunk-size 256]
+     python -m scripts.build_embeddings --sentence-model all-MiniLM-L6-v2
+     (the model must already be in the local sentence-transformers cache)
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from agents.nutrition_agent import get_food_catalog
+from retrieval.embedder import (
+    EMBED_CHUNK_SIZE,
+    NAME_EMBEDDINGS_DIR,
+    NameEmbeddings,
+    NgramEmbedder,
+    SentenceEmbedder
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", type=Path, default=NAME_EMBEDDINGS_DIR)
+    parser.add_argument("--chunk-size", type=int, default=EMBED_CHUNK_SIZE)
+    parser.add_argument("--sentence-model", help="use a locally cached sentence-transformers model")
+    parser.add_argument("--full", action="store_true", help="re-embed every row")
+    args = parser.parse_args()
+
+    embedder = SentenceEmbedder(args.sentence_model) if args.sentence_model else NgramEmbedder()
+    catalog = get_food_catalog()
+    previous = None if args.full else NameEmbeddings.load(args.path, mmap=False, embedder=embedder)
+    if previous is not None and previous.embedder_name != embedder.name:
+        print(f"stored embeddings are {previous.embedder_name}: re-embedding every row")
+
+    def progress(done, total):
+        print(f"  embedded {done}/{total}")
+
+    start = time.perf_counter()
+    embeddings = NameEmbeddings.build(
+        catalog, embedder, previous=previous, chunk_size=args.chunk_size, progress=progress
+    )
+    embeddings.save(args.path)
+
+    print(
+        f"{len(embeddings.ids)} dishes, {embeddings.embedded} embedded, "
+        f"{len(embeddings.ids) - embeddings.embedded} reused ({embedder.name}) "
+        f"in {time.perf_counter() - start:.2f}s -> {args.path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Build (or refresh) the recommendation index next to nutrition.db.
+
+An existing index is reused bucket by bucket: only buckets whose
+candidate dishes changed since it was written are re-ranked, so running
+this after editing the `foods` table is cheap.
+
+Run: python -m scripts.build_recommendation_index [--full] [--path FILE]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from agents.nutrition_agent import get_food_catalog
+from agents.recommendation_index import INDEX_PATH, RecommendationIndex
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", type=Path, default=INDEX_PATH)
+    parser.add_argument("--full", action="store_true", help="ignore the existing index")
+    args = parser.parse_args()
+
+    catalog = get_food_catalog()
+    start = time.perf_counter()
+
+    previous = None
+    if args.path.exists() and not args.full:
+        previous = RecommendationIndex.load(catalog, args.path)
+    index = RecommendationIndex.build(catalog, previous=previous)
+    index.save(args.path)
+
+    print(
+        f"{len(index.buckets)} buckets ({index.rebuilt} ranked, {index.reused} reused) "
+        f"in {time.perf_counter() - start:.2f}s -> {args.path} "
+        f"({args.path.stat().st_size / 1024:.1f} KiB)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Local OpenAI/Groq-compatible chat completion server with injected latency.
+Used to load-test the explanation path without calling Groq.
+
+Run: python -m scripts.fake_llm_server [--port 8099] [--median 1.5] [--tail 6]
+Then: GROQ_API_KEY=fake GROQ_BASE_URL=http://127.0.0.1:8099 uvicorn ...
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    median_latency = 1.5    # seconds
+    tail_latency = 6.0      # seconds, hit by ~5% of calls
+    tail_ratio = 0.05
+
+    def log_message(self, *args):
+        pass
+
+    def _latency(self) -> float:
+        if random.random() < self.tail_ratio:
+            return self.tail_latency
+        return random.lognormvariate(0, 0.25) * self.median_latency
+
+    def _stream(self, text: str, model: str):
+        """Server-sent events in the OpenAI chunk format"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        for word in text.split(" "):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": {"content": word + " "}, "finish_reason": None}
+                ]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(0.02)
+
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        model = body.get("model", "fake")
+
+        time.sleep(self._latency())
+        text = "This plan keeps calories on target and spreads protein across meals."
+
+        if body.get("stream"):
+            self._stream(text, model)
+            return
+
+        payload = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop"
+                }
+            ],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_server(port: int = 0, median: float = 1.5, tail: float = 6.0) -> ThreadingHTTPServer:
+    """Start the fake server in a daemon thread; returns the bound server"""
+    FakeLLMHandler.median_latency = median
+    FakeLLMHandler.tail_latency = tail
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeLLMHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--median", type=float, default=1.5)
+    parser.add_argument("--tail", type=float, default=6.0)
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.median, args.tail)
+    print(f"Fake LLM listening on http://127.0.0.1:{server.server_address[1]}")
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
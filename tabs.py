@@ -106,15 +106,15 @@ def render_organ_analytics_tab():
             """, unsafe_allow_html=True)
             
             # Health trend
-            if st.session_state.digital_twin.history[selected_organ]:
-                history_data = list(st.session_state.digital_twin.history[selected_organ])
-                if history_data:
-                    trend_df = pd.DataFrame(history_data)
-                    
-                    if not trend_df.empty and 'timestamp' in trend_df.columns and 'health' in trend_df.columns:
-                        fig_trend = px.line(trend_df, x="timestamp", y="health",
-                                          title=f"{selected_organ.title()} Health Trend")
-                        st.plotly_chart(fig_trend, use_container_width=True)
+            organ_history = st.session_state.digital_twin.history[selected_organ]
+            if organ_history:
+                # Columns straight from the twin's ring buffer, no per-row dicts
+                trend_df = organ_history.to_frame()
+                
+                if not trend_df.empty:
+                    fig_trend = px.line(trend_df, x="timestamp", y="health",
+                                      title=f"{selected_organ.title()} Health Trend")
+                    st.plotly_chart(fig_trend, use_container_width=True)
         
         with col2:
             # Metrics dashboard
@@ -185,36 +185,40 @@ def render_ai_insights_tab():
         </div>
         """, unsafe_allow_html=True)
         
-        # Agent learning progress
+        # Agent learning progress - O(1) aggregates kept by the agent's recorder
+        agent = st.session_state.dqn_agent
+        recorder = agent.recorder
         st.subheader(" DQN Learning Progress")
         
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("Exploration Rate", f"{st.session_state.dqn_agent.epsilon:.3f}")
+            st.metric("Exploration Rate", f"{agent.epsilon:.3f}")
         with col2:
-            st.metric("Memory Size", len(st.session_state.dqn_agent.memory))
+            st.metric("Memory Size", len(agent.memory))
         with col3:
-            st.metric("Decisions Made", len(st.session_state.dqn_agent.decision_log))
+            st.metric("Decisions Made", recorder.total_decisions)
         with col4:
-            avg_reward = np.mean([m.get('reward', 0) for m in st.session_state.meal_history[-5:]]) if st.session_state.meal_history else 0
-            st.metric("Avg Reward (last 5)", f"{avg_reward:.3f}")
+            st.metric(
+                "Avg Reward (last 5)",
+                f"{recorder.recent_mean_reward(5):.3f}",
+                f"{recorder.mean_reward:+.3f} overall",
+                delta_color="off"
+            )
         
-        # Training loss chart
-        if st.session_state.training_loss_history:
+        # Training loss chart (downsampled to a fixed number of points)
+        if recorder.losses.count:
             st.subheader(" Training Loss Over Time")
-            loss_df = pd.DataFrame({
-                'Step': range(len(st.session_state.training_loss_history)),
-                'Loss': st.session_state.training_loss_history
-            })
+            steps, losses = recorder.loss_series()
+            loss_df = pd.DataFrame({'Step': steps, 'Loss': losses})
             fig_loss = px.line(loss_df, x='Step', y='Loss', 
-                             title='DQN Training Loss (Lower is Better)')
+                             title=f'DQN Training Loss (Lower is Better) - EMA {recorder.loss_ema:.4f}')
             st.plotly_chart(fig_loss, use_container_width=True)
         
         # Decision history
-        if st.session_state.dqn_agent.decision_log:
+        if recorder.total_decisions:
             st.subheader(" Recent Decisions")
             
-            recent_decisions = st.session_state.dqn_agent.decision_log[-8:]
+            recent_decisions = recorder.recent_decisions(8)
             for decision in reversed(recent_decisions):
                 q_display = f"Q: {decision.get('q_value', 0):.3f}" if decision.get('q_value') is not None else "Exploration"
                 st.markdown(f"""
@@ -226,11 +230,8 @@ def render_ai_insights_tab():
         
         # Action distribution
         st.subheader(" Action Distribution")
-        if st.session_state.dqn_agent.decision_log:
-            action_counts = {}
-            for decision in st.session_state.dqn_agent.decision_log:
-                action = decision['action']
-                action_counts[action] = action_counts.get(action, 0) + 1
+        if recorder.total_decisions:
+            action_counts = recorder.action_histogram()
             
             action_df = pd.DataFrame({
                 'Action': list(action_counts.keys()),
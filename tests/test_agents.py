@@ -0,0 +1,534 @@
+import copy
+import json
+import os
+import pickle
+import random
+import shutil
+import sqlite3
+
+import numpy as np
+import pytest
+
+from agents import nutrition_agent
+from agents.keyword_matcher import KeywordMatcher, term_matcher
+from agents.meal_planner_agent import MEAL_SPLIT, BatchMealScorer, DailyMealPlanner
+from agents.nutrition_agent import (
+    ALLERGEN_SYNONYMS,
+    BEVERAGE_KEYWORDS,
+    DESSERT_KEYWORDS,
+    DISH_MATCHER,
+    SIDE_KEYWORDS,
+    SNACK_KEYWORDS,
+    SPICE_KEYWORDS,
+    allergen_label,
+    get_food_catalog
+)
+from agents.recommendation_index import RecommendationIndex
+from agents.user_profile_agent import (
+    FrozenProfile,
+    UserProfileAgent,
+    build_profiles,
+    get_profile,
+    get_profile_cache,
+    profile_key
+)
+from database import db_connection
+
+PROFILE = {
+    "daily_calories": 1800,
+    "protein_target": 90,
+    "sugar_limit": 40,
+    "food_restrictions": ["peanut"],
+}
+
+ADJUSTMENTS = [
+    {},
+    {"avoid_foods": ["Paneer tikka", "Fish curry"], "prefer_foods": ["dosa", "chicken"]},
+    {"avoid_foods": ["rice", "DAL"], "prefer_foods": ["Idli"]},
+]
+
+
+# =========================
+# REFERENCE: ORIGINAL PER-DISH SCORING
+# =========================
+# The planner's original _is_food_allowed / _preference_score / _select_meal
+# loop, kept verbatim so BatchMealScorer is checked against the behaviour
+# it replaced rather than against itself
+def reference_allowed(food, food_restrictions, avoid_foods):
+    dish = food["dish_name"].lower()
+    if "peanut" in food_restrictions:
+        if "peanut" in dish or "groundnut" in dish:
+            return False
+    if any(bad.lower() in dish for bad in avoid_foods):
+        return False
+    return True
+
+
+def reference_meal_type(dish_name):
+    name = dish_name.lower()
+    if any(k in name for k in DESSERT_KEYWORDS):
+        return "dessert"
+    if any(k in name for k in SNACK_KEYWORDS):
+        return "snack"
+    return "main"
+
+
+def reference_select(foods, adjustments, week_used, calorie_target, used_dishes, meal_index):
+    avoid_foods = adjustments.get("avoid_foods", [])
+    prefer_foods = adjustments.get("prefer_foods", [])
+
+    viable = [
+        food for food in foods
+        if reference_allowed(food, PROFILE["food_restrictions"], avoid_foods)
+        and reference_meal_type(food["dish_name"]) == "main"
+        and food["calories"] <= calorie_target * 1.2
+    ]
+    if not viable:
+        return {}
+
+    def score(food):
+        dish = food["dish_name"].lower()
+        score = 0
+        score -= abs(food["calories"] - calorie_target)
+        score += food.get("protein", 0) * 2
+        if any(p.lower() in dish for p in prefer_foods):
+            score += 15
+        if meal_index > 0 and dish in used_dishes:
+            score -= 50
+        if dish in week_used:
+            score -= 150
+        return score
+
+    viable.sort(key=score, reverse=True)
+    return viable[0]
+
+
+def synthetic_foods(n, seed=7):
+    rng = random.Random(seed)
+    words = ["dal", "chicken", "dosa", "paneer", "rice", "curry", "fish", "peanut",
+             "roti", "sabzi", "egg", "ladoo", "samosa", "tikka", "soup", "idli"]
+    return [
+        {
+            "dish_name": f"{rng.choice(words).title()} {rng.choice(words)} {i % 50}",
+            "calories": round(rng.uniform(50, 900), 2),
+            "protein": round(rng.uniform(0, 45), 2),
+        }
+        for i in range(n)
+    ]
+
+
+def catalog_foods():
+    catalog = get_food_catalog()
+    return catalog.serving_dicts(np.arange(catalog.size))
+
+
+# =========================
+# BATCH MEAL SCORING (user-003)
+# =========================
+@pytest.mark.parametrize("adjustments", ADJUSTMENTS)
+@pytest.mark.parametrize("source", ["catalog", "synthetic"])
+def test_batch_scorer_matches_reference_loop(source, adjustments):
+    foods = catalog_foods() if source == "catalog" else synthetic_foods(3000)
+    catalog = get_food_catalog() if source == "catalog" else None
+    week_used = {f["dish_name"].lower() for f in foods[::37]}
+
+    scorer = BatchMealScorer(
+        foods,
+        PROFILE["food_restrictions"],
+        adjustments.get("avoid_foods", []),
+        adjustments.get("prefer_foods", []),
+        week_used,
+        catalog=catalog
+    )
+
+    for daily_calories in (1200, 1800, 2600):
+        used_expected, used_actual = set(), set()
+        for meal_index, ratio in enumerate(MEAL_SPLIT.values()):
+            target = daily_calories * ratio
+            expected = reference_select(foods, adjustments, week_used, target, used_expected, meal_index)
+            best = scorer.best(target, used_actual, meal_index)
+            actual = foods[best] if best >= 0 else {}
+            assert actual == expected
+
+            if expected:
+                used_expected.add(expected["dish_name"].lower())
+                used_actual.add(actual["dish_name"].lower())
+
+
+@pytest.mark.parametrize("adjustments", ADJUSTMENTS)
+def test_day_plan_matches_reference_loop(adjustments):
+    foods = synthetic_foods(2000, seed=3)
+    week_used = {f["dish_name"].lower() for f in foods[::11]}
+    planner = DailyMealPlanner(
+        PROFILE, dict(adjustments), set(week_used), meal_candidates=foods
+    )
+    assert planner.rules is None
+
+    plan = planner.generate_day_plan()
+    used = set()
+    for meal_index, (meal, ratio) in enumerate(MEAL_SPLIT.items()):
+        expected = reference_select(
+            foods, adjustments, week_used, PROFILE["daily_calories"] * ratio, used, meal_index
+        )
+        assert plan[meal] == expected
+        used.add(expected["dish_name"].lower())
+
+
+# =========================
+# RECOMMENDATION INDEX (user-020)
+# =========================
+@pytest.fixture(scope="module")
+def recommendation_index():
+    # Built in memory: the test must not write data/processed/
+    return RecommendationIndex.build(get_food_catalog())
+
+
+def cohort_plans(count, seed):
+    """Varied profiles (conditions, allergies, goals) with avoid/prefer lists"""
+    rng = random.Random(seed)
+    users = [
+        {
+            "age": rng.randint(18, 75),
+            "gender": rng.choice(["male", "female"]),
+            "height": float(rng.randrange(150, 196, 2)),
+            "weight": float(rng.randrange(45, 121)),
+            "activity_level": rng.choice(["sedentary", "light", "moderate", "active"]),
+            "goal": rng.choice(["fat_loss", "maintenance", "muscle_gain"]),
+            "blood_sugar": rng.choice([None, "high"]),
+            "blood_pressure": rng.choice([None, "high"]),
+            "pcos": rng.random() < 0.2,
+            "thyroid": rng.random() < 0.2,
+            "digestive_issues": rng.choice([None, None, "ibs"]),
+            "allergies": rng.choice([[], [], ["peanut"]])
+        }
+        for _ in range(count)
+    ]
+    terms = ["rice", "chicken", "dal", "paneer", "egg", "idli", "dosa", "Roti", "fish"]
+    for profile in build_profiles(users):
+        yield profile, {
+            "avoid_foods": rng.sample(terms, rng.randint(0, 2)),
+            "prefer_foods": rng.sample(terms, rng.randint(0, 2))
+        }
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_index_plans_match_unindexed_plans(recommendation_index, seed):
+    for profile, adjustments in cohort_plans(100, seed):
+        expected = DailyMealPlanner(profile, dict(adjustments)).generate_day_plan()
+        actual = DailyMealPlanner(
+            profile, dict(adjustments), recommendation_index=recommendation_index
+        ).generate_day_plan()
+        assert actual == expected, (profile, adjustments)
+
+
+# =========================
+# USER PROFILES (user-008)
+# =========================
+def random_users(count, seed):
+    """Inputs varied in every field build_profile() reads, incl. spellings profile_key() folds"""
+    rng = random.Random(seed)
+    users = []
+    for _ in range(count):
+        user = {
+            "age": rng.randint(18, 75),
+            "gender": rng.choice(["male", "Male", "female", "FEMALE"]),
+            "height": rng.choice([float(rng.randrange(150, 196)), rng.randrange(150, 196)]),
+            "weight": rng.choice([float(rng.randrange(45, 121)), rng.randrange(45, 121) + 0.5]),
+            "activity_level": rng.choice(["sedentary", "light", "moderate", "active", "very_active", "unknown"]),
+            "goal": rng.choice(["fat_loss", "maintenance", "muscle_gain"]),
+            "blood_pressure": rng.choice([None, "normal", "high"]),
+            "blood_sugar": rng.choice([None, "normal", "high"]),
+            "cholesterol": rng.choice([None, "high"]),
+            "thyroid": rng.choice([False, True, None, "hypo"]),
+            "pcos": rng.choice([False, True, 0, 1]),
+            "digestive_issues": rng.choice([None, "ibs", "acidity"]),
+            "allergies": rng.choice([[], None, ["peanut"], ["dairy", "peanut"], ("gluten",)]),
+            "culture": rng.choice([None, "south_indian", "north_indian"]),
+            "region": rng.choice([None, "south", "north"]),
+            "state": rng.choice([None, "Kerala", "Punjab"])
+        }
+        if rng.random() < 0.7:
+            user["diet_preference"] = rng.choice(["veg", "non_veg", "any"])
+        for field in ("blood_pressure", "cholesterol", "culture"):
+            if user[field] is None and rng.random() < 0.5:
+                del user[field]
+        users.append(user)
+    return users
+
+
+def expected_profile(user):
+    profile = UserProfileAgent(copy.deepcopy(user)).build_profile()
+    # Frozen profiles hold the restrictions as a tuple
+    profile["food_restrictions"] = tuple(profile["food_restrictions"])
+    return profile
+
+
+@pytest.fixture
+def empty_profile_cache():
+    get_profile_cache().clear()
+    yield get_profile_cache()
+    get_profile_cache().clear()
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_cached_profiles_match_build_profile(empty_profile_cache, seed):
+    users = random_users(300, seed)
+    expected = [expected_profile(user) for user in users]
+
+    # Cold and warm cache, one by one and batched
+    assert [get_profile(user) for user in users] == expected
+    assert [get_profile(user) for user in users] == expected
+    empty_profile_cache.clear()
+    assert build_profiles(users) == expected
+    assert build_profiles(users) == expected
+    assert [get_profile(user) for user in users] == expected
+
+    for user, profile in zip(users, build_profiles(users)):
+        assert get_profile(user) is profile
+
+
+def test_batch_profiles_share_duplicates(empty_profile_cache):
+    users = random_users(20, 3)
+    respelled = [dict(user, gender=user["gender"].upper(), height=float(user["height"])) for user in users]
+    profiles = build_profiles(users + respelled)
+
+    assert [profile_key(user) for user in users] == [profile_key(user) for user in respelled]
+    for first, second in zip(profiles[:20], profiles[20:]):
+        assert first is second
+    assert empty_profile_cache.stats()["entries"] == len({profile_key(user) for user in users})
+
+
+def test_frozen_profile_is_read_only(empty_profile_cache):
+    user = random_users(1, 4)[0]
+    for profile in (get_profile(user), build_profiles([user])[0]):
+        assert isinstance(profile, FrozenProfile)
+        snapshot = copy.deepcopy(dict(profile))
+
+        mutations = [
+            lambda: profile.__setitem__("daily_calories", 1),
+            lambda: profile.__delitem__("bmr"),
+            lambda: profile.update(sugar_limit=0),
+            lambda: profile.setdefault("extra", 1),
+            lambda: profile.pop("bmr"),
+            lambda: profile.popitem(),
+            lambda: profile.clear(),
+            lambda: profile.__ior__({"bmr": 0}),
+            lambda: profile["diet_style"].__setitem__("culture", "other"),
+            lambda: profile["diet_style"].update(state="Goa"),
+        ]
+        for mutate in mutations:
+            with pytest.raises(TypeError, match="read-only"):
+                mutate()
+        with pytest.raises(AttributeError):
+            profile["food_restrictions"].append("dairy")
+
+        assert dict(profile) == snapshot
+        assert get_profile(user) == expected_profile(user)
+
+        # Copies are ordinary dicts; pickling and JSON keep working
+        mutable = dict(profile)
+        mutable["daily_calories"] = 1
+        assert profile["daily_calories"] != 1
+        restored = pickle.loads(pickle.dumps(profile))
+        assert isinstance(restored, FrozenProfile) and restored == profile
+        assert json.loads(json.dumps(profile))["bmr"] == profile["bmr"]
+
+
+# =========================
+# FOOD CATALOG (user-002)
+# =========================
+@pytest.fixture
+def catalog_db(tmp_path, monkeypatch):
+    """get_food_catalog() over a private copy of the database, checked on every call"""
+    path = tmp_path / "nutrition.db"
+    shutil.copy(db_connection.DB_PATH, path)
+
+    db_connection.reset_pool()
+    monkeypatch.setattr(db_connection, "DB_PATH", path)
+    monkeypatch.setattr(nutrition_agent, "DB_PATH", path)
+    monkeypatch.setattr(nutrition_agent, "CATALOG_CHECK_INTERVAL", 0.0)
+    monkeypatch.setattr(nutrition_agent, "_catalog", None)
+    yield path
+    db_connection.reset_pool()
+
+
+def bump_mtime(path, seconds=10):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+
+def catalog_snapshot(catalog):
+    rows = catalog.meal_candidate_rows(10, 600, 20)
+    return (
+        catalog.size, list(catalog.dish_names), catalog.ids.copy(),
+        catalog.serving["calories"].copy(), catalog.term_mask(["dal", "rice"]).copy(),
+        catalog.serving_dicts(rows)
+    )
+
+
+def assert_snapshot(catalog, snapshot):
+    size, names, ids, calories, mask, dicts = catalog_snapshot(catalog)
+    assert (size, names, dicts) == snapshot[:2] + snapshot[5:]
+    np.testing.assert_array_equal(ids, snapshot[2])
+    np.testing.assert_array_equal(calories, snapshot[3])
+    np.testing.assert_array_equal(mask, snapshot[4])
+
+
+def test_catalog_reloads_on_mtime_change(catalog_db):
+    old = get_food_catalog()
+    assert get_food_catalog() is old
+    before = catalog_snapshot(old)
+
+    # A bare touch is enough for a new load with the same content
+    bump_mtime(catalog_db)
+    touched = get_food_catalog()
+    assert touched is not old
+    assert get_food_catalog() is touched
+    assert_snapshot(touched, before)
+
+    # Rebuild in place: rename a dish, drop another
+    first_id, last_id = int(old.ids[0]), int(old.ids[-1])
+    conn = sqlite3.connect(catalog_db)
+    conn.execute("UPDATE foods SET dish_name = 'Test groundnut dal' WHERE id = ?", (first_id,))
+    conn.execute("DELETE FROM foods WHERE id = ?", (last_id,))
+    conn.commit()
+    conn.close()
+    bump_mtime(catalog_db, 20)
+
+    new = get_food_catalog()
+    assert new is not touched
+    assert new.size == old.size - 1
+    assert new.dish_names[0] == "Test groundnut dal"
+    assert "allergen:peanut" in new.labels_of(first_id)
+    with pytest.raises(KeyError):
+        new.labels_of(last_id)
+
+    # References to earlier loads keep their own consistent snapshot
+    assert_snapshot(old, before)
+    assert_snapshot(touched, before)
+    assert old.labels_of(last_id) == touched.labels_of(last_id)
+
+
+def test_catalog_is_kept_between_checks(catalog_db, monkeypatch):
+    monkeypatch.setattr(nutrition_agent, "CATALOG_CHECK_INTERVAL", 3600.0)
+    catalog = get_food_catalog()
+    bump_mtime(catalog_db)
+    assert get_food_catalog() is catalog
+
+
+def substring_mask(catalog, terms):
+    terms = [t.lower() for t in terms]
+    return np.array([any(t in name.lower() for t in terms) for name in catalog.dish_names], dtype=bool)
+
+
+def random_terms(names, rng):
+    """Words and fragments of real names, in mixed case, plus a few misses"""
+    name = rng.choice(names)
+    start = rng.randrange(len(name))
+    fragment = name[start:start + rng.randint(1, 8)]
+    word = rng.choice(name.split() or [name])
+    return [
+        rng.choice([fragment, fragment.upper(), word, word.title(), "zzq", "dal", "DAL makhani", "al"])
+        for _ in range(rng.randint(0, 4))
+    ]
+
+
+@pytest.mark.parametrize("cache_size", [nutrition_agent.TERM_CACHE_SIZE, 3])
+def test_term_mask_matches_substring_scan(monkeypatch, cache_size):
+    monkeypatch.setattr(nutrition_agent, "TERM_CACHE_SIZE", cache_size)
+    catalog = get_food_catalog()
+    rng = random.Random(11)
+
+    fixed = [[], ["dal"], ["Dal", "dal", "DAL"], ["dal", "dal makhani"], ["paneer", "an"], ["nothing-like-this"]]
+    for terms in fixed + [random_terms(catalog.dish_names, rng) for _ in range(200)]:
+        # Twice: cold and from the per-term cache
+        for _ in range(2):
+            mask = catalog.term_mask(terms)
+            assert mask.dtype == bool and mask.shape == (catalog.size,)
+            np.testing.assert_array_equal(mask, substring_mask(catalog, terms), err_msg=str(terms))
+
+
+# =========================
+# KEYWORD MATCHER (user-023)
+# =========================
+DISH_PATTERNS = {
+    "spice": SPICE_KEYWORDS,
+    "beverage": BEVERAGE_KEYWORDS,
+    "side": SIDE_KEYWORDS,
+    "dessert": DESSERT_KEYWORDS,
+    "snack": SNACK_KEYWORDS,
+    **{allergen_label(a): synonyms for a, synonyms in ALLERGEN_SYNONYMS.items()}
+}
+
+# Keywords that overlap, nest inside each other and share suffixes, so
+# matches have to be found through the failure links
+OVERLAPPING_PATTERNS = {
+    "he": ["he", "she", "hers"],
+    "his": ["his"],
+    "s": ["s", "ss"],
+    "dal": ["dal", "DAL makhani", "makhani dal"],
+    "al": ["al"],
+    "nut": ["peanut", "groundnut", "nut", "groundnuts"],
+    "aa": ["aaa", "aab"],
+    "empty": []
+}
+
+
+def reference_scan(patterns, text):
+    return {label: any(k.lower() in text for k in keywords) for label, keywords in patterns.items()}
+
+
+def assert_scans_match(matcher, patterns, texts):
+    masks = matcher.scan_many(texts)
+    for text, mask in zip(texts, masks.tolist()):
+        assert matcher.scan(text) == mask
+        found = {label: bool(mask & matcher.bits[label]) for label in patterns}
+        assert found == reference_scan(patterns, text), text
+
+
+def test_dish_matcher_matches_substring_scan():
+    catalog = get_food_catalog()
+    names = [name.lower() for name in catalog.dish_names]
+    assert_scans_match(DISH_MATCHER, DISH_PATTERNS, names)
+    assert catalog.labels.tolist() == DISH_MATCHER.scan_many(names).tolist()
+
+
+def test_peanut_synonyms_are_screened():
+    catalog = get_food_catalog()
+    names = [name.lower() for name in catalog.dish_names]
+    expected = np.array(["peanut" in n or "groundnut" in n for n in names])
+    assert expected.any()
+    np.testing.assert_array_equal(catalog.allergen_mask(["peanut"]), expected)
+    assert not catalog.allergen_mask(["shellfish"]).any()
+
+    for text in ["groundnut chutney", "peanut ladoo", "roasted groundnuts", "ground nut", "pea nut"]:
+        labels = DISH_MATCHER.names(DISH_MATCHER.scan(text))
+        assert ("allergen:peanut" in labels) == ("peanut" in text or "groundnut" in text)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_overlapping_keywords_match_substring_scan(seed):
+    rng = random.Random(seed)
+    matcher = KeywordMatcher(OVERLAPPING_PATTERNS)
+    texts = ["", "ushers", "this", "dal makhani", "makhani dal", "groundnuts", "aaab", "aab aaa"]
+    texts += [name.lower() for name in get_food_catalog().dish_names]
+    # Short texts over a small alphabet hit every partial-match path
+    texts += ["".join(rng.choice("ahersidlnutgb m") for _ in range(rng.randint(1, 12))) for _ in range(3000)]
+    assert_scans_match(matcher, OVERLAPPING_PATTERNS, texts)
+
+
+def test_empty_keyword_matches_everything():
+    matcher = KeywordMatcher({"any": [""], "x": ["x"]})
+    assert matcher.names(matcher.scan("")) == ["any"]
+    assert matcher.names(matcher.scan("box")) == ["any", "x"]
+
+
+def test_many_labels_fall_back_to_object_masks():
+    terms = [f"t{i:02d}" for i in range(70)]
+    matcher = term_matcher(terms)
+    texts = ["t00 t69", "t6", "t35t36", "nothing"]
+    masks = matcher.scan_many(texts)
+    assert masks.dtype == object
+    assert [matcher.names(m) for m in masks] == [
+        [t for t in terms if t in text] for text in texts
+    ]
@@ -0,0 +1,111 @@
+import sqlite3
+
+import pytest
+
+from database import db_connection
+from database.db_connection import ReadOnlyConnectionPool, get_pool, reset_pool
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "foods.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE foods (id INTEGER PRIMARY KEY, dish_name TEXT)")
+    conn.executemany("INSERT INTO foods VALUES (?, ?)", [(1, "Dal"), (2, "Dosa")])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def shared_pool(db_path, monkeypatch):
+    """get_pool() pointed at the temporary database"""
+    reset_pool()
+    monkeypatch.setattr(db_connection, "DB_PATH", db_path)
+    yield
+    reset_pool()
+
+
+# =========================
+# CONNECTION POOL
+# =========================
+def test_pool_reuses_idle_connection(db_path):
+    pool = ReadOnlyConnectionPool(db_path, size=4)
+
+    for _ in range(5):
+        rows = pool.fetchall("SELECT dish_name FROM foods ORDER BY id")
+        assert [r["dish_name"] for r in rows] == ["Dal", "Dosa"]
+
+    metrics = pool.metrics.snapshot()
+    assert metrics["connections_opened"] == 1
+    assert metrics["checkouts"] == 5
+    assert metrics["query_ms"]["count"] == 5
+    pool.close()
+
+
+def test_pool_opens_one_connection_per_concurrent_checkout(db_path):
+    pool = ReadOnlyConnectionPool(db_path, size=2)
+
+    with pool.connection() as first, pool.connection() as second:
+        assert first is not second
+    with pool.connection() as again:
+        assert again in (first, second)
+
+    assert pool.metrics.snapshot()["connections_opened"] == 2
+    pool.close()
+
+
+def test_pool_times_out_when_exhausted(db_path):
+    pool = ReadOnlyConnectionPool(db_path, size=1, timeout=0.05)
+
+    with pool.connection():
+        with pytest.raises(TimeoutError):
+            pool.fetchone("SELECT 1")
+
+    assert pool.metrics.snapshot()["timeouts"] == 1
+    assert pool.fetchone("SELECT COUNT(*) AS n FROM foods")["n"] == 2
+    pool.close()
+
+
+def test_pool_connections_are_read_only(db_path):
+    pool = ReadOnlyConnectionPool(db_path, size=1, immutable=False)
+
+    with pool.connection() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO foods VALUES (3, 'Idli')")
+    pool.close()
+
+
+def test_closed_pool_refuses_new_connections(db_path):
+    pool = ReadOnlyConnectionPool(db_path, size=1)
+    pool.fetchone("SELECT 1")
+    pool.close()
+
+    with pytest.raises(RuntimeError):
+        pool.fetchone("SELECT 1")
+
+
+# =========================
+# SHARED POOL
+# =========================
+def test_get_pool_is_shared(shared_pool):
+    assert get_pool() is get_pool()
+
+
+def test_reset_pool_reopens_the_database(shared_pool, db_path):
+    pool = get_pool()
+    assert pool.fetchone("SELECT COUNT(*) AS n FROM foods")["n"] == 2
+
+    # Rebuild the file, as scripts/init_db.py does
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO foods VALUES (3, 'Idli')")
+    conn.commit()
+    conn.close()
+
+    reset_pool()
+    with pytest.raises(RuntimeError):
+        pool.fetchone("SELECT 1")
+
+    fresh = get_pool()
+    assert fresh is not pool
+    assert fresh.fetchone("SELECT COUNT(*) AS n FROM foods")["n"] == 3
@@ -0,0 +1,357 @@
+import numpy as np
+import pytest
+import torch
+
+from config import DEFAULT_NUTRIENTS
+from dqn_agent import DQNOrganOptimizer
+from organ_twin import OrganDigitalTwin
+from rl import checkpoint
+from rl.memory_buffer import ReplayBuffer, SumTree
+from rl.state_encoder import FEATURE_SIZE, STATE_NUTRIENTS, STATE_ORGANS, StateEncoder
+
+
+# =========================
+# STATE ENCODER (user-017)
+# =========================
+def legacy_state(organ_twin, nutrients, state_size=23):
+    """DQNOrganOptimizer.get_state before the encoder, kept verbatim"""
+    ORGAN_ORDER = [
+        "heart", "lungs", "brain", "kidneys", "pancreas",
+        "liver", "gut", "skin", "immune", "muscles"
+    ]
+
+    organ_health = []
+    for organ_name in ORGAN_ORDER:
+        if organ_name in organ_twin.organs:
+            organ_health.append(organ_twin.organs[organ_name]["health"])
+        else:
+            organ_health.append(0.5)  # Default if organ missing
+
+    nutrient_features = [
+        nutrients.get('calories', 0) / 1000,
+        nutrients.get('carbs', 0) / 200,
+        nutrients.get('protein', 0) / 100,
+        nutrients.get('fat', 0) / 100,
+        nutrients.get('sugar', 0) / 100,
+        nutrients.get('fiber', 0) / 50,
+        nutrients.get('sodium', 0) / 5000,
+        nutrients.get('calcium', 0) / 2000,
+        nutrients.get('iron', 0) / 50
+    ]
+
+    organ_health_array = np.array(organ_health)
+    health_metrics = [
+        organ_twin.get_overall_health(),
+        len([h for h in organ_health if h < 0.6]) / len(organ_health),
+        np.std(organ_health_array) if len(organ_health_array) > 1 else 0.1,
+        min(organ_health) if organ_health else 0.5
+    ]
+
+    state_vector = organ_health + nutrient_features + health_metrics
+
+    if len(state_vector) != state_size:
+        if len(state_vector) < state_size:
+            state_vector = state_vector + [0] * (state_size - len(state_vector))
+        else:
+            state_vector = state_vector[:state_size]
+
+    return torch.FloatTensor(state_vector).unsqueeze(0)
+
+
+def random_pairs(count, seed=0):
+    """Random twins and meals, with missing organs and int nutrient values mixed in"""
+    rng = np.random.default_rng(seed)
+    pairs = []
+    for i in range(count):
+        twin = OrganDigitalTwin()
+        for organ in twin.organs.values():
+            organ["health"] = float(rng.uniform(0.1, 1.0))
+        if i % 7 == 0:
+            del twin.organs[STATE_ORGANS[i % len(STATE_ORGANS)]]
+
+        meal = {name: value * float(rng.uniform(0.5, 1.5)) for name, value in DEFAULT_NUTRIENTS.items()}
+        if i % 5 == 0:
+            meal = {name: int(value) for name, value in meal.items()}
+        if i % 11 == 0:
+            meal.pop("iron", None)
+        pairs.append((twin, meal))
+    return pairs
+
+
+@pytest.fixture(scope="module")
+def pairs():
+    return random_pairs(300)
+
+
+@pytest.mark.parametrize("state_size", [FEATURE_SIZE, 20, 30])
+def test_encoder_matches_legacy_get_state(pairs, state_size):
+    reference = torch.cat([legacy_state(twin, meal, state_size) for twin, meal in pairs])
+    encoder = StateEncoder(state_size)
+
+    assert torch.equal(encoder.encode(pairs), reference)
+    # One twin at a time, through reused scratch buffers and a preallocated output
+    out = encoder.output(1)
+    for i, pair in enumerate(pairs):
+        assert torch.equal(encoder.encode([pair], out), reference[i:i + 1])
+
+
+def test_get_state_matches_legacy(pairs):
+    agent = DQNOrganOptimizer()
+    reference = torch.cat([legacy_state(twin, meal, agent.state_size) for twin, meal in pairs])
+
+    assert torch.equal(agent.get_states(pairs), reference)
+    assert torch.equal(torch.cat([agent.get_state(twin, meal) for twin, meal in pairs]), reference)
+
+
+def test_missing_organ_uses_default_health():
+    twin = OrganDigitalTwin()
+    del twin.organs["gut"]
+    state = StateEncoder().encode([(twin, {})])
+
+    assert state[0, STATE_ORGANS.index("gut")].item() == 0.5
+    assert torch.equal(state, legacy_state(twin, {}))
+
+
+def test_encode_arrays_matches_legacy():
+    pairs = [pair for pair in random_pairs(200, seed=1) if len(pair[0].organs) == len(STATE_ORGANS)]
+    health = np.array([[twin.organs[name]["health"] for name in STATE_ORGANS] for twin, _ in pairs])
+    nutrients = np.array([[meal.get(name, 0) for name in STATE_NUTRIENTS] for _, meal in pairs])
+    reference = torch.cat([legacy_state(twin, meal) for twin, meal in pairs])
+
+    encoder = StateEncoder()
+    assert torch.equal(encoder.encode_arrays(health, nutrients), reference)
+    overall = [twin.get_overall_health() for twin, _ in pairs]
+    assert torch.equal(encoder.encode_arrays(health, nutrients, overall), reference)
+
+
+# =========================
+# REPLAY BUFFER (user-014)
+# =========================
+def transition(i, state_size=3):
+    return np.full(state_size, i, dtype=np.float32), i % 4, float(i) / 2, np.full(state_size, i + 0.5), i % 2
+
+
+def test_push_wraps_around():
+    buffer = ReplayBuffer(5, 3, seed=0)
+    for i in range(7):
+        buffer.push(*transition(i))
+
+    assert len(buffer) == 5
+    assert buffer.position == 2
+    # Rows 0-1 were overwritten by transitions 5 and 6
+    assert buffer.states[:, 0].tolist() == [5, 6, 2, 3, 4]
+    assert buffer.next_states[:, 0].tolist() == [5.5, 6.5, 2.5, 3.5, 4.5]
+    assert buffer.actions.tolist() == [1, 2, 2, 3, 0]
+    assert buffer.rewards.tolist() == [2.5, 3.0, 1.0, 1.5, 2.0]
+    assert buffer.dones.tolist() == [1, 0, 0, 1, 0]
+
+
+def test_push_batch_matches_push():
+    one, batched = ReplayBuffer(5, 3, seed=0), ReplayBuffer(5, 3, seed=0)
+    rows = [transition(i) for i in range(13)]
+    for row in rows:
+        one.push(*row)
+
+    # Wraps inside a batch, and a batch larger than the buffer keeps its newest rows
+    for chunk in (rows[:3], rows[3:6], rows[6:13]):
+        states, actions, rewards, next_states, dones = (np.array(x) for x in zip(*chunk))
+        batched.push_batch(states, actions, rewards, next_states, dones)
+
+    assert torch.equal(batched.data, one.data)
+    assert (batched.position, len(batched)) == (one.position, len(one)) == (3, 5)
+
+
+def test_uniform_sample_reads_filled_rows():
+    buffer = ReplayBuffer(8, 3, seed=0)
+    for i in range(5):
+        buffer.push(*transition(i))
+
+    states, actions, rewards, next_states, dones, indices, weights = buffer.sample(5)
+    assert sorted(indices) == [0, 1, 2, 3, 4]
+    assert weights is None
+    assert states[:, 0].tolist() == [float(i) for i in indices]
+    assert actions.shape == rewards.shape == dones.shape == (5, 1)
+    assert next_states[:, 0].tolist() == [i + 0.5 for i in indices]
+
+
+def assert_tree_consistent(tree):
+    internal = np.arange(tree.leaves - 1)
+    np.testing.assert_allclose(tree.tree[internal], tree.tree[2 * internal + 1] + tree.tree[2 * internal + 2])
+
+
+def test_sum_tree_totals_after_updates():
+    tree = SumTree(5)
+    priorities = np.zeros(5)
+    rng = np.random.default_rng(0)
+
+    for _ in range(50):
+        indices = rng.choice(5, size=rng.integers(1, 4), replace=False)
+        values = rng.uniform(0, 10, len(indices))
+        tree.update(indices, values)
+        priorities[indices] = values
+
+        assert tree.total == pytest.approx(priorities.sum())
+        np.testing.assert_array_equal(tree.priorities(np.arange(5)), priorities)
+        assert_tree_consistent(tree)
+
+
+def test_sum_tree_find_prefix_intervals():
+    tree = SumTree(5)
+    tree.update(np.arange(5), [1.0, 0.0, 2.0, 3.0, 4.0])
+
+    # Leaf i owns (prefix[i-1], prefix[i]]; empty leaves are never found
+    values = [0.0, 0.5, 1.0, 1.5, 3.0, 3.5, 6.0, 6.5, 9.99, 10.0]
+    assert tree.find(values).tolist() == [0, 0, 0, 2, 2, 3, 3, 4, 4, 4]
+
+
+def test_prioritized_sampling_is_proportional():
+    buffer = ReplayBuffer(4, 3, prioritized=True, alpha=1.0, eps=0.0, seed=0)
+    for i in range(4):
+        buffer.push(*transition(i))
+    td_errors = np.array([1.0, 2.0, 3.0, 4.0])
+    buffer.update_priorities(np.arange(4), -td_errors)   # sign does not matter
+    assert buffer.tree.total == pytest.approx(10.0)
+
+    counts = np.zeros(4)
+    for _ in range(4000):
+        indices = buffer.sample(1)[5]
+        counts[indices] += 1
+    np.testing.assert_allclose(counts / counts.sum(), td_errors / 10, atol=0.02)
+
+
+def test_prioritized_weights():
+    buffer = ReplayBuffer(4, 3, prioritized=True, alpha=1.0, beta=0.5, beta_increment=0.1, eps=0.0, seed=0)
+    for i in range(4):
+        buffer.push(*transition(i))
+    buffer.update_priorities(np.arange(4), [1.0, 2.0, 3.0, 4.0])
+
+    *_, indices, weights = buffer.sample(4)
+    # Stratified: one draw per quarter of the total priority, in order
+    assert indices.tolist() == sorted(indices.tolist())
+    assert indices[-1] == 3
+    probabilities = buffer.tree.priorities(indices) / 10
+    expected = (4 * probabilities) ** -0.5
+    np.testing.assert_allclose(weights[:, 0].numpy(), expected / expected.max(), rtol=1e-6)
+    assert buffer.beta == pytest.approx(0.6)
+
+    # New transitions enter at the highest priority seen
+    buffer.push(*transition(4))
+    assert buffer.tree.priorities([0])[0] == pytest.approx(4.0)
+
+
+# =========================
+# CHECKPOINTS (user-016)
+# =========================
+def trained_agent(seed=0, prioritized=False):
+    """An agent with replay rows, Adam state, decayed epsilon and counters"""
+    torch.manual_seed(seed)
+    agent = DQNOrganOptimizer()
+    if prioritized:
+        agent.memory = ReplayBuffer(agent.memory.capacity, agent.state_size, prioritized=True, seed=seed)
+    rng = np.random.default_rng(seed)
+    for _ in range(3 * agent.batch_size):
+        agent.store_transition(
+            rng.random(agent.state_size), int(rng.integers(agent.action_size)),
+            float(rng.normal()), rng.random(agent.state_size), bool(rng.random() < 0.1)
+        )
+    for _ in range(10):
+        agent.replay()
+    return agent
+
+
+def assert_states_equal(a, b):
+    assert a.keys() == b.keys()
+    for key in a:
+        if isinstance(a[key], dict):
+            assert_states_equal(a[key], b[key])
+        elif isinstance(a[key], torch.Tensor):
+            assert torch.equal(a[key], b[key]), key
+        else:
+            assert a[key] == b[key], key
+
+
+@pytest.mark.parametrize("prioritized", [False, True])
+def test_checkpoint_round_trip(tmp_path, prioritized):
+    agent = trained_agent(prioritized=prioritized)
+    assert agent.update_target_counter == 10 and agent.epsilon < 1.0
+    agent.save_checkpoint(tmp_path / "ckpt", extra={"env_steps": 96, "updates": 10})
+
+    loaded = DQNOrganOptimizer()
+    meta = loaded.load_checkpoint(tmp_path / "ckpt")
+
+    assert meta["extra"] == {"env_steps": 96, "updates": 10}
+    assert_states_equal(loaded.model.state_dict(), agent.model.state_dict())
+    assert_states_equal(loaded.target_model.state_dict(), agent.target_model.state_dict())
+    assert_states_equal(loaded.optimizer.state_dict(), agent.optimizer.state_dict())
+    assert loaded.epsilon == agent.epsilon
+    assert loaded.update_target_counter == agent.update_target_counter
+
+    memory = loaded.memory
+    assert torch.equal(memory.data, agent.memory.data)
+    assert (memory.position, len(memory), memory.prioritized) == (
+        agent.memory.position, len(agent.memory), prioritized
+    )
+    if prioritized:
+        np.testing.assert_array_equal(memory.tree.tree, agent.memory.tree.tree)
+        assert (memory.beta, memory.max_priority) == (agent.memory.beta, agent.memory.max_priority)
+
+    # Loaded weights are private: training the copy leaves the original alone
+    before = {k: v.clone() for k, v in agent.model.state_dict().items()}
+    loaded.replay()
+    assert_states_equal(agent.model.state_dict(), before)
+
+
+def test_checkpoint_without_replay(tmp_path):
+    agent = trained_agent()
+    agent.save_checkpoint(tmp_path / "ckpt", replay=False)
+
+    loaded = DQNOrganOptimizer()
+    meta = loaded.load_checkpoint(tmp_path / "ckpt")
+    assert meta["replay"] is None
+    assert len(loaded.memory) == 0
+    assert_states_equal(loaded.model.state_dict(), agent.model.state_dict())
+
+
+def test_checkpoint_rejects_other_shapes(tmp_path):
+    trained_agent().save_checkpoint(tmp_path / "ckpt")
+    with pytest.raises(ValueError, match="state/action size"):
+        DQNOrganOptimizer(state_size=FEATURE_SIZE + 1).load_checkpoint(tmp_path / "ckpt")
+
+
+def test_mapped_replay_is_copy_on_write(tmp_path):
+    agent = trained_agent()
+    path = agent.save_checkpoint(tmp_path / "ckpt")
+    on_disk = np.load(path / "replay.npy").copy()
+
+    first, second = DQNOrganOptimizer(), DQNOrganOptimizer()
+    first.load_checkpoint(path)
+    second.load_checkpoint(path)
+    row = first.memory.position
+
+    first.store_transition(np.full(agent.state_size, 9.0), 1, 5.0, np.zeros(agent.state_size), True)
+    first.memory.data[0].fill_(-1.0)
+
+    # The write stays private to `first`: other mappings and the file are untouched
+    assert first.memory.states[row].tolist() == [9.0] * agent.state_size
+    assert torch.equal(second.memory.data, torch.from_numpy(on_disk))
+    np.testing.assert_array_equal(np.load(path / "replay.npy"), on_disk)
+
+
+def test_pretrained_weights_are_shared_until_first_update(tmp_path):
+    path = trained_agent().save_checkpoint(tmp_path / "ckpt")
+    checkpoint.clear_pretrained()
+    try:
+        first = DQNOrganOptimizer.from_pretrained(path)
+        second = DQNOrganOptimizer.from_pretrained(path)
+    finally:
+        checkpoint.clear_pretrained()
+
+    def pointers(agent):
+        return [t.data_ptr() for t in agent.model.state_dict().values()]
+
+    assert pointers(first) == pointers(second)
+    shared = {k: v.clone() for k, v in second.model.state_dict().items()}
+
+    first.replay()
+    assert set(pointers(first)).isdisjoint(pointers(second))
+    assert_states_equal(second.model.state_dict(), shared)
@@ -0,0 +1,214 @@
+import numpy as np
+import pytest
+
+from agents.nutrition_agent import NUTRIENT_COLUMNS, get_food_catalog
+from rules_engine.diet_constraints import FoodTable
+from rules_engine.engine import CompiledRules, RuleEngine
+from rules_engine.medical_rules import Rule, load_rules
+from rules_engine.validator import MAX_RULES, plan_violations, validate_rules
+
+RULES = [
+    {
+        "name": "high_fodmap",
+        "reason": "high FODMAP ingredients (IBS)",
+        "when": {"restriction": "high_fodmap"},
+        "exclude": {
+            "any": [
+                {"name_contains": ["Onion", "garlic"]},
+                {"all": [
+                    {"name_contains": ["apple"]},
+                    {"not": {"name_contains": ["pineapple"]}}
+                ]}
+            ]
+        }
+    },
+    {
+        "name": "sodium_limit",
+        "when": {"profile": {"sodium_limit": {"above": 0}}},
+        "exclude": {"column": "sodium", "above": {"param": "sodium_limit", "scale": 0.4}}
+    },
+    {
+        "name": "sugar",
+        "when": {"always": True},
+        "exclude": {"all": [{"food_type": ["meal"]}, {"ratio": ["free_sugar", "fibre"], "above": 5}]},
+        "penalty": [
+            {"weight": 10, "column": "free_sugar", "per": 5},
+            {"weight": 3, "when": {"name_contains": ["fried"]}}
+        ]
+    }
+]
+
+# name, food_type, sodium, free_sugar, fibre
+DISHES = [
+    ("Onion dosa", "meal", 100, 0, 2),
+    ("Apple halwa", "meal", 50, 5, 2),
+    ("Pineapple juice", "beverage", 10, 20, 1),
+    ("Fried rice", "meal", 700, 0, 1),
+    ("Dal tadka", "meal", 300, 5, 0.5),
+    ("Plain idli", "meal", 200, 0, 0),
+]
+
+PROFILE = {"food_restrictions": ["high_fodmap"], "sodium_limit": 1500}
+
+
+def food(name, food_type, sodium, free_sugar, fibre):
+    values = dict.fromkeys(NUTRIENT_COLUMNS, 0.0)
+    values.update(sodium=sodium, free_sugar=free_sugar, fibre=fibre)
+    return {"dish_name": name, "food_type": food_type, **values}
+
+
+@pytest.fixture
+def table():
+    return FoodTable.from_foods([food(*dish) for dish in DISHES])
+
+
+@pytest.fixture
+def rules():
+    return [Rule(spec) for spec in validate_rules({"version": 1, "rules": RULES})]
+
+
+# =========================
+# VALIDATION
+# =========================
+def rules_document(**rule):
+    return {"version": 1, "rules": [{"name": "bad_rule", "when": {"always": True}, **rule}]}
+
+
+@pytest.mark.parametrize("document, message", [
+    ([], "expected a mapping"),
+    ({"version": 2, "rules": []}, "unsupported rules format"),
+    ({"version": 1, "rules": {"name": "x"}}, "'rules' must be a list"),
+    ({"version": 1, "rules": [{"when": {"always": True}}]}, "every rule needs a name"),
+    (rules_document(exclude={"column": "sodium", "above": 1}, severity=2), "unknown keys ['severity']"),
+    (rules_document(), "needs 'exclude' and/or 'penalty'"),
+    (rules_document(when={"diagnosis": "ibs"}, exclude={"food_type": ["meal"]}), "unknown activation"),
+    (rules_document(exclude={"column": "salt", "above": 1}), "unknown nutrient column 'salt'"),
+    (rules_document(exclude={"column": "sodium", "near": 1}), "needs exactly one of"),
+    (rules_document(exclude={"name_contains": []}), "takes a non-empty list"),
+    (rules_document(exclude={"regex": "x"}), "unknown predicate"),
+    (rules_document(exclude={"column": "sodium", "above": {"field": "x"}}), "threshold must be"),
+    (rules_document(penalty=[{"column": "sodium", "per": 100}]), "numeric 'weight'"),
+    (rules_document(penalty=[{"weight": 1, "column": "sodium"}]), "needs 'per'"),
+])
+def test_validator_rejects_bad_rules(document, message):
+    with pytest.raises(ValueError) as error:
+        validate_rules(document, source="rules.yaml")
+    assert message in str(error.value)
+    assert str(error.value).startswith("rules.yaml")
+
+
+def test_validator_names_the_rule():
+    with pytest.raises(ValueError, match=r"rule 'bad_rule'\.exclude\.any\[1\]"):
+        validate_rules(rules_document(exclude={"any": [{"food_type": ["meal"]}, {"column": "salt", "above": 1}]}))
+
+
+def test_validator_rejects_duplicate_names():
+    document = {"version": 1, "rules": RULES + [RULES[0]]}
+    with pytest.raises(ValueError, match="'high_fodmap': duplicate name"):
+        validate_rules(document)
+
+
+def test_validator_limits_rule_count():
+    document = {"version": 1, "rules": [
+        {"name": f"rule_{i}", "when": {"always": True}, "exclude": {"food_type": ["spice"]}}
+        for i in range(MAX_RULES + 1)
+    ]}
+    with pytest.raises(ValueError, match="at most"):
+        validate_rules(document)
+
+
+def test_load_rules_reports_file(tmp_path):
+    path = tmp_path / "rules.yaml"
+    path.write_text("version: 1\nrules:\n  - name: broken\n    when: {always: true}\n")
+    with pytest.raises(ValueError, match=f"{path}: rule 'broken'"):
+        load_rules(path)
+
+
+def test_shipped_rules_load():
+    names = [rule.name for rule in load_rules()]
+    assert names == ["high_gi_foods", "raw_cruciferous", "high_fodmap", "sodium_limit", "low_sodium"]
+
+
+# =========================
+# ACTIVATION
+# =========================
+def test_rules_apply_by_restriction_and_profile(rules):
+    fodmap, sodium, sugar = rules
+    assert fodmap.applies_to(PROFILE)
+    assert not fodmap.applies_to({"food_restrictions": ["high_gi_foods"]})
+    assert sodium.applies_to(PROFILE)
+    assert not sodium.applies_to({"sodium_limit": 0})
+    # A missing threshold parameter switches the rule off
+    assert not sodium.applies_to({"food_restrictions": []})
+    assert sugar.applies_to({})
+
+    assert sodium.signature(PROFILE) == ("sodium_limit", 1500)
+
+
+# =========================
+# COMPILED RULES
+# =========================
+def test_compiled_rules_exclusions(rules, table):
+    compiled = CompiledRules(rules, PROFILE, table)
+
+    assert compiled.allowed.tolist() == [False, False, True, False, False, True]
+    assert compiled.excluded_by(0) == ["high_fodmap"]
+    assert compiled.excluded_by(1) == ["high_fodmap"]
+    assert compiled.excluded_by(2) == []              # pineapple, and not a meal
+    assert compiled.excluded_by(3) == ["sodium_limit"]
+    assert compiled.excluded_by(4) == ["sugar"]       # 5 g sugar / 0.5 g fibre
+    assert compiled.excluded_by(5) == []              # 0 / 0 is NaN: passes
+    assert compiled.reasons(0) == ["high FODMAP ingredients (IBS)"]
+    assert compiled.exclusion_counts() == {"high_fodmap": 2, "sodium_limit": 1, "sugar": 1}
+
+
+def test_compiled_rules_penalty(rules, table):
+    compiled = CompiledRules(rules, PROFILE, table)
+
+    # 10 per 5 g free sugar, plus 3 for fried dishes
+    np.testing.assert_allclose(compiled.penalty, [0, 10, 40, 3, 10, 0])
+    assert compiled.has_penalty
+
+
+def test_compiled_rules_for_single_foods(rules):
+    compiled = CompiledRules(rules, PROFILE, FoodTable.from_foods([food(*DISHES[5])]))
+    assert compiled.allows(food(*DISHES[5]))
+    assert compiled.violations(food("Garlic naan", "meal", 900, 0, 1)) == ["high_fodmap", "sodium_limit"]
+
+
+def test_plan_violations(rules, table):
+    compiled = CompiledRules(rules, PROFILE, table)
+    day_plan = {
+        "breakfast": food(*DISHES[5]),
+        "lunch": food(*DISHES[0]),
+        "dinner": food("Garlic fried rice", "meal", 900, 0, 1),
+        "snack": {},
+        "totals": {"calories": 0}
+    }
+    assert plan_violations(day_plan, compiled) == {
+        "lunch": ["high_fodmap"],
+        "dinner": ["high_fodmap", "sodium_limit"]
+    }
+
+
+# =========================
+# ENGINE
+# =========================
+def test_engine_compiles_catalog_once_per_signature(rules):
+    engine = RuleEngine(rules)
+    catalog = get_food_catalog()
+
+    compiled = engine.compile(PROFILE, catalog)
+    assert compiled.matches(catalog)
+    assert engine.compile(dict(PROFILE), catalog) is compiled
+    assert engine.compile({**PROFILE, "sodium_limit": 2000}, catalog) is not compiled
+    assert compiled.allowed.shape == (catalog.size,)
+
+    # Same rows as evaluating the rules on the catalog's own table
+    direct = CompiledRules(engine.active(PROFILE), PROFILE, FoodTable.from_catalog(catalog))
+    assert np.array_equal(compiled.exclusions, direct.exclusions)
+
+
+def test_engine_skips_profiles_without_active_rules():
+    engine = RuleEngine([Rule(spec) for spec in RULES[:2]])
+    assert engine.compile({"food_restrictions": []}) is None
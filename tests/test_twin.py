@@ -0,0 +1,185 @@
+import copy
+import random
+
+import numpy as np
+import pytest
+
+from config import DEFAULT_NUTRIENTS, ORGAN_BASELINES
+from organ_twin import OrganDigitalTwin
+from twin_farm import TwinFarm
+from twin_population import TwinPopulation
+
+
+# =========================
+# REFERENCE: ORIGINAL PER-ORGAN LOOP
+# =========================
+# OrganDigitalTwin's meal / intervention updates before OrganImpactModel
+# and OrganMetricsModel, kept verbatim over a plain organs dict
+def reference_organ_impact(organ, nutrients, scale):
+    impact = 0
+    for nutrient, sensitivity in organ["sensitivity"].items():
+        if nutrient in nutrients:
+            nutrient_value = nutrients[nutrient]
+            if nutrient == "sodium":
+                norm_value = nutrient_value / 2300
+            elif nutrient == "sugar":
+                norm_value = nutrient_value / 50
+            elif nutrient == "fiber":
+                norm_value = nutrient_value / 25
+            elif nutrient == "protein":
+                norm_value = nutrient_value / 100
+            elif nutrient == "calories":
+                norm_value = nutrient_value / 2000
+            elif nutrient == "fat":
+                norm_value = nutrient_value / 100
+            else:
+                norm_value = nutrient_value / 100
+            impact += sensitivity * norm_value * scale
+
+    impact += random.uniform(-0.02, 0.02)
+    return impact
+
+
+def reference_update_metrics(organ_name, organ, new_health):
+    health_factor = 0.6 + (new_health * 0.4)
+    for metric in organ["metrics"]:
+        base_value = ORGAN_BASELINES.get(organ_name, {}).get(metric, 100)
+        current_value = organ["metrics"][metric]
+        target_value = base_value * health_factor
+        adjustment = (target_value - current_value) * 0.1
+        if "pressure" in metric or "creatinine" in metric or "inflammation" in metric:
+            organ["metrics"][metric] = np.clip(current_value + adjustment, base_value * 0.5, base_value * 1.5)
+        else:
+            organ["metrics"][metric] = np.clip(current_value + adjustment, base_value * 0.3, base_value * 1.2)
+
+
+def reference_color(health):
+    if health >= 0.8:
+        r = int(255 * (1 - (health - 0.8) * 5))
+        return f"rgb({r}, 255, {r})"
+    if health >= 0.6:
+        intensity = int(255 * (health - 0.6) * 5)
+        return f"rgb(255, {255 - intensity // 2}, 0)"
+    intensity = int(255 * (0.6 - health) * 5)
+    return f"rgb(255, {max(50, 255 - intensity)}, {max(50, 255 - intensity)})"
+
+
+def reference_meal(organs, nutrients, portion_g):
+    scale = portion_g / 100
+    impacts = {}
+    for organ_name, organ in organs.items():
+        impact = reference_organ_impact(organ, nutrients, scale)
+        new_health = np.clip(organ["health"] + impact, 0.1, 1.0)
+        new_health = min(1.0, new_health + 0.001)
+        organ["health"] = new_health
+        reference_update_metrics(organ_name, organ, new_health)
+        organ["color"] = reference_color(new_health)
+        impacts[organ_name] = {"impact": impact, "new_health": new_health, "stress_level": abs(impact) * 100}
+    return impacts
+
+
+def reference_intervention(organs, intervention_type, intensity):
+    impacts = {}
+    for organ_name, organ in organs.items():
+        if intervention_type == "exercise":
+            impact = 0.02 * intensity if organ_name in ["heart", "lungs", "muscles"] else 0.01 * intensity
+        elif intervention_type == "hydration":
+            impact = 0.015 * intensity if organ_name in ["kidneys", "brain", "skin"] else 0.008 * intensity
+        elif intervention_type == "sleep":
+            impact = 0.025 * intensity if organ_name in ["brain", "immune"] else 0.01 * intensity
+        elif intervention_type == "stress_reduction":
+            impact = 0.03 * intensity if organ_name in ["brain", "heart", "gut"] else 0.015 * intensity
+        else:
+            impact = 0.01 * intensity
+        new_health = np.clip(organ["health"] + impact, 0.1, 1.0)
+        organ["health"] = new_health
+        reference_update_metrics(organ_name, organ, new_health)
+        organ["color"] = reference_color(new_health)
+        impacts[organ_name] = {"impact": impact, "new_health": new_health}
+    return impacts
+
+
+def organ_state(organs):
+    return {
+        name: (organ["health"], organ.get("color"), dict(organ["metrics"]))
+        for name, organ in organs.items()
+    }
+
+
+# =========================
+# ORGAN TWIN (user-010)
+# =========================
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_twin_updates_match_reference_loop(seed):
+    random.seed(seed)
+    twin = OrganDigitalTwin()
+    organs = copy.deepcopy(twin.organs)
+    rng = random.Random(seed)
+
+    for step in range(60):
+        if step % 4 == 3:
+            action = rng.choice(["exercise", "hydration", "sleep", "stress_reduction", "meditation"])
+            intensity = rng.uniform(0.5, 2.0)
+            expected = reference_intervention(organs, action, intensity)
+            actual = twin.apply_intervention(action, intensity)
+        else:
+            nutrients = {name: value * rng.uniform(0, 3) for name, value in DEFAULT_NUTRIENTS.items()}
+            if step % 5 == 0:
+                nutrients.pop("sodium", None)
+            portion = rng.choice([50, 100, 250])
+
+            # Same seeded jitter for both
+            state = random.getstate()
+            expected = reference_meal(organs, nutrients, portion)
+            random.setstate(state)
+            actual, _ = twin.simulate_meal_impact(nutrients, portion)
+
+        assert actual == expected
+        assert organ_state(twin.organs) == organ_state(organs)
+
+
+def test_seeded_twins_are_identical():
+    # Health and rewards only: organs whose definitions carry metrics share
+    # those dicts across twins (config.ORGAN_DEFINITIONS), so a second twin
+    # starts from the first one's metrics
+    def run(seed):
+        random.seed(seed)
+        twin = OrganDigitalTwin()
+        rewards = [twin.simulate_meal_impact(DEFAULT_NUTRIENTS, 150)[1] for _ in range(20)]
+        twin.apply_intervention("sleep", 1.5)
+        return rewards, twin.get_organ_states()
+
+    assert run(42) == run(42)
+
+
+# =========================
+# TWIN FARM (user-012)
+# =========================
+def farm_rollout(workers):
+    meals = TwinPopulation(1).nutrient_matrix([
+        DEFAULT_NUTRIENTS,
+        dict(DEFAULT_NUTRIENTS, sugar=40.0, sodium=1200.0)
+    ])
+    epochs = []
+    # 3 shards, 2 epochs
+    with TwinFarm(30, seed=7, workers=workers, shard_size=10, epoch_hours=4) as farm:
+        summary = farm.run(8, meals, portion_g=150, on_epoch=epochs.append)
+        return (
+            farm.health.copy(), farm.buffers["metrics"].array.copy(), farm.returns.copy(),
+            summary, epochs
+        )
+
+
+def test_farm_results_do_not_depend_on_worker_count():
+    health, metrics, returns, summary, epochs = farm_rollout(workers=1)
+    assert summary["epochs"] == 2
+    assert summary["meals"] == 30 * 8
+    assert [e["epoch"] for e in epochs] == [0, 1]
+
+    for workers in (2, 3):
+        other = farm_rollout(workers)
+        assert np.array_equal(other[0], health)
+        assert np.array_equal(other[1], metrics)
+        assert np.array_equal(other[2], returns)
+        assert other[3] == summary
+        assert other[4] == epochs
@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+import pytest
+
+from agents import weekly_optimizer
+from agents.meal_planner_agent import MEAL_SPLIT, BatchMealScorer
+from agents.weekly_optimizer import DAYS, MEALS, SOLVERS, WeeklyProblem, solve_week
+from agents.weekly_planner_agent import WeeklyMealPlanner
+
+BUDGET = 0.3
+# CBC runs as a subprocess: allow for its start-up on top of the budget
+OVERRUN = 0.25
+
+PROFILES = [
+    # 35-odd candidates and a calorie band no three of them reach
+    {"daily_calories": 2000, "protein_target": 100, "sugar_limit": 40, "food_restrictions": []},
+    {"daily_calories": 1500, "protein_target": 70, "sugar_limit": 25,
+     "food_restrictions": ["peanut"], "blood_sugar": "high"},
+]
+
+SOLVER_NAMES = ["auto", "local"] + [name for name, (available, _) in SOLVERS.items() if available()]
+
+
+def greedy_problem(profile):
+    """The optimizer's problem for `profile` and the greedy week as its assignment"""
+    greedy = WeeklyMealPlanner(profile, mode="greedy").generate_week_plan()
+    problem = WeeklyMealPlanner(profile).week_problem(greedy)
+    return problem, WeeklyMealPlanner.assignment_of(problem, greedy)
+
+
+@pytest.fixture(scope="module")
+def greedy_problems():
+    return [greedy_problem(profile) for profile in PROFILES]
+
+
+def synthetic_problem():
+    """
+    Enough distinct dishes exactly on every slot's target, plus a
+    higher-protein favourite per meal: a week without repeats exists and
+    costs only the favourites' protein bonus.
+    """
+    foods = []
+    for meal, ratio in MEAL_SPLIT.items():
+        calories = 1800 * ratio
+        foods.append({"dish_name": f"Favourite {meal} thali", "calories": calories,
+                      "protein": 60, "fibre": 10, "free_sugar": 0})
+        foods.extend(
+            {"dish_name": f"{meal.title()} thali {i}", "calories": calories,
+             "protein": 20, "fibre": 10, "free_sugar": 0}
+            for i in range(2 * DAYS)
+        )
+    for i, food in enumerate(foods):
+        food["id"] = i
+
+    scorer = BatchMealScorer(foods, [], [], [], set())
+    problem = WeeklyProblem(foods, scorer, [1800] * DAYS, [MEAL_SPLIT] * DAYS, 50, 40)
+
+    # Start from the favourites on every day
+    favourites = {food["dish_name"].split()[1]: food["id"] for food in foods if food["protein"] == 60}
+    start = np.array([favourites[meal] for _ in range(DAYS) for meal in MEALS], dtype=np.int64)
+    return problem, start
+
+
+# =========================
+# SOLVE_WEEK
+# =========================
+@pytest.mark.parametrize("solver", SOLVER_NAMES)
+def test_solve_week_is_valid_and_never_worse_than_greedy(greedy_problems, solver):
+    for problem, start in greedy_problems:
+        assert problem.valid(start)
+
+        began = time.perf_counter()
+        assign, used, status = solve_week(problem, BUDGET, solver, start)
+        elapsed = time.perf_counter() - began
+
+        assert problem.valid(assign)
+        assert problem.objective(assign) >= problem.objective(start) - 1e-6
+        assert elapsed <= BUDGET + OVERRUN
+        assert used in ("local", solver) or solver == "auto"
+        assert status in ("optimal", "time_limit", "converged")
+
+
+def test_optimizer_keeps_greedy_repeats_and_sugar(greedy_problems):
+    # No repeats or sugar are traded away on a week whose band is out of reach
+    problem, start = greedy_problems[0]
+    assert not (problem.band_weight == weekly_optimizer.CALORIE_BAND_PENALTY).any()
+
+    assign, _, _ = solve_week(problem, BUDGET, "auto", start)
+    before, after = problem.breakdown(start), problem.breakdown(assign)
+    assert after["repeats"] <= before["repeats"]
+    assert after["sugar_over_g"] <= before["sugar_over_g"]
+
+
+@pytest.mark.parametrize("solver", SOLVER_NAMES)
+def test_avoidable_repeats_are_removed(solver):
+    problem, start = synthetic_problem()
+    assert problem.breakdown(start)["repeats"] == 3 * (DAYS - 1)
+
+    assign, _, _ = solve_week(problem, BUDGET, solver, start)
+    breakdown = problem.breakdown(assign)
+    assert problem.valid(assign)
+    assert breakdown["repeats"] == 0
+    assert breakdown["days_outside_band"] == 0
+
+
+def test_local_search_without_mip_solvers(monkeypatch, greedy_problems):
+    monkeypatch.setattr(weekly_optimizer, "cp_model", None)
+    monkeypatch.setattr(weekly_optimizer, "pulp", None)
+    problem, start = greedy_problems[1]
+
+    for solver in ("auto", "local"):
+        assign, used, status = solve_week(problem, BUDGET, solver, start)
+        assert used == "local"
+        assert problem.valid(assign)
+        assert problem.objective(assign) >= problem.objective(start) - 1e-6
+
+    with pytest.raises(ValueError, match="not available"):
+        solve_week(problem, BUDGET, "cpsat", start)
+
+
+def test_local_search_without_a_start():
+    problem, _ = synthetic_problem()
+    assign, used, status = solve_week(problem, BUDGET, "local")
+    assert problem.valid(assign)
+    assert (assign >= 0).all()
+    assert problem.breakdown(assign)["repeats"] == 0
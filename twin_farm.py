@@ -0,0 +1,281 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from multiprocessing import shared_memory
+
+import numpy as np
+from twin_population import TwinPopulation
+
+SHARD_SIZE = 8192          # twins per shard (fixed, so results do not depend on worker count)
+EPOCH_HOURS = 24 * 7       # hours simulated per task before results are aggregated
+
+
+# =========================
+# SHARED STATE
+# =========================
+class SharedArray:
+    """A NumPy array backed by a multiprocessing.shared_memory block"""
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        nbytes = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self.owner = True
+        else:
+            # Pool workers share the parent's resource tracker; only the
+            # creating process unlinks the block
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    @property
+    def spec(self):
+        """What a worker needs to attach: (name, shape, dtype)"""
+        return self.shm.name, self.shape, self.dtype.str
+
+    def close(self):
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# Attachments are reused by a worker across tasks
+_attached = {}
+
+
+def _attach(spec):
+    name, shape, dtype = spec
+    if name not in _attached:
+        _attached[name] = SharedArray(shape, dtype, name=name)
+    return _attached[name].array
+
+
+def _shard_rng(seed, shard, epoch):
+    """Independent, reproducible stream per (shard, epoch)"""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(shard, epoch)))
+
+
+# =========================
+# WORKER
+# =========================
+def _run_shard(task):
+    """
+    Advance one shard by one epoch, in place in shared memory.
+    Returns only small per-shard aggregates.
+    """
+    (shard, epoch, start, stop, first_hour, hours,
+     seed, buffers, meals, portion_g) = task
+
+    health = _attach(buffers["health"])[start:stop]
+    metrics = _attach(buffers["metrics"])[start:stop]
+    previous = _attach(buffers["previous_overall_health"])[start:stop]
+    returns = _attach(buffers["returns"])[start:stop]
+
+    population = TwinPopulation.from_buffers(
+        health, metrics, previous, _shard_rng(seed, shard, epoch)
+    )
+
+    size = stop - start
+    reward_sum = 0.0
+    for hour in range(first_hour, first_hour + hours):
+        meal = np.broadcast_to(meals[hour % len(meals)], (size, meals.shape[1]))
+        _, reward = population.apply_meals(meal, portion_g)
+        returns += reward
+        reward_sum += float(reward.sum(dtype=np.float64))
+
+    return shard, epoch, {
+        "meals": size * hours,
+        "reward_sum": reward_sum,
+        "health_sum": float(population.overall_health().sum(dtype=np.float64)),
+        "critical_twins": int((health < 0.6).any(axis=1).sum())
+    }
+
+
+# =========================
+# FARM
+# =========================
+class TwinFarm:
+    """
+    Long-horizon rollouts of a TwinPopulation across processes.
+
+    The population lives in shared memory and is split into fixed-size
+    shards; each (shard, epoch) task gets its own RNG stream from the
+    seed, and per-shard results are folded in (epoch, shard) order as
+    they arrive. A fixed seed therefore gives bit-identical results for
+    any number of workers.
+    """
+
+    def __init__(
+        self,
+        size,
+        seed=0,
+        workers=None,
+        shard_size=SHARD_SIZE,
+        epoch_hours=EPOCH_HOURS,
+        start_time=None
+    ):
+        self.size = size
+        self.seed = seed
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.epoch_hours = epoch_hours
+        self.current_time = start_time or datetime.now()
+        self.hours_done = 0
+        self.epochs_done = 0
+
+        initial = TwinPopulation(size, seed=seed)
+        self.nutrient_names = initial.nutrient_names
+
+        self.buffers = {
+            "health": SharedArray(initial.health.shape, np.float32),
+            "metrics": SharedArray(initial.metrics.shape, np.float32),
+            "previous_overall_health": SharedArray((size,), np.float32),
+            "returns": SharedArray((size,), np.float64)
+        }
+        self.buffers["health"].array[:] = initial.health
+        self.buffers["metrics"].array[:] = initial.metrics
+        self.buffers["previous_overall_health"].array[:] = initial.previous_overall_health
+        self.buffers["returns"].array[:] = 0
+
+        self.shards = [
+            (start, min(start + shard_size, size)) for start in range(0, size, shard_size)
+        ]
+        self._executor = None
+
+    # ---------- LIFECYCLE ----------
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for buffer in self.buffers.values():
+            buffer.close()
+        self.buffers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- STATE ----------
+    @property
+    def health(self):
+        return self.buffers["health"].array
+
+    @property
+    def returns(self):
+        """Cumulative reward per twin"""
+        return self.buffers["returns"].array
+
+    def population(self):
+        """The whole farm as a TwinPopulation (views into shared memory)"""
+        return TwinPopulation.from_buffers(
+            self.buffers["health"].array,
+            self.buffers["metrics"].array,
+            self.buffers["previous_overall_health"].array,
+            np.random.default_rng(self.seed)
+        )
+
+    # ---------- ROLLOUT ----------
+    def run(self, hours, meals, portion_g=100, on_epoch=None):
+        """
+        Simulate `hours` hourly meals for every twin. `meals` is a
+        K x nutrients matrix (TwinPopulation.nutrient_matrix) eaten in
+        rotation. `on_epoch(summary)` is called after each completed epoch.
+        Returns the aggregate summary.
+        """
+        meals = np.ascontiguousarray(meals, dtype=np.float32)
+        buffers = {name: buffer.spec for name, buffer in self.buffers.items()}
+
+        aggregate = OrderedAggregator(len(self.shards), on_epoch)
+
+        # An epoch reads the state the previous one wrote, so epochs run
+        # one after another; shards within an epoch run in parallel
+        for offset in range(0, hours, self.epoch_hours):
+            epoch_hours = min(self.epoch_hours, hours - offset)
+            futures = [
+                self.executor.submit(_run_shard, (
+                    shard, self.epochs_done, start, stop,
+                    self.hours_done + offset, epoch_hours,
+                    self.seed, buffers, meals, portion_g
+                ))
+                for shard, (start, stop) in enumerate(self.shards)
+            ]
+            for future in as_completed(futures):
+                aggregate.add(*future.result())
+            self.epochs_done += 1
+
+        self.hours_done += hours
+        self.current_time += timedelta(hours=hours)
+
+        return aggregate.summary(self.size)
+
+
+class OrderedAggregator:
+    """
+    Folds per-shard results as they complete, but always in
+    (epoch, shard) order, so float sums do not depend on timing.
+    """
+
+    def __init__(self, shard_count, on_epoch=None):
+        self.shard_count = shard_count
+        self.on_epoch = on_epoch
+        self._waiting = {}
+        self._next = (None, 0)
+
+        self.meals = 0
+        self.reward_sum = 0.0
+        self.epochs = 0
+        self._epoch_health = 0.0
+        self._epoch_critical = 0
+        self.health_sum = 0.0
+        self.critical_twins = 0
+
+    def add(self, shard, epoch, result):
+        self._waiting[(epoch, shard)] = result
+
+        if self._next[0] is None:
+            self._next = (epoch, 0)
+        while self._next in self._waiting:
+            self._fold(self._waiting.pop(self._next))
+
+    def _fold(self, result):
+        epoch, shard = self._next
+        self.meals += result["meals"]
+        self.reward_sum += result["reward_sum"]
+        self._epoch_health += result["health_sum"]
+        self._epoch_critical += result["critical_twins"]
+
+        if shard + 1 < self.shard_count:
+            self._next = (epoch, shard + 1)
+            return
+
+        # Epoch complete: its end-of-epoch state is the latest one
+        self.epochs += 1
+        self.health_sum, self.critical_twins = self._epoch_health, self._epoch_critical
+        self._epoch_health, self._epoch_critical = 0.0, 0
+        self._next = (epoch + 1, 0)
+
+        if self.on_epoch is not None:
+            self.on_epoch({"epoch": epoch, "meals": self.meals, "reward_sum": self.reward_sum})
+
+    def summary(self, size):
+        return {
+            "meals": self.meals,
+            "epochs": self.epochs,
+            "reward_sum": self.reward_sum,
+            "mean_reward": self.reward_sum / self.meals if self.meals else 0.0,
+            "mean_overall_health": self.health_sum / size if size else 0.0,
+            "critical_twins": self.critical_twins
+        }
@@ -0,0 +1,361 @@
+import numpy as np
+
+HISTORY_CAPACITY = 100     # meal/intervention events kept per twin
+
+
+# =========================
+# RING BUFFER
+# =========================
+class RingBuffer:
+    """
+    Fixed-capacity structured-array ring buffer.
+
+    Rows are written twice (at i and i + capacity), so the live window
+    is always one contiguous slice: records() and column() are views,
+    never copies, and pandas can wrap them directly.
+    """
+
+    def __init__(self, dtype, capacity=HISTORY_CAPACITY):
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=dtype)
+        self._next = 0          # slot of the next write, in [0, capacity)
+        self._count = 0
+
+    def append(self, row):
+        self._data[self._next] = row
+        self._data[self._next + self.capacity] = row
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def records(self):
+        """Live rows, oldest first (a view)"""
+        start = (self._next - self._count) % self.capacity
+        return self._data[start:start + self._count]
+
+    def column(self, name):
+        return self.records()[name]
+
+    def remap(self, field, mapping):
+        """Rewrite an id column through `mapping` (used when interned ids are compacted)"""
+        self._data[field] = mapping[self._data[field]]
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+
+# =========================
+# INTERNED MEALS
+# =========================
+class MealTable:
+    """
+    Each distinct (meal name, nutrients) pair stored once, as one row of
+    a float64 table; history rows keep only its id. Nutrients absent from
+    a meal are NaN. Bounded: when full, ids no longer referenced are
+    dropped.
+    """
+
+    def __init__(self, capacity=2 * HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.nutrient_names = []
+        self._nutrient_index = {}
+        self.names = []
+        self.values = np.full((capacity, 0), np.nan)
+        self._ids = {}
+
+    def intern(self, name, nutrients, live_ids=None, on_compact=None):
+        key = (name, tuple(sorted(nutrients.items())))
+        meal_id = self._ids.get(key)
+        if meal_id is not None:
+            return meal_id
+
+        if len(self.names) >= self.capacity:
+            self._compact(live_ids() if live_ids else np.array([], dtype=np.int32), on_compact)
+
+        for nutrient in nutrients:
+            if nutrient not in self._nutrient_index:
+                self._nutrient_index[nutrient] = len(self.nutrient_names)
+                self.nutrient_names.append(nutrient)
+        if self.values.shape[1] < len(self.nutrient_names):
+            grown = np.full((self.capacity, len(self.nutrient_names)), np.nan)
+            grown[:, :self.values.shape[1]] = self.values
+            self.values = grown
+
+        meal_id = len(self.names)
+        self.names.append(name)
+        self.values[meal_id] = np.nan
+        for nutrient, value in nutrients.items():
+            self.values[meal_id, self._nutrient_index[nutrient]] = value
+        self._ids[key] = meal_id
+        return meal_id
+
+    def _compact(self, live_ids, on_compact):
+        keep = np.unique(live_ids[live_ids >= 0])
+        mapping = np.full(self.capacity + 1, -1, dtype=np.int32)
+        mapping[keep] = np.arange(len(keep), dtype=np.int32)
+
+        self.names = [self.names[i] for i in keep.tolist()]
+        self.values[:len(keep)] = self.values[keep]
+        self._ids = {
+            key: int(mapping[meal_id]) for key, meal_id in self._ids.items() if mapping[meal_id] >= 0
+        }
+        if on_compact is not None:
+            on_compact(mapping)
+
+    def name_array(self):
+        return np.array(self.names, dtype=object)
+
+    def nutrients(self, meal_id):
+        row = self.values[meal_id].tolist()
+        return {
+            name: value for name, value in zip(self.nutrient_names, row) if value == value
+        }
+
+
+def _to_datetime(value):
+    return value.astype("datetime64[us]").item()
+
+
+# =========================
+# TWIN HISTORY
+# =========================
+class TwinHistory:
+    """
+    Meal and intervention history of one OrganDigitalTwin.
+
+    One row per meal holds the timestamp (datetime64[ns], int64
+    underneath), meal id, portion, reward, overall health and float32
+    health/impact vectors for all organs. `history[organ]`,
+    `nutrient_history` and `intervention_history` on the twin are views
+    over these buffers.
+    """
+
+    def __init__(self, organ_names, capacity=HISTORY_CAPACITY):
+        self.organ_names = list(organ_names)
+        self.organ_index = {name: i for i, name in enumerate(self.organ_names)}
+        organs = len(self.organ_names)
+
+        self.meals = MealTable(capacity=2 * capacity)
+        self.meal_events = RingBuffer([
+            ("timestamp", "datetime64[ns]"),
+            ("meal_id", np.int32),
+            ("portion", np.float32),
+            ("overall_impact", np.float32),
+            ("reward", np.float32),
+            ("overall_health_before", np.float32),
+            ("overall_health_after", np.float32),
+            ("health_before", np.float32, (organs,)),
+            ("health", np.float32, (organs,)),
+            ("impact", np.float32, (organs,))
+        ], capacity)
+
+        self.interventions = []
+        self._intervention_ids = {}
+        self.intervention_events = RingBuffer([
+            ("timestamp", "datetime64[ns]"),
+            ("intervention_id", np.int32),
+            ("intensity", np.float32),
+            ("health", np.float32, (organs,)),
+            ("impact", np.float32, (organs,))
+        ], capacity)
+
+    # ---------- RECORDING ----------
+    def record_meal(self, timestamp, meal_name, nutrients, portion, health_before,
+                    health, impact, reward, overall_before, overall_after):
+        meal_id = self.meals.intern(
+            meal_name,
+            nutrients,
+            live_ids=lambda: self.meal_events.column("meal_id"),
+            on_compact=lambda mapping: self.meal_events.remap("meal_id", mapping)
+        )
+        self.meal_events.append((
+            np.datetime64(timestamp, "ns"),
+            meal_id,
+            portion,
+            float(np.mean(impact)),
+            reward,
+            overall_before,
+            overall_after,
+            health_before,
+            health,
+            impact
+        ))
+
+    def record_intervention(self, timestamp, intervention, intensity, health, impact):
+        intervention_id = self._intervention_ids.setdefault(intervention, len(self.interventions))
+        if intervention_id == len(self.interventions):
+            self.interventions.append(intervention)
+        self.intervention_events.append((
+            np.datetime64(timestamp, "ns"), intervention_id, intensity, health, impact
+        ))
+
+    # ---------- EXPORT ----------
+    def organ_frame(self, organ_name):
+        """timestamp / health / impact / meal for one organ as a DataFrame"""
+        import pandas as pd
+
+        records = self.meal_events.records()
+        i = self.organ_index[organ_name]
+        return pd.DataFrame({
+            "timestamp": records["timestamp"],
+            "health": records["health"][:, i],
+            "impact": records["impact"][:, i],
+            "meal": self.meals.name_array()[records["meal_id"]]
+        }, copy=False)
+
+    def meal_frame(self):
+        """One row per meal with overall figures and the meal's nutrients"""
+        import pandas as pd
+
+        records = self.meal_events.records()
+        frame = pd.DataFrame({
+            "timestamp": records["timestamp"],
+            "meal": self.meals.name_array()[records["meal_id"]],
+            "portion": records["portion"],
+            "overall_impact": records["overall_impact"],
+            "reward": records["reward"],
+            "overall_health_before": records["overall_health_before"],
+            "overall_health_after": records["overall_health_after"]
+        }, copy=False)
+        nutrients = self.meals.values[records["meal_id"]]
+        for j, name in enumerate(self.meals.nutrient_names):
+            frame[name] = nutrients[:, j]
+        return frame
+
+
+# =========================
+# COMPATIBILITY VIEWS
+# =========================
+class OrganHistoryView:
+    """history[organ]: sized, iterable as the former per-organ dicts"""
+
+    def __init__(self, history, organ_name):
+        self._history = history
+        self._organ_name = organ_name
+
+    def __len__(self):
+        return len(self._history.meal_events)
+
+    def __bool__(self):
+        return bool(self._history.meal_events)
+
+    def __iter__(self):
+        history = self._history
+        i = history.organ_index[self._organ_name]
+        for row in history.meal_events.records():
+            yield {
+                "timestamp": _to_datetime(row["timestamp"]),
+                "health": float(row["health"][i]),
+                "impact": float(row["impact"][i]),
+                "meal": history.meals.names[row["meal_id"]],
+                "nutrients": history.meals.nutrients(row["meal_id"])
+            }
+
+    def to_frame(self):
+        return self._history.organ_frame(self._organ_name)
+
+
+class OrganHistory:
+    """Mapping organ -> OrganHistoryView, replacing the per-organ deques"""
+
+    def __init__(self, history):
+        self._history = history
+
+    def __getitem__(self, organ_name):
+        if organ_name not in self._history.organ_index:
+            raise KeyError(organ_name)
+        return OrganHistoryView(self._history, organ_name)
+
+    def __contains__(self, organ_name):
+        return organ_name in self._history.organ_index
+
+    def __iter__(self):
+        return iter(self._history.organ_names)
+
+    def __len__(self):
+        return len(self._history.organ_names)
+
+    def keys(self):
+        return list(self._history.organ_names)
+
+    def items(self):
+        return [(name, self[name]) for name in self._history.organ_names]
+
+
+class MealEventsView:
+    """nutrient_history: sized, indexable, iterable as the former dicts"""
+
+    def __init__(self, history):
+        self._history = history
+
+    def __len__(self):
+        return len(self._history.meal_events)
+
+    def __bool__(self):
+        return bool(self._history.meal_events)
+
+    def _row(self, row):
+        history = self._history
+        return {
+            "timestamp": _to_datetime(row["timestamp"]),
+            "meal": history.meals.names[row["meal_id"]],
+            "nutrients": history.meals.nutrients(row["meal_id"]),
+            "portion": float(row["portion"]),
+            "overall_impact": float(row["overall_impact"]),
+            "organ_states": dict(zip(history.organ_names, row["health_before"].tolist())),
+            "reward": float(row["reward"]),
+            "overall_health_before": float(row["overall_health_before"]),
+            "overall_health_after": float(row["overall_health_after"])
+        }
+
+    def __getitem__(self, index):
+        records = self._history.meal_events.records()
+        if isinstance(index, slice):
+            return [self._row(row) for row in records[index]]
+        return self._row(records[index])
+
+    def __iter__(self):
+        for row in self._history.meal_events.records():
+            yield self._row(row)
+
+    def to_frame(self):
+        return self._history.meal_frame()
+
+
+class InterventionEventsView:
+    """intervention_history: sized, indexable, iterable as the former dicts"""
+
+    def __init__(self, history):
+        self._history = history
+
+    def __len__(self):
+        return len(self._history.intervention_events)
+
+    def __bool__(self):
+        return bool(self._history.intervention_events)
+
+    def _row(self, row):
+        history = self._history
+        return {
+            "timestamp": _to_datetime(row["timestamp"]),
+            "intervention": history.interventions[row["intervention_id"]],
+            "intensity": float(row["intensity"]),
+            "impacts": {
+                name: {"impact": impact, "new_health": health}
+                for name, impact, health in zip(
+                    history.organ_names, row["impact"].tolist(), row["health"].tolist()
+                )
+            }
+        }
+
+    def __getitem__(self, index):
+        records = self._history.intervention_events.records()
+        if isinstance(index, slice):
+            return [self._row(row) for row in records[index]]
+        return self._row(records[index])
+
+    def __iter__(self):
+        for row in self._history.intervention_events.records():
+            yield self._row(row)
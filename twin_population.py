@@ -0,0 +1,269 @@
+import numpy as np
+from config import ORGAN_BASELINES, ORGAN_DEFINITIONS, ORGAN_WEIGHTS
+from organ_twin import (
+    OrganDigitalTwin,
+    OrganImpactModel,
+    OrganMetricsModel,
+    intervention_effect,
+    organ_colors
+)
+
+
+def _organ_layout():
+    """Organs as OrganDigitalTwin._initialize_organs lays them out (without health)"""
+    organs = {}
+    for organ_name, props in ORGAN_DEFINITIONS.items():
+        metrics = props.get("metrics") or ORGAN_BASELINES.get(organ_name, {})
+        organs[organ_name] = {**props, "metrics": dict(metrics)}
+    return organs
+
+
+class TwinPopulation:
+    """
+    Many digital twins in contiguous float32 arrays.
+
+    - health: N twins x 10 organs
+    - metrics: N twins x organ metric slots (layout of OrganMetricsModel)
+
+    A batch of meals (N x nutrients) is one matrix product, a clip and a
+    few row reductions, with the same rules as OrganDigitalTwin. Random
+    jitter comes from a seeded NumPy generator, so results are
+    reproducible per seed but not draw-for-draw equal to a single twin.
+    """
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self._compile()
+
+        # Start with 70-90% health
+        self.health = 0.7 + self.rng.random((size, len(self.organ_names)), dtype=np.float32) * np.float32(0.2)
+        self.metrics = np.tile(self.initial_metrics, (size, 1))
+        self.previous_overall_health = np.full(size, 0.5, dtype=np.float32)
+
+    @classmethod
+    def from_buffers(cls, health, metrics, previous_overall_health, rng):
+        """
+        Population over existing arrays (e.g. a shard of shared memory);
+        every step updates them in place.
+        """
+        population = cls.__new__(cls)
+        population.size = len(health)
+        population.rng = rng
+        population._compile()
+        population.health = health
+        population.metrics = metrics
+        population.previous_overall_health = previous_overall_health
+        return population
+
+    def _compile(self):
+        self.layout = _organ_layout()
+        self.organ_names = list(self.layout)
+        self.impact_model = OrganImpactModel(self.layout)
+        self.metrics_model = OrganMetricsModel(self.layout)
+        self.nutrient_names = self.impact_model.nutrient_names
+
+        # Float32 copies of the compiled models
+        self.sensitivity = self.impact_model.matrix.T.astype(np.float32)          # nutrients x organs
+        self.inv_normalization = (1.0 / self.impact_model.normalization).astype(np.float32)
+        self.metric_organ = self.metrics_model.organ_slot
+        self.metric_base = self.metrics_model.base.astype(np.float32)
+        self.metric_low = self.metrics_model.low.astype(np.float32)
+        self.metric_high = self.metrics_model.high.astype(np.float32)
+        self.organ_weights = np.array(
+            [ORGAN_WEIGHTS.get(name, 0.0) for name in self.organ_names], dtype=np.float32
+        )
+        self.initial_metrics = np.array(
+            [metrics[metric] for metrics, metric in self.metrics_model.slots], dtype=np.float32
+        )
+
+    # =========================
+    # INPUTS
+    # =========================
+    def nutrient_matrix(self, meals):
+        """
+        N x nutrients float32 matrix, columns in `nutrient_names` order.
+        `meals` is a list of nutrient dicts or a dict of per-nutrient
+        arrays/scalars; missing nutrients count as 0.
+        """
+        if isinstance(meals, dict):
+            matrix = np.zeros((self.size, len(self.nutrient_names)), dtype=np.float32)
+            for j, name in enumerate(self.nutrient_names):
+                if name in meals:
+                    matrix[:, j] = meals[name]
+            return matrix
+
+        return np.array(
+            [[meal.get(name, 0) for name in self.nutrient_names] for meal in meals],
+            dtype=np.float32
+        )
+
+    # =========================
+    # BATCH STEPS
+    # =========================
+    def apply_meals(self, nutrients, portion_g=100, rows=None):
+        """
+        Apply one meal per twin. `nutrients` is an N x nutrients matrix
+        (see nutrient_matrix) or anything nutrient_matrix accepts;
+        `portion_g` is a scalar or per-twin array. `rows` restricts the
+        step to a subset of twins (nutrients then has one row per index).
+
+        Returns (impact, reward): impact per twin x organ, reward per twin.
+        """
+        if not isinstance(nutrients, np.ndarray):
+            nutrients = self.nutrient_matrix(nutrients)
+        nutrients = np.asarray(nutrients, dtype=np.float32)
+
+        health = self.health if rows is None else self.health[rows]
+        scale = np.asarray(portion_g, dtype=np.float32) / np.float32(100)
+
+        self.previous_overall_health[slice(None) if rows is None else rows] = (
+            self.overall_health(health)
+        )
+
+        # One matrix product for the whole batch
+        impact = (nutrients * self.inv_normalization) @ self.sensitivity
+        impact *= scale.reshape(-1, 1) if scale.ndim else scale
+        noise = self.rng.random(impact.shape, dtype=np.float32)
+        noise *= np.float32(0.04)
+        noise -= np.float32(0.02)
+        impact += noise
+
+        # Bounds and natural recovery
+        new_health = np.clip(health + impact, 0.1, 1.0)
+        new_health += np.float32(0.001)
+        np.minimum(new_health, 1.0, out=new_health)
+
+        reward = self.reward(health, new_health)
+        self._store(rows, new_health)
+        return impact, reward
+
+    def apply_intervention(self, intervention_type, intensity=1.0, rows=None):
+        """Same effects as OrganDigitalTwin.apply_intervention, for every twin"""
+        boosted, boost, other = intervention_effect(intervention_type)
+        impact = np.array(
+            [boost if name in boosted else other for name in self.organ_names], dtype=np.float32
+        ) * np.float32(intensity)
+
+        health = self.health if rows is None else self.health[rows]
+        self._store(rows, np.clip(health + impact, 0.1, 1.0))
+        return impact
+
+    def _store(self, rows, new_health):
+        if rows is None:
+            self.health[:] = new_health
+            self._update_metrics(self.health, self.metrics)
+        else:
+            metrics = self.metrics[rows]
+            self._update_metrics(new_health, metrics)
+            self.health[rows] = new_health
+            self.metrics[rows] = metrics
+
+    def _update_metrics(self, health, metrics):
+        """Move every metric toward baseline * health factor, in place"""
+        # Maps 0.1-1.0 to 0.64-1.0
+        health_factor = 0.6 + health[:, self.metric_organ] * np.float32(0.4)
+        target = self.metric_base * health_factor
+        target -= metrics
+        target *= np.float32(0.1)
+        metrics += target
+        np.clip(metrics, self.metric_low, self.metric_high, out=metrics)
+
+    # =========================
+    # REDUCTIONS
+    # =========================
+    def overall_health(self, health=None):
+        """Weighted organ health per twin"""
+        health = self.health if health is None else health
+        # Row-wise reduction rather than a matmul, so one twin's value
+        # does not depend on how many rows are reduced with it
+        return np.add.reduce(health * self.organ_weights, axis=1)
+
+    @staticmethod
+    def reward(before, after):
+        """OrganDigitalTwin._calculate_reward as row reductions"""
+        health_reward = (after.mean(axis=1) - before.mean(axis=1)) * 50
+        critical_penalty = -(after < 0.6).sum(axis=1) * 0.5
+        balance_reward = -after.var(axis=1) * 2
+        worst_organ_reward = (after.min(axis=1) - before.min(axis=1)) * 20
+        return (health_reward + critical_penalty + balance_reward + worst_organ_reward).astype(np.float32)
+
+    # =========================
+    # PER-TWIN VIEWS
+    # =========================
+    def twin(self, index):
+        return TwinView(self, index)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return self.twin(index)
+
+
+class TwinView:
+    """
+    One row of a TwinPopulation behind the OrganDigitalTwin API.
+
+    `organs` is built on access from the arrays (health, metrics, colour
+    plus the static organ properties); changes go through the methods,
+    not through that dict. No per-twin history is kept.
+    """
+
+    def __init__(self, population, index):
+        self.population = population
+        self.index = index
+
+    @property
+    def organs(self):
+        population = self.population
+        health = population.health[self.index].tolist()
+        metric_values = population.metrics[self.index].tolist()
+        colors = organ_colors(health)
+
+        organs = {}
+        for i, (organ_name, props) in enumerate(population.layout.items()):
+            organs[organ_name] = {**props, "health": health[i], "color": colors[i], "metrics": {}}
+
+        for slot, (_, metric) in enumerate(population.metrics_model.slots):
+            organ_name = population.organ_names[population.metric_organ[slot]]
+            organs[organ_name]["metrics"][metric] = metric_values[slot]
+        return organs
+
+    def simulate_meal_impact(self, nutrients, portion_g=100, meal_name="Meal"):
+        population = self.population
+        impact, reward = population.apply_meals(
+            population.nutrient_matrix([nutrients]), portion_g, rows=[self.index]
+        )
+
+        new_health = population.health[self.index].tolist()
+        impacts = {
+            organ_name: {
+                "impact": float(impact[0, i]),
+                "new_health": new_health[i],
+                "stress_level": abs(float(impact[0, i])) * 100
+            }
+            for i, organ_name in enumerate(population.organ_names)
+        }
+        return impacts, float(reward[0])
+
+    def apply_intervention(self, intervention_type, intensity=1.0):
+        population = self.population
+        impact = population.apply_intervention(intervention_type, intensity, rows=[self.index])
+        new_health = population.health[self.index].tolist()
+        return {
+            organ_name: {"impact": float(impact[i]), "new_health": new_health[i]}
+            for i, organ_name in enumerate(population.organ_names)
+        }
+
+    def get_organ_states(self):
+        return dict(zip(self.population.organ_names, self.population.health[self.index].tolist()))
+
+    def get_overall_health(self):
+        return float(self.population.overall_health(self.population.health[[self.index]])[0])
+
+    def get_overall_health_previous(self):
+        return float(self.population.previous_overall_health[self.index])
+
+    # Only reads self.organs, so the single-twin implementation applies as is
+    create_3d_visualization = OrganDigitalTwin.create_3d_visualization